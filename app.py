@@ -8,13 +8,19 @@ from routes.directors_routes import directors_bp
 from routes.recommendations_routes import recommendations_bp
 from routes.auth_routes import auth_bp
 from routes.interaction_routes import interactions_bp
+from routes.suggest_routes import suggest_bp
+from routes.metrics_routes import metrics_bp
+from commands import register_commands
+import schema_migrations
+from engines import warmup
+import telemetry
 
 def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'Olvidonaaaaaa'
     
     # Habilitar CORS para todas las rutas
-    CORS(app)
+    CORS(app, expose_headers=["X-Next-Cursor"])
 
     app.register_blueprint(users_bp)
     app.register_blueprint(movies_bp)
@@ -24,5 +30,19 @@ def create_app():
     app.register_blueprint(recommendations_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(interactions_bp)
+    app.register_blueprint(suggest_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Spans por petición (/metrics, /debug/slow) y logging con nivel y muestreo
+    telemetry.configure_logging()
+    telemetry.init_app(app)
+
+    # Constraints e índices de las búsquedas por id/email/nombre (SCHEMA_MIGRATIONS)
+    schema_migrations.init_app(app)
+
+    register_commands(app)
+
+    # Motores en memoria habilitados cargados antes de la primera petición
+    warmup.init_app(app)
 
     return app
\ No newline at end of file
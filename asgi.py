@@ -0,0 +1,73 @@
+"""Modo ASGI: hypercorn asgi:app --bind 0.0.0.0:5001
+
+Las rutas con versión asíncrona (routes/async_routes.py) se atienden en el
+event loop con el driver asíncrono de Neo4j, así que una consulta lenta no
+ocupa un hilo. El resto de las rutas de los blueprints pasan a la app Flask
+de siempre, que corre en el pool de hilos.
+"""
+import os
+import asyncio
+from quart import Quart
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from werkzeug.exceptions import HTTPException
+from app import create_app
+from neo4j_connection import close_async_driver
+import telemetry
+from engines.warmup import warm_engines as load_engines
+from routes.async_routes import async_bp
+
+
+def create_async_app():
+    app = Quart(__name__)
+    app.register_blueprint(async_bp)
+    telemetry.init_app(app, asynchronous=True)
+
+    @app.before_serving
+    async def warm_engines():
+        # Las estructuras en memoria se cargan con consultas síncronas: mejor antes de recibir tráfico
+        await asyncio.get_running_loop().run_in_executor(None, load_engines)
+
+    @app.after_serving
+    async def close_driver():
+        await close_async_driver()
+
+    # Mismos encabezados CORS que flask-cors en la app Flask
+    @app.after_request
+    async def cors_headers(response):
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+        return response
+
+    return app
+
+
+class AsyncFirst:
+    """App ASGI que despacha a la app asíncrona si tiene la ruta y si no a Flask"""
+
+    def __init__(self, async_app, flask_app):
+        self.async_app = async_app
+        self.flask_app = AsyncioWSGIMiddleware(
+            flask_app, max_body_size=int(os.getenv("ASGI_MAX_BODY_BYTES", str(16 * 1024 * 1024))))
+        self.routes = async_app.url_map.bind("")
+
+    def handles(self, scope):
+        # Las preflight OPTIONS las responde flask-cors
+        if scope["method"] == "OPTIONS":
+            return False
+        try:
+            self.routes.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self.handles(scope):
+            return await self.flask_app(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+def create_asgi_app():
+    return AsyncFirst(create_async_app(), create_app())
+
+
+app = create_asgi_app()
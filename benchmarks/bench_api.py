@@ -0,0 +1,216 @@
+"""Prueba de carga de toda la API sobre el backend en memoria (sin Neo4j).
+
+Uso:
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --movies 10000 --users 2000 --interactions 100000 --requests 200
+    python -m benchmarks.bench_api --env CONTENT_GRAPH_ENABLED=true --env SEARCH_INDEX_ENABLED=true
+    python -m benchmarks.bench_api --routes recommendations movies/search
+
+Genera un grafo sintético determinista (ver synthetic.generate_graph),
+lo instala con memory_driver.install() y recorre cada ruta de los blueprints
+con el cliente de pruebas de Flask: --requests peticiones por ruta con
+parámetros al azar del grafo (usuarios, películas, actores, ...). Reporta
+peticiones por segundo, p50, p95 y p99 de cada ruta. Lo que se mide es la
+parte de Python (controladores, motores, JSON); el repositorio en memoria
+responde las consultas con bucles simples, así que sin índices en memoria
+las consultas que recorren todo el catálogo pesan más que en Neo4j.
+
+Termina con código 1 si alguna ruta respondió 5xx, si el driver en memoria recibió
+una consulta que no sabe responder o si hay rutas registradas que el
+benchmark no cubre.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+
+# /login y /register usan bcrypt (~0.2 s por petición); se piden menos veces
+SLOW_ROUTES = {"/register", "/login"}
+
+ADMIN_TOKEN = "bench-admin"
+ADMIN_HEADERS = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def quote(value):
+    return urllib.parse.quote(str(value), safe="")
+
+
+def route_cases(graph, rng):
+    """[(regla de Flask, método, función rng -> (ruta, json))] que cubren todos los blueprints"""
+    movies = list(graph.movies)
+    users = list(graph.users)
+    actors = list(graph.actors.values())
+    directors = list(graph.directors.values())
+    genres = list(graph.genres)
+    seasons = list(graph.seasons) or ["Navidad"]
+    words = [word for movie in graph.movies.values() for word in (movie["title"] or "").split()[:1]] or ["a"]
+    counter = iter(range(10**9))
+
+    def user():
+        return quote(rng.choice(users))
+
+    def movie():
+        return quote(rng.choice(movies))
+
+    def interact(r):
+        kind = r.choice(["like", "like", "like", "dislike"])
+        return "/interact", {"user_id": r.choice(users), "movie_id": r.choice(movies), "type": kind}
+
+    def advanced(r):
+        params = r.choice([{"genre": r.choice(genres)}, {"title": r.choice(words)},
+                           {"actor": r.choice(actors)["name"]}, {"season": r.choice(seasons)},
+                           {"genre": r.choice(genres), "director": r.choice(directors)["name"][:4]}])
+        return "/movies/search/advanced?" + urllib.parse.urlencode(params), None
+
+    def register(r):
+        return "/register", {"email": f"bench{next(counter)}@example.com", "password": "secreto", "name": "Bench"}
+
+    def create_user(r):
+        return "/users", {"email": f"nuevo{next(counter)}@example.com", "name": "Nuevo", "password_hash": None}
+
+    return [
+        ("/interact", "POST", interact),
+        ("/users/<user_id>/interactions", "GET", lambda r: (f"/users/{user()}/interactions", None)),
+        ("/users/<user_id>/preferences", "GET", lambda r: (f"/users/{user()}/preferences", None)),
+        ("/movies/<movie_id>", "GET", lambda r: (f"/movies/{movie()}", None)),
+        ("/movies/<movie_id>/similar", "GET", lambda r: (f"/movies/{movie()}/similar", None)),
+        ("/movies", "GET", lambda r: ("/movies?limit=50", None)),
+        ("/movies?sort=title", "GET", lambda r: ("/movies?sort=title&limit=100", None)),
+        ("/movies?stream=ndjson", "GET", lambda r: ("/movies?stream=ndjson", None)),
+        ("/movies/top", "GET", lambda r: ("/movies/top?" + r.choice(["limit=10", "window=24h", "window=7d"]), None)),
+        ("/movies/latest", "GET", lambda r: ("/movies/latest", None)),
+        ("/movies/season/<season_name>", "GET", lambda r: (f"/movies/season/{quote(r.choice(seasons))}", None)),
+        ("/movies/search", "GET", lambda r: (f"/movies/search?q={quote(r.choice(words))}", None)),
+        ("/movies/search/advanced", "GET", advanced),
+        ("/movies/cache/stats", "GET", lambda r: ("/movies/cache/stats", None)),
+        ("/movies/cache/invalidate", "POST", lambda r: ("/movies/cache/invalidate", {"movie_ids": [r.choice(movies)]})),
+        ("/movies/cache/refresh", "POST", lambda r: ("/movies/cache/refresh", {"movie_ids": [r.choice(movies)]})),
+        ("/users", "POST", create_user),
+        ("/users/id/<user_id>", "GET", lambda r: (f"/users/id/{user()}", None)),
+        ("/users/email/<user_email>", "GET",
+         lambda r: (f"/users/email/{quote(graph.users[r.choice(users)]['email'])}", None)),
+        ("/genres/<genre_name>", "GET", lambda r: (f"/genres/{quote(r.choice(genres))}", None)),
+        ("/genres", "GET", lambda r: ("/genres", None)),
+        ("/genres/<genre_name>/movies", "GET", lambda r: (f"/genres/{quote(r.choice(genres))}/movies", None)),
+        ("/recommendations/<user_id>", "GET", lambda r: (f"/recommendations/{user()}", None)),
+        ("/recommendations/<user_id>?algo=ppr", "GET", lambda r: (f"/recommendations/{user()}?algo=ppr", None)),
+        ("/recommendations/<user_id>?algo=collaborative", "GET",
+         lambda r: (f"/recommendations/{user()}?algo=collaborative", None)),
+        ("/recommendations/<user_id>?algo=hybrid", "GET", lambda r: (f"/recommendations/{user()}?algo=hybrid", None)),
+        ("/recommendations/batch", "POST",
+         lambda r: ("/recommendations/batch", {"user_ids": r.sample(users, min(20, len(users)))})),
+        ("/recommendations/cache/stats", "GET", lambda r: ("/recommendations/cache/stats", None)),
+        ("/recommendations/<user_id>/explain/<movie_id>", "GET",
+         lambda r: (f"/recommendations/{user()}/explain/{movie()}", None)),
+        ("/recommendations/<user_id>/test", "GET", lambda r: (f"/recommendations/{user()}/test", None)),
+        ("/actors/<actor_id>", "GET", lambda r: (f"/actors/{quote(r.choice(actors)['id'])}", None)),
+        ("/actors", "GET", lambda r: ("/actors", None)),
+        ("/actors/search", "GET", lambda r: (f"/actors/search?q={quote(r.choice(actors)['name'][:4])}", None)),
+        ("/actors/<actor_name>/movies", "GET", lambda r: (f"/actors/{quote(r.choice(actors)['name'])}/movies", None)),
+        ("/register", "POST", register),
+        ("/login", "POST", lambda r: ("/login", {"email": "bench0@example.com", "password": "secreto"})),
+        ("/suggest", "GET", lambda r: (f"/suggest?q={quote(r.choice(words)[:3])}", None)),
+        ("/directors/<director_id>", "GET", lambda r: (f"/directors/{quote(r.choice(directors)['id'])}", None)),
+        ("/directors", "GET", lambda r: ("/directors", None)),
+        ("/directors/<director_name>/movies", "GET",
+         lambda r: (f"/directors/{quote(r.choice(directors)['name'])}/movies", None)),
+        ("/metrics", "GET", lambda r: ("/metrics", None)),
+        ("/debug/slow", "GET", lambda r: ("/debug/slow", None)),
+    ]
+
+
+def run_case(client, method, make_request, n, rng):
+    """(latencias en ms, [(estado, ruta)] con 5xx) de n peticiones"""
+    samples, errors = [], []
+    for _ in range(n):
+        path, body = make_request(rng)
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=ADMIN_HEADERS)
+        response.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 500:
+            errors.append((response.status_code, path))
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--interactions", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=100, help="peticiones por ruta")
+    parser.add_argument("--routes", nargs="*", default=None, help="solo las rutas que contienen estos textos")
+    parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="variable de entorno antes de crear la app (p. ej. para habilitar motores)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Las rutas de administración (/movies/cache/...) también se miden
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    # El índice de películas parecidas se construye al crear la app y no se guarda
+    os.environ.setdefault("SIMILAR_INDEX_PATH", "")
+    # Un solo proceso: /movies/cache/refresh no tiene a quién publicar la recarga
+    os.environ.setdefault("CATALOG_REFRESH_PATH", "")
+    for assignment in args.env:
+        key, _, value = assignment.partition("=")
+        os.environ[key] = value
+
+    from testing.synthetic import generate_graph
+    from testing.memory_driver import install
+    from neo4j_connection import get_driver
+
+    start = time.perf_counter()
+    graph = generate_graph(args.movies, args.users, args.interactions, seed=args.seed)
+    install(graph)
+    print(f"grafo sintético: {len(graph.movies)} películas, {len(graph.users)} usuarios, "
+          f"{args.interactions} interacciones ({time.perf_counter() - start:.1f}s)")
+
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    cases = route_cases(graph, rng)
+    # El usuario de /login tiene que existir antes de medir
+    client.post("/register", json={"email": "bench0@example.com", "password": "secreto", "name": "Bench"})
+
+    covered = {rule.split("?")[0] for rule, _, _ in cases}
+    missing = sorted(rule.rule for rule in app.url_map.iter_rules()
+                     if rule.endpoint != "static" and rule.rule.replace("<path:", "<") not in covered)
+
+    print(f"{'ruta':<50}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'5xx':>6}")
+    failures = []
+    for rule, method, make_request in cases:
+        if args.routes and not any(text in rule for text in args.routes):
+            continue
+        n = max(args.requests // 20, 3) if rule in SLOW_ROUTES else args.requests
+        # Una petición de calentamiento: carga perezosa de motores e índices
+        run_case(client, method, make_request, 1, rng)
+        started = time.perf_counter()
+        samples, errors = run_case(client, method, make_request, n, rng)
+        elapsed = time.perf_counter() - started
+        samples.sort()
+        print(f"{method + ' ' + rule:<50}{n / elapsed:>9.1f}{statistics.median(samples):>10.2f}"
+              f"{_percentile(samples, 0.95):>10.2f}{_percentile(samples, 0.99):>10.2f}{len(errors):>6}")
+        failures.extend(f"{status} {method} {path}" for status, path in errors[:3])
+
+    unsupported = sorted(set(get_driver().backend.unsupported))
+    for query in unsupported:
+        print(f"ERROR >> {query}")
+    for status_path in failures:
+        print(f"ERROR >> {status_path}")
+    for rule in missing:
+        print(f"ERROR >> Ruta sin cubrir en el benchmark: {rule}")
+    if unsupported or failures or missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Prueba de carga: app Flask (hilos) vs modo ASGI (driver asíncrono).
+
+Uso (con los dos servidores en marcha sobre la misma base):
+    python main.py                                   # Flask en :5001
+    hypercorn asgi:app --bind 0.0.0.0:5002           # ASGI en :5002
+    python -m benchmarks.bench_asgi --flask http://localhost:5001 --asgi http://localhost:5002
+
+Cada cliente pide GET /recommendations/<user_id> (solo lectura) para
+usuarios al azar, con --clients peticiones en vuelo a la vez (200 por
+defecto). Los usuarios salen de --users o de los primeros --sample-users
+User de la base de .env. Se reportan peticiones por segundo, p50, p99 y
+errores de cada servidor. Conviene desactivar la caché de recomendaciones
+(RECOMMENDATION_CACHE_SIZE=0) en ambos para medir el camino hasta Neo4j.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def sample_users(n):
+    from neo4j_connection import Neo4jConnection
+    from engines.preference_store import iter_user_id_pages
+
+    users = []
+    with Neo4jConnection() as conn:
+        for page in iter_user_id_pages(conn, min(n, 1000)):
+            users.extend(page)
+            if len(users) >= n:
+                break
+    return users[:n]
+
+
+def load_test(url, users, n_clients, n_requests, path, timeout):
+    """n_requests peticiones repartidas entre n_clients hilos que piden sin pausa"""
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    per_client = max(n_requests // n_clients, 1)
+
+    def client(seed):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(per_client):
+            user_id = urllib.parse.quote(str(rng.choice(users)), safe="")
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url.rstrip('/') + path.format(user_id=user_id),
+                                            timeout=timeout) as response:
+                    json.load(response)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = _percentiles(samples) if samples else {"p50": 0, "p99": 0}
+    return {"requests": len(samples), "seconds": elapsed, "rps": len(samples) / elapsed,
+            "errors": len(errors), **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flask", default="http://localhost:5001")
+    parser.add_argument("--asgi", default="http://localhost:5002")
+    parser.add_argument("--path", default="/recommendations/{user_id}?limit=10")
+    parser.add_argument("--users", nargs="+")
+    parser.add_argument("--sample-users", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    users = args.users or sample_users(args.sample_users)
+    if not users:
+        parser.error("No hay usuarios: usa --users o carga User en la base")
+
+    for name, url in (("flask", args.flask), ("asgi", args.asgi)):
+        # Una ronda corta para calentar conexiones y estructuras en memoria
+        load_test(url, users, min(args.clients, 10), min(args.requests, 50), args.path, args.timeout)
+        result = load_test(url, users, args.clients, args.requests, args.path, args.timeout)
+        print(f"{name:<6} {result['requests']:>6} peticiones en {result['seconds']:6.2f}s "
+              f"({result['rps']:7.1f} req/s) | p50 {result['p50']:8.1f} ms p99 {result['p99']:8.1f} ms | "
+              f"errores {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark y prueba de paridad del grafo de contenido en memoria.
+
+Uso:
+    python -m benchmarks.bench_content_graph                 # catálogos sintéticos de 10k y 100k
+    python -m benchmarks.bench_content_graph --sizes 1000 10000
+    python -m benchmarks.bench_content_graph --neo4j USER_ID [USER_ID ...]
+
+La paridad se comprueba contra una emulación fila por fila de la consulta
+Cypher de get_recommendations_for_user (producto cartesiano de géneros x
+actores x directores x temporadas y REDUCE sobre toda la lista de
+preferencias). Esa emulación es Python, no Neo4j: su latencia sale en la
+tabla como "Cypher emulado en Python" y solo sirve de orden de magnitud. La misma
+paridad corre en pytest (tests/test_content_graph.py). Con --neo4j se
+compara además contra la consulta real sobre la base de datos configurada
+en .env (solo lectura) y se mide su latencia real.
+"""
+import argparse
+import statistics
+import time
+
+from testing.reference import cypher_reference_scores
+from testing.synthetic import edges_by_movie, generate_catalogue, generate_user
+from engines.content_graph import ContentGraph
+
+
+def check_parity(n_movies=2000, n_users=20, limit=10):
+    movies, edges = generate_catalogue(n_movies, seed=1)
+    graph = ContentGraph.from_rows(movies, edges)
+    per_movie = edges_by_movie(edges)
+
+    for user_seed in range(n_users):
+        seen, preferences = generate_user(movies, edges, n_interactions=40, seed=user_seed)
+        reference = cypher_reference_scores(movies, per_movie, preferences, seen)
+
+        scores = graph.score(preferences)
+        for movie_id, expected in reference.items():
+            got = scores[graph.movie_index[movie_id]]
+            assert abs(got - expected) < 1e-9, (user_seed, movie_id, got, expected)
+
+        top = graph.top_k(scores, seen, limit)
+        expected_top = sorted(reference.values(), reverse=True)[:limit]
+        assert [round(s, 9) for _, s in top] == [round(s, 9) for s in expected_top], user_seed
+        assert not {graph.movie_ids[row] for row, _ in top} & seen
+    print(f"paridad OK: {n_users} usuarios sobre {n_movies} películas")
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def bench_size(n_movies, n_users=50, limit=10, reference_users=3):
+    movies, edges = generate_catalogue(n_movies, seed=1)
+    start = time.perf_counter()
+    graph = ContentGraph.from_rows(movies, edges)
+    build = time.perf_counter() - start
+
+    users = [generate_user(movies, edges, n_interactions=60, seed=s) for s in range(n_users)]
+    engine_times = []
+    for seen, preferences in users:
+        start = time.perf_counter()
+        graph.recommend(preferences, seen, limit)
+        engine_times.append((time.perf_counter() - start) * 1000)
+
+    per_movie = edges_by_movie(edges)
+    reference_times = []
+    for seen, preferences in users[:reference_users]:
+        start = time.perf_counter()
+        best = cypher_reference_scores(movies, per_movie, preferences, seen)
+        sorted(best.values(), reverse=True)[:limit]
+        reference_times.append((time.perf_counter() - start) * 1000)
+
+    engine = _percentiles(engine_times)
+    reference = _percentiles(reference_times)
+    print(f"{n_movies:>7} películas | build {build:6.2f}s | "
+          f"motor p50 {engine['p50']:7.2f} ms p99 {engine['p99']:7.2f} ms | "
+          f"Cypher emulado en Python p50 {reference['p50']:9.1f} ms | "
+          f"x{reference['p50'] / engine['p50']:.0f}")
+
+
+def bench_neo4j(user_ids, limit=10, repeat=5):
+    """Compara la consulta Cypher real contra el motor usando la base configurada"""
+    from neo4j_connection import Neo4jConnection
+    from controllers.movieRecommender_controller import MovieRecommenderController
+    import engines.content_graph as content_graph
+
+    with Neo4jConnection() as conn:
+        start = time.perf_counter()
+        graph = ContentGraph.load(conn)
+        print(f"grafo cargado: {len(graph)} películas en {time.perf_counter() - start:.2f}s")
+
+    for user_id in user_ids:
+        content_graph._graph = None
+        cypher_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cypher = MovieRecommenderController.get_recommendations_for_user(user_id, limit)
+            cypher_times.append((time.perf_counter() - start) * 1000)
+
+        content_graph._graph = graph
+        engine_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine = MovieRecommenderController._get_graph_recommendations(graph, user_id, limit)
+            engine_times.append((time.perf_counter() - start) * 1000)
+
+        same = [m["score"] for m in cypher] == [m["score"] for m in engine]
+        print(f"{user_id}: cypher p50 {statistics.median(cypher_times):8.1f} ms | "
+              f"motor p50 {statistics.median(engine_times):8.1f} ms | puntajes iguales: {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--neo4j", nargs="*", metavar="USER_ID")
+    args = parser.parse_args()
+
+    if args.neo4j:
+        bench_neo4j(args.neo4j, args.limit)
+        return
+
+    check_parity(limit=args.limit)
+    for n_movies in args.sizes:
+        bench_size(n_movies, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
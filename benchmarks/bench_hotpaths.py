@@ -0,0 +1,289 @@
+"""Suite de rendimiento de los caminos calientes con línea base JSON y comparación.
+
+Uso:
+    python -m benchmarks.bench_hotpaths run --output base.json             # 1k, 10k y 100k películas
+    python -m benchmarks.bench_hotpaths run --sizes 1000 10000 --output actual.json
+    python -m benchmarks.bench_hotpaths run --neo4j --output neo4j.json    # la base de .env, con PROFILE
+    python -m benchmarks.bench_hotpaths compare base.json actual.json --threshold 0.2
+
+run mide get_recommendations_for_user, _get_popular_movies,
+get_explanation_for_recommendation, search_movies, advanced_search,
+get_all_movies y add_interaction. Por defecto usa el backend en memoria
+con un grafo sintético por tamaño (usuarios = películas / 5,
+interacciones = películas * 5), cada tamaño en su propio proceso para que
+la RSS pico sea la de ese tamaño. Con --neo4j mide la base configurada y
+suma los db hits del plan de PROFILE de cada consulta que hace la
+operación (en memoria no hay db hits y se guardan como null).
+
+Por operación se guarda p50/p95/p99 en ms, db hits por llamada y, desde
+tracemalloc en llamadas aparte, el pico de memoria de Python en KiB y los
+bloques que quedan asignados. La caché de recomendaciones se apaga
+(RECOMMENDATION_CACHE_SIZE=0) para medir el cálculo; la de tarjetas queda
+como en producción.
+
+compare sale con código 1 si alguna métrica de la segunda línea base
+empeora más que --threshold (relativo) respecto de la primera.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+OPERATIONS = ("get_recommendations_for_user", "_get_popular_movies", "get_explanation_for_recommendation",
+              "search_movies", "advanced_search", "get_all_movies", "add_interaction")
+# Métricas comparables (todas: más es peor) y diferencia absoluta por debajo de la cual se ignora el cambio
+METRIC_FLOORS = {"p50_ms": 0.05, "p95_ms": 0.1, "p99_ms": 0.2, "db_hits": 10,
+                 "alloc_peak_kib": 16, "alloc_blocks": 50, "peak_rss_mib": 5}
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def _db_hits(plan):
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+@contextmanager
+def profiled_queries(counter):
+    """Dentro del bloque cada Neo4jConnection.query corre con PROFILE y suma sus db hits en counter['db_hits']"""
+    from neo4j_connection import Neo4jConnection
+
+    original = Neo4jConnection.query
+
+    def query(self, cypher_query, parameters=None):
+        with self.driver.session() as session:
+            result = session.run("PROFILE " + cypher_query, parameters or {})
+            records = [record.data() for record in result]
+            profile = result.consume().profile
+        counter["db_hits"] += _db_hits(profile or {})
+        return records
+
+    Neo4jConnection.query = query
+    try:
+        yield counter
+    finally:
+        Neo4jConnection.query = original
+
+
+class Workload:
+    """Entradas al azar para cada operación (usuarios, películas, palabras de títulos, géneros)"""
+
+    def __init__(self, users, movies, titles, genres, seed=7):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.movies = movies
+        self.words = [word for title in titles for word in (title or "").split()[:1] if len(word) > 2] or ["a"]
+        self.genres = genres
+
+    def call(self, name):
+        from controllers.interaction_controller import InteractionController
+        from controllers.movieRecommender_controller import MovieRecommenderController
+        from controllers.movie_controller import MovieController
+
+        rng = self.rng
+        if name == "get_recommendations_for_user":
+            return MovieRecommenderController.get_recommendations_for_user(rng.choice(self.users), 10)
+        if name == "_get_popular_movies":
+            return MovieRecommenderController._get_popular_movies(rng.choice(self.users), 10)
+        if name == "get_explanation_for_recommendation":
+            return MovieRecommenderController.get_explanation_for_recommendation(
+                rng.choice(self.users), rng.choice(self.movies))
+        if name == "search_movies":
+            return MovieController.search_movies(rng.choice(self.words))
+        if name == "advanced_search":
+            return MovieController.advanced_search({"genre": rng.choice(self.genres), "title": rng.choice(self.words)})
+        if name == "get_all_movies":
+            return MovieController.get_all_movies(150)
+        return InteractionController.add_interaction(
+            rng.choice(self.users), rng.choice(self.movies), rng.choice(["like", "like", "like", "dislike"]))
+
+
+def memory_workload(n_movies, seed):
+    from testing.synthetic import generate_graph
+    from testing.memory_driver import install
+
+    graph = generate_graph(n_movies, max(n_movies // 5, 10), n_movies * 5, seed=seed)
+    install(graph)
+    return Workload(list(graph.users), list(graph.movies),
+                    [movie["title"] for movie in graph.movies.values()], list(graph.genres), seed)
+
+
+def neo4j_workload(seed, sample=2000):
+    from neo4j_connection import Neo4jConnection
+    from engines.preference_store import iter_user_id_pages
+
+    with Neo4jConnection() as conn:
+        users = next(iter_user_id_pages(conn, sample), [])
+        movies = conn.query("MATCH (m:Movie) RETURN m.id AS id, m.title AS title LIMIT $limit", {"limit": sample})
+        genres = [row["name"] for row in conn.query("MATCH (g:Genre) RETURN g.name AS name")]
+    if not users or not movies:
+        raise SystemExit("ERROR >> La base no tiene usuarios o películas para medir")
+    return Workload(users, [movie["id"] for movie in movies], [movie["title"] for movie in movies], genres, seed)
+
+
+def measure(workload, name, iterations, max_seconds, alloc_calls, profile):
+    """Métricas de una operación: latencias, db hits por llamada y memoria de Python"""
+    workload.call(name)  # calentamiento: carga perezosa de motores y cachés
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    for i in range(iterations):
+        start = time.perf_counter()
+        workload.call(name)
+        samples.append((time.perf_counter() - start) * 1000)
+        if time.perf_counter() > deadline and i >= 4:
+            break
+    samples.sort()
+
+    db_hits = None
+    if profile:
+        counter = {"db_hits": 0}
+        with profiled_queries(counter):
+            for _ in range(alloc_calls):
+                workload.call(name)
+        db_hits = counter["db_hits"] / alloc_calls
+
+    peaks, blocks = [], []
+    for _ in range(alloc_calls):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        workload.call(name)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        peaks.append(peak / 1024)
+        blocks.append(sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename")))
+    return {
+        "calls": len(samples),
+        "p50_ms": round(_percentile(samples, 0.5), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+        "db_hits": db_hits,
+        "alloc_peak_kib": round(sorted(peaks)[len(peaks) // 2], 1),
+        "alloc_blocks": sorted(blocks)[len(blocks) // 2],
+    }
+
+
+def worker(args):
+    """Mide un tamaño (o la base de .env) y escribe el resultado como JSON en stdout"""
+    os.environ.setdefault("RECOMMENDATION_CACHE_SIZE", "0")
+    if args.neo4j:
+        workload = neo4j_workload(args.seed)
+    else:
+        workload = memory_workload(args.worker, args.seed)
+    operations = {}
+    for name in args.operations:
+        operations[name] = measure(workload, name, args.iterations, args.max_seconds, args.alloc_calls, args.neo4j)
+        print(f"  {name:<36} p50 {operations[name]['p50_ms']:9.2f} ms  p99 {operations[name]['p99_ms']:9.2f} ms",
+              file=sys.stderr, flush=True)
+    peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"peak_rss_mib": round(peak_rss_mib, 1), "operations": operations}))
+
+
+def run(args):
+    env = dict(os.environ)
+    for assignment in args.env:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+    results = {}
+    for size in (["neo4j"] if args.neo4j else args.sizes):
+        print(f"{size if args.neo4j else f'{size} películas'}:", file=sys.stderr, flush=True)
+        command = [sys.executable, "-m", "benchmarks.bench_hotpaths", "run", "--worker", "0" if args.neo4j else str(size),
+                   "--iterations", str(args.iterations), "--max-seconds", str(args.max_seconds),
+                   "--alloc-calls", str(args.alloc_calls), "--seed", str(args.seed), "--operations", *args.operations]
+        if args.neo4j:
+            command.append("--neo4j")
+        output = subprocess.run(command, env=env, stdout=subprocess.PIPE, text=True, check=True).stdout
+        results[str(size)] = json.loads(output.strip().splitlines()[-1])
+
+    baseline = {
+        "meta": {"backend": "neo4j" if args.neo4j else "memory", "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(), "machine": platform.machine(), "env": args.env},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+    print(f"línea base en {args.output}", file=sys.stderr)
+
+
+def compare(args):
+    """Tabla de cambios y código 1 si alguna métrica empeora más que el umbral"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    thresholds = dict(assignment.split("=") for assignment in args.metric_threshold)
+    if baseline["meta"].get("backend") != current["meta"].get("backend"):
+        print(f"AVISO >> Backends distintos: {baseline['meta'].get('backend')} vs {current['meta'].get('backend')}")
+
+    regressions = []
+    print(f"{'tamaño':<8}{'operación':<36}{'métrica':<16}{'base':>12}{'actual':>12}{'cambio':>9}")
+    for size, base in baseline["results"].items():
+        now = current["results"].get(size)
+        if now is None:
+            continue
+        rows = [("-", "peak_rss_mib", base.get("peak_rss_mib"), now.get("peak_rss_mib"))]
+        for name, metrics in base["operations"].items():
+            for metric in METRIC_FLOORS:
+                if metric in metrics and name in now["operations"]:
+                    rows.append((name, metric, metrics[metric], now["operations"][name].get(metric)))
+        for name, metric, before, after in rows:
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            threshold = float(thresholds.get(metric, args.threshold))
+            regressed = change > threshold and after - before > METRIC_FLOORS[metric]
+            if regressed:
+                regressions.append((size, name, metric))
+            if regressed or args.verbose:
+                print(f"{size:<8}{name:<36}{metric:<16}{before:>12.2f}{after:>12.2f}{change:>+8.0%}"
+                      f"{'  REGRESIÓN' if regressed else ''}")
+    if regressions:
+        print(f"ERROR >> {len(regressions)} métricas empeoraron más que el umbral")
+        sys.exit(1)
+    print("sin regresiones")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="medir y guardar una línea base")
+    run_parser.add_argument("--output", default="hotpaths_baseline.json")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    run_parser.add_argument("--neo4j", action="store_true", help="medir la base de .env en lugar del backend en memoria")
+    run_parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=OPERATIONS)
+    run_parser.add_argument("--iterations", type=int, default=100)
+    run_parser.add_argument("--max-seconds", type=float, default=15, help="tiempo máximo por operación")
+    run_parser.add_argument("--alloc-calls", type=int, default=3, help="llamadas con tracemalloc y con PROFILE")
+    run_parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+
+    compare_parser = commands.add_parser("compare", help="comparar dos líneas base")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento relativo tolerado")
+    compare_parser.add_argument("--metric-threshold", action="append", default=[], metavar="MÉTRICA=UMBRAL",
+                                help="umbral propio de una métrica, p. ej. p99_ms=0.5")
+    compare_parser.add_argument("--verbose", action="store_true", help="mostrar también las métricas sin regresión")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args)
+    elif args.worker is not None:
+        worker(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Latencia del ranking híbrido con fuentes lentas o caídas.
+
+Uso:
+    python -m benchmarks.bench_hybrid
+    python -m benchmarks.bench_hybrid --slow-ms 2000 --budget-ms 300
+
+Las fuentes simuladas duermen lo que tardaría su consulta (contenido
+120 ms, populares 30 ms, colaborativas --slow-ms) y devuelven candidatos
+que se solapan en parte. Se compara el camino secuencial (una fuente
+después de la otra, como el fallback anterior) contra HybridRanker, que
+las lanza a la vez y corta en el presupuesto: la colaborativa lenta
+queda fuera y el resto llega a tiempo. Como cada fuente tiene su propio
+pool y un tope de llamadas sin terminar, las llamadas colaborativas que
+siguen durmiendo no frenan a las otras fuentes; al llegar al tope, las
+peticiones siguientes ni la lanzan.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from engines.hybrid import HybridRanker
+
+
+def make_source(latency_ms, ids, seed, fail=False):
+    rng = random.Random(seed)
+    items = [(movie_id, rng.random()) for movie_id in ids]
+
+    def source():
+        time.sleep(latency_ms / 1000)
+        if fail:
+            raise RuntimeError("fuente caída")
+        return items
+    return source
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def check_blend():
+    ranker = HybridRanker(blend={"content": 0.5, "popular": 0.5}, budget_ms=1000)
+    ranked, missed = ranker.rank({
+        "content": lambda: [("a", 2.0), ("b", 1.0)],
+        "popular": lambda: [("b", 0.9), ("c", 0.45)],
+        "collaborative": lambda: [("z", 1.0)],  # peso 0: no se ejecuta
+    }, 10)
+    assert missed == []
+    assert [movie_id for movie_id, *_ in ranked] == ["b", "a", "c"]
+    assert ranked[0][2] == "popular" and sorted(ranked[0][3]) == ["content", "popular"]
+    assert abs(ranked[0][1] - 0.75) < 1e-9
+    print("mezcla OK: normalización por fuente, deduplicación y etiqueta de la fuente principal")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--budget-ms", type=float, default=300)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    check_blend()
+    ids = [f"m{i}" for i in range(400)]
+    sources = {
+        "content": make_source(120, ids[:args.limit], 1),
+        "popular": make_source(30, ids[args.limit // 2:args.limit * 3 // 2], 2),
+        "collaborative": make_source(args.slow_ms, ids[args.limit:args.limit * 2], 3),
+    }
+    ranker = HybridRanker(budget_ms=args.budget_ms,
+                          deadlines_ms={"content": args.budget_ms, "popular": args.budget_ms,
+                                        "collaborative": args.budget_ms})
+
+    sequential = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for source in sources.values():
+            source()
+        sequential.append((time.perf_counter() - start) * 1000)
+
+    hybrid = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        ranked, missed = ranker.rank(sources, args.limit)
+        hybrid.append((time.perf_counter() - start) * 1000)
+    assert missed == ["collaborative"] and len(ranked) == args.limit
+
+    down = dict(sources, content=make_source(5, [], 4, fail=True))
+    ranked, missed = ranker.rank(down, args.limit)
+    assert "content" in missed and all(source == "popular" for _, _, source, _ in ranked)
+
+    p50, p99 = _percentiles(hybrid)
+    print(f"secuencial {statistics.median(sequential):8.1f} ms | híbrido p50 {p50:6.1f} ms p99 {p99:6.1f} ms "
+          f"(presupuesto {args.budget_ms:.0f} ms, colaborativa de {args.slow_ms:.0f} ms descartada)")
+    print("fuente caída: sus candidatos faltan y el resto se sirve igual")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Filas por segundo de la carga masiva (ingest.py) según tamaño de lote e hilos.
+
+Uso:
+    python -m benchmarks.bench_ingest                          # backend en memoria, 20k películas
+    python -m benchmarks.bench_ingest --movies 200000 --batch-sizes 500 2000 --writers 1 4 8
+    python -m benchmarks.bench_ingest --neo4j --movies 100000  # la base de .env (borra lo que carga)
+
+Escribe un JSONL sintético (catálogo de synthetic.generate_catalogue con
+pesos en géneros y directores) y lo carga con cada combinación de
+--batch-sizes y --writers, desde cero en cada corrida. En memoria se mide
+la parte de Python (lectura, normalización, deduplicación y armado de
+lotes); los hilos no escriben en paralelo porque el backend tiene un solo
+candado. Con --neo4j los ids llevan el prefijo bench-ingest- y se borran
+(películas, actores y directores) antes de cada corrida y al terminar.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+PREFIX = "bench-ingest-"
+
+
+def write_input(path, n_movies, seed):
+    from testing.synthetic import generate_catalogue, with_realistic_names
+
+    rng = random.Random(seed)
+    movies, edges = with_realistic_names(*generate_catalogue(n_movies, seed))
+    per_movie = {}
+    for category, rows in edges.items():
+        for movie_id, key, name in rows:
+            per_movie.setdefault(movie_id, {}).setdefault(category, []).append((key, name))
+    with open(path, "w", encoding="utf-8") as f:
+        for movie in movies:
+            entities = per_movie.get(movie["id"], {})
+            f.write(json.dumps({
+                "id": PREFIX + movie["id"], "title": movie["title"], "year": movie["year"],
+                "description": movie["description"],
+                "genres": [{"name": name, "peso": round(rng.uniform(0.3, 1.0), 2)}
+                           for _, name in entities.get("genre", [])],
+                "actors": [{"id": PREFIX + key, "name": name} for key, name in entities.get("actor", [])],
+                "directors": [{"id": PREFIX + key, "name": name, "peso": round(rng.uniform(0.3, 1.0), 2)}
+                              for key, name in entities.get("director", [])],
+                "seasons": [name for _, name in entities.get("season", [])],
+            }, ensure_ascii=False) + "\n")
+    return sum(len(rows) for rows in edges.values())
+
+
+def reset(neo4j):
+    if not neo4j:
+        from testing.memory_driver import install
+        from repositories.memory_repository import MemoryGraph
+
+        # Un grafo vacío y un driver nuevo para cada corrida
+        install(MemoryGraph())
+        return
+    from neo4j_connection import Neo4jConnection
+
+    with Neo4jConnection() as conn:
+        for label in ("Movie", "Actor", "Director"):
+            deleted = 1
+            while deleted:
+                deleted = conn.query(f"""
+                MATCH (n:{label}) WHERE n.id STARTS WITH $prefix
+                WITH n LIMIT 10000
+                DETACH DELETE n
+                RETURN count(*) AS n
+                """, {"prefix": PREFIX})[0]["n"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--neo4j", action="store_true", help="cargar en la base de .env en lugar del backend en memoria")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from ingest import ingest_file
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.jsonl")
+        start = time.perf_counter()
+        relationships = write_input(path, args.movies, args.seed)
+        print(f"entrada: {args.movies} películas, {relationships} relaciones, "
+              f"{os.path.getsize(path) / 2**20:.1f} MiB ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+        print(f"{'lote':>6}{'hilos':>7}{'segundos':>10}{'filas/s':>10}{'escrituras/s':>14}{'entidades':>11}")
+        try:
+            for batch_size in args.batch_sizes:
+                for writers in args.writers:
+                    reset(args.neo4j)
+                    stats = ingest_file(path, batch_size=batch_size, writers=writers, restart=True)
+                    elapsed = stats["elapsed"]
+                    print(f"{batch_size:>6}{writers:>7}{elapsed:>10.2f}{stats['rows'] / elapsed:>10.0f}"
+                          f"{(stats['movies'] + stats['relationships']) / elapsed:>14.0f}{stats['entities']:>11}")
+        finally:
+            if args.neo4j:
+                reset(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Construcción y consulta de los vecinos por ítem (filtrado colaborativo).
+
+Uso:
+    python -m benchmarks.bench_item_cf
+    python -m benchmarks.bench_item_cf --interactions 1000000 --movies 20000 --users 100000
+
+Primero compara ItemNeighbours contra la matriz de co-likes densa en un
+catálogo pequeño (coseno y Jaccard, vecinos y conteos exactos). Después
+construye el modelo con --interactions interacciones sintéticas (ley de
+potencias en usuarios y películas) y reporta tiempo, pico de memoria
+durante la construcción (tracemalloc) y tamaño del modelo; por último,
+cuánto tarda apply() por like nuevo y recommend() por usuario, y qué
+fracción de los vecinos exactos conserva el mantenimiento incremental.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from testing.synthetic import generate_interactions
+from engines.item_cf import ItemNeighbours, similarity
+
+
+def brute_force(likes, movie_ids, kind, k):
+    """{movie_id: [(vecino, likes en común)]} con la matriz usuario x película densa"""
+    users = sorted({user_id for user_id, _ in likes})
+    user_index = {user_id: i for i, user_id in enumerate(users)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    matrix = np.zeros((len(users), len(movie_ids)))
+    for user_id, movie_id in likes:
+        matrix[user_index[user_id], movie_index[movie_id]] = 1
+    common = matrix.T @ matrix
+    totals = np.diag(common).copy()
+    result = {}
+    for i, movie_id in enumerate(movie_ids):
+        cols = np.flatnonzero(common[i])
+        cols = cols[cols != i]
+        sims = similarity(kind, common[i, cols], totals[i], totals[cols])
+        order = np.lexsort((cols, -sims))[:k]
+        result[movie_id] = [(movie_ids[cols[j]], int(common[i, cols[j]])) for j in order]
+    return result
+
+
+def model_neighbours(model, movie_id):
+    row = model.movie_index[movie_id]
+    cols = model.neighbours[row]
+    pairs = [(model.movie_ids[c], int(n)) for c, n in zip(cols, model.counts[row]) if c >= 0]
+    sims = {m: s for m, s in model.similar(movie_id, model.k)}
+    return sorted(pairs, key=lambda pair: (-sims[pair[0]], model.movie_index[pair[0]]))
+
+
+def likes_of(interactions):
+    return [(user_id, movie_id) for user_id, movie_id, weight in interactions if weight > 0]
+
+
+def check_exact():
+    movies = [{"id": f"m{i}"} for i in range(300)]
+    likes = likes_of(generate_interactions(movies, 400, 20000, seed=5))
+    for kind in ("cosine", "jaccard"):
+        model = ItemNeighbours.from_likes(likes, k=10, kind=kind, max_user_likes=10_000, pair_budget=5000)
+        expected = brute_force(likes, model.movie_ids, kind, 10)
+        for movie_id in model.movie_ids:
+            assert model_neighbours(model, movie_id) == expected[movie_id], movie_id
+    print(f"exactitud OK: {len(model)} películas, vecinos y conteos iguales a la matriz densa "
+          f"(coseno y Jaccard, construcción por bloques)")
+
+
+def incremental_recall(likes, k, seed=3):
+    """Construye con el 90% de los likes, aplica el 10% restante y mide la recuperación del top-K exacto"""
+    rng = random.Random(seed)
+    shuffled = likes[:]
+    rng.shuffle(shuffled)
+    split = len(shuffled) * 9 // 10
+    model = ItemNeighbours.from_likes(shuffled[:split], k=k)
+    latencies = []
+    for user_id, movie_id in shuffled[split:]:
+        start = time.perf_counter()
+        model.apply(user_id, movie_id, 0, 1.0)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    exact = ItemNeighbours.from_likes(shuffled, k=k)
+    hits = total = 0
+    for movie_id in exact.movie_ids:
+        truth = {m for m, _ in exact.similar(movie_id, k)}
+        got = {m for m, _ in model.similar(movie_id, k)}
+        hits += len(truth & got)
+        total += len(truth)
+    return hits / max(total, 1), latencies, len(shuffled) - split
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--neighbours", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    check_exact()
+
+    movies = [{"id": f"m{i}"} for i in range(args.movies)]
+    likes = likes_of(generate_interactions(movies, args.users, args.interactions))
+    print(f"{len(likes)} likes de {args.interactions} interacciones generadas")
+
+    start = time.perf_counter()
+    ItemNeighbours.from_likes(likes, k=args.neighbours)
+    build_s = time.perf_counter() - start
+    # El pico de memoria se mide aparte: tracemalloc hace más lenta la construcción
+    tracemalloc.start()
+    model = ItemNeighbours.from_likes(likes, k=args.neighbours)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = (model.neighbours.nbytes + model.counts.nbytes + model.likes.nbytes +
+            model._user_indptr.nbytes + model._user_items.nbytes)
+    print(f"construcción {build_s:6.2f}s | pico {peak / 2**20:7.1f} MiB | modelo {size / 2**20:6.1f} MiB "
+          f"({len(model)} películas x {model.k} vecinos, {len(model.user_index)} usuarios)")
+
+    per_user = {}
+    for user_id, movie_id in likes:
+        per_user.setdefault(user_id, []).append(movie_id)
+    rng = random.Random(9)
+    users = rng.sample(sorted(per_user), min(args.queries, len(per_user)))
+    latencies = []
+    for user_id in users:
+        start = time.perf_counter()
+        model.recommend(per_user[user_id], set(per_user[user_id]), 10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"recommend p50 {statistics.median(latencies):6.2f} ms | "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)]:6.2f} ms")
+
+    recall, apply_us, applied = incremental_recall(likes, args.neighbours)
+    print(f"apply p50 {statistics.median(apply_us):6.1f} us ({applied} likes incrementales) | "
+          f"vecinos exactos conservados {recall:.1%}")
+
+
+if __name__ == "__main__":
+    main()
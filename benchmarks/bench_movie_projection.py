@@ -0,0 +1,126 @@
+"""DB hits de la proyección de películas: OPTIONAL MATCH encadenados vs pattern comprehensions.
+
+Uso:
+    python -m benchmarks.bench_movie_projection                  # estimación sobre un catálogo sintético
+    python -m benchmarks.bench_movie_projection --neo4j --top 50  # PROFILE real sobre la base de .env
+
+Sin --neo4j se cuentan las filas intermedias que genera cada forma para
+películas con repartos grandes: la consulta anterior materializa
+géneros x actores x directores x temporadas por película; la proyección lee
+cada relación una vez (géneros + actores + directores + temporadas).
+Con --neo4j se ejecutan ambas consultas con PROFILE sobre las películas de
+mayor reparto, se suman los db hits del plan y se comprueba que devuelven
+lo mismo (solo lectura).
+"""
+import argparse
+import time
+
+from testing.synthetic import edges_by_movie, generate_catalogue
+from repositories.cypher import movie_projection
+
+# Forma anterior de _get_movies_by_ids / search_movies / get_top_movies...
+LEGACY_QUERY = """
+UNWIND $ids AS movie_id
+MATCH (m:Movie {id: movie_id})
+OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
+OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
+OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
+RETURN m {.id, .title, .year, .description} AS movie,
+COLLECT(DISTINCT g.name) AS genres,
+COLLECT(DISTINCT a.name) AS actors,
+COLLECT(DISTINCT d.name) AS directors,
+COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
+"""
+
+PROJECTION_QUERY = """
+UNWIND $ids AS movie_id
+MATCH (m:Movie {id: movie_id})
+RETURN """ + movie_projection(actor_limit=None)
+
+LARGEST_CASTS_QUERY = """
+MATCH (m:Movie)
+OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
+WITH m, count(a) AS cast_size
+ORDER BY cast_size DESC
+LIMIT $top
+RETURN m.id AS id, cast_size
+"""
+
+
+def estimate(n_movies, top):
+    movies, edges = generate_catalogue(n_movies, seed=1, actors_per_movie=(5, 60))
+    per_movie = edges_by_movie(edges)
+    sizes = []
+    for movie in movies:
+        counts = [len(per_movie[c].get(movie["id"], [])) for c in ("genre", "actor", "director", "season")]
+        legacy = 1
+        for count in counts:
+            legacy *= max(count, 1)
+        sizes.append((counts[1], legacy, sum(counts)))
+    sizes.sort(reverse=True)
+    chosen = sizes[:top]
+    legacy_rows = sum(legacy for _, legacy, _ in chosen)
+    projection_reads = sum(reads for _, _, reads in chosen)
+    print(f"{top} películas con mayor reparto (hasta {chosen[0][0]} actores) de {n_movies}:")
+    print(f"  OPTIONAL MATCH encadenados: {legacy_rows:>8} filas intermedias")
+    print(f"  pattern comprehensions:     {projection_reads:>8} relaciones leídas "
+          f"(x{legacy_rows / projection_reads:.1f} menos)")
+
+
+def _db_hits(plan):
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+def _profile(session, query, params):
+    start = time.perf_counter()
+    result = session.run("PROFILE " + query, params)
+    records = [record.data() for record in result]
+    summary = result.consume()
+    elapsed = (time.perf_counter() - start) * 1000
+    return records, _db_hits(summary.profile or {}), elapsed
+
+
+def _normalized(records, legacy):
+    movies = {}
+    for record in records:
+        movie = dict(record["movie"])
+        if legacy:
+            for field in ("genres", "actors", "directors", "seasons"):
+                movie[field] = record[field]
+        movies[movie["id"]] = {k: sorted(v) if isinstance(v, list) else v for k, v in movie.items()}
+    return movies
+
+
+def profile_neo4j(top):
+    from neo4j_connection import get_driver
+
+    with get_driver().session() as session:
+        largest = [record.data() for record in session.run(LARGEST_CASTS_QUERY, {"top": top})]
+        ids = [row["id"] for row in largest]
+        print(f"{len(ids)} películas con mayor reparto (hasta {largest[0]['cast_size']} actores)")
+
+        legacy, legacy_hits, legacy_ms = _profile(session, LEGACY_QUERY, {"ids": ids})
+        projection, projection_hits, projection_ms = _profile(session, PROJECTION_QUERY, {"ids": ids})
+
+    same = _normalized(legacy, True) == _normalized(projection, False)
+    print(f"  OPTIONAL MATCH encadenados: {legacy_hits:>9} db hits {legacy_ms:8.1f} ms")
+    print(f"  pattern comprehensions:     {projection_hits:>9} db hits {projection_ms:8.1f} ms")
+    print(f"  mismos resultados: {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--neo4j", action="store_true")
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--movies", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.neo4j:
+        profile_neo4j(args.top)
+    else:
+        estimate(args.movies, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark del muestreo de películas de la portada (GET /movies).
+
+Uso:
+    python -m benchmarks.bench_movie_sampler                  # catálogos sintéticos de 10k y 100k
+    python -m benchmarks.bench_movie_sampler --neo4j --limit 150
+
+La referencia emula la consulta anterior de get_all_movies: expande las
+filas géneros x actores x directores x temporadas de cada película, las
+ordena todas por rand() y se queda con las primeras `limit` películas. Con
+--neo4j se ejecuta esa consulta real y se compara contra el muestreador más
+la hidratación de las películas elegidas (solo lectura).
+"""
+import argparse
+import random
+import statistics
+import time
+
+from testing.synthetic import edges_by_movie, generate_catalogue
+from engines.movie_sampler import MovieSampler
+
+# Consulta original de get_all_movies
+LEGACY_QUERY = """
+MATCH (m:Movie)
+OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
+OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
+OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
+WITH m, g, a, d, s
+ORDER BY rand()
+WITH m,
+    COLLECT(DISTINCT g.name) AS genres,
+    COLLECT(DISTINCT a.name)[0..3] AS actors,
+    COLLECT(DISTINCT d.name) AS directors,
+    COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
+RETURN m {.id, .title, .year, .description} AS movie, genres, actors, directors, seasons
+LIMIT $limit
+"""
+
+
+def legacy_reference(movies, per_movie, limit, rng):
+    """ORDER BY rand() sobre las filas expandidas y luego las primeras `limit` películas"""
+    rows = []
+    for movie in movies:
+        counts = [max(len(per_movie[c].get(movie["id"], [])), 1)
+                  for c in ("genre", "actor", "director", "season")]
+        expanded = counts[0] * counts[1] * counts[2] * counts[3]
+        rows.extend((rng.random(), movie["id"]) for _ in range(expanded))
+    rows.sort()
+    chosen = {}
+    for _, movie_id in rows:
+        chosen.setdefault(movie_id, None)
+        if len(chosen) >= limit:
+            break
+    return list(chosen), len(rows)
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def bench_size(n_movies, limit, repeat=200):
+    movies, edges = generate_catalogue(n_movies, seed=1)
+    sampler = MovieSampler(movie["id"] for movie in movies)
+
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        sampler.sample(limit, seed=i if i % 2 else None, page=i % 5)
+        samples.append((time.perf_counter() - start) * 1000)
+    engine = _percentiles(samples)
+
+    per_movie = edges_by_movie(edges)
+    rng = random.Random(3)
+    start = time.perf_counter()
+    _, rows = legacy_reference(movies, per_movie, limit, rng)
+    reference = (time.perf_counter() - start) * 1000
+    print(f"{n_movies:>7} películas | muestreo p50 {engine['p50']:6.3f} ms p99 {engine['p99']:6.3f} ms | "
+          f"ORDER BY rand() sobre {rows} filas {reference:9.1f} ms")
+
+
+def bench_neo4j(limit, repeat=5):
+    from neo4j_connection import Neo4jConnection
+    from controllers.movie_controller import MovieController
+    from engines.card_cache import card_cache
+
+    with Neo4jConnection() as conn:
+        start = time.perf_counter()
+        sampler = MovieSampler.load(conn)
+        print(f"muestreador cargado: {len(sampler)} películas en {time.perf_counter() - start:.2f}s")
+
+        legacy = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.query(LEGACY_QUERY, {"limit": limit})
+            legacy.append((time.perf_counter() - start) * 1000)
+
+    sampled = []
+    for _ in range(repeat):
+        card_cache.clear()  # peor caso: todas las películas elegidas se hidratan desde Neo4j
+        start = time.perf_counter()
+        MovieController._get_movies_by_ids(sampler.sample(limit))
+        sampled.append((time.perf_counter() - start) * 1000)
+    print(f"consulta anterior p50 {statistics.median(legacy):8.1f} ms | "
+          f"muestreo + hidratación p50 {statistics.median(sampled):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=150)
+    parser.add_argument("--neo4j", action="store_true")
+    args = parser.parse_args()
+
+    if args.neo4j:
+        bench_neo4j(args.limit)
+        return
+
+    for n_movies in args.sizes:
+        bench_size(n_movies, args.limit)
+
+
+if __name__ == "__main__":
+    main()
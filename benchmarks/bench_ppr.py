@@ -0,0 +1,88 @@
+"""Benchmark del PageRank personalizado: latencia por usuario, iteraciones y calidad.
+
+Uso:
+    python -m benchmarks.bench_ppr
+    python -m benchmarks.bench_ppr --movies 100000 --users 50000 --interactions 1000000
+
+Compara la iteración de potencias (referencia exacta) con el forward push
+sin límite y con presupuestos de aristas acotados. La calidad del push se
+mide como recall@10 contra el top 10 de la iteración de potencias.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from testing.synthetic import generate_catalogue, generate_interactions
+from engines.content_graph import ContentGraph
+from engines.ppr import PPRGraph
+
+
+def _top(vector, n_movies, seen_rows, k=10):
+    scores = vector[:n_movies].copy()
+    scores[list(seen_rows)] = -np.inf
+    return set(np.argpartition(-scores, k)[:k].tolist())
+
+
+def _summary(times):
+    times = sorted(times)
+    return (statistics.median(times), times[min(len(times) - 1, int(len(times) * 0.99))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--interactions", type=int, default=200_000)
+    parser.add_argument("--sample", type=int, default=50, help="usuarios medidos")
+    parser.add_argument("--alpha", type=float, default=0.15)
+    args = parser.parse_args()
+
+    movies, edges = generate_catalogue(args.movies, seed=1)
+    interactions = generate_interactions(movies, args.users, args.interactions)
+    start = time.perf_counter()
+    content_graph = ContentGraph.from_rows(movies, edges)
+    graph = PPRGraph.from_content_graph(
+        content_graph, [(u, m) for u, m, w in interactions if w > 0])
+    print(f"grafo: {graph.n_nodes} nodos, {len(graph.indices)} aristas dirigidas, "
+          f"construido en {time.perf_counter() - start:.2f}s")
+
+    by_user = {}
+    for user_id, movie_id, weight in interactions:
+        liked, seen = by_user.setdefault(user_id, ([], set()))
+        seen.add(content_graph.movie_index[movie_id])
+        if weight > 0:
+            liked.append(movie_id)
+    users = [u for u, (liked, _) in by_user.items() if liked][:args.sample]
+
+    configs = [("power", {}), ("push", {}),
+               ("push", {"push_budget": 2_000_000}), ("push", {"push_budget": 500_000})]
+    exact = {}
+    for method, options in configs:
+        times, iterations, recalls = [], [], []
+        for user_id in users:
+            liked, seen_rows = by_user[user_id]
+            seed = graph.seed_vector(liked)
+            start = time.perf_counter()
+            if method == "power":
+                vector, iters = graph.power_iteration(seed, args.alpha, tolerance=1e-6, max_iter=100)
+            else:
+                vector, iters = graph.forward_push(seed, args.alpha, epsilon=1e-7, **options)
+            times.append((time.perf_counter() - start) * 1000)
+            iterations.append(iters)
+            top = _top(vector, len(content_graph), seen_rows)
+            if method == "power":
+                exact[user_id] = top
+            else:
+                recalls.append(len(top & exact[user_id]) / len(exact[user_id]))
+
+        p50, p99 = _summary(times)
+        label = method + (f" budget={options['push_budget']}" if options else "")
+        recall = f" recall@10 {statistics.mean(recalls):.3f}" if recalls else ""
+        print(f"{label:<24} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+              f"iteraciones p50 {statistics.median(iterations):5.0f}{recall}")
+
+
+if __name__ == "__main__":
+    main()
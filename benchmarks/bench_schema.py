@@ -0,0 +1,165 @@
+"""Latencia de login y recomendaciones sin y con las migraciones de esquema.
+
+Uso (contra una base de pruebas: borra y vuelve a crear los constraints e índices):
+    python -m benchmarks.bench_schema                       # 1M de usuarios sintéticos
+    python -m benchmarks.bench_schema --users 100000 --sample 100
+    python -m benchmarks.bench_schema --keep                # no borrar los usuarios al terminar
+
+Carga --users usuarios sintéticos en la base de .env (marcados con
+bench_schema = true) con UNWIND por lotes, y a --sample de ellos les
+registra --likes interacciones con InteractionController.add_interaction
+sobre las películas que ya hay en la base. Después quita los constraints e
+índices de schema_migrations.MIGRATIONS y mide, para usuarios al azar de
+la muestra:
+
+    login            AuthController.authenticate_user (búsqueda por email
+                     y bcrypt; el hash de prueba usa 4 rondas para que
+                     pese la consulta y no bcrypt)
+    user_by_id       UserController.get_user_by_id
+    recommendations  get_recommendations_for_user sin caché
+
+Luego aplica las migraciones, espera a que los índices estén ONLINE y
+vuelve a medir. Al terminar borra los usuarios de prueba salvo con --keep;
+el esquema queda migrado.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+MEASURED = ("login", "user_by_id", "recommendations")
+PASSWORD = "secreto"
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def load_users(conn, n_users, batch_size, hashed_password):
+    """Crea los usuarios sintéticos que falten (reanuda si ya hay algunos de una corrida anterior)"""
+    existing = conn.query("MATCH (u:User {bench_schema: true}) RETURN count(u) AS n")[0]["n"]
+    start = time.perf_counter()
+    for offset in range(existing, n_users, batch_size):
+        rows = [{"id": f"bench-u{i}", "email": f"bench{i}@example.com", "name": f"Bench {i}"}
+                for i in range(offset, min(offset + batch_size, n_users))]
+        conn.query("""
+        UNWIND $rows AS row
+        CREATE (u:User {id: row.id, email: row.email, name: row.name,
+                        hashed_password: $hashed_password, created_at: datetime(), bench_schema: true})
+        """, {"rows": rows, "hashed_password": hashed_password})
+        print(f"\r  usuarios: {offset + len(rows)}/{n_users}", end="", file=sys.stderr, flush=True)
+    if existing < n_users:
+        elapsed = time.perf_counter() - start
+        print(f"\r  usuarios: {n_users - existing} creados en {elapsed:.1f}s "
+              f"({(n_users - existing) / elapsed:.0f}/s)", file=sys.stderr)
+
+
+def add_likes(conn, users, likes, rng):
+    from controllers.interaction_controller import InteractionController
+
+    movies = [row["id"] for row in conn.query("MATCH (m:Movie) RETURN m.id AS id LIMIT 5000")]
+    if not movies:
+        raise SystemExit("ERROR >> La base no tiene películas para las interacciones")
+    for user_id in users:
+        for movie_id in rng.sample(movies, min(likes, len(movies))):
+            InteractionController.add_interaction(user_id, movie_id, rng.choice(["like", "like", "like", "dislike"]))
+
+
+def drop_schema(conn):
+    from schema_migrations import MIGRATIONS, object_names
+
+    existing = {row["name"] for row in conn.query("SHOW CONSTRAINTS YIELD name RETURN name")}
+    for _, _, statements in reversed(MIGRATIONS):
+        for statement, name in zip(statements, object_names(statements)):
+            kind = "CONSTRAINT" if statement.startswith("CREATE CONSTRAINT") else "INDEX"
+            if kind == "INDEX" or name in existing:
+                conn.query(f"DROP {kind} {name} IF EXISTS")
+    conn.query("MATCH (s:SchemaMigration) DELETE s")
+
+
+def measure(users, iterations, rng):
+    from controllers.auth_controller import AuthController
+    from controllers.movieRecommender_controller import MovieRecommenderController
+    from controllers.user_controller import UserController
+
+    calls = {
+        "login": lambda i: AuthController.authenticate_user(f"bench{i}@example.com", PASSWORD),
+        "user_by_id": lambda i: UserController.get_user_by_id(f"bench-u{i}"),
+        "recommendations": lambda i: MovieRecommenderController.get_recommendations_for_user(f"bench-u{i}", 10),
+    }
+    results = {}
+    for name in MEASURED:
+        calls[name](users[0])  # calentamiento
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            calls[name](rng.choice(users))
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        results[name] = (statistics.median(samples), _percentile(samples, 0.95), _percentile(samples, 0.99))
+    return results
+
+
+def cleanup(conn, batch_size):
+    deleted = 1
+    while deleted:
+        deleted = conn.query("""
+        MATCH (u:User {bench_schema: true})
+        WITH u LIMIT $limit
+        DETACH DELETE u
+        RETURN count(*) AS n
+        """, {"limit": batch_size})[0]["n"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=200, help="usuarios con interacciones que se miden")
+    parser.add_argument("--likes", type=int, default=30, help="interacciones por usuario de la muestra")
+    parser.add_argument("--iterations", type=int, default=200, help="llamadas por operación y fase")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--keep", action="store_true", help="no borrar los usuarios de prueba")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Medir el cálculo, no la caché de recomendaciones
+    os.environ["RECOMMENDATION_CACHE_SIZE"] = "0"
+
+    import bcrypt
+    from neo4j_connection import Neo4jConnection
+    from schema_migrations import migrate, wait_for_indexes
+
+    rng = random.Random(args.seed)
+    hashed_password = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode("utf-8")
+    sample = rng.sample(range(args.users), min(args.sample, args.users))
+
+    with Neo4jConnection() as conn:
+        load_users(conn, args.users, args.batch_size, hashed_password)
+        print(f"  interacciones: {len(sample)} usuarios x {args.likes}", file=sys.stderr, flush=True)
+        drop_schema(conn)
+        add_likes(conn, [f"bench-u{i}" for i in sample], args.likes, rng)
+
+        print("sin índices...", file=sys.stderr, flush=True)
+        before = measure(sample, args.iterations, rng)
+
+        start = time.perf_counter()
+        migrate()
+        wait_for_indexes()
+        print(f"migraciones aplicadas e índices ONLINE en {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        after = measure(sample, args.iterations, rng)
+
+        if not args.keep:
+            cleanup(conn, args.batch_size)
+
+    print(f"{args.users} usuarios, {args.iterations} llamadas por operación (ms)")
+    print(f"{'operación':<18}{'p50 antes':>11}{'p50 después':>13}{'p99 antes':>11}{'p99 después':>13}{'x p50':>8}")
+    for name in MEASURED:
+        (p50_before, _, p99_before), (p50_after, _, p99_after) = before[name], after[name]
+        print(f"{name:<18}{p50_before:>11.2f}{p50_after:>13.2f}{p99_before:>11.2f}{p99_after:>13.2f}"
+              f"{p50_before / p50_after:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
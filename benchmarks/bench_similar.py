@@ -0,0 +1,95 @@
+"""Recall@10 y latencia del índice de películas parecidas contra fuerza bruta.
+
+Uso:
+    python -m benchmarks.bench_similar
+    python -m benchmarks.bench_similar --movies 100000 --probes 4 8 16 32
+
+Construye los embeddings (feature hashing de géneros con peso, actores,
+directores y temporadas) de un catálogo sintético y el índice IVF. Para
+cada valor de --probes mide, sobre --queries películas al azar, la
+latencia de similar() y qué fracción de su top 10 está en el top 10
+exacto (con empates contados como acierto), frente a recorrer todas las
+películas. También mide cuánto tarda cargar el índice guardado en disco
+comparado con reconstruirlo.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from testing.synthetic import generate_catalogue
+from engines.similar_index import SimilarIndex, embed
+
+
+def synthetic_features(edges, seed=1):
+    """Aristas (movie_id, llave, peso) con un peso al azar en los géneros, como HAS_GENRE.peso"""
+    rng = random.Random(seed)
+    return {category: [(movie_id, key, round(rng.uniform(0.3, 1.0), 2) if category == "genre" else 1.0)
+                       for movie_id, key, _ in rows]
+            for category, rows in edges.items()}
+
+
+def recall_at(index, movie_id, limit, nprobe):
+    """(aciertos / limit, milisegundos) de similar() frente a exact()"""
+    start = time.perf_counter()
+    approx = index.similar(movie_id, limit, nprobe)
+    elapsed = (time.perf_counter() - start) * 1000
+    exact = index.exact(movie_id, limit)
+    if not exact:
+        return 1.0, elapsed
+    threshold = exact[-1][1] - 1e-6
+    return sum(1 for _, score in approx if score >= threshold) / len(exact), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    movies, edges = generate_catalogue(args.movies)
+    movie_ids = [movie["id"] for movie in movies]
+    start = time.perf_counter()
+    vectors = embed(movie_ids, synthetic_features(edges), args.dim)
+    embed_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index = SimilarIndex.build(movie_ids, vectors, nlist=args.lists)
+    build_s = time.perf_counter() - start
+    print(f"{len(index)} películas: embeddings {embed_s:5.2f}s | índice {build_s:5.2f}s "
+          f"({len(index.centroids)} listas)")
+
+    queries = random.Random(3).sample(movie_ids, min(args.queries, len(movie_ids)))
+    brute = []
+    for movie_id in queries:
+        start = time.perf_counter()
+        index.exact(movie_id, args.limit)
+        brute.append((time.perf_counter() - start) * 1000)
+    print(f"fuerza bruta   p50 {statistics.median(brute):6.2f} ms | recall@{args.limit} 1.000")
+    for nprobe in args.probes:
+        results = [recall_at(index, movie_id, args.limit, nprobe) for movie_id in queries]
+        recall = statistics.mean(r for r, _ in results)
+        latency = statistics.median(ms for _, ms in results)
+        print(f"nprobe {nprobe:<7} p50 {latency:6.2f} ms | recall@{args.limit} {recall:.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "similar_index.npz")
+        index.save(path)
+        start = time.perf_counter()
+        loaded = SimilarIndex.load_file(path)
+        load_s = time.perf_counter() - start
+        assert loaded.similar(queries[0], args.limit) == index.similar(queries[0], args.limit)
+        size = os.path.getsize(path)
+    print(f"carga desde disco {load_s:5.2f}s ({size / 2**20:.1f} MiB) vs {embed_s + build_s:5.2f}s "
+          f"reconstruyendo (sin contar la lectura de Neo4j)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Arranque en frío y memoria de los workers: grafo reconstruido vs snapshot con mmap.
+
+Uso:
+    python -m benchmarks.bench_snapshot
+    python -m benchmarks.bench_snapshot --movies 100000 --workers 4
+
+Genera un catálogo sintético y lo guarda de dos formas: las filas que
+devolvería Neo4j (pickle) y el snapshot. Después arranca --workers
+procesos a la vez con cada variante; cada uno carga el grafo, calcula una
+recomendación (lo que toca todas las páginas de los arrays) y reporta su
+tiempo de arranque, RSS y PSS (la RSS repartida entre los procesos que
+comparten cada página, de /proc/self/smaps_rollup). Con el snapshot las
+páginas de los arrays son de la caché de páginas y se comparten; al
+reconstruir, cada worker tiene su copia privada. El tiempo de
+reconstrucción no incluye la lectura desde Neo4j, que en producción se
+suma en cada worker. Al final se verifica el cambio atómico a un snapshot
+nuevo sin reiniciar.
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+from testing.synthetic import generate_catalogue
+
+
+def memory_kib():
+    """{Rss, Pss, Private} del proceso actual en KiB (Linux)"""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    fields[name] = int(rest.split()[0])
+    except OSError:
+        return {}
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker(mode, path):
+    from engines.content_graph import ContentGraph
+    from engines.snapshot import Snapshot
+
+    before = memory_kib()
+    start = time.perf_counter()
+    if mode == "snapshot":
+        graph = ContentGraph.from_snapshot(Snapshot(path))
+    else:
+        with open(path, "rb") as f:
+            movies, edges = pickle.load(f)
+        graph = ContentGraph.from_rows(movies, edges)
+        del movies, edges
+    preferences = {category: {key: 1.0 for key in matrix.keys[:50]}
+                   for category, matrix in graph.categories.items()}
+    graph.recommend(preferences, [], 10)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps({"ms": elapsed, "before": before, "after": memory_kib()}), flush=True)
+    # Se queda vivo hasta que el proceso padre midió a todos los workers
+    sys.stdin.read()
+
+
+def run_workers(mode, path, n):
+    processes = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_snapshot", "--worker", mode, path],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(n)]
+    reports = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return reports
+
+
+def summary(name, reports):
+    ms = sorted(report["ms"] for report in reports)
+    rss = [report["after"].get("rss", 0) - report["before"].get("rss", 0) for report in reports]
+    pss = sum(report["after"].get("pss", 0) - report["before"].get("pss", 0) for report in reports)
+    private = [report["after"].get("private", 0) - report["before"].get("private", 0) for report in reports]
+    print(f"{name:<12} arranque p50 {ms[len(ms) // 2]:8.1f} ms | RSS por worker {max(rss) / 1024:7.1f} MiB "
+          f"(privada {max(private) / 1024:6.1f} MiB) | PSS total {pss / 1024:7.1f} MiB")
+
+
+def check_swap(movies, edges, path):
+    """Un snapshot nuevo reemplaza al anterior en get_content_graph() sin reiniciar"""
+    import engines.content_graph as content_graph
+    from engines.content_graph import ContentGraph
+
+    os.environ.update({"CONTENT_GRAPH_ENABLED": "true", "CONTENT_GRAPH_SNAPSHOT": path,
+                       "CONTENT_GRAPH_SNAPSHOT_CHECK_INTERVAL": "0"})
+    old = content_graph.get_content_graph()
+    ContentGraph.from_rows(movies[:len(movies) // 2], edges).save_snapshot(path)
+    new = content_graph.get_content_graph()
+    assert new is not old and len(new) == len(movies) // 2 and len(old) == len(movies)
+    assert old.recommend({"genre": {"Género 1": 1.0}}, [], 5)
+    print(f"cambio atómico OK: {len(old)} -> {len(new)} películas sin reiniciar; "
+          f"el grafo anterior sigue válido para las peticiones en curso")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(*args.worker)
+
+    from engines.content_graph import ContentGraph
+
+    movies, edges = generate_catalogue(args.movies)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows_path = os.path.join(tmp, "rows.pickle")
+        snapshot_path = os.path.join(tmp, "content_graph.snap")
+        with open(rows_path, "wb") as f:
+            pickle.dump((movies, edges), f)
+        start = time.perf_counter()
+        ContentGraph.from_rows(movies, edges).save_snapshot(snapshot_path)
+        print(f"{args.movies} películas: export {time.perf_counter() - start:.2f}s, "
+              f"snapshot de {os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+
+        summary("reconstruir", run_workers("rebuild", rows_path, args.workers))
+        summary("snapshot", run_workers("snapshot", snapshot_path, args.workers))
+        check_swap(movies, edges, snapshot_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Memoria pico de Neo4jConnection.query (lista de dicts) vs Neo4jConnection.stream.
+
+Uso:
+    python -m benchmarks.bench_stream                      # 200k filas sintéticas en proceso
+    python -m benchmarks.bench_stream --rows 1000000 --fetch-size 500
+    python -m benchmarks.bench_stream --neo4j              # aristas película-actor de la base de .env
+
+Sin --neo4j la conexión usa un driver en proceso que entrega neo4j.Record
+en lotes de fetch_size, como hace el driver real al pedir registros al
+servidor, así que se mide solo el costo del lado de Python. Cada variante
+recorre las filas (movie_id, key, name) y cuenta las entidades distintas,
+como hace la carga de un índice. Con --neo4j se ejecuta la consulta de
+aristas de actores del grafo de contenido (solo lectura).
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from neo4j import Record
+
+from neo4j_connection import Neo4jConnection
+
+KEYS = ("movie_id", "key", "name")
+
+
+class _Result:
+    def __init__(self, rows, fetch_size):
+        self._rows = rows
+        self._fetch_size = fetch_size
+
+    def keys(self):
+        return list(KEYS)
+
+    def __iter__(self):
+        # El driver guarda en memoria un lote de fetch_size registros a la vez
+        for start in range(0, self._rows, self._fetch_size):
+            batch = [Record(zip(KEYS, (f"m{i // 8}", f"a{i % 50_000}", f"Actor {i % 50_000}")))
+                     for i in range(start, min(start + self._fetch_size, self._rows))]
+            yield from batch
+
+
+class _Session:
+    def __init__(self, rows, fetch_size):
+        self._rows = rows
+        self._fetch_size = fetch_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, cypher_query, parameters=None):
+        return _Result(self._rows, self._fetch_size)
+
+
+class _Driver:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def session(self, fetch_size=1000):
+        return _Session(self.rows, fetch_size)
+
+
+def _count_keys(rows, key):
+    keys = set()
+    count = 0
+    for row in rows:
+        keys.add(key(row))
+        count += 1
+    return count, len(keys)
+
+
+VARIANTS = {
+    "query (lista de dicts)": lambda conn, q, fs: _count_keys(conn.query(q), lambda r: r["key"]),
+    "stream dict": lambda conn, q, fs: _count_keys(conn.stream(q, fetch_size=fs), lambda r: r["key"]),
+    "stream tuple": lambda conn, q, fs: _count_keys(conn.stream(q, fetch_size=fs, rows="tuple"), lambda r: r[1]),
+    "stream row": lambda conn, q, fs: _count_keys(conn.stream(q, fetch_size=fs, rows="row"), lambda r: r.key),
+    "list(stream tuple)": lambda conn, q, fs: _count_keys(list(conn.stream(q, fetch_size=fs, rows="tuple")),
+                                                        lambda r: r[1]),
+}
+
+
+def _measure(run):
+    """(resultado, memoria pico, segundos); el tiempo se mide sin tracemalloc, que lo distorsiona"""
+    gc.collect()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def bench(conn, query, fetch_size):
+    reference = None
+    for name, variant in VARIANTS.items():
+        result, peak, elapsed = _measure(lambda: variant(conn, query, fetch_size))
+        reference = reference or result
+        assert result == reference, (name, result, reference)
+        print(f"  {name:<24} pico {peak / 2**20:9.1f} MiB  {elapsed:6.2f} s")
+    print(f"  {reference[0]} filas, {reference[1]} llaves distintas en todas las variantes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--fetch-size", type=int, default=1000)
+    parser.add_argument("--neo4j", action="store_true")
+    args = parser.parse_args()
+
+    if args.neo4j:
+        from engines.content_graph import EDGE_QUERIES
+        with Neo4jConnection() as conn:
+            print(f"aristas película-actor de la base (fetch_size={args.fetch_size}):")
+            bench(conn, EDGE_QUERIES["actor"], args.fetch_size)
+        return
+
+    conn = Neo4jConnection()
+    conn.driver = _Driver(args.rows)
+    print(f"{args.rows} filas sintéticas (fetch_size={args.fetch_size}):")
+    bench(conn, "MATCH ...", args.fetch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Prueba de carga y de paridad del autocompletado (/suggest).
+
+Uso:
+    python -m benchmarks.bench_suggest                       # 100k películas sintéticas, en proceso
+    python -m benchmarks.bench_suggest --sizes 10000 100000
+    python -m benchmarks.bench_suggest --url http://localhost:5001 --threads 8 --requests 5000
+
+En proceso se mide el tiempo del índice y el del endpoint completo con el
+cliente de pruebas de Flask (enrutamiento + JSON). Con --url se envían
+peticiones concurrentes a un servidor ya levantado y se reporta latencia y
+peticiones por segundo vistas por el cliente.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from testing.synthetic import generate_catalogue, generate_interactions, with_realistic_names
+from engines.content_graph import ContentGraph
+from engines.suggest_index import SUGGEST_TYPES, PrefixIndex, SuggestIndex
+from engines.text_index import normalize, word_starts
+
+
+def build(n_movies):
+    movies, edges = with_realistic_names(*generate_catalogue(n_movies, seed=1))
+    likes = {}
+    for _, movie_id, weight in generate_interactions(movies, n_movies // 10, n_movies * 2):
+        if weight > 0:
+            likes[movie_id] = likes.get(movie_id, 0) + 1
+    graph = ContentGraph.from_rows(movies, edges)
+    start = time.perf_counter()
+    index = SuggestIndex.from_content_graph(graph, likes)
+    return movies, index, time.perf_counter() - start
+
+
+def reference_suggest(prefix_index, query, limit):
+    """Fuerza bruta: nombres con alguna palabra que empiece por query, por popularidad"""
+    query = normalize(query)
+    matches = [rank for rank, name in enumerate(prefix_index.names)
+               if any(normalize(name)[start:].startswith(query) for start in word_starts(normalize(name)))]
+    return [prefix_index.ids[rank] for rank in matches[:limit]]
+
+
+def keystrokes(index, n, seed=9):
+    """Prefijos de 1 a 8 caracteres de nombres existentes, como al escribir en la caja de búsqueda"""
+    rng = random.Random(seed)
+    names = [name for prefix_index in index.indexes.values() for name in prefix_index.names]
+    queries = []
+    while len(queries) < n:
+        name = rng.choice(names)
+        words = name.split()
+        word = " ".join(words[rng.randrange(len(words)):])
+        queries.extend(word[:i] for i in range(1, min(len(word), 8) + 1))
+    return queries[:n]
+
+
+def check_parity(n_movies=5000, limit=8):
+    _, index, _ = build(n_movies)
+    for query in keystrokes(index, 300):
+        for suggest_type, prefix_index in index.indexes.items():
+            got = [item["id"] for item in prefix_index.suggest(query, limit)]
+            assert got == reference_suggest(prefix_index, query, limit), (suggest_type, query)
+    small = PrefixIndex(["a", "b", "c"], ["Ñandú", "La Noche", "Noche"], [1, 5, 3], heavy=1)
+    assert [i["id"] for i in small.suggest("noc")] == ["b", "c"]
+    assert [i["id"] for i in small.suggest("nan")] == ["a"]
+    print(f"paridad OK: 300 prefijos x {len(SUGGEST_TYPES)} tipos sobre {n_movies} películas")
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def bench_size(n_movies, n_queries=5000, limit=8):
+    _, index, build_time = build(n_movies)
+    entities = sum(len(prefix_index) for prefix_index in index.indexes.values())
+    queries = keystrokes(index, n_queries)
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.suggest(query, None, limit)
+        samples.append((time.perf_counter() - start) * 1000)
+    engine = _percentiles(samples)
+
+    import engines.suggest_index as suggest_index
+    from app import create_app
+    suggest_index._index = index
+    client = create_app().test_client()
+    samples = []
+    for query in queries[:2000]:
+        start = time.perf_counter()
+        response = client.get("/suggest", query_string={"q": query, "limit": limit})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    suggest_index._index = None
+    endpoint = _percentiles(samples)
+
+    print(f"{n_movies:>7} películas ({entities} entidades) | build {build_time:5.2f}s | "
+          f"índice p50 {engine['p50']:6.3f} ms p99 {engine['p99']:6.3f} ms | "
+          f"endpoint p50 {endpoint['p50']:6.3f} ms p99 {endpoint['p99']:6.3f} ms")
+
+
+def load_test(url, n_threads, n_requests, limit=8):
+    """Peticiones concurrentes contra un servidor en marcha"""
+    prefixes = ["a", "co", "cor", "la n", "gar", "nu", "mar", "sombra", "ju", "ve", "pe", "in"]
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    per_thread = n_requests // n_threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(per_thread):
+            query = urllib.parse.urlencode({"q": rng.choice(prefixes), "limit": limit})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f"{url.rstrip('/')}/suggest?{query}") as response:
+                    json.load(response)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = _percentiles(samples) if samples else {"p50": 0, "p99": 0}
+    print(f"{len(samples)} peticiones en {elapsed:.2f}s ({len(samples) / elapsed:.0f} req/s), "
+          f"{n_threads} hilos | p50 {stats['p50']:.2f} ms p99 {stats['p99']:.2f} ms | errores {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--url")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.url:
+        load_test(args.url, args.threads, args.requests)
+        return
+
+    check_parity()
+    for n_movies in args.sizes:
+        bench_size(n_movies)
+
+
+if __name__ == "__main__":
+    main()
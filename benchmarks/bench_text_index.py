@@ -0,0 +1,163 @@
+"""Benchmark y prueba de paridad del índice de texto (trigramas) de búsqueda.
+
+Uso:
+    python -m benchmarks.bench_text_index                   # catálogos sintéticos de 10k y 100k
+    python -m benchmarks.bench_text_index --sizes 1000 10000
+    python -m benchmarks.bench_text_index --neo4j [PALABRA ...]
+
+La referencia emula el recorrido que hace Cypher con
+`toLower(x) CONTAINS toLower($kw)`: se pasa a minúsculas cada texto del
+catálogo en cada búsqueda. El índice además ignora acentos, así que sus
+resultados deben ser un superconjunto de los de Cypher e iguales a los del
+recorrido con textos normalizados. Con --neo4j se comparan los endpoints de
+búsqueda con y sin índice sobre la base configurada en .env (solo lectura).
+"""
+import argparse
+import random
+import statistics
+import time
+
+from testing.synthetic import generate_catalogue, with_realistic_names
+from engines.content_graph import ContentGraph
+from engines.text_index import SearchIndex, normalize
+
+QUERIES = ["no", "coraz", "corazón", "pequena", "NOCHE", "sombra 1", "mar", "ciudad del",
+           "garcía", "nunez", "ángel", "martín pe", "ibanez", "x", "tierra 99"]
+
+
+def cypher_contains(texts, keyword):
+    keyword = keyword.lower()
+    return {doc_id for doc_id, text in texts if keyword in text.lower()}
+
+
+def normalized_contains(texts, keyword):
+    keyword = normalize(keyword)
+    return {doc_id for doc_id, text in texts if keyword in normalize(text)}
+
+
+def reference_advanced(movies, edges, params):
+    """Búsqueda avanzada por fuerza bruta (insensible a acentos), ordenada por título"""
+    candidates = {movie["id"] for movie in movies}
+    for category in SearchIndex.CATEGORIES:
+        if params.get(category):
+            keyword = normalize(params[category])
+            candidates &= {movie_id for movie_id, _, name in edges[category]
+                           if keyword in normalize(name)}
+    if params.get("title"):
+        candidates &= normalized_contains([(m["id"], m["title"]) for m in movies], params["title"])
+    titles = {movie["id"]: movie["title"] for movie in movies}
+    return sorted(candidates, key=lambda m: (titles[m], m))[:50]
+
+
+def build(n_movies):
+    movies, edges = with_realistic_names(*generate_catalogue(n_movies, seed=1))
+    start = time.perf_counter()
+    index = SearchIndex.from_content_graph(ContentGraph.from_rows(movies, edges))
+    index.add_actors((key, name) for _, key, name in edges["actor"])
+    return movies, edges, index, time.perf_counter() - start
+
+
+def check_parity(n_movies=5000):
+    movies, edges, index, _ = build(n_movies)
+    titles = [(movie["id"], movie["title"]) for movie in movies]
+    actors = list({key: (key, name) for _, key, name in edges["actor"]}.values())
+
+    for keyword in QUERIES:
+        for docs, trigram_index in ((titles, index.movies), (actors, index.actors)):
+            got = trigram_index.matching_ids(keyword)
+            assert got == normalized_contains(docs, keyword), keyword
+            assert cypher_contains(docs, keyword) <= got, keyword
+
+        # Las coincidencias al inicio van antes que las de palabra y estas antes que las subcadenas
+        expected = normalized_contains(titles, keyword)
+        ranked = [normalize(text) for _, text in index.movies.search(keyword, 20)]
+        assert len(ranked) == min(20, len(expected)), keyword
+        quality = [0 if text.startswith(normalize(keyword)) else
+                   1 if f" {normalize(keyword)}" in text else 2 for text in ranked]
+        assert quality == sorted(quality), (keyword, ranked)
+
+    rng = random.Random(5)
+    for _ in range(30):
+        params = {field: rng.choice(QUERIES) for field in rng.sample(
+            ["genre", "actor", "director", "season", "title"], rng.randint(1, 3))}
+        assert index.advanced_search(params) == reference_advanced(movies, edges, params), params
+
+    # Alta incremental de una película
+    index.add_movie("nueva", "Ñandú en Invierno", {"actor": [("a-nuevo", "Iñaki Núñez")]})
+    assert index.search_movies("nandu") == ["nueva"]
+    assert "nueva" in index.advanced_search({"actor": "inaki nunez", "title": "invierno"})
+    print(f"paridad OK: {len(QUERIES)} búsquedas y 30 búsquedas avanzadas sobre {n_movies} películas")
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def _time(fn, keywords, repeat):
+    samples = []
+    for _ in range(repeat):
+        for keyword in keywords:
+            start = time.perf_counter()
+            fn(keyword)
+            samples.append((time.perf_counter() - start) * 1000)
+    return _percentiles(samples)
+
+
+def bench_size(n_movies, repeat=5):
+    movies, edges, index, build_time = build(n_movies)
+    titles = [(movie["id"], movie["title"]) for movie in movies]
+
+    # Simula lo que se escribe en la caja de búsqueda, tecla por tecla
+    keystrokes = [q[:i] for q in ("corazón", "pequeña noche", "sombra 12") for i in range(1, len(q) + 1)]
+    engine = _time(lambda kw: index.search_movies(kw, 20), keystrokes, repeat)
+    reference = _time(lambda kw: cypher_contains(titles, kw), keystrokes, 1)
+    print(f"{n_movies:>7} películas | build {build_time:6.2f}s | "
+          f"índice p50 {engine['p50']:7.3f} ms p99 {engine['p99']:7.3f} ms | "
+          f"recorrido p50 {reference['p50']:7.2f} ms p99 {reference['p99']:7.2f} ms | "
+          f"x{reference['p50'] / engine['p50']:.0f}")
+
+
+def bench_neo4j(keywords, repeat=5):
+    """Compara los endpoints de búsqueda con Cypher y con el índice sobre la base configurada"""
+    from neo4j_connection import Neo4jConnection
+    from controllers.movie_controller import MovieController
+    from controllers.actor_controller import ActorController
+    import engines.text_index as text_index
+
+    with Neo4jConnection() as conn:
+        start = time.perf_counter()
+        index = SearchIndex.load(conn)
+        print(f"índice cargado: {len(index.movies)} películas, {len(index.actors)} actores "
+              f"en {time.perf_counter() - start:.2f}s")
+
+    for name, fn in (("search_movies", MovieController.search_movies),
+                     ("search_actors", ActorController.search_actors)):
+        text_index._index = None
+        cypher = _time(fn, keywords, repeat)
+        text_index._index = index
+        engine = _time(fn, keywords, repeat)
+        print(f"{name}: cypher p50 {cypher['p50']:8.1f} ms | índice p50 {engine['p50']:8.1f} ms")
+    text_index._index = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--neo4j", nargs="*", metavar="PALABRA")
+    args = parser.parse_args()
+
+    if args.neo4j is not None:
+        bench_neo4j(args.neo4j or ["a", "el", "amor", "navidad"])
+        return
+
+    check_parity()
+    for n_movies in args.sizes:
+        bench_size(n_movies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Comandos de administración: flask --app main <grupo> <comando>"""
+import os
+import time
+import click
+from flask.cli import AppGroup
+
+preferences_cli = AppGroup('preferences', help="Mantenimiento de las preferencias de usuario")
+
+
+@preferences_cli.command('replay')
+def replay_preferences():
+    """Aplica en el grafo los journals de escritura diferida de procesos ya detenidos."""
+    from engines.preference_store import recover_journals
+
+    total = 0
+    for path, applied in recover_journals(os.getenv("PREFERENCE_JOURNAL_DIR", "preference_journal")):
+        click.echo(f"{path}: {applied} eventos aplicados")
+        total += applied
+    click.echo(f"Total: {total} eventos")
+
+
+@preferences_cli.command('rebuild')
+@click.option('--user', 'user_ids', multiple=True, help="Solo estos usuarios (se puede repetir)")
+@click.option('--skip-replay', is_flag=True, help="No aplicar antes los journals pendientes")
+def rebuild_preferences_command(user_ids, skip_replay):
+    """Recalcula los USER_*_PREFERENCE del grafo desde las interacciones INTERACTED."""
+    from engines.preference_store import rebuild_preferences
+
+    if not skip_replay:
+        replay_preferences.callback()
+    rebuilt = rebuild_preferences(list(user_ids) or None)
+    click.echo(f"Preferencias reconstruidas para {rebuilt} usuarios")
+
+
+item_cf_cli = AppGroup('item-cf', help="Vecinos por ítem del filtrado colaborativo")
+
+
+@item_cf_cli.command('build')
+@click.option('--output', default=None, help="Archivo .npz de salida (por defecto ITEM_CF_PATH)")
+def build_item_cf(output):
+    """Construye los K vecinos de cada película a partir de los likes en Neo4j."""
+    from neo4j_connection import Neo4jConnection
+    from engines.item_cf import ItemNeighbours, build_options
+
+    output = output or os.getenv("ITEM_CF_PATH")
+    if not output:
+        raise click.UsageError("Indica --output o define ITEM_CF_PATH")
+    start = time.perf_counter()
+    with Neo4jConnection() as conn:
+        model = ItemNeighbours.load(conn, **build_options())
+    model.save(output)
+    click.echo(f"{len(model)} películas, {model.k} vecinos por película ({model.kind}) "
+               f"en {time.perf_counter() - start:.1f}s -> {output}")
+
+
+similar_cli = AppGroup('similar', help="Índice de películas parecidas")
+
+
+@similar_cli.command('build')
+@click.option('--output', default=None, help="Archivo .npz de salida (por defecto SIMILAR_INDEX_PATH)")
+def build_similar(output):
+    """Reconstruye los embeddings y el índice IVF desde Neo4j y los guarda en disco."""
+    from engines.similar_index import build_similar_index, index_path
+
+    output = output or index_path()
+    start = time.perf_counter()
+    index = build_similar_index(output)
+    click.echo(f"{len(index)} películas en {len(index.centroids)} listas "
+               f"en {time.perf_counter() - start:.1f}s -> {output}")
+
+
+snapshot_cli = AppGroup('snapshot', help="Snapshot en disco del grafo de contenido")
+
+
+@snapshot_cli.command('export')
+@click.option('--output', default=None, help="Archivo de salida (por defecto CONTENT_GRAPH_SNAPSHOT)")
+def export_snapshot(output):
+    """Lee el catálogo de Neo4j y lo escribe como snapshot; los workers lo cambian sin reiniciar."""
+    from neo4j_connection import Neo4jConnection
+    from engines.content_graph import ContentGraph, snapshot_path
+
+    output = output or snapshot_path()
+    if not output:
+        raise click.UsageError("Indica --output o define CONTENT_GRAPH_SNAPSHOT")
+    start = time.perf_counter()
+    with Neo4jConnection() as conn:
+        graph = ContentGraph.load(conn)
+    graph.save_snapshot(output)
+    click.echo(f"{len(graph)} películas en {time.perf_counter() - start:.1f}s -> {output} "
+               f"({os.path.getsize(output) / 2**20:.1f} MiB)")
+
+
+profiles_cli = AppGroup('profiles', help="Planes PROFILE/EXPLAIN capturados por muestreo (query_profiler.py)")
+
+
+# Función para describir una pista de índice faltante: "NodeByLabelScan :User(id)"
+def _index_hint(operator, label, prop):
+    target = f":{label}" if label else "(todos los nodos)"
+    return f"{operator} {target}({prop})" if prop else f"{operator} {target}"
+
+
+@profiles_cli.command('report')
+@click.option('--path', default=None, help="Archivo de capturas (por defecto QUERY_PROFILE_PATH)")
+@click.option('--top', default=20, show_default=True, help="Cuántas huellas mostrar")
+@click.option('--show-query', is_flag=True, help="Imprimir también el texto normalizado de cada consulta")
+def profiles_report(path, top, show_query):
+    """Huellas de consulta ordenadas por db hits totales, con los escaneos que piden un índice."""
+    from query_profiler import profiles_path, read_profiles, summarize
+
+    path = path or profiles_path()
+    groups = summarize(read_profiles(path))
+    if not groups:
+        click.echo(f"Sin capturas en {path}")
+        return
+    click.echo(f"{'huella':<18}{'consulta':<42}{'capt.':>6}{'db hits':>14}{'hits/ej.':>12}"
+               f"{'filas/ej.':>11}{'max ms':>10}")
+    for group in groups[:top]:
+        profiled = group["profiled"] or 1
+        click.echo(f"{group['fingerprint']:<18}{', '.join(sorted(group['names']))[:40]:<42}{group['captures']:>6}"
+                   f"{group['db_hits']:>14}{group['db_hits'] // profiled:>12}{group['rows'] // profiled:>11}"
+                   f"{group['max_ms']:>10.1f}")
+        for hint in sorted(group["missing_indexes"], key=lambda item: tuple(str(part) for part in item)):
+            click.echo(f"{'':<18}  posible índice faltante: {_index_hint(*hint)}")
+        if show_query:
+            click.echo(f"{'':<18}  {group['query']}")
+
+
+@profiles_cli.command('clear')
+@click.option('--path', default=None, help="Archivo de capturas (por defecto QUERY_PROFILE_PATH)")
+def profiles_clear(path):
+    """Borra el archivo de capturas (y su rotación .1)."""
+    from query_profiler import profiles_path
+
+    path = path or profiles_path()
+    for candidate in (path, f"{path}.1"):
+        if os.path.exists(candidate):
+            os.remove(candidate)
+            click.echo(f"{candidate} borrado")
+
+
+schema_cli = AppGroup('schema', help="Migraciones del esquema de Neo4j (constraints e índices)")
+
+
+@schema_cli.command('migrate')
+@click.option('--target', type=int, default=None, help="Aplicar solo hasta esta versión")
+@click.option('--wait/--no-wait', default=True, show_default=True, help="Esperar a que los índices se pueblen")
+@click.option('--timeout', default=600, show_default=True, help="Segundos de espera de los índices")
+def schema_migrate(target, wait, timeout):
+    """Aplica las migraciones pendientes (idempotente)."""
+    from schema_migrations import migrate, wait_for_indexes
+
+    start = time.perf_counter()
+    applied = migrate(target)
+    if applied and wait:
+        wait_for_indexes(timeout)
+    click.echo(f"Migraciones aplicadas: {', '.join(map(str, applied)) or 'ninguna'} "
+               f"({time.perf_counter() - start:.1f}s)")
+
+
+@schema_cli.command('status')
+def schema_status():
+    """Versión aplicada, migraciones pendientes e índices que faltan o no están ONLINE."""
+    from schema_migrations import MIGRATIONS, verify
+
+    version, missing = verify()
+    click.echo(f"Versión del esquema: {version} de {MIGRATIONS[-1][0]}")
+    for number, description, _ in MIGRATIONS:
+        click.echo(f"  {number} {'aplicada ' if number <= version else 'pendiente'} {description}")
+    for number, name, state in missing:
+        click.echo(f"  falta {name} (migración {number}, estado {state or 'inexistente'})")
+    if missing:
+        raise SystemExit(1)
+
+
+ingest_cli = AppGroup('ingest', help="Carga masiva del catálogo")
+
+
+# Función para avisar a un servidor en marcha que recargue sus cachés e índices del catálogo
+def _notify_refresh(url, admin_token):
+    import json
+    import urllib.request
+
+    request = urllib.request.Request(url.rstrip('/') + '/movies/cache/refresh', data=b'{}', method='POST',
+                                     headers={'Content-Type': 'application/json',
+                                              'Authorization': f'Bearer {admin_token}'})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.load(response)["reloaded"]
+
+
+@ingest_cli.command('movies')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help="Formato del archivo (por defecto, según la extensión)")
+@click.option('--batch-size', default=1000, show_default=True, help="Películas por transacción UNWIND")
+@click.option('--writers', default=4, show_default=True, help="Hilos escritores (particiones por id)")
+@click.option('--checkpoint', default=None, help="Archivo de checkpoint (por defecto PATH.checkpoint)")
+@click.option('--restart', is_flag=True, help="Ignorar el checkpoint y empezar desde la primera fila")
+@click.option('--notify', multiple=True, metavar='URL',
+              help="Servidor en marcha al que pedir POST /movies/cache/refresh al terminar; "
+                   "los workers que comparten su CATALOG_REFRESH_PATH recargan solos (se puede repetir)")
+@click.option('--admin-token', envvar='ADMIN_TOKEN', default='', help="Token de las rutas de administración")
+def ingest_movies(path, fmt, batch_size, writers, checkpoint, restart, notify, admin_token):
+    """Carga películas con géneros, actores, directores y temporadas desde CSV o JSONL (ver ingest.py)."""
+    from ingest import ingest_file
+
+    def progress(stats):
+        click.echo(f"  {stats['committed_rows']} filas confirmadas, {stats['movies']} películas, "
+                   f"{stats['movies'] / max(stats['elapsed'], 1e-9):.0f} películas/s", err=True)
+
+    checkpoint = checkpoint or f"{path}.checkpoint"
+    try:
+        stats = ingest_file(path, fmt, batch_size, writers, checkpoint, restart, progress)
+    except Exception as e:
+        raise click.ClickException(f"{e} (volver a correr el comando reanuda desde {checkpoint})")
+    if stats["skipped"]:
+        click.echo(f"Reanudado desde el checkpoint: {stats['skipped']} filas ya cargadas")
+    elapsed = max(stats["elapsed"], 1e-9)
+    click.echo(f"{stats['rows']} filas leídas ({stats['invalid']} inválidas), {stats['movies']} películas, "
+               f"{stats['entities']} entidades nuevas, {stats['relationships']} relaciones en "
+               f"{stats['batches']} lotes, {stats['elapsed']:.1f}s: {stats['rows'] / elapsed:.0f} filas/s, "
+               f"{(stats['movies'] + stats['relationships']) / elapsed:.0f} escrituras/s")
+    # Este proceso no sirve peticiones: se recargan los motores de los servidores avisados
+    for url in notify:
+        try:
+            reloaded = _notify_refresh(url, admin_token)
+            click.echo(f"{url}: recargado {', '.join(reloaded) or 'solo la caché de tarjetas'}")
+        except Exception as e:
+            click.echo(f"ERROR >> Avisando a {url}: {e}", err=True)
+    if not notify:
+        click.echo("Los servidores en marcha siguen con sus cachés: POST /movies/cache/refresh o --notify URL")
+
+
+def register_commands(app):
+    app.cli.add_command(preferences_cli)
+    app.cli.add_command(item_cf_cli)
+    app.cli.add_command(similar_cli)
+    app.cli.add_command(snapshot_cli)
+    app.cli.add_command(profiles_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(ingest_cli)
@@ -1,44 +1,30 @@
-from neo4j_connection import Neo4jConnection
+from telemetry import instrumented
+from engines.text_index import get_search_index
+from repositories.base import get_repository
 
+@instrumented
 class ActorController:
     @staticmethod
     def get_actor(actor_id):
-        query = """
-        MATCH (a:Actor {id: $actor_id})
-        RETURN a {.id, .name} AS actor
-        """
-        with Neo4jConnection() as conn:
-            result = conn.query(query, {"actor_id": actor_id})
-            return result[0] if result else None
+        return get_repository().get_actor(actor_id)
 
     @staticmethod
-    def get_all_actors():
-        query = """
-        MATCH (a:Actor)
-        RETURN a {.id, .name} AS actor
-        ORDER BY a.name
-        """
-        with Neo4jConnection() as conn:
-            return conn.query(query)
+    def get_all_actors(limit=100, after=None):
+        """Una página de actores ordenados por nombre; after = (nombre, id) del último visto"""
+        return get_repository().actors_page(limit, after)
+
+    @staticmethod
+    def stream_actors(after=None):
+        """Todos los actores desde el cursor, uno a uno (para exportar sin cargar la lista)"""
+        yield from get_repository().stream_actors(after)
     
     @staticmethod
     def search_actors(keyword):
-        query = """
-        MATCH (a:Actor)
-        WHERE toLower(a.name) CONTAINS toLower($keyword)
-        RETURN a {.id, .name} AS actor
-        LIMIT 20
-        """
-        with Neo4jConnection() as conn:
-            return conn.query(query, {"keyword": keyword})
+        index = get_search_index()
+        if index is not None:
+            return [{"actor": actor} for actor in index.search_actors(keyword, 20)]
+        return get_repository().search_actors(keyword, 20)
     
     @staticmethod
     def get_movies_by_actor(actor_name):
-        query = """
-        MATCH (m:Movie)-[:HAS_ACTOR]->(a:Actor {name: $actor_name})
-        RETURN m {.id, .title, .year} AS movie
-        ORDER BY m.year DESC
-        LIMIT 20
-        """
-        with Neo4jConnection() as conn:
-            return conn.query(query, {"actor_name": actor_name})
\ No newline at end of file
+        return get_repository().movies_by_actor(actor_name, 20)
\ No newline at end of file
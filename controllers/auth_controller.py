@@ -1,5 +1,7 @@
 import bcrypt
+from telemetry import instrumented
 
+@instrumented
 class AuthController:
     @staticmethod
     def hash_password(password):
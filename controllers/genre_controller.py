@@ -1,34 +1,21 @@
-from neo4j_connection import Neo4jConnection
+from telemetry import instrumented
+from repositories.base import get_repository
 
+@instrumented
 class GenreController:
     @staticmethod
     def get_genre(genre_name):
-        query = """
-        MATCH (g:Genre {name: $genre_name})
-        RETURN g {.name} AS genre
-        """
-        with Neo4jConnection() as conn:
-            result = conn.query(query, {"genre_name": genre_name})
-            return result[0] if result else None
+        return get_repository().get_genre(genre_name)
 
     @staticmethod
-    def get_all_genres():
-        query = """
-        MATCH (g:Genre)
-        RETURN g {.name} AS genre
-        ORDER BY g.name
-        """
-        with Neo4jConnection() as conn:
-            return conn.query(query)
+    def get_all_genres(limit=100, after=None):
+        """Una página de géneros ordenados por nombre; after = (nombre, nombre) del último visto"""
+        return get_repository().genres_page(limit, after)
+
+    @staticmethod
+    def stream_genres(after=None):
+        yield from get_repository().stream_genres(after)
     
     @staticmethod
     def get_movies_by_genre(genre_name, min_weight=0.5):
-        query = """
-        MATCH (g:Genre {name: $genre_name})<-[r:HAS_GENRE]-(m:Movie)
-        WHERE r.peso >= $min_weight
-        RETURN m {.id, .title, .year, genre_weight: r.peso} AS movie
-        ORDER BY r.peso DESC
-        LIMIT 20
-        """
-        with Neo4jConnection() as conn:
-            return conn.query(query, {"genre_name": genre_name, "min_weight": min_weight})
\ No newline at end of file
+        return get_repository().movies_by_genre(genre_name, min_weight, 20)
\ No newline at end of file
@@ -1,164 +1,150 @@
-from neo4j_connection import Neo4jConnection
-from datetime import datetime
-
+import asyncio
+import time
+from telemetry import get_logger, instrumented
+from engines.recommendation_cache import recommendation_cache
+from engines.preference_store import get_preference_store, interaction_event
+from engines.popularity_index import get_popularity_index
+from engines import item_cf
+from engines.item_cf import get_item_cf
+from repositories.base import get_repository
+
+log = get_logger(__name__)
+
+@instrumented
 class InteractionController:
 
     @staticmethod
     def add_interaction(user_id, movie_id, interaction_type):
-        if interaction_type not in ['like', 'dislike']:
-            raise ValueError("El tipo de interacción debe ser 'like' o 'dislike'.")
+        weight = InteractionController._weight(interaction_type)
+        # El mismo instante va al grafo y al índice de popularidad (ver PopularityIndex.reconcile)
+        timestamp = time.time()
 
-        weight = 1.0 if interaction_type == 'like' else -1.0
-
-        user_check_query = """
-        MATCH (u:User {id: $user_id})
-        RETURN u.id AS user_id, u.name AS user_name, u.email AS user_email
-        """
-        
         try:
-            with Neo4jConnection() as conn:
-                user_check = conn.query(user_check_query, {"user_id": user_id})
-                
-                if not user_check:
-                    raise ValueError(f"Usuario {user_id} no existe. Debe iniciar sesión correctamente.")
-                
-                user_info = user_check[0]
-                print(f"DEBUG >> Usuario encontrado: {user_info['user_name']} ({user_info['user_email']})")
-                
-                movie_check_query = """
-                MATCH (m:Movie {id: $movie_id})
-                RETURN m.id AS movie_id, m.title AS movie_title
-                """
-                
-                movie_check = conn.query(movie_check_query, {"movie_id": movie_id})
-                
-                if not movie_check:
-                    raise ValueError(f"La película {movie_id} no existe en la base de datos")
-                
-                movie_info = movie_check[0]
-                print(f"DEBUG >> Película encontrada: {movie_info['movie_title']}")
-
-                interaction_query = """
-                // Registrar la interacción básica
-                MATCH (u:User {id: $user_id}), (m:Movie {id: $movie_id})
-                MERGE (u)-[r:INTERACTED]->(m)
-                SET r.type = $interaction_type,
-                    r.weight = $weight,
-                    r.timestamp = datetime()
-
-                WITH u, m, $weight AS weight
-
-                // Procesar géneros (si existen)
-                OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-                WITH u, m, weight, COLLECT(DISTINCT g) AS genres
-                FOREACH (genre IN genres |
-                    MERGE (u)-[ug:USER_GENRE_PREFERENCE]->(genre)
-                    SET ug.peso = coalesce(ug.peso, 0) + (weight * 0.15)
-                )
-
-                WITH u, m, weight
-
-                // Procesar directores (si existen)
-                OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-                WITH u, m, weight, COLLECT(DISTINCT d) AS directors
-                FOREACH (director IN directors |
-                    MERGE (u)-[ud:USER_DIRECTOR_PREFERENCE]->(director)
-                    SET ud.peso = coalesce(ud.peso, 0) + (weight * 0.12)
-                )
-
-                WITH u, m, weight
-
-                // Procesar actores (si existen)
-                OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-                WITH u, m, weight, COLLECT(DISTINCT a) AS actors
-                FOREACH (actor IN actors |
-                    MERGE (u)-[ua:USER_ACTOR_PREFERENCE]->(actor)
-                    SET ua.peso = coalesce(ua.peso, 0) + (weight * 0.08)
-                )
-
-                WITH u, m, weight
-
-                // Procesar temporadas/contextos (si existen)
-                OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-                WHERE s:Season OR s:Contexto
-                WITH u, m, weight, COLLECT(DISTINCT s) AS seasons
-                FOREACH (season IN seasons |
-                    MERGE (u)-[us:USER_SEASON_PREFERENCE]->(season)
-                    SET us.peso = coalesce(us.peso, 0) + (weight * 0.05)
-                )
-
-                // Retornar información básica
-                RETURN {
-                    user: {id: u.id, name: u.name, email: u.email},
-                    movie: {id: m.id, title: m.title},
-                    interaction: {type: $interaction_type, weight: $weight},
-                    status: 'success'
-                } AS result
-                """
-
-                result = conn.query(interaction_query, {
-                    "user_id": user_id,
-                    "movie_id": movie_id,
-                    "interaction_type": interaction_type,
-                    "weight": weight
-                })
-
-                print(f"DEBUG >> Interacción procesada exitosamente para usuario real: {user_info['user_name']}")
-                
-                return {
-                    "message": f"Interacción '{interaction_type}' registrada exitosamente",
-                    "data": result[0] if result else None,
-                    "user": user_info,
-                    "movie": movie_info,
-                    "status": "success"
-                }
+            repository = get_repository()
+            user_info, movie_info = InteractionController._checked(
+                user_id, movie_id, repository.user_summary(user_id), repository.movie_summary(movie_id))
+
+            store = get_preference_store()
+            if store is not None:
+                result, previous = InteractionController._queue(
+                    store, user_id, movie_id, interaction_type, weight, timestamp, user_info, movie_info)
+            else:
+                result = repository.write_interactions([
+                    interaction_event(user_id, movie_id, interaction_type, weight, timestamp)
+                ])
+                previous = InteractionController._previous_weight(result, weight)
+
+            return InteractionController._applied(
+                user_id, movie_id, interaction_type, weight, previous, timestamp, result, user_info, movie_info)
                 
         except Exception as e:
-            print(f"ERROR >> En add_interaction: {str(e)}")
+            log.error("En add_interaction: %s", e)
             raise e
 
     @staticmethod
-    def get_user_interactions(user_id, limit=10):
-        query = """
-        MATCH (u:User {id: $user_id})-[r:INTERACTED]->(m:Movie)
-        RETURN {
-            movie: {id: m.id, title: m.title},
-            interaction: {type: r.type, weight: r.weight, timestamp: toString(r.timestamp)}
-        } AS interaction
-        ORDER BY r.timestamp DESC
-        LIMIT $limit
-        """
+    def _weight(interaction_type):
+        if interaction_type not in ['like', 'dislike']:
+            raise ValueError("El tipo de interacción debe ser 'like' o 'dislike'.")
+        return 1.0 if interaction_type == 'like' else -1.0
+
+    @staticmethod
+    def _previous_weight(result, weight):
+        """Peso anterior de la interacción escrita; si el grafo la descartó por vieja, nada cambió"""
+        if not result:
+            return 0
+        written = result[0]['result']
+        return written['interaction']['previous_weight'] if written['status'] == 'success' else weight
+
+    @staticmethod
+    def _checked(user_id, movie_id, user_info, movie_info):
+        """(user_info, movie_info) o ValueError si el usuario o la película no existen"""
+        if user_info is None:
+            raise ValueError(f"Usuario {user_id} no existe. Debe iniciar sesión correctamente.")
+        log.debug("Usuario encontrado: %s (%s)", user_info['user_name'], user_info['user_email'])
+
+        if movie_info is None:
+            raise ValueError(f"La película {movie_id} no existe en la base de datos")
+        log.debug("Película encontrada: %s", movie_info['movie_title'])
+        return user_info, movie_info
+
+    @staticmethod
+    def _queue(store, user_id, movie_id, interaction_type, weight, timestamp, user_info, movie_info):
+        # Escritura diferida: journal + vector en memoria, el grafo se actualiza por lotes
+        previous = store.record(user_id, movie_id, interaction_type, weight, timestamp)
+        result = [{"result": {
+            "user": {"id": user_id, "name": user_info['user_name'], "email": user_info['user_email']},
+            "movie": {"id": movie_id, "title": movie_info['movie_title']},
+            "interaction": {"type": interaction_type, "weight": weight, "previous_weight": previous},
+            "status": "queued"
+        }}]
+        return result, previous
+
+    @staticmethod
+    def _applied(user_id, movie_id, interaction_type, weight, previous, timestamp, result, user_info, movie_info):
+        """Actualiza popularidad, vecinos por ítem y caché tras registrar la interacción y arma la respuesta"""
+        index = get_popularity_index()
+        if index is not None:
+            index.apply(user_id, movie_id, previous, weight, timestamp)
+        # Solo si los vecinos ya están en memoria: construirlos aquí bloquearía la petición
+        # (y el event loop en ASGI); al cargarse se ponen al día con el grafo (ItemNeighbours.catch_up)
+        if item_cf.is_loaded():
+            get_item_cf().apply(user_id, movie_id, previous, weight)
+
+        log.debug("Interacción procesada exitosamente para usuario real: %s", user_info['user_name'])
+
+        # Las preferencias del usuario cambiaron: sus recomendaciones en caché ya no sirven
+        recommendation_cache.invalidate_user(user_id)
         
-        with Neo4jConnection() as conn:
-            return conn.query(query, {"user_id": user_id, "limit": limit})
+        return {
+            "message": f"Interacción '{interaction_type}' registrada exitosamente",
+            "data": result[0] if result else None,
+            "user": user_info,
+            "movie": movie_info,
+            "status": "success"
+        }
+
+    @staticmethod
+    def get_user_interactions(user_id, limit=10):
+        return get_repository().user_interactions(user_id, limit)
 
     @staticmethod
     def get_user_preferences(user_id):
-        query = """
-        MATCH (u:User {id: $user_id})
-        
-        // Preferencias de géneros
-        OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)
-        WITH u, COLLECT({name: g.name, peso: pg.peso}) AS genre_prefs
-        
-        // Preferencias de directores
-        OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)
-        WITH u, genre_prefs, COLLECT({name: d.name, peso: pd.peso}) AS director_prefs
-        
-        // Preferencias de actores
-        OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)
-        WITH u, genre_prefs, director_prefs, COLLECT({name: a.name, peso: pa.peso}) AS actor_prefs
-        
-        RETURN {
-            user: {id: u.id, name: u.name, email: u.email},
-            preferences: {
-                genres: [x IN genre_prefs WHERE x.peso > 0.05 | x],
-                directors: [x IN director_prefs WHERE x.peso > 0.05 | x],
-                actors: [x IN actor_prefs WHERE x.peso > 0.05 | x]
-            }
-        } AS user_preferences
-        """
-        
-        with Neo4jConnection() as conn:
-            result = conn.query(query, {"user_id": user_id})
-            return result[0] if result else None
\ No newline at end of file
+        return get_repository().user_preferences(user_id)
+
+
+@instrumented
+class AsyncInteractionController:
+    """add_interaction para el modo ASGI: las comprobaciones de usuario y película van en paralelo"""
+
+    @staticmethod
+    async def add_interaction(user_id, movie_id, interaction_type):
+        weight = InteractionController._weight(interaction_type)
+        # El mismo instante va al grafo y al índice de popularidad (ver PopularityIndex.reconcile)
+        timestamp = time.time()
+
+        try:
+            repository = get_repository()
+            user_info, movie_info = await asyncio.gather(
+                repository.user_summary_async(user_id),
+                repository.movie_summary_async(movie_id),
+            )
+            user_info, movie_info = InteractionController._checked(user_id, movie_id, user_info, movie_info)
+
+            store = get_preference_store()
+            if store is not None:
+                # record() puede leer el perfil de Neo4j la primera vez: va al pool de hilos
+                result, previous = await asyncio.get_running_loop().run_in_executor(
+                    None, InteractionController._queue,
+                    store, user_id, movie_id, interaction_type, weight, timestamp, user_info, movie_info)
+            else:
+                result = await repository.write_interactions_async([
+                    interaction_event(user_id, movie_id, interaction_type, weight, timestamp)
+                ])
+                previous = InteractionController._previous_weight(result, weight)
+
+            return InteractionController._applied(
+                user_id, movie_id, interaction_type, weight, previous, timestamp, result, user_info, movie_info)
+
+        except Exception as e:
+            log.error("En add_interaction: %s", e)
+            raise e
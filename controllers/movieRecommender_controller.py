@@ -1,203 +1,368 @@
-from neo4j_connection import Neo4jConnection
+import asyncio
+from telemetry import get_logger, instrumented
+from engines.content_graph import get_content_graph
+from engines.ppr import get_ppr_graph
+from engines.recommendation_cache import recommendation_cache
+from engines.preference_store import get_preference_store
+from engines.popularity_index import get_popularity_index
+from engines.hybrid import get_hybrid_ranker
+from engines.item_cf import get_item_cf
+from controllers.movie_projection import fetch_movies, fetch_movies_async, recommendation_card
+from repositories.base import get_repository
 import random
 
+log = get_logger(__name__)
+
+# Algoritmos disponibles en GET /recommendations/<user_id>?algo=
+ALGORITHMS = ('content', 'ppr', 'collaborative', 'hybrid')
+
+# recommendation_type de cada fuente del ranking híbrido
+SOURCE_TYPES = {"content": "content_based", "popular": "popular", "collaborative": "collaborative"}
+
+@instrumented
 class MovieRecommenderController:
     @staticmethod
-    def get_recommendations_for_user(user_id, limit=10):
-
-        query = """
-        MATCH (u:User {id: $user_id})
-        
-        // 1. PREFERENCIAS DE GÉNERO (50% peso)
-        OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)
-        WITH u, COLLECT({genre: g, weight: pg.peso}) AS genre_prefs
-        
-        // 2. PREFERENCIAS DE ACTORES (20% peso)
-        OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)
-        WITH u, genre_prefs, COLLECT({actor: a, weight: pa.peso}) AS actor_prefs
-        
-        // 3. PREFERENCIAS DE DIRECTORES (30% peso)
-        OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)
-        WITH u, genre_prefs, actor_prefs, COLLECT({director: d, weight: pd.peso}) AS director_prefs
-        
-        // 4. PREFERENCIAS DE TEMPORADA (opcional)
-        OPTIONAL MATCH (u)-[ps:USER_SEASON_PREFERENCE]->(s)
-        WITH u, genre_prefs, actor_prefs, director_prefs, COLLECT({season: s, weight: ps.peso}) AS season_prefs
-        
-        CALL {
-            WITH u, genre_prefs, actor_prefs, director_prefs, season_prefs
-            
-            MATCH (m:Movie)
-            WHERE NOT EXISTS((u)-[:INTERACTED]->(m))
-            
-            // 1. Puntaje por géneros
-            OPTIONAL MATCH (m)-[:HAS_GENRE]->(mg:Genre)
-            WITH m, genre_prefs, actor_prefs, director_prefs, season_prefs,
-                 REDUCE(s = 0, gp IN genre_prefs | 
-                   CASE WHEN mg = gp.genre THEN s + gp.weight * 0.5 ELSE s END) AS genre_score
-                 
-            // 2. Puntaje por actores
-            OPTIONAL MATCH (m)-[:HAS_ACTOR]->(ma:Actor)
-            WITH m, genre_score, actor_prefs, director_prefs, season_prefs,
-                 genre_score + REDUCE(s = 0, ap IN actor_prefs | 
-                   CASE WHEN ma = ap.actor THEN s + ap.weight * 0.2 ELSE s END) AS actor_score
-                 
-            // 3. Puntaje por directores
-            OPTIONAL MATCH (m)-[:DIRECTED_BY]->(md:Director)
-            WITH m, genre_score, actor_score, director_prefs, season_prefs,
-                 actor_score + REDUCE(s = 0, dp IN director_prefs | 
-                   CASE WHEN md = dp.director THEN s + dp.weight * 0.3 ELSE s END) AS director_score
-                 
-            // 4. Puntaje por temporada (opcional)
-            OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(ms)
-            WITH m, genre_score, actor_score, director_score, season_prefs,
-                 director_score + REDUCE(s = 0, sp IN season_prefs | 
-                   CASE WHEN ms = sp.season THEN s + sp.weight * 0.1 ELSE s END) AS final_score
-                 
-            // Obtener información completa de la película
-            OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-            OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-            OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-            
-            RETURN m, 
-                   final_score AS score,
-                   COLLECT(DISTINCT g.name)[0..3] AS genres,
-                   COLLECT(DISTINCT a.name)[0..2] AS actors,
-                   COLLECT(DISTINCT d.name)[0] AS director
-            ORDER BY score DESC
-            LIMIT $limit
-        }
-        
-        RETURN {
-            id: m.id,
-            title: m.title,
-            year: m.year,
-            score: round(score * 100) / 100,
-            genres: genres,
-            actors: actors,
-            director: director,
-            recommendation_type: 'content_based'
-        } AS movie
-        ORDER BY score DESC
-        LIMIT $limit
-        """
-        
+    def _get_user_profile(user_id):
+        """Perfil de un usuario o None si no existe; usa el vector en memoria si está activo"""
+        store = get_preference_store()
+        if store is not None:
+            return store.snapshot(user_id)
+        return get_repository().user_profiles([user_id]).get(user_id)
+
+    @staticmethod
+    def get_recommendations_for_user(user_id, limit=10, algo='content'):
+        """Recomendaciones del usuario, servidas desde la caché cuando es posible"""
+        if not recommendation_cache.can_serve(limit):
+            return MovieRecommenderController._compute_recommendations(user_id, limit, algo)
+
+        cached = recommendation_cache.get(user_id, algo, limit)
+        if cached is not None:
+            return cached
+
+        generation = recommendation_cache.generation(user_id)
+        movies, complete = MovieRecommenderController._compute_with_status(
+            user_id, recommendation_cache.max_limit, algo)
+        # Si faltó una fuente del híbrido o se cayó al fallback por un error no se guarda:
+        # la próxima petición lo reintenta
+        if complete:
+            recommendation_cache.put(user_id, algo, movies, generation)
+        return movies[:limit]
+
+    @staticmethod
+    def _compute_with_status(user_id, limit, algo):
+        """(recomendaciones, True si no faltó ninguna fuente ni hubo que caer a populares por un error)"""
+        if algo == 'hybrid':
+            return MovieRecommenderController._get_hybrid_recommendations(user_id, limit)
         try:
-            with Neo4jConnection() as conn:
-                print(f"DEBUG >> Buscando recomendaciones para usuario: {user_id}")
-                result = conn.query(query, {"user_id": user_id, "limit": limit})
-                print(f"DEBUG >> Recomendaciones encontradas: {len(result)}")
-                
-                if len(result) < limit:
-                    fallback = MovieRecommenderController._get_popular_movies(
-                        user_id, limit - len(result))
-                    result.extend(fallback)
-                
-                # Extraer solo la parte 'movie' de cada resultado para mantener compatibilidad
-                movies = [item['movie'] for item in result if 'movie' in item]
-                return movies
-                
+            return MovieRecommenderController._rank(user_id, limit, algo), True
         except Exception as e:
-            print(f"ERROR >> En get_recommendations_for_user: {str(e)}")
-            return MovieRecommenderController._get_popular_movies(user_id, limit)
+            log.error("En get_recommendations_for_user (%s): %s", algo, e)
+            return MovieRecommenderController._get_popular_movies(user_id, limit), False
+
+    @staticmethod
+    def _compute_recommendations(user_id, limit, algo):
+        return MovieRecommenderController._compute_with_status(user_id, limit, algo)[0]
+
+    @staticmethod
+    def _rank(user_id, limit, algo):
+        """Recomendaciones de un algoritmo completadas con populares; los errores se propagan"""
+        if algo == 'ppr':
+            return MovieRecommenderController._get_ppr_recommendations(user_id, limit)
+        if algo == 'collaborative':
+            return MovieRecommenderController._get_collaborative_recommendations(user_id, limit)
+
+        graph = get_content_graph()
+        if graph is not None:
+            return MovieRecommenderController._get_graph_recommendations(graph, user_id, limit)
+
+        log.debug("Buscando recomendaciones para usuario: %s", user_id)
+        result = get_repository().content_recommendations(user_id, limit)
+        log.debug("Recomendaciones encontradas: %d", len(result))
+        movies = MovieRecommenderController._recommendation_cards(result, 'content_based')
+        return MovieRecommenderController._fill_with_popular(user_id, movies, limit)
+
+    @staticmethod
+    def _fill_with_popular(user_id, movies, limit):
+        if len(movies) < limit:
+            movies.extend(MovieRecommenderController._popular_movies(user_id, limit - len(movies)))
+        return movies
+
+    @staticmethod
+    def _get_graph_recommendations(graph, user_id, limit):
+        """Recomendaciones de contenido calculadas sobre el grafo en memoria"""
+        profile = MovieRecommenderController._get_user_profile(user_id)
+        if profile is None:
+            return []
+        movies = graph.recommend(profile.preferences, profile.seen, limit)
+        return MovieRecommenderController._fill_with_popular(user_id, movies, limit)
+
+    @staticmethod
+    def _get_ppr_recommendations(user_id, limit):
+        """Recomendaciones por PageRank personalizado sembrado con los likes del usuario"""
+        likes = MovieRecommenderController._get_user_likes(user_id)
+        if likes is None:
+            return []
+        liked, seen = likes
+        movies, iterations = get_ppr_graph().rank(liked, seen, limit)
+        log.debug("PPR para usuario %s: %d películas en %d iteraciones", user_id, len(movies), iterations)
+        return MovieRecommenderController._fill_with_popular(user_id, movies, limit)
+
+    @staticmethod
+    def _get_user_likes(user_id):
+        """(películas con like, películas vistas) del usuario o None si no existe"""
+        store = get_preference_store()
+        if store is not None:
+            profile = store.snapshot(user_id)
+            return (profile.liked, profile.seen) if profile is not None else None
+        return get_repository().user_likes(user_id)
+
+    @staticmethod
+    def _get_collaborative_recommendations(user_id, limit):
+        """Películas parecidas (por quién les dio like) a las que le gustaron al usuario"""
+        scored = MovieRecommenderController._collaborative_candidates(user_id, limit)
+        movies = MovieRecommenderController._recommendation_cards(
+            [(movie_id, round(score, 2)) for movie_id, score in scored], 'collaborative')
+        return MovieRecommenderController._fill_with_popular(user_id, movies, limit)
+
+    @staticmethod
+    def _get_hybrid_recommendations(user_id, limit):
+        """Contenido, populares y colaborativas en paralelo, mezcladas y etiquetadas por fuente"""
+        sources = {
+            "content": lambda: MovieRecommenderController._content_candidates(user_id, limit),
+            "popular": lambda: MovieRecommenderController._popular_candidates(user_id, limit),
+            "collaborative": lambda: MovieRecommenderController._collaborative_candidates(user_id, limit),
+        }
+        ranked, missed = get_hybrid_ranker().rank(sources, limit)
+        cards = {card['id']: card for card in MovieRecommenderController._recommendation_cards(
+            [(movie_id, round(score, 2)) for movie_id, score, _, _ in ranked], 'hybrid')}
+        movies = []
+        for movie_id, _, source, contributing in ranked:
+            card = cards.get(movie_id)
+            if card is not None:
+                card['recommendation_type'] = SOURCE_TYPES[source]
+                card['sources'] = contributing
+                movies.append(card)
+        return movies, not missed
+
+    @staticmethod
+    def _content_candidates(user_id, limit):
+        graph = get_content_graph()
+        if graph is not None:
+            profile = MovieRecommenderController._get_user_profile(user_id)
+            if profile is None:
+                return []
+            scores = graph.score(profile.preferences)
+            return [(graph.movie_ids[row], score) for row, score in graph.top_k(scores, profile.seen, limit)]
+        return get_repository().content_recommendations(user_id, limit)
+
+    @staticmethod
+    def _popular_candidates(user_id, limit):
+        index = get_popularity_index()
+        if index is not None:
+            profile = MovieRecommenderController._get_user_profile(user_id)
+            return index.top_fallback(limit, exclude=profile.interactions) if profile else []
+        return get_repository().popular_for_user(user_id, limit)
+
+    @staticmethod
+    def _collaborative_candidates(user_id, limit):
+        model = get_item_cf()
+        if model is not None:
+            likes = MovieRecommenderController._get_user_likes(user_id)
+            return model.recommend(likes[0], likes[1], limit) if likes else []
+        return get_repository().collaborative_candidates(user_id, limit)
+
+    @staticmethod
+    def _iter_all_user_ids(page_size=1000):
+        """Recorre los ids de todos los User por páginas ordenadas por id"""
+        yield from get_repository().iter_user_ids(page_size)
+
+    @staticmethod
+    def get_recommendations_for_users(user_ids=None, limit=10, chunk_size=None):
+        """Recomendaciones para muchos usuarios; genera un dict por usuario.
+
+        Si user_ids es None se recorren todos los User. El catálogo se lee una
+        sola vez por lote (o se usa el grafo en memoria si está cargado) y los
+        usuarios se puntúan juntos por bloques.
+        """
+        graph = get_content_graph()
+        if graph is None:
+            graph = get_repository().content_graph()
+        chunk_size = chunk_size or graph.batch_size_hint()
+
+        if user_ids is None:
+            user_ids = MovieRecommenderController._iter_all_user_ids()
+
+        chunk = []
+        for user_id in user_ids:
+            chunk.append(user_id)
+            if len(chunk) >= chunk_size:
+                yield from MovieRecommenderController._score_user_chunk(graph, chunk, limit)
+                chunk = []
+        if chunk:
+            yield from MovieRecommenderController._score_user_chunk(graph, chunk, limit)
+
+    @staticmethod
+    def _score_user_chunk(graph, user_ids, limit):
+        # Si el límite cabe en la caché se calcula el top completo para dejarla precalentada
+        warm_cache = recommendation_cache.can_serve(limit)
+        top_n = recommendation_cache.max_limit if warm_cache else limit
+        generations = {user_id: recommendation_cache.generation(user_id)
+                       for user_id in user_ids} if warm_cache else {}
+
+        profiles = get_repository().user_profiles(user_ids)
+
+        # Los perfiles en memoria pueden tener interacciones que aún no llegan al grafo
+        store = get_preference_store()
+        if store is not None:
+            for user_id in profiles:
+                profiles[user_id] = store.peek(user_id) or profiles[user_id]
+
+        found = [user_id for user_id in user_ids if user_id in profiles]
+        scores = graph.score_batch([profiles[user_id].preferences for user_id in found]) if found else None
+        rows = {user_id: i for i, user_id in enumerate(found)}
+
+        for user_id in user_ids:
+            if user_id not in rows:
+                yield {"user_id": user_id, "recommendations": []}
+                continue
+            seen = profiles[user_id].seen
+            movies = [graph.movie_card(row, score)
+                      for row, score in graph.top_k(scores[rows[user_id]], seen, top_n)]
+            complete = True
+            try:
+                MovieRecommenderController._fill_with_popular(user_id, movies, top_n)
+            except Exception as e:
+                log.error("En _score_user_chunk: %s", e)
+                complete = False
+            if warm_cache and complete:
+                recommendation_cache.put(user_id, 'content', movies, generations[user_id])
+            yield {"user_id": user_id, "recommendations": movies[:limit]}
+
+    @staticmethod
+    def _recommendation_cards(scored_ids, recommendation_type):
+        """Tarjetas {id, title, year, score, genres, actors, director} para [(movie_id, score)]"""
+        graph = get_content_graph()
+        if graph is not None and all(m in graph.movie_index for m, _ in scored_ids):
+            return [graph.movie_card(graph.movie_index[movie_id], score, recommendation_type)
+                    for movie_id, score in scored_ids]
+
+        movies = {movie['id']: movie for movie in fetch_movies([m for m, _ in scored_ids])}
+        return [recommendation_card(movies[movie_id], score, recommendation_type)
+                for movie_id, score in scored_ids if movie_id in movies]
 
     @staticmethod
     def _get_popular_movies(user_id, limit):
         """Fallback: películas populares que no ha visto (versión original mejorada)"""
-        query = """
-        MATCH (u:User {id: $user_id})
-        MATCH (m:Movie)
-        WHERE NOT EXISTS((u)-[:INTERACTED]->(m))
-        
-        OPTIONAL MATCH (m)<-[int:INTERACTED]-() WHERE int.weight > 0
-        WITH m, COUNT(int) AS popularity
-        
-        // Obtener información de la película
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        
-        WITH m, popularity,
-             COLLECT(DISTINCT g.name)[0..3] AS genres,
-             COLLECT(DISTINCT a.name)[0..2] AS actors,
-             COLLECT(DISTINCT d.name)[0] AS director
-        
-        WITH m, genres, actors, director,
-             CASE 
-                WHEN popularity > 50 THEN 0.9
-                WHEN popularity > 30 THEN 0.7
-                WHEN popularity > 10 THEN 0.5
-                ELSE 0.3
-             END AS score
-        
-        RETURN {
-            id: m.id,
-            title: m.title,
-            year: m.year,
-            score: score,
-            genres: genres,
-            actors: actors,
-            director: director,
-            recommendation_type: 'popular'
-        } AS movie
-        
-        ORDER BY score DESC, m.title
-        LIMIT $limit
-        """
-        
         try:
-            with Neo4jConnection() as conn:
-                print(f"DEBUG >> Buscando películas populares para usuario: {user_id}")
-                result = conn.query(query, {"user_id": user_id, "limit": limit})
-                print(f"DEBUG >> Películas populares encontradas: {len(result)}")
-                if result:
-                    # Extraer solo la parte 'movie' de cada resultado
-                    movies = [item['movie'] for item in result if 'movie' in item]
-                    return movies
-                return []
+            return MovieRecommenderController._popular_movies(user_id, limit)
         except Exception as e:
-            print(f"ERROR >> En _get_popular_movies: {str(e)}")
+            log.error("En _get_popular_movies: %s", e)
             return []
 
+    @staticmethod
+    def _popular_movies(user_id, limit):
+        index = get_popularity_index()
+        if index is not None:
+            profile = MovieRecommenderController._get_user_profile(user_id)
+            if profile is None:
+                return []
+            popular = index.top_fallback(limit, exclude=profile.interactions)
+            return MovieRecommenderController._recommendation_cards(popular, 'popular')
+
+        log.debug("Buscando películas populares para usuario: %s", user_id)
+        result = get_repository().popular_for_user(user_id, limit)
+        log.debug("Películas populares encontradas: %d", len(result))
+        return MovieRecommenderController._recommendation_cards(result, 'popular')
+
     @staticmethod
     def get_explanation_for_recommendation(user_id, movie_id):
         """Explicación de por qué se recomendó (versión original)"""
-        query = """
-        MATCH (u:User {id: $user_id}), (m:Movie {id: $movie_id})
-        
-        OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)<-[:HAS_GENRE]-(m)
-        WITH u, m, COLLECT({genre: g.name, weight: pg.peso}) AS genre_matches
-        
-        OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)<-[:HAS_ACTOR]-(m)
-        WITH u, m, genre_matches, COLLECT({actor: a.name, weight: pa.peso}) AS actor_matches
-        
-        OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)<-[:DIRECTED_BY]-(m)
-        WITH u, m, genre_matches, actor_matches, COLLECT({director: d.name, weight: pd.peso}) AS director_matches
-        
-        OPTIONAL MATCH (m)<-[int:INTERACTED]-() WHERE int.weight > 0
-        WITH u, m, genre_matches, actor_matches, director_matches,
-             COUNT(int) AS popularity_count
-        
-        RETURN {
-            movie: {id: m.id, title: m.title},
-            reasons: {
-                matched_genres: [x IN genre_matches WHERE x.weight > 0.1 | {
-                    genre: x.genre, 
-                    user_preference: x.weight
-                }],
-                matched_actors: [x IN actor_matches WHERE x.weight > 0.1 | {
-                    actor: x.actor, 
-                    user_preference: x.weight
-                }],
-                matched_directors: [x IN director_matches WHERE x.weight > 0.1 | {
-                    director: x.director, 
-                    user_preference: x.weight
-                }],
-                is_popular: popularity_count > 5
-            }
-        } AS explanation
-        """
-        
-        with Neo4jConnection() as conn:
-            result = conn.query(query, {"user_id": user_id, "movie_id": movie_id})
-            return result[0] if result else None
\ No newline at end of file
+        index = get_popularity_index()
+        # La popularidad sale del índice en memoria (si está) en lugar de contar los likes
+        popularity_count = index.counts(movie_id)[0] if index is not None else None
+        return get_repository().explanation(user_id, movie_id, popularity_count)
+
+
+@instrumented
+class AsyncMovieRecommenderController:
+    """Recomendaciones para el modo ASGI.
+
+    Los caminos en memoria (grafo de contenido, PageRank, vecinos por ítem)
+    son cálculo puro y van al pool de hilos con el controlador síncrono; el
+    colaborativo sin vecinos en memoria también. Sin grafo en memoria,
+    la consulta de contenido y la de populares (o el perfil, si hay índice de
+    popularidad) salen a la vez en lugar de una después de la otra.
+    """
+
+    @staticmethod
+    async def get_recommendations_for_user(user_id, limit=10, algo='content'):
+        if algo == 'hybrid':
+            # El ranking híbrido ya reparte sus fuentes en hilos y maneja su propia caché
+            return await asyncio.get_running_loop().run_in_executor(
+                None, MovieRecommenderController.get_recommendations_for_user, user_id, limit, algo)
+        if not recommendation_cache.can_serve(limit):
+            return await AsyncMovieRecommenderController._compute_recommendations(user_id, limit, algo)
+
+        cached = recommendation_cache.get(user_id, algo, limit)
+        if cached is not None:
+            return cached
+
+        generation = recommendation_cache.generation(user_id)
+        movies, complete = await AsyncMovieRecommenderController._compute_with_status(
+            user_id, recommendation_cache.max_limit, algo)
+        if complete:
+            recommendation_cache.put(user_id, algo, movies, generation)
+        return movies[:limit]
+
+    @staticmethod
+    async def _compute_recommendations(user_id, limit, algo):
+        return (await AsyncMovieRecommenderController._compute_with_status(user_id, limit, algo))[0]
+
+    @staticmethod
+    async def _compute_with_status(user_id, limit, algo):
+        """(recomendaciones, False si hubo que caer a populares por un error)"""
+        if algo in ('ppr', 'collaborative') or get_content_graph() is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, MovieRecommenderController._compute_with_status, user_id, limit, algo)
+
+        repository = get_repository()
+        index = get_popularity_index()
+        try:
+            if index is not None:
+                scored, profile = await asyncio.gather(
+                    repository.content_recommendations_async(user_id, limit),
+                    AsyncMovieRecommenderController._get_user_profile(user_id),
+                )
+                popular = index.top_fallback(limit, exclude=profile.interactions) if profile else []
+            else:
+                scored, popular = await asyncio.gather(
+                    repository.content_recommendations_async(user_id, limit),
+                    repository.popular_for_user_async(user_id, limit),
+                )
+        except Exception as e:
+            log.error("En get_recommendations_for_user (async): %s", e)
+            movies = await asyncio.get_running_loop().run_in_executor(
+                None, MovieRecommenderController._get_popular_movies, user_id, limit)
+            return movies, False
+
+        chosen = {movie_id for movie_id, _ in scored}
+        fallback = [(movie_id, score) for movie_id, score in popular if movie_id not in chosen]
+        movies = await AsyncMovieRecommenderController._recommendation_cards(
+            scored, fallback[:max(limit - len(scored), 0)])
+        return movies, True
+
+    @staticmethod
+    async def _get_user_profile(user_id):
+        store = get_preference_store()
+        if store is not None:
+            # snapshot() lee el perfil de Neo4j la primera vez: va al pool de hilos
+            return await asyncio.get_running_loop().run_in_executor(None, store.snapshot, user_id)
+        return (await get_repository().user_profiles_async([user_id])).get(user_id)
+
+    @staticmethod
+    async def _recommendation_cards(scored_ids, popular_ids):
+        """Tarjetas de contenido y de populares con una sola hidratación"""
+        movies = {movie['id']: movie for movie in
+                  await fetch_movies_async([m for m, _ in scored_ids + popular_ids])}
+        return ([recommendation_card(movies[m], score, 'content_based') for m, score in scored_ids if m in movies] +
+                [recommendation_card(movies[m], score, 'popular') for m, score in popular_ids if m in movies])
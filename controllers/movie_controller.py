@@ -1,285 +1,93 @@
-from neo4j_connection import Neo4jConnection
+from telemetry import instrumented
+from engines.popularity_index import WINDOWS, get_popularity_index
+from engines.text_index import get_search_index
+from engines.movie_sampler import get_movie_sampler
+from engines.similar_index import get_similar_index
+from controllers.movie_projection import fetch_movies, movie_card
+from repositories.base import get_repository
 
+@instrumented
 class MovieController:
     @staticmethod
     def get_movie(movie_id):
-        query = """
-        MATCH (m:Movie {id: $movie_id})
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name) AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
-        """
-        with Neo4jConnection() as conn:
-            result = conn.query(query, {"movie_id": movie_id})
-            if result:
-                movie_data = result[0]
-                movie_data['movie']['genres'] = movie_data['genres']
-                movie_data['movie']['actors'] = movie_data['actors']
-                movie_data['movie']['directors'] = movie_data['directors']
-                movie_data['movie']['seasons'] = movie_data['seasons']
-                return movie_data['movie']
-            return None
+        movies = fetch_movies([movie_id])
+        return movie_card(movies[0], actor_limit=None) if movies else None
 
     @staticmethod
-    def get_all_movies(limit=150):
-        query = """
-        MATCH (m:Movie)
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        WITH m, g, a, d, s
-        ORDER BY rand()
-        WITH m, 
-            COLLECT(DISTINCT g.name) AS genres,
-            COLLECT(DISTINCT a.name)[0..3] AS actors,
-            COLLECT(DISTINCT d.name) AS directors,
-            COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        genres,
-        actors,
-        directors,
-        seasons
-        LIMIT $limit
-        """
-        with Neo4jConnection() as conn:
-            results = conn.query(query, {"limit": limit})
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
+    def get_all_movies(limit=150, seed=None, page=0):
+        """Películas al azar para la portada; con seed, la página `page` de un orden fijo"""
+        sampler = get_movie_sampler()
+        if sampler is not None:
+            return MovieController._get_movies_by_ids(sampler.sample(limit, seed, page))
+        return MovieController._get_movies_by_ids(get_repository().random_movie_ids(limit))
+
+    @staticmethod
+    def get_movies_page(limit=100, after=None):
+        """Una página del catálogo ordenado por título; after = (título, id) de la última vista"""
+        return MovieController._get_movies_by_ids(get_repository().movie_ids_page(limit, after))
+
+    @staticmethod
+    def stream_movies(after=None):
+        """Todo el catálogo desde el cursor, película por película (sin pasar por la caché)"""
+        yield from get_repository().stream_movies(after)
 
     @staticmethod
     def get_latest_movies(limit=10):
-        query = """
-        MATCH (m:Movie)
-        WITH m
-        ORDER BY m.year DESC
-        LIMIT $limit
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name)[0..3] AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
-        """
-        with Neo4jConnection() as conn:
-            results = conn.query(query, {"limit": limit})
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
+        return MovieController._get_movies_by_ids(get_repository().latest_movie_ids(limit))
 
     @staticmethod
     def get_movies_by_season(season_name):
-        query = """
-        MATCH (m:Movie)-[:APPROPIATE_FOR_SEASON]->(s)
-        WHERE toLower(coalesce(s.name, s.nombre)) CONTAINS toLower($season_name)
-        WITH m, s
-        ORDER BY m.year DESC
-        LIMIT 20
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name)[0..3] AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        [coalesce(s.name, s.nombre)] AS seasons
-        """
-        with Neo4jConnection() as conn:
-            results = conn.query(query, {"season_name": season_name})
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
+        results = get_repository().movies_by_season(season_name, 20)
+        # Una fila por (película, temporada encontrada), como antes
+        by_id = {movie['id']: movie for movie in fetch_movies([movie_id for movie_id, _ in results])}
+        return [dict(movie_card(by_id[movie_id]), seasons=[season])
+                for movie_id, season in results if movie_id in by_id]
 
     @staticmethod
     def search_movies(title_keyword):
-        query = """
-        MATCH (m:Movie)
-        WHERE toLower(m.title) CONTAINS toLower($keyword)
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name)[0..3] AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
-        LIMIT 20
-        """
-        with Neo4jConnection() as conn:
-            results = conn.query(query, {"keyword": title_keyword})
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
+        index = get_search_index()
+        if index is not None:
+            return MovieController._get_movies_by_ids(index.search_movies(title_keyword, 20))
+        return MovieController._get_movies_by_ids(get_repository().search_movie_ids(title_keyword, 20))
 
     @staticmethod
-    def advanced_search(query_params):
-        conditions = []
-        params = {}
-        
-        base_query = """
-        MATCH (m:Movie)
-        """
-        
-        if query_params.get('genre'):
-            base_query += """
-            MATCH (m)-[:HAS_GENRE]->(search_g:Genre)
-            WHERE toLower(search_g.name) CONTAINS toLower($genre)
-            """
-            params['genre'] = query_params['genre']
-        
-        if query_params.get('actor'):
-            base_query += """
-            MATCH (m)-[:HAS_ACTOR]->(search_a:Actor)
-            WHERE toLower(search_a.name) CONTAINS toLower($actor)
-            """
-            params['actor'] = query_params['actor']
-        
-        if query_params.get('director'):
-            base_query += """
-            MATCH (m)-[:DIRECTED_BY]->(search_d:Director)
-            WHERE toLower(search_d.name) CONTAINS toLower($director)
-            """
-            params['director'] = query_params['director']
-        
-        if query_params.get('season'):
-            base_query += """
-            MATCH (m)-[:APPROPIATE_FOR_SEASON]->(search_s)
-            WHERE toLower(coalesce(search_s.name, search_s.nombre)) CONTAINS toLower($season)
-            """
-            params['season'] = query_params['season']
-        
-        if query_params.get('title'):
-            base_query += """
-            WHERE toLower(m.title) CONTAINS toLower($title)
-            """
-            params['title'] = query_params['title']
-        
-        base_query += """
-        WITH m
-        ORDER BY m.title
-        LIMIT 50
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name)[0..3] AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
-        """
-        
-        with Neo4jConnection() as conn:
-            results = conn.query(base_query, params)
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
-        
+    def advanced_search(query_params, limit=50, after=None):
+        """Películas que cumplen todos los filtros, ordenadas por título; after = (título, id)"""
+        index = get_search_index()
+        if index is not None:
+            return MovieController._get_movies_by_ids(index.advanced_search(query_params, limit, after))
+        return MovieController._get_movies_by_ids(get_repository().advanced_search_ids(query_params, limit, after))
+
+    @staticmethod
+    def _get_movies_by_ids(movie_ids):
+        """Películas para listados en el mismo orden que los ids (desde la caché de tarjetas)"""
+        return [movie_card(movie) for movie in fetch_movies(movie_ids)]
+
     @staticmethod
-    def get_top_movies(limit=10):
-        """Obtiene las películas más populares basadas en interacciones positivas"""
-        query = """
-        MATCH (m:Movie)
-        OPTIONAL MATCH (m)<-[r:INTERACTED]-()
-        WHERE r.weight > 0
-        WITH m, COUNT(r) AS positive_interactions
-        ORDER BY positive_interactions DESC, m.year DESC
-        LIMIT $limit
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
-        OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
-        OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
-        RETURN m {
-            .id, 
-            .title, 
-            .year,
-            .description,
-            popularity: positive_interactions
-        } AS movie,
-        COLLECT(DISTINCT g.name) AS genres,
-        COLLECT(DISTINCT a.name)[0..3] AS actors,
-        COLLECT(DISTINCT d.name) AS directors,
-        COLLECT(DISTINCT coalesce(s.name, s.nombre)) AS seasons
+    def get_similar_movies(movie_id, limit=10):
+        """Películas parecidas por géneros, actores, directores y temporadas; None si no existe"""
+        ranked = get_similar_index().similar(movie_id, limit)
+        if ranked is None:
+            return None
+        movies = MovieController._get_movies_by_ids([similar_id for similar_id, _ in ranked])
+        similarity = dict(ranked)
+        for movie in movies:
+            movie['similarity'] = round(similarity[movie['id']], 4)
+        return movies
+
+    @staticmethod
+    def get_top_movies(limit=10, window=None):
+        """Obtiene las películas más populares basadas en interacciones positivas.
+
+        window: None (todo el historial) o una de las ventanas de WINDOWS ('24h', '7d')
         """
-        with Neo4jConnection() as conn:
-            results = conn.query(query, {"limit": limit})
-            movies = []
-            for result in results:
-                movie = result['movie']
-                movie['genres'] = result['genres']
-                movie['actors'] = result['actors']
-                movie['directors'] = result['directors']
-                movie['seasons'] = result['seasons']
-                movies.append(movie)
-            return movies
\ No newline at end of file
+        index = get_popularity_index()
+        if index is not None:
+            ranked = index.top_window(window, limit) if window else index.top(limit)
+        else:
+            ranked = get_repository().top_movies(limit, WINDOWS.get(window))
+        movies = MovieController._get_movies_by_ids([movie_id for movie_id, _ in ranked])
+        popularity = dict(ranked)
+        for movie in movies:
+            movie['popularity'] = popularity[movie['id']]
+        return movies
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""Películas completas para los controladores.
+
+Las consultas de listados solo devuelven ids ordenados; fetch_movies los
+hidrata desde la caché de tarjetas y pide los faltantes al repositorio en
+una sola llamada.
+"""
+from engines.card_cache import card_cache
+from repositories.base import get_repository
+
+
+def fetch_movies(movie_ids):
+    """Películas completas en el orden de movie_ids (las que no existen se omiten)"""
+    found, missing = card_cache.get_many(movie_ids)
+    if missing:
+        fetched = get_repository().movies_by_ids(list(dict.fromkeys(missing)))
+        card_cache.put_many(fetched)
+        found.update((movie['id'], movie) for movie in fetched)
+    return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+
+async def fetch_movies_async(movie_ids):
+    """fetch_movies para el modo ASGI (misma caché, consulta asíncrona)"""
+    found, missing = card_cache.get_many(movie_ids)
+    if missing:
+        fetched = await get_repository().movies_by_ids_async(list(dict.fromkeys(missing)))
+        card_cache.put_many(fetched)
+        found.update((movie['id'], movie) for movie in fetched)
+    return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+
+def movie_card(movie, actor_limit=3):
+    """Copia de la película para listados (primeros `actor_limit` actores)"""
+    return dict(movie, actors=movie['actors'][:actor_limit] if actor_limit is not None else movie['actors'])
+
+
+def recommendation_card(movie, score, recommendation_type):
+    """Tarjeta del recomendador: id, title, year, score, genres[0..3], actors[0..2], director"""
+    return {
+        "id": movie['id'],
+        "title": movie['title'],
+        "year": movie['year'],
+        "score": score,
+        "genres": movie['genres'][:3],
+        "actors": movie['actors'][:2],
+        "director": movie['directors'][0] if movie['directors'] else None,
+        "recommendation_type": recommendation_type,
+    }
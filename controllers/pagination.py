@@ -0,0 +1,28 @@
+"""Paginación por cursor (keyset) para los listados.
+
+Cada listado se ordena por (llave de orden, id) y la página siguiente
+empieza después de la última pareja vista, así que no hay OFFSET que
+recorrer y las páginas no se desplazan si se agregan elementos. Aquí
+solo está el cursor opaco que ven los clientes; la condición Cypher está
+en repositories/cypher.py.
+"""
+import json
+import base64
+
+
+def encode_cursor(after):
+    """(llave, id) -> texto opaco para el encabezado X-Next-Cursor"""
+    raw = json.dumps(list(after), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Texto del cursor -> (llave, id); None si no hay cursor. ValueError si es inválido"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after_key, after_id = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    return after_key, after_id
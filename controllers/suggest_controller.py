@@ -0,0 +1,17 @@
+from telemetry import instrumented
+from engines.suggest_index import SUGGEST_TYPES, get_suggest_index
+from repositories.base import get_repository
+
+
+@instrumented
+class SuggestController:
+    @staticmethod
+    def suggest(query, types=None, limit=10):
+        """Sugerencias por prefijo agrupadas por tipo: {tipo: [{'id', 'name'}]}"""
+        types = types or list(SUGGEST_TYPES)
+        index = get_suggest_index()
+        if index is not None:
+            return index.suggest(query, types, limit)
+
+        repository = get_repository()
+        return {suggest_type: repository.suggest(suggest_type, query, limit) for suggest_type in types}
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def approximate_size(value):
+    """Bytes aproximados de un dict/lista/str anidados (lo que ocupa una tarjeta en memoria)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approximate_size(v) for v in value)
+    return size
+
+
+class CardCache:
+    """Caché LRU id -> película hidratada, acotada por memoria en lugar de por entradas.
+
+    El catálogo casi no cambia: las entradas solo se retiran por presión de
+    memoria, por TTL (red de seguridad entre procesos) o explícitamente con
+    invalidate()/clear() cuando se edita el catálogo.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=3600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(os.getenv("MOVIE_CARD_CACHE_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("MOVIE_CARD_CACHE_TTL", "3600")),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get_many(self, movie_ids):
+        """({movie_id: película} encontradas, [ids que faltan])"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for movie_id in movie_ids:
+                entry = self._entries.get(movie_id)
+                if entry is not None and self.ttl_seconds > 0 and entry[0] < now:
+                    self._remove(movie_id)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    missing.append(movie_id)
+                    continue
+                self._entries.move_to_end(movie_id)
+                self.hits += 1
+                found[movie_id] = entry[2]
+        return found, missing
+
+    def put_many(self, movies):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for movie in movies:
+                movie_id = movie['id']
+                self._remove(movie_id)
+                size = approximate_size(movie)
+                self._entries[movie_id] = (expires_at, size, movie)
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, movie_ids):
+        """Retira películas editadas o borradas del catálogo"""
+        with self._lock:
+            for movie_id in movie_ids:
+                if movie_id in self._entries:
+                    self._remove(movie_id)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, movie_id):
+        entry = self._entries.pop(movie_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "avg_entry_bytes": self._bytes // len(self._entries) if self._entries else 0,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+card_cache = CardCache.from_env()
@@ -0,0 +1,380 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.snapshot import IntColumn, Snapshot, StringTable, write_snapshot
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Peso de cada categoría en el puntaje final (los mismos de la consulta Cypher)
+CATEGORY_WEIGHTS = {
+    "genre": 0.5,
+    "actor": 0.2,
+    "director": 0.3,
+    "season": 0.1,
+}
+
+MOVIES_QUERY = """
+MATCH (m:Movie)
+RETURN m.id AS id, m.title AS title, m.year AS year
+"""
+
+# Aristas Movie -> entidad; la llave identifica a la entidad igual que las
+# preferencias del usuario (ver USER_PROFILE_QUERY en el recomendador)
+EDGE_QUERIES = {
+    "genre": """
+        MATCH (m:Movie)-[:HAS_GENRE]->(g:Genre)
+        RETURN m.id AS movie_id, g.name AS key, g.name AS name
+    """,
+    "actor": """
+        MATCH (m:Movie)-[:HAS_ACTOR]->(a:Actor)
+        RETURN m.id AS movie_id, coalesce(a.id, a.name) AS key, a.name AS name
+    """,
+    "director": """
+        MATCH (m:Movie)-[:DIRECTED_BY]->(d:Director)
+        RETURN m.id AS movie_id, coalesce(d.id, d.name) AS key, d.name AS name
+    """,
+    "season": """
+        MATCH (m:Movie)-[:APPROPIATE_FOR_SEASON]->(s)
+        RETURN m.id AS movie_id, coalesce(s.name, s.nombre) AS key,
+               coalesce(s.name, s.nombre) AS name
+    """,
+}
+
+
+class CategoryMatrix:
+    """Matriz dispersa Movie x entidad en formato CSR (solo estructura, sin valores)"""
+
+    def __init__(self, indptr, indices, keys, names, key_index=None, nonempty_rows=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.keys = keys
+        self.names = names
+        self.key_index = key_index if key_index is not None else {key: i for i, key in enumerate(keys)}
+        self.nonempty_rows = nonempty_rows if nonempty_rows is not None else np.flatnonzero(np.diff(indptr))
+        self.row_starts = indptr[:-1][self.nonempty_rows]
+
+    @classmethod
+    def from_edges(cls, movie_index, edges):
+        keys, names, key_index = [], [], {}
+        rows = [[] for _ in range(len(movie_index))]
+        for movie_id, key, name in edges:
+            row = movie_index.get(movie_id)
+            if row is None or key is None:
+                continue
+            col = key_index.get(key)
+            if col is None:
+                col = key_index[key] = len(keys)
+                keys.append(key)
+                names.append(name)
+            if col not in rows[row]:
+                rows[row].append(col)
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        indices = np.fromiter((c for r in rows for c in r), dtype=np.int32, count=int(indptr[-1]))
+        return cls(indptr, indices, keys, names)
+
+    def preference_vector(self, preferences):
+        """Convierte {llave: peso} en un vector denso alineado con las columnas"""
+        vector = np.zeros(len(self.keys), dtype=np.float64)
+        for key, weight in preferences.items():
+            col = self.key_index.get(key)
+            if col is not None and weight is not None:
+                vector[col] = weight
+        return vector
+
+    def row_max(self, vector):
+        """Máximo por película de las preferencias de sus entidades (0 si no tiene)"""
+        result = np.zeros(len(self.indptr) - 1, dtype=np.float64)
+        if len(self.indices):
+            gathered = vector[self.indices]
+            result[self.nonempty_rows] = np.maximum.reduceat(gathered, self.row_starts)
+        return result
+
+    def row_max_batch(self, matrix):
+        """Igual que row_max pero para una matriz densa usuarios x entidades"""
+        result = np.zeros((matrix.shape[0], len(self.indptr) - 1), dtype=matrix.dtype)
+        if len(self.indices):
+            gathered = matrix[:, self.indices]
+            result[:, self.nonempty_rows] = np.maximum.reduceat(gathered, self.row_starts, axis=1)
+        return result
+
+    def row_names(self, row):
+        names = []
+        for col in self.indices[self.indptr[row]:self.indptr[row + 1]]:
+            name = self.names[col]
+            if name not in names:
+                names.append(name)
+        return names
+
+
+class ContentGraph:
+    """Grafo bipartito Movie -> Genre/Actor/Director/Season materializado en memoria.
+
+    La consulta Cypher agrupa por (película, puntaje), así que el puntaje de
+    cada película es la suma, por categoría, de la mejor preferencia del
+    usuario entre las entidades de la película. Aquí se calcula lo mismo con
+    un gather + reduceat sobre cada matriz CSR.
+    """
+
+    def __init__(self, movie_ids, titles, years, categories, movie_index=None):
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.categories = categories
+        self.movie_index = movie_index if movie_index is not None else \
+            {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        self.snapshot = None
+
+    @classmethod
+    def from_rows(cls, movies, edges):
+        """Construye el grafo a partir de filas {id, title, year} y aristas por categoría"""
+        movie_ids, titles, years = [], [], []
+        for movie in movies:
+            movie_ids.append(movie["id"])
+            titles.append(movie.get("title"))
+            years.append(movie.get("year"))
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        categories = {
+            category: CategoryMatrix.from_edges(movie_index, edges.get(category, ()))
+            for category in CATEGORY_WEIGHTS
+        }
+        return cls(movie_ids, titles, years, categories)
+
+    @classmethod
+    def load(cls, conn):
+        """Lee el catálogo completo desde Neo4j usando una conexión abierta"""
+        movies = conn.query(MOVIES_QUERY)
+        # Las aristas son la parte grande: se leen como tuplas (movie_id, key, name)
+        # directamente del driver, sin una lista intermedia de dicts
+        edges = {
+            category: list(conn.stream(query, rows="tuple"))
+            for category, query in EDGE_QUERIES.items()
+        }
+        return cls.from_rows(movies, edges)
+
+    def save_snapshot(self, path):
+        """Escribe el grafo (arrays CSR, ids, títulos, años y nombres) como snapshot para mmap"""
+        arrays = {}
+        arrays.update(StringTable.from_strings(self.movie_ids).to_arrays("movie_ids"))
+        arrays.update(StringTable.from_strings(self.titles).to_arrays("titles"))
+        years = IntColumn.from_values(list(self.years))
+        arrays.update({"years.values": years.values, "years.nulls": years.nulls})
+        for category, matrix in self.categories.items():
+            arrays.update({f"{category}.indptr": matrix.indptr, f"{category}.indices": matrix.indices,
+                           f"{category}.nonempty_rows": matrix.nonempty_rows})
+            arrays.update(StringTable.from_strings(matrix.keys).to_arrays(f"{category}.keys"))
+            arrays.update(StringTable.from_strings(matrix.names).to_arrays(f"{category}.names"))
+        write_snapshot(path, arrays, {"kind": "content_graph", "movies": len(self),
+                                      "categories": list(self.categories), "created_at": time.time()})
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Grafo de solo lectura sobre un Snapshot abierto (sin copiar los arrays)"""
+        if snapshot.meta.get("kind") != "content_graph":
+            raise ValueError(f"{snapshot.path} no es un snapshot del grafo de contenido")
+        arrays = snapshot.arrays
+        categories = {}
+        for category in snapshot.meta["categories"]:
+            keys = snapshot.strings(f"{category}.keys")
+            categories[category] = CategoryMatrix(
+                arrays[f"{category}.indptr"], arrays[f"{category}.indices"], keys,
+                snapshot.strings(f"{category}.names"), key_index=keys.index(),
+                nonempty_rows=arrays[f"{category}.nonempty_rows"])
+        movie_ids = snapshot.strings("movie_ids")
+        graph = cls(movie_ids, snapshot.strings("titles"),
+                    IntColumn(arrays["years.values"], arrays["years.nulls"]), categories,
+                    movie_index=movie_ids.index())
+        graph.snapshot = snapshot
+        return graph
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def score(self, preferences):
+        """Puntaje de contenido de todas las películas para un usuario.
+
+        preferences: {categoría: {llave: peso}}
+        """
+        scores = np.zeros(len(self.movie_ids), dtype=np.float64)
+        for category, weight in CATEGORY_WEIGHTS.items():
+            user_prefs = preferences.get(category)
+            if not user_prefs:
+                continue
+            matrix = self.categories[category]
+            scores += weight * matrix.row_max(matrix.preference_vector(user_prefs))
+        return scores
+
+    def score_batch(self, preferences_list):
+        """Puntajes de varios usuarios a la vez: matriz usuarios x películas"""
+        scores = np.zeros((len(preferences_list), len(self.movie_ids)), dtype=np.float64)
+        for category, weight in CATEGORY_WEIGHTS.items():
+            matrix = self.categories[category]
+            user_matrix = np.zeros((len(preferences_list), len(matrix.keys)), dtype=np.float64)
+            active = False
+            for i, preferences in enumerate(preferences_list):
+                user_prefs = preferences.get(category)
+                if user_prefs:
+                    user_matrix[i] = matrix.preference_vector(user_prefs)
+                    active = True
+            if active:
+                scores += weight * matrix.row_max_batch(user_matrix)
+        return scores
+
+    def batch_size_hint(self, max_elements=8_000_000):
+        """Usuarios por bloque para que la matriz intermedia usuarios x aristas quepa en memoria"""
+        nnz = max((len(m.indices) for m in self.categories.values()), default=0)
+        return max(1, max_elements // max(nnz, 1))
+
+    def top_k(self, scores, seen_ids, limit):
+        """Índices de las mejores películas excluyendo las ya vistas"""
+        scores = scores.copy()
+        for movie_id in seen_ids:
+            row = self.movie_index.get(movie_id)
+            if row is not None:
+                scores[row] = -np.inf
+
+        available = len(scores) - int(np.isneginf(scores).sum())
+        k = min(limit, available)
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+    def movie_card(self, row, score, recommendation_type="content_based"):
+        """Mismo formato que devuelve la consulta Cypher del recomendador"""
+        directors = self.categories["director"].row_names(row)
+        return {
+            "id": self.movie_ids[row],
+            "title": self.titles[row],
+            "year": self.years[row],
+            "score": math.floor(score * 100 + 0.5) / 100,
+            "genres": self.categories["genre"].row_names(row)[:3],
+            "actors": self.categories["actor"].row_names(row)[:2],
+            "director": directors[0] if directors else None,
+            "recommendation_type": recommendation_type,
+        }
+
+    def recommend(self, preferences, seen_ids, limit):
+        scores = self.score(preferences)
+        return [self.movie_card(row, score) for row, score in self.top_k(scores, seen_ids, limit)]
+
+
+_graph = None
+_graph_lock = threading.Lock()
+_last_snapshot_check = 0.0
+_swap_listeners = []
+
+
+def is_enabled():
+    return os.getenv("CONTENT_GRAPH_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def snapshot_path():
+    return os.getenv("CONTENT_GRAPH_SNAPSHOT", "")
+
+
+def _load_graph():
+    # Con snapshot los workers lo mapean en lugar de leer todo el catálogo de Neo4j
+    path = snapshot_path()
+    if path and os.path.exists(path):
+        return ContentGraph.from_snapshot(Snapshot(path))
+    with Neo4jConnection() as conn:
+        return ContentGraph.load(conn)
+
+
+def get_content_graph():
+    """Devuelve el grafo materializado (cargándolo la primera vez) o None si está deshabilitado"""
+    global _graph
+    if _graph is None and is_enabled():
+        with _graph_lock:
+            if _graph is None:
+                _graph = _load_graph()
+    elif _graph is not None and _graph.snapshot is not None:
+        _check_snapshot()
+    return _graph
+
+
+def _check_snapshot():
+    """Cambia al snapshot nuevo si el archivo fue reemplazado (como mucho una vez por intervalo)"""
+    global _graph, _last_snapshot_check
+    now = time.monotonic()
+    interval = float(os.getenv("CONTENT_GRAPH_SNAPSHOT_CHECK_INTERVAL", "5"))
+    if now - _last_snapshot_check < interval:
+        return
+    _last_snapshot_check = now
+    path = snapshot_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    if (stat.st_dev, stat.st_ino, stat.st_mtime_ns) == _graph.snapshot.identity:
+        return
+    try:
+        graph = ContentGraph.from_snapshot(Snapshot(path))
+    except Exception as e:
+        log.error("Cargando snapshot nuevo %s: %s", path, e)
+        return
+    # Las peticiones en curso terminan con el grafo anterior; su mapeo se libera al soltarlo
+    # cuando nadie más lo referencia. Los derivados se rehacen fuera de la petición.
+    _swap(graph)
+    threading.Thread(target=_notify_swap, args=(graph,), name="content-graph-swap", daemon=True).start()
+
+
+def reload_content_graph():
+    """Vuelve a leer el catálogo (o el snapshot) y reemplaza el grafo en memoria de forma atómica"""
+    graph = _load_graph()
+    _swap(graph)
+    _notify_swap(graph)
+    return graph
+
+
+def refresh_content_graph(rebuild=True):
+    """Recarga el grafo tras cambiar el catálogo.
+
+    Con CONTENT_GRAPH_SNAPSHOT y rebuild, primero reescribe el snapshot desde
+    Neo4j: si no, se volvería a mapear el archivo viejo. Sin rebuild (otro
+    worker ya lo reescribió) solo se cambia al archivo actual, y nada si este
+    proceso ya lo tiene mapeado.
+    """
+    path = snapshot_path()
+    if path and rebuild:
+        with Neo4jConnection() as conn:
+            ContentGraph.load(conn).save_snapshot(path)
+    elif path and _graph is not None and _graph.snapshot is not None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is not None and (stat.st_dev, stat.st_ino, stat.st_mtime_ns) == _graph.snapshot.identity:
+            return _graph
+    return reload_content_graph()
+
+
+def on_swap(callback):
+    """Registra callback(graph) para cuando el grafo se reemplaza (snapshot nuevo o recarga).
+
+    Lo usan los motores que guardan el grafo o algo derivado de él (PPR,
+    búsqueda, sugerencias, muestreo, preferencias): sin esto seguirían con el
+    grafo anterior y su mapeo.
+    """
+    _swap_listeners.append(callback)
+
+
+def _swap(graph):
+    global _graph
+    with _graph_lock:
+        _graph = graph
+
+
+def _notify_swap(graph):
+    for callback in list(_swap_listeners):
+        try:
+            callback(graph)
+        except Exception as e:
+            log.error("Actualizando %s tras cambiar el grafo de contenido: %s", callback.__module__, e)
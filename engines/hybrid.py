@@ -0,0 +1,156 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from engines import content_graph, item_cf, popularity_index
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Fuentes de candidatos del ranking híbrido, en orden de prioridad para desempates
+SOURCES = ("content", "popular", "collaborative")
+
+DEFAULT_BLEND = {"content": 0.6, "popular": 0.15, "collaborative": 0.25}
+# Plazos con el motor en memoria de la fuente activo y sin él (consulta Cypher)
+DEFAULT_DEADLINES_MS = {"content": 250, "popular": 100, "collaborative": 200}
+CYPHER_DEADLINES_MS = {"content": 2000, "popular": 500, "collaborative": 1000}
+
+# Motor en memoria que sirve cada fuente; si no está activo la fuente consulta Neo4j
+SOURCE_ENGINES = {"content": content_graph, "popular": popularity_index, "collaborative": item_cf}
+
+
+def parse_weights(text, default):
+    """"content:0.6,popular:0.2" -> {"content": 0.6, "popular": 0.2}; vacío = default"""
+    if not text:
+        return dict(default)
+    weights = {}
+    for part in text.split(","):
+        name, _, value = part.partition(":")
+        name = name.strip()
+        if name not in SOURCES:
+            raise ValueError(f"Fuente desconocida '{name}', usa: {', '.join(SOURCES)}")
+        weights[name] = float(value)
+    return weights
+
+
+def default_deadlines_ms():
+    """Plazo por fuente según si su motor en memoria está activo"""
+    return {name: (DEFAULT_DEADLINES_MS if SOURCE_ENGINES[name].is_enabled() else CYPHER_DEADLINES_MS)[name]
+            for name in SOURCES}
+
+
+class HybridRanker:
+    """Genera candidatos de varias fuentes en paralelo y los mezcla.
+
+    Cada fuente es una función sin argumentos que devuelve [(movie_id,
+    puntaje)]. Todas arrancan a la vez, cada una en su propio pool de
+    max_workers hilos; cada una tiene su propio plazo y ninguna espera más
+    que el presupuesto total, así que una fuente lenta o caída solo hace que
+    falten sus candidatos. La llamada que vence su plazo se cancela si aún no
+    empezó; si ya corre, sigue ocupando su hilo, y cuando una fuente tiene
+    max_pending llamadas sin terminar las nuevas peticiones la omiten en vez
+    de hacer cola detrás de ella.
+    Los puntajes de cada fuente se normalizan a [0, 1] dividiendo por su
+    máximo y se suman ponderados por `blend`; cada película queda etiquetada
+    con la fuente que más aportó.
+    """
+
+    def __init__(self, blend=None, deadlines_ms=None, budget_ms=300, max_workers=8, max_pending=16):
+        self.blend = dict(DEFAULT_BLEND if blend is None else blend)
+        self.deadlines_ms = dict(DEFAULT_DEADLINES_MS if deadlines_ms is None else deadlines_ms)
+        self.budget_ms = budget_ms
+        self.max_pending = max(max_pending, max_workers)
+        self._executors = {name: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hybrid-{name}")
+                           for name in SOURCES}
+        self._pending = {name: threading.BoundedSemaphore(self.max_pending) for name in SOURCES}
+
+    @classmethod
+    def from_env(cls):
+        # Sin HYBRID_BUDGET_MS el presupuesto es el plazo más largo, para que ninguno quede recortado
+        deadlines_ms = parse_weights(os.getenv("HYBRID_DEADLINES_MS"), default_deadlines_ms())
+        budget_ms = os.getenv("HYBRID_BUDGET_MS")
+        return cls(
+            blend=parse_weights(os.getenv("HYBRID_BLEND"), DEFAULT_BLEND),
+            deadlines_ms=deadlines_ms,
+            budget_ms=float(budget_ms) if budget_ms else max(deadlines_ms.values(), default=300),
+            max_workers=int(os.getenv("HYBRID_MAX_WORKERS", "8")),
+            max_pending=int(os.getenv("HYBRID_MAX_PENDING", "16")),
+        )
+
+    def active_sources(self):
+        return [name for name in SOURCES if self.blend.get(name, 0) > 0]
+
+    def gather(self, sources):
+        """({fuente: [(movie_id, puntaje)]} de las que terminaron a tiempo, [fuentes que faltaron])"""
+        start = time.monotonic()
+        futures, missed = {}, []
+        for name in self.active_sources():
+            if name not in sources:
+                continue
+            future = self._submit(name, sources[name])
+            if future is None:
+                missed.append(name)
+                log.error("Fuente '%s' omitida: tiene %d llamadas sin terminar", name, self.max_pending)
+            else:
+                futures[name] = future
+        results = {}
+        for name, future in futures.items():
+            deadline_ms = min(self.deadlines_ms.get(name, self.budget_ms), self.budget_ms)
+            remaining = start + deadline_ms / 1000 - time.monotonic()
+            try:
+                results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeout:
+                # Si no empezó no llega a correr; si ya corre, su resultado ya no se usa
+                future.cancel()
+                missed.append(name)
+                log.error("Fuente '%s' superó su plazo de %.0f ms", name, deadline_ms)
+            except Exception as e:
+                missed.append(name)
+                log.error("Fuente '%s' falló: %s", name, e)
+        return results, missed
+
+    def _submit(self, name, source):
+        """Future de la fuente o None si ya tiene max_pending llamadas sin terminar"""
+        slots = self._pending[name]
+        if not slots.acquire(blocking=False):
+            return None
+        future = self._executors[name].submit(source)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def blend_candidates(self, results, limit):
+        """[(movie_id, puntaje, fuente principal, [fuentes])] ordenados por puntaje"""
+        merged = {}
+        for name in SOURCES:
+            items = results.get(name)
+            if not items:
+                continue
+            top = max(score for _, score in items)
+            weight = self.blend.get(name, 0)
+            for movie_id, score in items:
+                contribution = weight * max(score, 0) / top if top > 0 else 0.0
+                merged.setdefault(movie_id, {})[name] = contribution
+        ranked = sorted(
+            ((movie_id, sum(parts.values()), parts) for movie_id, parts in merged.items()),
+            key=lambda item: (-item[1], item[0]))
+        return [(movie_id, score, max(parts, key=lambda name: (parts[name], -SOURCES.index(name))),
+                 list(parts))
+                for movie_id, score, parts in ranked[:limit]]
+
+    def rank(self, sources, limit):
+        """(candidatos mezclados, [fuentes que faltaron]) dentro del presupuesto de latencia"""
+        results, missed = self.gather(sources)
+        return self.blend_candidates(results, limit), missed
+
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def get_hybrid_ranker():
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                _ranker = HybridRanker.from_env()
+    return _ranker
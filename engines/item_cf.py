@@ -0,0 +1,415 @@
+import os
+import time
+import threading
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.ppr import LIKES_QUERY
+from engines.popularity_index import CHANGED_SINCE_QUERY
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+SIMILARITIES = ("cosine", "jaccard")
+
+# Al ponerse al día se releen también los minutos anteriores a la construcción: con
+# escritura diferida (PreferenceStore) una interacción llega al grafo después de su timestamp
+CATCH_UP_SLACK_MS = 5 * 60 * 1000
+
+
+def similarity(kind, common, likes_a, likes_b):
+    """Similitud entre películas a partir de likes en común y likes de cada una"""
+    common = np.asarray(common, dtype=np.float64)
+    if kind == "jaccard":
+        union = likes_a + likes_b - common
+        return np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+    norm = np.sqrt(np.asarray(likes_a, dtype=np.float64) * likes_b)
+    return np.divide(common, norm, out=np.zeros_like(common), where=norm > 0)
+
+
+class ItemNeighbours:
+    """Filtrado colaborativo por ítems: las K películas más parecidas a cada una.
+
+    Dos películas se parecen si las mismas personas les dieron like (coseno
+    o Jaccard sobre los conjuntos de usuarios). neighbours[i] guarda hasta K
+    películas (-1 = hueco) y counts[i] cuántos usuarios dieron like a ambas;
+    likes[i] es el total de likes de i. La similitud se calcula al usarla con
+    los conteos actuales, así que un like nuevo solo toca los pares de esa
+    película con las demás que le gustan al usuario.
+
+    Los usuarios con más de max_user_likes likes solo aportan los primeros
+    max_user_likes: el costo de cada usuario es cuadrático en sus likes.
+
+    built_at es el momento (epoch en ms) en que se empezaron a leer los likes;
+    catch_up aplica lo que el grafo cambió desde entonces.
+    """
+
+    def __init__(self, movie_ids, likes, neighbours, counts, user_ids, user_indptr, user_items,
+                 kind="cosine", max_user_likes=500, built_at=None):
+        if kind not in SIMILARITIES:
+            raise ValueError(f"Similitud no soportada: {kind}")
+        self.movie_ids = list(movie_ids)
+        self.movie_index = {movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+        self.likes = likes
+        self.neighbours = neighbours
+        self.counts = counts
+        self.kind = kind
+        self.max_user_likes = max_user_likes
+        self.k = neighbours.shape[1]
+        self.built_at = built_at
+        # Likes de cada usuario al construir (CSR) más los que llegaron después
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        self._user_indptr = user_indptr
+        self._user_items = user_items
+        self._user_changes = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    # -- Construcción ------------------------------------------------------
+
+    @classmethod
+    def from_likes(cls, likes, k=50, kind="cosine", min_support=1, max_user_likes=500,
+                   pair_budget=1_000_000):
+        """Construye los vecinos a partir de pares (user_id, movie_id) con like.
+
+        Las películas se procesan por bloques de forma que cada bloque genere
+        como mucho pair_budget pares (película, película) antes de contarlos,
+        así que la memoria no depende del número total de co-likes.
+        """
+        movie_index, user_index = {}, {}
+        user_rows, movie_rows = [], []
+        for user_id, movie_id in likes:
+            user_rows.append(user_index.setdefault(user_id, len(user_index)))
+            movie_rows.append(movie_index.setdefault(movie_id, len(movie_index)))
+        n_movies, n_users = len(movie_index), len(user_index)
+
+        # Pares únicos ordenados por usuario y película; se recortan los usuarios sobre el tope
+        keys = np.unique(np.asarray(user_rows, dtype=np.int64) * max(n_movies, 1) +
+                         np.asarray(movie_rows, dtype=np.int64))
+        users, items = keys // max(n_movies, 1), (keys % max(n_movies, 1)).astype(np.int32)
+        del keys, user_rows, movie_rows
+        per_user = np.bincount(users, minlength=n_users)
+        starts = np.concatenate(([0], np.cumsum(per_user)[:-1]))
+        rank = np.arange(len(users)) - np.repeat(starts, per_user)
+        keep = rank < max_user_likes
+        users, items = users[keep], items[keep]
+        user_indptr = np.zeros(n_users + 1, dtype=np.int64)
+        user_indptr[1:] = np.cumsum(np.bincount(users, minlength=n_users))
+        like_counts = np.bincount(items, minlength=n_movies).astype(np.int64)
+
+        # Usuarios de cada película (CSR por película)
+        order = np.argsort(items, kind="stable")
+        movie_users = users[order].astype(np.int32)
+        movie_indptr = np.zeros(n_movies + 1, dtype=np.int64)
+        movie_indptr[1:] = np.cumsum(like_counts)
+        del order, users
+
+        neighbours = np.full((n_movies, k), -1, dtype=np.int32)
+        counts = np.zeros((n_movies, k), dtype=np.int32)
+        user_degree = np.diff(user_indptr)
+        # Pares que genera cada película: la suma de likes de sus usuarios
+        cost = np.add.reduceat(user_degree[movie_users], movie_indptr[:-1]) if len(movie_users) else \
+            np.zeros(n_movies, dtype=np.int64)
+        cost[like_counts == 0] = 0
+
+        start = 0
+        while start < n_movies:
+            end = start + 1
+            budget = cost[start]
+            while end < n_movies and budget + cost[end] <= pair_budget:
+                budget += cost[end]
+                end += 1
+            cls._block_neighbours(start, end, movie_indptr, movie_users, user_indptr, items,
+                                  like_counts, neighbours, counts, kind, min_support)
+            start = end
+
+        user_ids = [None] * n_users
+        for user_id, i in user_index.items():
+            user_ids[i] = user_id
+        movie_ids = [None] * n_movies
+        for movie_id, i in movie_index.items():
+            movie_ids[i] = movie_id
+        return cls(movie_ids, like_counts, neighbours, counts, user_ids, user_indptr, items,
+                   kind=kind, max_user_likes=max_user_likes)
+
+    @staticmethod
+    def _block_neighbours(start, end, movie_indptr, movie_users, user_indptr, user_items,
+                          like_counts, neighbours, counts, kind, min_support):
+        """Top-K de las películas [start, end): cuenta co-likes y se queda con las K más parecidas"""
+        n_movies = len(like_counts)
+        k = neighbours.shape[1]
+        lo, hi = movie_indptr[start], movie_indptr[end]
+        users = movie_users[lo:hi]
+        owners = np.repeat(np.arange(start, end, dtype=np.int64), np.diff(movie_indptr[start:end + 1]))
+        first = user_indptr[users]
+        lengths = user_indptr[users + 1] - first
+        total = int(lengths.sum())
+        if total == 0:
+            return
+        # Reúne los likes de cada usuario de cada película sin un bucle en Python
+        offsets = np.repeat(first - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        others = user_items[offsets + np.arange(total)].astype(np.int64)
+        owners = np.repeat(owners, lengths)
+        distinct = owners != others
+        keys, common = np.unique((owners[distinct] - start) * n_movies + others[distinct],
+                                 return_counts=True)
+        del offsets, others, owners, distinct
+        if min_support > 1:
+            keys, common = keys[common >= min_support], common[common >= min_support]
+        rows = keys // n_movies + start
+        cols = keys % n_movies
+        sims = similarity(kind, common, like_counts[rows], like_counts[cols])
+        order = np.lexsort((cols, -sims, rows))
+        rows, cols, common = rows[order], cols[order], common[order]
+        group_sizes = np.bincount(rows - start, minlength=end - start)
+        group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+        rank = np.arange(len(rows)) - np.repeat(group_starts, group_sizes)
+        keep = rank < k
+        neighbours[rows[keep], rank[keep]] = cols[keep]
+        counts[rows[keep], rank[keep]] = common[keep]
+
+    @classmethod
+    def load(cls, conn, **options):
+        built_at = int(time.time() * 1000)
+        model = cls.from_likes(conn.stream(LIKES_QUERY, rows="tuple"), **options)
+        model.built_at = built_at
+        return model
+
+    # -- Persistencia ------------------------------------------------------
+
+    def save(self, path):
+        """Guarda el modelo en un .npz (los likes llegados después de construirlo incluidos)"""
+        with self._lock:
+            user_ids, indptr, items = self._merged_user_likes()
+            np.savez(path, movie_ids=np.array(self.movie_ids, dtype=str), likes=self.likes,
+                     neighbours=self.neighbours, counts=self.counts,
+                     user_ids=np.array(user_ids, dtype=str), user_indptr=indptr, user_items=items,
+                     kind=self.kind, max_user_likes=self.max_user_likes,
+                     built_at=-1 if self.built_at is None else self.built_at)
+
+    @classmethod
+    def load_file(cls, path):
+        """Modelo guardado; built_at es None si el archivo no lo trae (versiones anteriores)"""
+        with np.load(path) as data:
+            built_at = int(data["built_at"]) if "built_at" in data.files else -1
+            return cls(data["movie_ids"].tolist(), data["likes"], data["neighbours"], data["counts"],
+                       data["user_ids"].tolist(), data["user_indptr"], data["user_items"],
+                       kind=str(data["kind"]), max_user_likes=int(data["max_user_likes"]),
+                       built_at=None if built_at < 0 else built_at)
+
+    def _merged_user_likes(self):
+        user_ids = [None] * len(self.user_index)
+        for user_id, i in self.user_index.items():
+            user_ids[i] = user_id
+        rows = [self._user_likes(i) for i in range(len(user_ids))]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        items = np.fromiter((m for row in rows for m in row), dtype=np.int32, count=int(indptr[-1]))
+        return user_ids, indptr, items
+
+    # -- Actualización incremental -----------------------------------------
+
+    def _user_likes(self, user_row):
+        changed = self._user_changes.get(user_row)
+        if changed is not None:
+            return changed
+        if user_row < len(self._user_indptr) - 1:
+            return self._user_items[self._user_indptr[user_row]:self._user_indptr[user_row + 1]].tolist()
+        return []
+
+    def _movie_row(self, movie_id):
+        row = self.movie_index.get(movie_id)
+        if row is None:
+            row = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.movie_index[movie_id] = row
+            if row >= len(self.likes):
+                grow = max(16, len(self.likes) // 2)
+                self.likes = np.concatenate((self.likes, np.zeros(grow, dtype=self.likes.dtype)))
+                self.neighbours = np.vstack((self.neighbours, np.full((grow, self.k), -1, dtype=np.int32)))
+                self.counts = np.vstack((self.counts, np.zeros((grow, self.k), dtype=np.int32)))
+        return row
+
+    def liked(self, user_id, movie_id):
+        """True si el modelo ya cuenta el like de user_id a movie_id"""
+        with self._lock:
+            user_row, row = self.user_index.get(user_id), self.movie_index.get(movie_id)
+            return user_row is not None and row is not None and row in self._user_likes(user_row)
+
+    def catch_up(self, conn, slack_ms=CATCH_UP_SLACK_MS):
+        """Aplica las interacciones escritas desde built_at (menos slack_ms); devuelve cuántas leyó.
+
+        Cada interacción se compara con lo que el modelo ya tiene, así que
+        releer una que ya estaba contada no cambia nada.
+        """
+        changes = conn.query(CHANGED_SINCE_QUERY, {"cutoff": self.built_at - slack_ms})
+        for change in changes:
+            previous = 1.0 if self.liked(change['user_id'], change['movie_id']) else 0.0
+            self.apply(change['user_id'], change['movie_id'], previous, change['weight'])
+        return len(changes)
+
+    def apply(self, user_id, movie_id, previous_weight, weight):
+        """Actualiza los vecinos tras una interacción (mismo contrato que PopularityIndex.apply)"""
+        was_like, is_like = (previous_weight or 0) > 0, weight > 0
+        if was_like == is_like:
+            return
+        with self._lock:
+            user_row = self.user_index.setdefault(user_id, len(self.user_index))
+            liked = list(self._user_likes(user_row))
+            row = self._movie_row(movie_id)
+            if is_like:
+                if row in liked or len(liked) >= self.max_user_likes:
+                    return
+                delta = 1
+                liked.append(row)
+            else:
+                if row not in liked:
+                    return
+                delta = -1
+                liked.remove(row)
+            self._user_changes[user_row] = liked
+            self.likes[row] += delta
+            for other in liked:
+                if other != row:
+                    self._bump(row, other, delta)
+                    self._bump(other, row, delta)
+
+    def _bump(self, a, b, delta):
+        """Suma delta a los likes en común de (a, b) en la lista de vecinos de a"""
+        row = self.neighbours[a]
+        hit = np.flatnonzero(row == b)
+        if hit.size:
+            slot = hit[0]
+            self.counts[a, slot] += delta
+            if self.counts[a, slot] <= 0:
+                row[slot] = -1
+                self.counts[a, slot] = 0
+            return
+        if delta < 0:
+            return
+        # b no estaba entre los K vecinos: su conteo anterior no se guardó (era menor que
+        # el de la lista), así que entra con el nuevo like como cota inferior
+        empty = np.flatnonzero(row < 0)
+        if empty.size:
+            row[empty[0]] = b
+            self.counts[a, empty[0]] = delta
+            return
+        current = similarity(self.kind, self.counts[a], self.likes[a], self.likes[row])
+        worst = int(np.argmin(current))
+        if similarity(self.kind, [delta], self.likes[a], self.likes[b])[0] > current[worst]:
+            row[worst] = b
+            self.counts[a, worst] = delta
+
+    # -- Consulta ----------------------------------------------------------
+
+    def similar(self, movie_id, limit=10):
+        """[(movie_id, similitud)] de los vecinos de una película"""
+        with self._lock:
+            row = self.movie_index.get(movie_id)
+            if row is None:
+                return []
+            cols = self.neighbours[row]
+            mask = cols >= 0
+            cols = cols[mask]
+            sims = similarity(self.kind, self.counts[row][mask], self.likes[row], self.likes[cols])
+        order = np.lexsort((cols, -sims))[:limit]
+        return [(self.movie_ids[cols[i]], float(sims[i])) for i in order]
+
+    def recommend(self, liked_ids, seen_ids, limit):
+        """[(movie_id, puntaje)]: suma de similitudes de cada película con las que le gustaron"""
+        with self._lock:
+            rows = np.fromiter((self.movie_index[m] for m in liked_ids if m in self.movie_index),
+                               dtype=np.int64)
+            if not len(rows):
+                return []
+            cols = self.neighbours[rows]
+            common = self.counts[rows]
+            mask = cols >= 0
+            sims = similarity(self.kind, common[mask],
+                              np.repeat(self.likes[rows], mask.sum(axis=1)), self.likes[cols[mask]])
+            scores = np.bincount(cols[mask], weights=sims, minlength=len(self.movie_ids))
+            movie_ids = self.movie_ids
+        for movie_id in seen_ids:
+            row = self.movie_index.get(movie_id)
+            if row is not None and row < len(scores):
+                scores[row] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        k = min(limit, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(movie_ids[i], float(scores[i])) for i in top]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("ITEM_CF_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def build_options():
+    return {
+        "k": int(os.getenv("ITEM_CF_NEIGHBOURS", "50")),
+        "kind": os.getenv("ITEM_CF_SIMILARITY", "cosine"),
+        "min_support": int(os.getenv("ITEM_CF_MIN_SUPPORT", "1")),
+        "max_user_likes": int(os.getenv("ITEM_CF_MAX_USER_LIKES", "500")),
+    }
+
+
+def _load_model(rebuild=False):
+    """Vecinos del archivo del job offline (ITEM_CF_PATH) o, si no hay o rebuild, desde Neo4j.
+
+    En los dos casos se ponen al día con lo que el grafo cambió desde que se
+    construyeron: los likes posteriores al archivo, los que llegaron antes de
+    la precarga y los aplicados en memoria antes de reiniciar.
+    """
+    path = os.getenv("ITEM_CF_PATH", "")
+    with Neo4jConnection() as conn:
+        model = ItemNeighbours.load_file(path) if path and os.path.exists(path) and not rebuild else None
+        if model is not None and model.built_at is None:
+            log.info("%s no guarda cuándo se construyó: se reconstruye desde Neo4j", path)
+            model = None
+        if model is None:
+            model = ItemNeighbours.load(conn, **build_options())
+        model.catch_up(conn)
+    return model
+
+
+def get_item_cf():
+    """Devuelve los vecinos por ítem (cargándolos la primera vez) o None si está deshabilitado"""
+    global _model
+    if _model is None and is_enabled():
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+                interval = float(os.getenv("ITEM_CF_REFRESH_INTERVAL", "0"))
+                if interval > 0:
+                    threading.Thread(target=_refresh_loop, args=(interval,),
+                                     name="item-cf-refresh", daemon=True).start()
+    return _model
+
+
+def is_loaded():
+    return _model is not None
+
+
+def reload_item_cf(rebuild=False):
+    global _model
+    model = _load_model(rebuild)
+    with _model_lock:
+        _model = model
+    return model
+
+
+def _refresh_loop(interval):
+    # Reconstrucción completa: corrige la deriva de los conteos incrementales
+    while True:
+        time.sleep(interval)
+        try:
+            reload_item_cf(rebuild=True)
+        except Exception as e:
+            log.error("Reconstruyendo vecinos por ítem: %s", e)
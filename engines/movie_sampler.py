@@ -0,0 +1,142 @@
+import os
+import time
+import random
+import threading
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import get_content_graph, on_swap
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+MOVIE_IDS_QUERY = """
+MATCH (m:Movie)
+RETURN m.id AS id
+"""
+
+
+class MovieSampler:
+    """Arreglo denso de ids de películas para muestrear sin ordenar el catálogo.
+
+    Altas y bajas son O(1) (la baja mueve el último id al hueco). sample()
+    hace un Fisher-Yates parcial sobre posiciones virtuales: solo guarda los
+    intercambios realizados, así que cuesta O(limit) sin importar el tamaño
+    del catálogo. Con la misma semilla, la página p es siempre la misma
+    mientras el catálogo no cambie; para llegar a ella hay que repetir los
+    intercambios de las anteriores, así que cuesta O((p + 1) * limit). Por
+    eso la permutación con semilla se corta en max_offset posiciones: las
+    páginas que empiezan después vuelven vacías.
+    """
+
+    def __init__(self, movie_ids=(), max_offset=10_000):
+        self.max_offset = max_offset
+        self._ids = []
+        self._positions = {}
+        self._lock = threading.Lock()
+        for movie_id in movie_ids:
+            self.add(movie_id)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @classmethod
+    def load(cls, conn, max_offset=10_000):
+        graph = get_content_graph()
+        if graph is not None:
+            return cls(graph.movie_ids, max_offset)
+        return cls((movie_id for movie_id, in conn.stream(MOVIE_IDS_QUERY, rows="tuple")), max_offset)
+
+    def add(self, movie_id):
+        with self._lock:
+            if movie_id not in self._positions:
+                self._positions[movie_id] = len(self._ids)
+                self._ids.append(movie_id)
+
+    def remove(self, movie_id):
+        with self._lock:
+            position = self._positions.pop(movie_id, None)
+            if position is None:
+                return
+            last = self._ids.pop()
+            if position < len(self._ids):
+                self._ids[position] = last
+                self._positions[last] = position
+
+    def sample(self, limit, seed=None, page=0):
+        """`limit` ids distintos al azar; con seed, la página `page` de una permutación fija
+        (hasta max_offset posiciones)"""
+        rng = random.Random(seed)
+        with self._lock:
+            n = len(self._ids)
+            if seed is not None:
+                start = min(page * limit, n, self.max_offset)
+                end = min(start + limit, n, self.max_offset)
+            else:
+                start, end = 0, min(limit, n)
+            swapped = {}
+            result = []
+            for i in range(end):
+                j = rng.randrange(i, n)
+                chosen = swapped.get(j, j)
+                swapped[j] = swapped.get(i, i)
+                if i >= start:
+                    result.append(self._ids[chosen])
+            return result
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("MOVIE_SAMPLER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _max_offset():
+    return int(os.getenv("MOVIE_SAMPLER_MAX_OFFSET", "10000"))
+
+
+def get_movie_sampler():
+    """Devuelve el muestreador (cargándolo la primera vez) o None si está deshabilitado"""
+    global _sampler
+    if _sampler is None and is_enabled():
+        with _sampler_lock:
+            if _sampler is None:
+                with Neo4jConnection() as conn:
+                    _sampler = MovieSampler.load(conn, _max_offset())
+                interval = float(os.getenv("MOVIE_SAMPLER_REFRESH_INTERVAL", "3600"))
+                if interval > 0:
+                    threading.Thread(target=_refresh_loop, args=(interval,),
+                                     name="movie-sampler-refresh", daemon=True).start()
+    return _sampler
+
+
+def reload_movie_sampler():
+    global _sampler
+    with Neo4jConnection() as conn:
+        sampler = MovieSampler.load(conn, _max_offset())
+    with _sampler_lock:
+        _sampler = sampler
+    return sampler
+
+
+def _refresh_loop(interval):
+    # Red de seguridad para películas creadas o borradas fuera de add()/remove()
+    while True:
+        time.sleep(interval)
+        try:
+            reload_movie_sampler()
+        except Exception as e:
+            log.error("Recargando muestreador de películas: %s", e)
+
+
+def is_loaded():
+    return _sampler is not None
+
+
+# Se arma con los ids del grafo: uno nuevo puede traer películas que el muestreador no tiene
+def _graph_swapped(content_graph):
+    if is_loaded():
+        reload_movie_sampler()
+
+
+on_swap(_graph_swapped)
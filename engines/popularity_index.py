@@ -0,0 +1,326 @@
+import os
+import time
+import bisect
+import heapq
+import threading
+from collections import deque
+from neo4j_connection import Neo4jConnection
+from engines.preference_store import get_preference_store
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Conteo de interacciones positivas/negativas de cada película hasta el corte
+# $cutoff (epoch en ms); lo posterior se lee aparte con CHANGED_SINCE_QUERY
+POPULARITY_QUERY = """
+MATCH (m:Movie)
+OPTIONAL MATCH (m)<-[r:INTERACTED]-()
+WHERE r.timestamp IS NULL OR r.timestamp <= datetime({epochMillis: $cutoff})
+RETURN m.id AS movie_id, m.title AS title, m.year AS year,
+       count(CASE WHEN r.weight > 0 THEN 1 END) AS positive,
+       count(CASE WHEN r.weight < 0 THEN 1 END) AS negative
+"""
+
+# Interacciones escritas (o reescritas) después del corte, con su peso actual
+CHANGED_SINCE_QUERY = """
+MATCH (u:User)-[r:INTERACTED]->(m:Movie)
+WHERE r.timestamp > datetime({epochMillis: $cutoff})
+RETURN u.id AS user_id, m.id AS movie_id, r.weight AS weight, r.timestamp.epochMillis AS timestamp
+"""
+
+# Likes recientes, para las ventanas de popularidad
+RECENT_LIKES_QUERY = """
+MATCH (u:User)-[r:INTERACTED]->(m:Movie)
+WHERE r.weight > 0 AND r.timestamp >= datetime() - duration({seconds: $seconds})
+RETURN u.id AS user_id, m.id AS movie_id, r.timestamp.epochMillis AS timestamp
+"""
+
+# Margen con que reconcile adelanta el corte (ver PopularityIndex.reconcile); cubre
+# la demora entre el timestamp de una interacción y su escritura en el grafo
+RECONCILE_SLACK_MS = 60_000
+
+# Ventanas de popularidad disponibles (nombre -> segundos)
+WINDOWS = {
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+}
+
+
+def fallback_score(positive):
+    """Mismos escalones que la consulta de películas populares del recomendador"""
+    if positive > 50:
+        return 0.9
+    if positive > 30:
+        return 0.7
+    if positive > 10:
+        return 0.5
+    return 0.3
+
+
+class SlidingWindow:
+    """Likes por película dentro de los últimos `span` segundos"""
+
+    def __init__(self, span):
+        self.span = span
+        self.counts = {}
+        self._likes = {}
+        self._events = deque()
+
+    def add(self, user_id, movie_id, timestamp):
+        key = (user_id, movie_id)
+        if key not in self._likes:
+            self.counts[movie_id] = self.counts.get(movie_id, 0) + 1
+        self._likes[key] = timestamp
+        self._events.append((timestamp, key))
+
+    def remove(self, user_id, movie_id):
+        if self._likes.pop((user_id, movie_id), None) is not None:
+            self._decrement(movie_id)
+
+    def expire(self, now):
+        limit = now - self.span
+        while self._events and self._events[0][0] < limit:
+            timestamp, key = self._events.popleft()
+            # Solo cuenta si es el like vigente (no fue reemplazado ni retirado)
+            if self._likes.get(key) == timestamp:
+                del self._likes[key]
+                self._decrement(key[1])
+
+    def _decrement(self, movie_id):
+        count = self.counts[movie_id] - 1
+        if count:
+            self.counts[movie_id] = count
+        else:
+            del self.counts[movie_id]
+
+
+class PopularityIndex:
+    """Índice de popularidad por película con dos rankings ordenados.
+
+    - ranking: (-positivas, -año, id), el orden de get_top_movies
+    - fallback: (-escalón, título, id), el orden de _get_popular_movies
+
+    Ambos son listas ordenadas que se actualizan con bisect, así que el top-N
+    es un recorrido de los primeros N elementos.
+    """
+
+    def __init__(self):
+        self._movies = {}
+        self._ranking = []
+        self._fallback = []
+        self._windows = {name: SlidingWindow(span) for name, span in WINDOWS.items()}
+        self._lock = threading.RLock()
+        self._buffer = None
+
+    # -- Carga -------------------------------------------------------------
+
+    @classmethod
+    def load(cls, conn, cutoff=None):
+        """Lee el índice del grafo.
+
+        Los conteos llegan hasta `cutoff` (epoch en ms, por defecto ahora) y
+        las interacciones escritas después se suman con su peso actual, así
+        que cada pareja cuenta una sola vez aunque cambie durante la lectura.
+        """
+        return cls._read(conn, cutoff)[0]
+
+    @classmethod
+    def _read(cls, conn, cutoff=None):
+        """(índice, {(usuario, película): ms de la escritura leída después del corte})"""
+        cutoff = cutoff if cutoff is not None else int(time.time() * 1000)
+        index = cls()
+        for row in conn.stream(POPULARITY_QUERY, {"cutoff": cutoff}, rows="row"):
+            index._movies[row.movie_id] = [row.positive, row.negative, row.year, row.title]
+        index._ranking = sorted(index._ranking_key(m) for m in index._movies)
+        index._fallback = sorted(index._fallback_key(m) for m in index._movies)
+        loaded_at = {}
+        for row in conn.query(CHANGED_SINCE_QUERY, {"cutoff": cutoff}):
+            index.apply(row['user_id'], row['movie_id'], 0, row['weight'] or 0, row['timestamp'] / 1000)
+            loaded_at[(row['user_id'], row['movie_id'])] = row['timestamp']
+
+        rows = conn.query(RECENT_LIKES_QUERY, {"seconds": max(WINDOWS.values())})
+        for row in sorted(rows, key=lambda r: r['timestamp']):
+            for window in index._windows.values():
+                window.add(row['user_id'], row['movie_id'], row['timestamp'] / 1000)
+        index._expire(time.time())
+        return index, loaded_at
+
+    def _ranking_key(self, movie_id):
+        positive, _, year, _ = self._movies[movie_id]
+        return (-positive, -(year or 0), movie_id)
+
+    def _fallback_key(self, movie_id):
+        positive, _, _, title = self._movies[movie_id]
+        return (-fallback_score(positive), title or "", movie_id)
+
+    # -- Actualización incremental -----------------------------------------
+
+    def add_movie(self, movie_id, title=None, year=None):
+        with self._lock:
+            if movie_id in self._movies:
+                return
+            self._movies[movie_id] = [0, 0, year, title]
+            bisect.insort(self._ranking, self._ranking_key(movie_id))
+            bisect.insort(self._fallback, self._fallback_key(movie_id))
+
+    def apply(self, user_id, movie_id, previous_weight, weight, timestamp=None):
+        """Refleja una interacción; previous_weight es 0 si es nueva (like->dislike resta un like).
+
+        timestamp es el mismo con que se escribió en el grafo (segundos);
+        reconcile lo usa para no contar dos veces lo que ya trae la carga.
+        """
+        timestamp = timestamp or time.time()
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.append((user_id, movie_id, previous_weight, weight, timestamp))
+            movie = self._movies.get(movie_id)
+            if movie is None:
+                self.add_movie(movie_id)
+                movie = self._movies[movie_id]
+
+            old_ranking = self._ranking_key(movie_id)
+            old_fallback = self._fallback_key(movie_id)
+            if previous_weight > 0:
+                movie[0] -= 1
+            elif previous_weight < 0:
+                movie[1] -= 1
+            if weight > 0:
+                movie[0] += 1
+            elif weight < 0:
+                movie[1] += 1
+            _replace(self._ranking, old_ranking, self._ranking_key(movie_id))
+            _replace(self._fallback, old_fallback, self._fallback_key(movie_id))
+
+            for window in self._windows.values():
+                if weight > 0:
+                    window.add(user_id, movie_id, timestamp)
+                else:
+                    window.remove(user_id, movie_id)
+
+    # -- Lectura -----------------------------------------------------------
+
+    def counts(self, movie_id):
+        """(positivas, negativas) de una película"""
+        with self._lock:
+            movie = self._movies.get(movie_id)
+            return (movie[0], movie[1]) if movie else (0, 0)
+
+    def top(self, limit, exclude=()):
+        """[(movie_id, positivas)] en el orden de get_top_movies"""
+        result = []
+        with self._lock:
+            for _, _, movie_id in self._ranking:
+                if movie_id in exclude:
+                    continue
+                result.append((movie_id, self._movies[movie_id][0]))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def top_fallback(self, limit, exclude=()):
+        """[(movie_id, puntaje)] en el orden del fallback de películas populares"""
+        result = []
+        with self._lock:
+            for score, _, movie_id in self._fallback:
+                if movie_id in exclude:
+                    continue
+                result.append((movie_id, -score))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def top_window(self, window, limit, exclude=()):
+        """[(movie_id, likes en la ventana)] de mayor a menor"""
+        with self._lock:
+            self._expire(time.time())
+            counts = self._windows[window].counts
+            candidates = ((count, movie_id) for movie_id, count in counts.items()
+                          if movie_id not in exclude)
+            return [(movie_id, count) for count, movie_id in heapq.nlargest(limit, candidates)]
+
+    def _expire(self, now):
+        for window in self._windows.values():
+            window.expire(now)
+
+    # -- Reconciliación ----------------------------------------------------
+
+    def reconcile(self):
+        """Recalcula el índice desde el grafo y reaplica lo que llegó mientras tanto.
+
+        Un evento del buffer se descarta solo si la carga leyó esa pareja con
+        una escritura igual o posterior a la suya. El reloj no sirve para
+        decidirlo: el timestamp se toma antes de que la escritura se confirme
+        (o se vacíe del PreferenceStore), así que un evento anterior al corte
+        puede llegar al grafo después de la lectura. Por eso el corte se
+        adelanta RECONCILE_SLACK_MS: lo que un evento del buffer pudo escribir
+        cae después del corte y queda en loaded_at si la carga lo vio.
+        """
+        with self._lock:
+            cutoff = int(time.time() * 1000) - RECONCILE_SLACK_MS
+            self._buffer = []
+        try:
+            with Neo4jConnection() as conn:
+                fresh, loaded_at = PopularityIndex._read(conn, cutoff)
+        except Exception:
+            with self._lock:
+                self._buffer = None
+            raise
+        with self._lock:
+            for event in self._buffer:
+                user_id, movie_id, _, _, timestamp = event
+                loaded = loaded_at.get((user_id, movie_id))
+                if loaded is None or loaded < int(timestamp * 1000):
+                    fresh.apply(*event)
+            self._movies, self._ranking, self._fallback = fresh._movies, fresh._ranking, fresh._fallback
+            self._windows = fresh._windows
+            self._buffer = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "movies": len(self._movies),
+                "windows": {name: len(w.counts) for name, w in self._windows.items()},
+            }
+
+
+def _replace(ranking, old_key, new_key):
+    if old_key == new_key:
+        return
+    del ranking[bisect.bisect_left(ranking, old_key)]
+    bisect.insort(ranking, new_key)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("POPULARITY_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_popularity_index():
+    """Devuelve el índice de popularidad (cargándolo la primera vez) o None si está deshabilitado"""
+    global _index
+    if _index is None and is_enabled():
+        with _index_lock:
+            if _index is None:
+                with Neo4jConnection() as conn:
+                    _index = PopularityIndex.load(conn)
+                interval = float(os.getenv("POPULARITY_RECONCILE_INTERVAL", "3600"))
+                if interval > 0:
+                    threading.Thread(target=_reconcile_loop, args=(_index, interval),
+                                     name="popularity-reconcile", daemon=True).start()
+    return _index
+
+
+def _reconcile_loop(index, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            # Primero se vacían las escrituras diferidas para que el grafo esté al día
+            store = get_preference_store()
+            if store is not None:
+                store.flush()
+            index.reconcile()
+        except Exception as e:
+            log.error("Reconciliando índice de popularidad: %s", e)
@@ -0,0 +1,221 @@
+import os
+import time
+import threading
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import ContentGraph, get_content_graph, on_swap
+
+# Likes de todos los usuarios: aristas User - Movie del grafo de PageRank
+LIKES_QUERY = """
+MATCH (u:User)-[r:INTERACTED]->(m:Movie)
+WHERE r.weight > 0
+RETURN u.id AS user_id, m.id AS movie_id
+"""
+
+# Categorías del grafo de contenido que forman parte del grafo de PageRank
+PPR_CATEGORIES = ("genre", "actor", "director")
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+class PPRGraph:
+    """Grafo no dirigido User - Movie - Genre/Actor/Director en formato CSR.
+
+    Los nodos se numeran por bloques: primero las películas (en el mismo
+    orden que el ContentGraph), luego géneros, actores, directores y al
+    final los usuarios.
+    """
+
+    def __init__(self, content_graph, user_ids, indptr, indices):
+        self.content_graph = content_graph
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.degree = np.diff(indptr)
+        self.sources = np.repeat(np.arange(len(self.degree), dtype=np.int32), self.degree)
+        self.inverse_degree = np.divide(
+            1.0, self.degree, out=np.zeros(len(self.degree)), where=self.degree > 0)
+
+    @classmethod
+    def from_content_graph(cls, content_graph, likes):
+        """Construye el grafo a partir del catálogo en memoria y pares (user_id, movie_id)"""
+        n_movies = len(content_graph)
+        sources, targets = [], []
+        offset = n_movies
+        for category in PPR_CATEGORIES:
+            matrix = content_graph.categories[category]
+            sources.append(np.repeat(np.arange(n_movies, dtype=np.int64), np.diff(matrix.indptr)))
+            targets.append(matrix.indices.astype(np.int64) + offset)
+            offset += len(matrix.keys)
+
+        user_ids, user_index, user_rows, movie_rows = [], {}, [], []
+        for user_id, movie_id in likes:
+            movie_row = content_graph.movie_index.get(movie_id)
+            if movie_row is None:
+                continue
+            if user_id not in user_index:
+                user_index[user_id] = len(user_ids)
+                user_ids.append(user_id)
+            user_rows.append(user_index[user_id] + offset)
+            movie_rows.append(movie_row)
+        sources.append(np.asarray(user_rows, dtype=np.int64))
+        targets.append(np.asarray(movie_rows, dtype=np.int64))
+        n_nodes = offset + len(user_ids)
+
+        # Cada arista se guarda en ambos sentidos
+        src = np.concatenate(sources + targets)
+        dst = np.concatenate(targets + sources)
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(src, minlength=n_nodes))
+        return cls(content_graph, user_ids, indptr, dst[order].astype(np.int32))
+
+    @classmethod
+    def load(cls, conn, content_graph=None):
+        if content_graph is None:
+            content_graph = ContentGraph.load(conn)
+        likes = list(conn.stream(LIKES_QUERY, rows="tuple"))
+        return cls.from_content_graph(content_graph, likes)
+
+    @property
+    def n_nodes(self):
+        return len(self.degree)
+
+    def seed_vector(self, movie_ids):
+        """Distribución de reinicio uniforme sobre las películas semilla"""
+        rows = [self.content_graph.movie_index[m] for m in movie_ids
+                if m in self.content_graph.movie_index]
+        seed = np.zeros(self.n_nodes, dtype=np.float64)
+        if rows:
+            seed[rows] = 1.0 / len(rows)
+        return seed
+
+    def _spread(self, x):
+        """Un paso de la caminata aleatoria: reparte la masa de cada nodo entre sus vecinos"""
+        return np.bincount(self.indices, weights=(x * self.inverse_degree)[self.sources],
+                           minlength=self.n_nodes)
+
+    def power_iteration(self, seed, alpha=0.15, tolerance=1e-6, max_iter=50, deadline=None):
+        """PageRank personalizado exacto (hasta la tolerancia L1). Devuelve (vector, iteraciones)"""
+        dangling = self.degree == 0
+        x = seed.copy()
+        iterations = 0
+        for iterations in range(1, max_iter + 1):
+            lost = x[dangling].sum()
+            y = alpha * seed + (1 - alpha) * (self._spread(x) + lost * seed)
+            delta = np.abs(y - x).sum()
+            x = y
+            if delta < tolerance or (deadline is not None and time.perf_counter() > deadline):
+                break
+        return x, iterations
+
+    def forward_push(self, seed, alpha=0.15, epsilon=1e-6, push_budget=None, deadline=None):
+        """Aproximación por forward push con todos los nodos activos empujando a la vez.
+
+        Se detiene cuando ningún residuo supera epsilon * grado, cuando se
+        agotan push_budget aristas recorridas o al llegar al deadline.
+        Devuelve (vector, rondas).
+        """
+        estimate = np.zeros(self.n_nodes, dtype=np.float64)
+        residual = seed.copy()
+        threshold = epsilon * np.maximum(self.degree, 1)
+        pushes = 0
+        rounds = 0
+        while True:
+            frontier = np.flatnonzero(residual > threshold)
+            if not frontier.size:
+                break
+            if push_budget is not None and pushes >= push_budget:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+            mass = residual[frontier]
+            residual[frontier] = 0.0
+            estimate[frontier] += alpha * mass
+
+            counts = self.degree[frontier]
+            share = (1 - alpha) * mass * self.inverse_degree[frontier]
+            total = int(counts.sum())
+            starts = self.indptr[frontier]
+            edge_positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            residual += np.bincount(self.indices[edge_positions], weights=np.repeat(share, counts),
+                                    minlength=self.n_nodes)
+            pushes += total
+            rounds += 1
+        return estimate, rounds
+
+    def rank(self, liked_ids, seen_ids, limit, method=None, deadline_ms=None):
+        """Películas no vistas ordenadas por PageRank personalizado desde los likes"""
+        seed = self.seed_vector(liked_ids)
+        if not seed.any():
+            return [], 0
+
+        method = method or os.getenv("PPR_METHOD", "push")
+        alpha = _env_float("PPR_ALPHA", "0.15")
+        deadline_ms = deadline_ms if deadline_ms is not None else _env_float("PPR_DEADLINE_MS", "50")
+        deadline = time.perf_counter() + deadline_ms / 1000 if deadline_ms > 0 else None
+
+        if method == "power":
+            vector, iterations = self.power_iteration(
+                seed, alpha,
+                tolerance=_env_float("PPR_TOLERANCE", "1e-6"),
+                max_iter=int(os.getenv("PPR_MAX_ITER", "50")),
+                deadline=deadline)
+        else:
+            budget = os.getenv("PPR_PUSH_BUDGET")
+            vector, iterations = self.forward_push(
+                seed, alpha,
+                epsilon=_env_float("PPR_EPSILON", "1e-7"),
+                push_budget=int(budget) if budget else None,
+                deadline=deadline)
+
+        scores = vector[:len(self.content_graph)].copy()
+        scores[scores <= 0] = -np.inf
+        ranked = self.content_graph.top_k(scores, seen_ids, limit)
+        ranked = [(row, score) for row, score in ranked if np.isfinite(score)]
+        if not ranked:
+            return [], iterations
+        top = ranked[0][1]
+        movies = [self.content_graph.movie_card(row, score / top, recommendation_type="ppr")
+                  for row, score in ranked]
+        return movies, iterations
+
+
+_ppr_graph = None
+_ppr_lock = threading.Lock()
+
+
+def get_ppr_graph():
+    """Devuelve el grafo de PageRank, cargándolo la primera vez que se pide"""
+    global _ppr_graph
+    if _ppr_graph is None:
+        with _ppr_lock:
+            if _ppr_graph is None:
+                with Neo4jConnection() as conn:
+                    _ppr_graph = PPRGraph.load(conn, get_content_graph())
+    return _ppr_graph
+
+
+def is_loaded():
+    return _ppr_graph is not None
+
+
+def reload_ppr_graph():
+    global _ppr_graph
+    with Neo4jConnection() as conn:
+        graph = PPRGraph.load(conn, get_content_graph())
+    with _ppr_lock:
+        _ppr_graph = graph
+    return graph
+
+
+# Las filas del grafo de PageRank son las del grafo de contenido: con uno nuevo se reconstruye
+def _graph_swapped(content_graph):
+    if is_loaded():
+        reload_ppr_graph()
+
+
+on_swap(_graph_swapped)
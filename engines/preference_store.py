@@ -0,0 +1,616 @@
+import os
+import glob
+import json
+import time
+import atexit
+import threading
+from collections import Counter, OrderedDict
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import get_content_graph, on_swap
+from repositories.base import get_repository
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Cuánto cambia la preferencia de cada entidad de la película por cada like (+) o dislike (-)
+PREFERENCE_DELTAS = {
+    "genre": 0.15,
+    "director": 0.12,
+    "actor": 0.08,
+    "season": 0.05,
+}
+
+PREFERENCE_CATEGORIES = {
+    "USER_GENRE_PREFERENCE": "genre",
+    "USER_ACTOR_PREFERENCE": "actor",
+    "USER_DIRECTOR_PREFERENCE": "director",
+    "USER_SEASON_PREFERENCE": "season",
+}
+
+# Interacciones y preferencias de uno o varios usuarios, con la misma llave
+# que usa el grafo de contenido en memoria
+USER_PROFILE_QUERY = """
+UNWIND $user_ids AS user_id
+MATCH (u:User {id: user_id})
+OPTIONAL MATCH (u)-[r:INTERACTED]->(seen:Movie)
+WITH u, COLLECT({movie_id: seen.id, weight: r.weight}) AS interactions
+OPTIONAL MATCH (u)-[p:USER_GENRE_PREFERENCE|USER_ACTOR_PREFERENCE|USER_DIRECTOR_PREFERENCE|USER_SEASON_PREFERENCE]->(x)
+WHERE (type(p) = 'USER_GENRE_PREFERENCE' AND x:Genre)
+   OR (type(p) = 'USER_ACTOR_PREFERENCE' AND x:Actor)
+   OR (type(p) = 'USER_DIRECTOR_PREFERENCE' AND x:Director)
+   OR type(p) = 'USER_SEASON_PREFERENCE'
+RETURN u.id AS user_id, interactions, COLLECT({
+    rel: type(p),
+    key: CASE type(p)
+        WHEN 'USER_GENRE_PREFERENCE' THEN x.name
+        WHEN 'USER_SEASON_PREFERENCE' THEN coalesce(x.name, x.nombre)
+        ELSE coalesce(x.id, x.name)
+    END,
+    weight: p.peso
+}) AS prefs
+"""
+
+
+def _preference_update_clauses(carry):
+    """Cláusulas que suman delta * paso a las preferencias del usuario por cada
+    entidad de la película. `carry` son las variables que se conservan entre
+    bloques y debe incluir u, m y delta."""
+    return f"""
+    // Procesar géneros (si existen)
+    OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+    WITH {carry}, COLLECT(DISTINCT g) AS genres
+    FOREACH (genre IN CASE WHEN delta <> 0 THEN genres ELSE [] END |
+        MERGE (u)-[ug:USER_GENRE_PREFERENCE]->(genre)
+        SET ug.peso = coalesce(ug.peso, 0) + (delta * {PREFERENCE_DELTAS['genre']})
+    )
+
+    WITH {carry}
+
+    // Procesar directores (si existen)
+    OPTIONAL MATCH (m)-[:DIRECTED_BY]->(d:Director)
+    WITH {carry}, COLLECT(DISTINCT d) AS directors
+    FOREACH (director IN CASE WHEN delta <> 0 THEN directors ELSE [] END |
+        MERGE (u)-[ud:USER_DIRECTOR_PREFERENCE]->(director)
+        SET ud.peso = coalesce(ud.peso, 0) + (delta * {PREFERENCE_DELTAS['director']})
+    )
+
+    WITH {carry}
+
+    // Procesar actores (si existen)
+    OPTIONAL MATCH (m)-[:HAS_ACTOR]->(a:Actor)
+    WITH {carry}, COLLECT(DISTINCT a) AS actors
+    FOREACH (actor IN CASE WHEN delta <> 0 THEN actors ELSE [] END |
+        MERGE (u)-[ua:USER_ACTOR_PREFERENCE]->(actor)
+        SET ua.peso = coalesce(ua.peso, 0) + (delta * {PREFERENCE_DELTAS['actor']})
+    )
+
+    WITH {carry}
+
+    // Procesar temporadas/contextos (si existen)
+    OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(s)
+    WHERE s:Season OR s:Contexto
+    WITH {carry}, COLLECT(DISTINCT s) AS seasons
+    FOREACH (season IN CASE WHEN delta <> 0 THEN seasons ELSE [] END |
+        MERGE (u)-[us:USER_SEASON_PREFERENCE]->(season)
+        SET us.peso = coalesce(us.peso, 0) + (delta * {PREFERENCE_DELTAS['season']})
+    )
+"""
+
+
+# Página de ids de usuarios ordenada por id, para recorrer todos los User por bloques
+USER_IDS_PAGE_QUERY = """
+MATCH (u:User)
+WHERE $after IS NULL OR u.id > $after
+RETURN u.id AS user_id
+ORDER BY u.id
+LIMIT $page_size
+"""
+
+# Escritura idempotente de interacciones: el delta de preferencias se calcula
+# contra el peso anterior de INTERACTED, así que repetir un like no suma dos
+# veces y pasar de like a dislike resta el doble. Un evento más viejo que la
+# interacción guardada (un journal reaplicado tarde, otro worker que ya
+# escribió uno más nuevo) no cambia nada y vuelve con status 'stale'. Cada
+# evento corre en su propio CALL para que los eventos de un lote se apliquen
+# en orden.
+INTERACTION_WRITE_QUERY = """
+UNWIND $events AS e
+CALL {
+    WITH e
+    MATCH (u:User {id: e.user_id}), (m:Movie {id: e.movie_id})
+    MERGE (u)-[r:INTERACTED]->(m)
+    WITH u, m, r, e, coalesce(r.weight, 0) AS previous, datetime({epochMillis: e.timestamp}) AS ts
+    WITH u, m, r, e, previous, ts, r.timestamp IS NULL OR r.timestamp <= ts AS current
+    FOREACH (_ IN CASE WHEN current THEN [1] ELSE [] END |
+        SET r.type = e.type,
+            r.weight = e.weight,
+            r.timestamp = ts
+    )
+
+    WITH u, m, e, previous, current, CASE WHEN current THEN e.weight - previous ELSE 0 END AS delta
+""" + _preference_update_clauses("u, m, e, previous, current, delta") + """
+    WITH u, m, e, previous, current
+
+    // Retornar información básica
+    RETURN {
+        user: {id: u.id, name: u.name, email: u.email},
+        movie: {id: m.id, title: m.title},
+        interaction: {type: e.type, weight: e.weight, previous_weight: previous},
+        status: CASE WHEN current THEN 'success' ELSE 'stale' END
+    } AS result
+}
+RETURN result
+"""
+
+# Borra y recalcula desde INTERACTED los USER_*_PREFERENCE de un grupo de usuarios
+REBUILD_PREFERENCES_QUERY = """
+MATCH (u:User)
+WHERE u.id IN $user_ids
+CALL {
+    WITH u
+    MATCH (u)-[p:USER_GENRE_PREFERENCE|USER_ACTOR_PREFERENCE|USER_DIRECTOR_PREFERENCE|USER_SEASON_PREFERENCE]->()
+    DELETE p
+}
+WITH u
+MATCH (u)-[r:INTERACTED]->(m:Movie)
+CALL {
+    WITH u, m, r
+    WITH u, m, coalesce(r.weight, 0) AS delta
+""" + _preference_update_clauses("u, m, delta") + """
+}
+RETURN count(DISTINCT u) AS users
+"""
+
+
+def interaction_event(user_id, movie_id, interaction_type, weight, timestamp=None):
+    """Evento de interacción con el formato que espera INTERACTION_WRITE_QUERY"""
+    return {
+        "user_id": user_id,
+        "movie_id": movie_id,
+        "type": interaction_type,
+        "weight": weight,
+        "timestamp": int((timestamp or time.time()) * 1000),
+    }
+
+
+class UserProfile:
+    """Interacciones {movie_id: peso} y preferencias {categoría: {llave: peso}} de un usuario"""
+
+    __slots__ = ("interactions", "preferences")
+
+    def __init__(self, interactions=None, preferences=None):
+        self.interactions = interactions or {}
+        self.preferences = preferences or {category: {} for category in PREFERENCE_DELTAS}
+
+    @property
+    def seen(self):
+        return set(self.interactions)
+
+    @property
+    def liked(self):
+        return [movie_id for movie_id, weight in self.interactions.items() if weight > 0]
+
+    def copy(self):
+        return UserProfile(dict(self.interactions),
+                           {c: dict(p) for c, p in self.preferences.items()})
+
+
+def load_profiles(conn, user_ids):
+    """Lee de Neo4j los perfiles de varios usuarios: {user_id: UserProfile}"""
+    return profiles_from_rows(conn.query(USER_PROFILE_QUERY, {"user_ids": list(user_ids)}))
+
+
+async def load_profiles_async(conn, user_ids):
+    """load_profiles con una AsyncNeo4jConnection"""
+    return profiles_from_rows(await conn.query(USER_PROFILE_QUERY, {"user_ids": list(user_ids)}))
+
+
+def profiles_from_rows(rows):
+    """Filas de USER_PROFILE_QUERY -> {user_id: UserProfile}"""
+    profiles = {}
+    for row in rows:
+        profile = UserProfile()
+        for interaction in row['interactions']:
+            if interaction['movie_id'] is not None:
+                profile.interactions[interaction['movie_id']] = interaction['weight'] or 0
+        for pref in row['prefs']:
+            category = PREFERENCE_CATEGORIES.get(pref['rel'])
+            if category and pref['key'] is not None:
+                profile.preferences[category][pref['key']] = pref['weight']
+        profiles[row['user_id']] = profile
+    return profiles
+
+
+def write_interactions(conn, events):
+    """Aplica eventos en el grafo; si hay varios de la misma pareja solo cuenta el último.
+
+    Con una AsyncNeo4jConnection devuelve la consulta pendiente (hay que esperarla).
+    """
+    latest = {}
+    for event in events:
+        latest[(event["user_id"], event["movie_id"])] = event
+    return conn.query(INTERACTION_WRITE_QUERY, {"events": list(latest.values())})
+
+
+class PreferenceStore:
+    """Vectores de preferencia por usuario mantenidos en memoria.
+
+    Los perfiles se leen del grafo la primera vez que se necesitan y después
+    se actualizan de forma incremental con cada interacción. Se guardan en
+    un LRU de max_profiles entradas y se vuelven a leer del grafo después de
+    profile_ttl segundos, para ver lo que escribieron otros workers; un
+    perfil con escrituras pendientes no expira ni se desaloja. La escritura
+    en Neo4j es diferida: cada evento se agrega y se sincroniza (fsync) a un
+    journal antes de responder, y un hilo lo aplica al grafo por lotes;
+    después de cada lote el journal se reescribe con lo que falta. Al
+    arrancar se reaplican los journals que otros procesos dejaron sin vaciar.
+    """
+
+    def __init__(self, content_graph, journal_dir, flush_interval=1.0, batch_size=500,
+                 max_profiles=100_000, profile_ttl=60.0):
+        self.content_graph = content_graph
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_profiles = max_profiles
+        self.profile_ttl = profile_ttl
+        # user_id -> (momento de carga, UserProfile), del menos al más usado
+        self._profiles = OrderedDict()
+        self._pending_users = Counter()
+        self.evictions = 0
+        self.expirations = 0
+        self._pending = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopped = False
+
+        os.makedirs(journal_dir, exist_ok=True)
+        recover_journals(journal_dir)
+        self.journal_path = os.path.join(journal_dir, f"preferences-{os.getpid()}.jsonl")
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_loop, name="preference-flusher",
+                                         daemon=True)
+        self._flusher.start()
+
+    # -- Lectura -----------------------------------------------------------
+
+    def get_profile(self, user_id):
+        """Perfil del usuario (se carga del grafo si no está o expiró) o None si no existe"""
+        with self._lock:
+            profile = self._cached(user_id)
+        if profile is not None:
+            return profile
+        loaded = get_repository().user_profiles([user_id]).get(user_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            # Otro hilo pudo cargarlo (o registrar una interacción) mientras tanto
+            return self._cached(user_id) or self._insert(user_id, loaded)
+
+    def peek(self, user_id):
+        """Copia del perfil solo si ya está en memoria y vigente (no consulta el grafo)"""
+        with self._lock:
+            profile = self._cached(user_id)
+            return profile.copy() if profile is not None else None
+
+    def _cached(self, user_id):
+        entry = self._profiles.get(user_id)
+        if entry is None:
+            return None
+        loaded_at, profile = entry
+        if time.monotonic() - loaded_at > self.profile_ttl and not self._pending_users[user_id]:
+            del self._profiles[user_id]
+            self.expirations += 1
+            return None
+        self._profiles.move_to_end(user_id)
+        return profile
+
+    def _insert(self, user_id, profile):
+        self._profiles[user_id] = (time.monotonic(), profile)
+        # Los perfiles con escrituras pendientes pasan al final en lugar de desalojarse
+        kept = 0
+        while len(self._profiles) > self.max_profiles and kept < len(self._profiles):
+            oldest, entry = self._profiles.popitem(last=False)
+            if self._pending_users[oldest]:
+                self._profiles[oldest] = entry
+                kept += 1
+            else:
+                self.evictions += 1
+        return profile
+
+    def snapshot(self, user_id):
+        """Copia del perfil para leerlo sin bloquear las actualizaciones"""
+        profile = self.get_profile(user_id)
+        if profile is None:
+            return None
+        with self._lock:
+            return profile.copy()
+
+    # -- Escritura ---------------------------------------------------------
+
+    def record(self, user_id, movie_id, interaction_type, weight, timestamp=None):
+        """Registra una interacción: journal durable, vector en memoria y cola hacia el grafo.
+
+        Devuelve el peso anterior de la interacción (0 si es nueva).
+        """
+        profile = self.get_profile(user_id)
+        if profile is None:
+            raise ValueError(f"Usuario {user_id} no existe. Debe iniciar sesión correctamente.")
+
+        event = interaction_event(user_id, movie_id, interaction_type, weight, timestamp)
+        with self._lock:
+            self._journal.write(json.dumps(event) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+            # Si el perfil se desalojó desde get_profile, el que se actualiza es el que queda en memoria
+            profile = self._cached(user_id) or self._insert(user_id, profile)
+            previous = profile.interactions.get(movie_id, 0)
+            profile.interactions[movie_id] = weight
+            self._apply_delta(profile, movie_id, weight - previous)
+
+            self._pending.append(event)
+            self._pending_users[user_id] += 1
+            self._wakeup.notify()
+        return previous
+
+    def rebind(self, content_graph):
+        """Usa otro grafo de contenido para los eventos que lleguen desde ahora"""
+        with self._lock:
+            self.content_graph = content_graph
+
+    def _apply_delta(self, profile, movie_id, delta):
+        if not delta:
+            return
+        row = self.content_graph.movie_index.get(movie_id)
+        if row is None:
+            return
+        for category, step in PREFERENCE_DELTAS.items():
+            matrix = self.content_graph.categories[category]
+            prefs = profile.preferences[category]
+            for col in matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]:
+                key = matrix.keys[col]
+                prefs[key] = (prefs.get(key) or 0) + delta * step
+
+    # -- Vaciado hacia Neo4j -----------------------------------------------
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                if not self._pending and not self._stopped:
+                    self._wakeup.wait(self.flush_interval)
+                if self._stopped and not self._pending:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Vaciando preferencias al grafo: %s", e)
+                time.sleep(self.flush_interval)
+
+    def flush(self):
+        """Escribe en Neo4j los eventos pendientes; tras cada lote el journal queda solo con lo que falta"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                if not batch:
+                    return
+                get_repository().write_interactions(batch)
+                with self._lock:
+                    del self._pending[:len(batch)]
+                    for event in batch:
+                        self._pending_users[event["user_id"]] -= 1
+                        if not self._pending_users[event["user_id"]]:
+                            del self._pending_users[event["user_id"]]
+                    self._compact_journal()
+
+    def _compact_journal(self):
+        """Reescribe el journal con los eventos pendientes (se llama con el candado tomado).
+
+        Si el proceso muere justo antes del reemplazo, el journal viejo se
+        reaplica entero; los eventos ya escritos vuelven como 'stale' o sin
+        cambio de peso, así que no se cuentan dos veces.
+        """
+        if not self._pending:
+            self._journal.truncate(0)
+            return
+        compacted = self.journal_path + ".tmp"
+        with open(compacted, "w", encoding="utf-8") as journal:
+            for event in self._pending:
+                journal.write(json.dumps(event) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        self._journal.close()
+        os.replace(compacted, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def close(self):
+        """Detiene el hilo de vaciado después de escribir todo lo pendiente"""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        self._flusher.join(timeout=30)
+        self._journal.close()
+        with self._lock:
+            if not self._pending:
+                os.remove(self.journal_path)
+
+    # -- Recuperación ------------------------------------------------------
+
+    def rebuild(self, user_ids=None):
+        """Descarta los perfiles en memoria para que se vuelvan a leer del grafo"""
+        self.flush()
+        with self._lock:
+            if user_ids is None:
+                self._profiles.clear()
+            else:
+                for user_id in user_ids:
+                    self._profiles.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"profiles": len(self._profiles), "max_profiles": self.max_profiles,
+                    "profile_ttl": self.profile_ttl, "evictions": self.evictions,
+                    "expirations": self.expirations, "pending_writes": len(self._pending)}
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_journals(journal_dir):
+    """Reaplica en el grafo los journals de procesos que ya no están vivos.
+
+    Cada journal se reclama antes renombrándolo a RUTA.recovering.<pid>: si
+    varios workers arrancan juntos solo uno lo aplica. Un reclamo cuyo dueño
+    murió a mitad de camino se vuelve a reclamar. Devuelve [(ruta, eventos aplicados)].
+    """
+    recovered = []
+    for path in sorted(glob.glob(os.path.join(journal_dir, "preferences-*.jsonl"))):
+        if not _dead_owner(path, "preferences-", ".jsonl"):
+            continue
+        claimed = _claim(path, path)
+        if claimed is None:
+            continue
+        recovered.append((path, replay_journal(claimed)))
+        # Una compactación que no alcanzó a reemplazar el journal
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+    for stale in sorted(glob.glob(os.path.join(journal_dir, "preferences-*.jsonl.recovering.*"))):
+        path, _, _ = stale.rpartition(".recovering.")
+        if not _dead_owner(stale, ".recovering.", ""):
+            continue
+        claimed = _claim(stale, path)
+        if claimed is not None:
+            recovered.append((path, replay_journal(claimed)))
+    return recovered
+
+
+def _dead_owner(path, prefix, suffix):
+    """True si el pid que nombra el archivo (entre prefix y suffix) no es este proceso ni uno vivo"""
+    name = os.path.basename(path)
+    pid = name[name.rindex(prefix) + len(prefix):len(name) - len(suffix)]
+    return not (pid.isdigit() and (int(pid) == os.getpid() or _process_alive(int(pid))))
+
+
+def _claim(path, journal_path):
+    """Renombra path a journal_path.recovering.<pid> de forma atómica; None si otro lo reclamó antes"""
+    claimed = f"{journal_path}.recovering.{os.getpid()}"
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def replay_journal(path, batch_size=500):
+    """Aplica un journal completo en el grafo y lo elimina.
+
+    Los eventos más viejos que la interacción guardada se descartan (ver
+    INTERACTION_WRITE_QUERY). La última línea puede haber quedado a medias
+    si el proceso murió escribiéndola: se descarta. Devuelve los eventos aplicados.
+    """
+    with open(path, encoding="utf-8") as journal:
+        lines = [line for line in journal if line.strip()]
+    events = []
+    for number, line in enumerate(lines, 1):
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            if number < len(lines):
+                raise
+            log.error("Journal %s: la última línea quedó incompleta y se descarta: %r", path, line[:200])
+    applied = 0
+    repository = get_repository()
+    for start in range(0, len(events), batch_size):
+        result = repository.write_interactions(events[start:start + batch_size])
+        applied += sum(1 for row in result if row['result']['status'] == 'success')
+    if applied < len(events):
+        log.info("Journal %s: %d de %d eventos ya estaban en el grafo o eran viejos",
+                 path, len(events) - applied, len(events))
+    os.remove(path)
+    return applied
+
+
+def rebuild_preferences(user_ids=None, page_size=500):
+    """Recalcula en el grafo los USER_*_PREFERENCE a partir de las interacciones.
+
+    Sirve para reparar preferencias desfasadas (p. ej. likes repetidos que se
+    sumaron dos veces). Sin user_ids recorre todos los usuarios por páginas.
+    Devuelve el número de usuarios reconstruidos.
+    """
+    rebuilt = 0
+    with Neo4jConnection() as conn:
+        if user_ids is not None:
+            pages = [list(user_ids)]
+        else:
+            pages = iter_user_id_pages(conn, page_size)
+        for page in pages:
+            conn.query(REBUILD_PREFERENCES_QUERY, {"user_ids": page})
+            rebuilt += len(page)
+    return rebuilt
+
+
+def iter_user_id_pages(conn, page_size=1000):
+    """Recorre los ids de todos los User en páginas ordenadas por id"""
+    after = None
+    while True:
+        page = [row['user_id'] for row in conn.query(
+            USER_IDS_PAGE_QUERY, {"after": after, "page_size": page_size})]
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("PREFERENCE_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_preference_store():
+    """Devuelve el almacén de preferencias o None si está deshabilitado.
+
+    Necesita el grafo de contenido en memoria para conocer las entidades de
+    cada película.
+    """
+    global _store
+    if _store is None and is_enabled():
+        content_graph = get_content_graph()
+        if content_graph is None:
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = PreferenceStore(
+                    content_graph,
+                    journal_dir=os.getenv("PREFERENCE_JOURNAL_DIR", "preference_journal"),
+                    flush_interval=float(os.getenv("PREFERENCE_FLUSH_INTERVAL", "1.0")),
+                    max_profiles=int(os.getenv("PREFERENCE_PROFILE_CACHE_SIZE", "100000")),
+                    profile_ttl=float(os.getenv("PREFERENCE_PROFILE_TTL", "60")),
+                )
+                atexit.register(_store.close)
+    return _store
+
+
+def is_loaded():
+    return _store is not None
+
+
+# Las entidades de cada película se leen del grafo: los eventos nuevos deben usar el actual
+def _graph_swapped(content_graph):
+    if _store is not None:
+        _store.rebind(content_graph)
+
+
+on_swap(_graph_swapped)
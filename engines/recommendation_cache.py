@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """Caché LRU con TTL de recomendaciones por (usuario, algoritmo).
+
+    Cada entrada guarda el top-K calculado con max_limit; cualquier limit
+    menor o igual se sirve como un slice de la misma lista.
+
+    Quien calcula toma generation() antes de leer el grafo y se la pasa a
+    put: si mientras tanto el usuario se invalidó (o se vació todo con
+    clear), el resultado ya es viejo y no se guarda. Se recuerda el momento
+    de cada invalidación solo durante ttl_seconds; un cálculo que tardó más
+    que eso tampoco se guarda, así que la memoria no crece con los usuarios.
+
+    La caché es de cada proceso: un like atendido por otro worker no la
+    invalida aquí, y la entrada sigue hasta su TTL (corto por eso).
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=30, max_limit=50):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_limit = max_limit
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        # user_id -> momento (monotónico) de su última invalidación, de la más vieja a la más nueva
+        self._invalidated_at = OrderedDict()
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("RECOMMENDATION_CACHE_TTL", "30")),
+            max_limit=int(os.getenv("RECOMMENDATION_CACHE_MAX_LIMIT", "50")),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def can_serve(self, limit):
+        return self.enabled and limit <= self.max_limit
+
+    def get(self, user_id, algo, limit):
+        """Devuelve las primeras `limit` recomendaciones o None si no hay entrada válida"""
+        key = (user_id, algo)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, movies = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return movies[:limit]
+
+    def generation(self, user_id):
+        """Generación actual del usuario; se toma antes de calcular y se pasa a put"""
+        with self._lock:
+            return self._epoch, time.monotonic()
+
+    def _is_stale(self, user_id, generation):
+        epoch, started = generation
+        if epoch != self._epoch or started < time.monotonic() - self.ttl_seconds:
+            return True
+        invalidated_at = self._invalidated_at.get(user_id)
+        return invalidated_at is not None and invalidated_at >= started
+
+    def put(self, user_id, algo, movies, generation=None):
+        """Guarda el top-K salvo que el usuario se haya invalidado después de `generation`"""
+        key = (user_id, algo)
+        with self._lock:
+            if generation is not None and self._is_stale(user_id, generation):
+                self.stale_puts += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(movies))
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Elimina todas las entradas de un usuario (p. ej. tras un like/dislike)"""
+        with self._lock:
+            now = time.monotonic()
+            self._invalidated_at[user_id] = now
+            self._invalidated_at.move_to_end(user_id)
+            # Pasado el TTL ningún cálculo anterior a la invalidación se guarda (ver _is_stale)
+            while self._invalidated_at:
+                oldest_user, invalidated_at = next(iter(self._invalidated_at.items()))
+                if invalidated_at >= now - self.ttl_seconds:
+                    break
+                del self._invalidated_at[oldest_user]
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            # Los cálculos en curso se hicieron con el catálogo anterior
+            self._epoch += 1
+            self._invalidated_at.clear()
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_limit": self.max_limit,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+                "tracked_invalidations": len(self._invalidated_at),
+            }
+
+
+recommendation_cache = RecommendationCache.from_env()
@@ -0,0 +1,261 @@
+import os
+import math
+import hashlib
+import threading
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import CATEGORY_WEIGHTS
+
+# Aristas Movie -> entidad con su peso; HAS_GENRE y DIRECTED_BY traen `peso`, las demás valen 1
+FEATURE_QUERIES = {
+    "genre": """
+        MATCH (m:Movie)-[r:HAS_GENRE]->(g:Genre)
+        RETURN m.id AS movie_id, g.name AS key, coalesce(r.peso, 1.0) AS weight
+    """,
+    "actor": """
+        MATCH (m:Movie)-[:HAS_ACTOR]->(a:Actor)
+        RETURN m.id AS movie_id, coalesce(a.id, a.name) AS key, 1.0 AS weight
+    """,
+    "director": """
+        MATCH (m:Movie)-[r:DIRECTED_BY]->(d:Director)
+        RETURN m.id AS movie_id, coalesce(d.id, d.name) AS key, coalesce(r.peso, 1.0) AS weight
+    """,
+    "season": """
+        MATCH (m:Movie)-[:APPROPIATE_FOR_SEASON]->(s)
+        RETURN m.id AS movie_id, coalesce(s.name, s.nombre) AS key, 1.0 AS weight
+    """,
+}
+
+# Catálogos más chicos que esto se recorren completos (una sola lista) salvo que se fije nlist
+EXHAUSTIVE_BELOW = 20000
+
+
+def _hashed(category, key, dim):
+    """(columna, signo) estables entre procesos para la entidad `key` de `category`"""
+    digest = hashlib.blake2b(f"{category}:{key}".encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value // dim) & 1 else -1.0
+
+
+def embed(movie_ids, features, dim=128):
+    """Matriz películas x dim (float32, filas de norma 1) por feature hashing.
+
+    features: {categoría: [(movie_id, llave, peso)]}. Cada entidad suma
+    peso de la categoría x peso de la arista x idf en una columna con signo,
+    así que el producto punto de dos filas aproxima el coseno entre los
+    conjuntos ponderados de géneros, actores, directores y temporadas.
+    """
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    vectors = np.zeros((len(movie_ids), dim), dtype=np.float32)
+    n_movies = max(len(movie_ids), 1)
+    for category, edges in features.items():
+        category_weight = CATEGORY_WEIGHTS.get(category, 0.0)
+        rows, keys, weights = [], [], []
+        for movie_id, key, weight in edges:
+            row = movie_index.get(movie_id)
+            if row is None or key is None:
+                continue
+            rows.append(row)
+            keys.append(key)
+            weights.append(weight if weight is not None else 1.0)
+        frequency = {}
+        for key in keys:
+            frequency[key] = frequency.get(key, 0) + 1
+        slots = {key: _hashed(category, key, dim) for key in frequency}
+        for row, key, weight in zip(rows, keys, weights):
+            col, sign = slots[key]
+            vectors[row, col] += sign * category_weight * weight * math.log(1 + n_movies / frequency[key])
+    norms = np.linalg.norm(vectors, axis=1)
+    np.divide(vectors, norms[:, None], out=vectors, where=norms[:, None] > 0)
+    return vectors
+
+
+class SimilarIndex:
+    """Películas parecidas con un índice IVF sobre los embeddings.
+
+    Un k-means esférico (sobre una muestra) reparte las películas en
+    `nlist` listas; cada película va a la lista del centroide con mayor
+    coseno. La consulta compara el vector solo contra las películas de las
+    `nprobe` listas más cercanas y las reordena con el coseno exacto, en
+    lugar de recorrer todo el catálogo. Las listas se guardan como CSR
+    (ids ordenados por lista + offsets).
+    """
+
+    def __init__(self, movie_ids, vectors, centroids, list_offsets, list_rows, nprobe=16):
+        self.movie_ids = list(movie_ids)
+        self.movie_index = {movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    @classmethod
+    def build(cls, movie_ids, vectors, nlist=None, nprobe=16, iterations=10, sample=20000, seed=7):
+        # Las películas sin entidades (vector nulo) no se parecen a nada: no se indexan
+        indexed = np.flatnonzero(np.any(vectors != 0, axis=1)).astype(np.int32)
+        if nlist is None:
+            # Con pocas películas recorrerlas todas cuesta menos de un milisegundo: una sola lista
+            nlist = int(math.sqrt(len(indexed))) if len(indexed) >= EXHAUSTIVE_BELOW else 1
+        nlist = max(1, min(nlist, len(indexed)))
+        centroids = cls._train(vectors[indexed], nlist, iterations, sample, seed)
+        nlist = len(centroids)
+        assignment = np.empty(len(indexed), dtype=np.int32)
+        for start in range(0, len(indexed), 20000):
+            chunk = vectors[indexed[start:start + 20000]]
+            assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(assignment, minlength=nlist))
+        return cls(movie_ids, vectors, centroids, list_offsets, indexed[order], nprobe)
+
+    @staticmethod
+    def _train(vectors, nlist, iterations, sample, seed):
+        """Centroides de norma 1 por k-means esférico sobre una muestra de filas"""
+        rng = np.random.default_rng(seed)
+        if not len(vectors):
+            return np.zeros((nlist, vectors.shape[1]), dtype=np.float32)
+        points = vectors[rng.choice(len(vectors), min(sample, len(vectors)), replace=False)]
+        centroids = points[rng.choice(len(points), min(nlist, len(points)), replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, points)
+            norms = np.linalg.norm(sums, axis=1)
+            # Un centroide sin puntos conserva su posición anterior
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        return centroids
+
+    @classmethod
+    def load(cls, conn, dim=128, **options):
+        movie_ids = [movie_id for movie_id, in conn.stream("MATCH (m:Movie) RETURN m.id AS id", rows="tuple")]
+        features = {category: list(conn.stream(query, rows="tuple"))
+                    for category, query in FEATURE_QUERIES.items()}
+        return cls.build(movie_ids, embed(movie_ids, features, dim), **options)
+
+    def save(self, path):
+        """Guarda el índice en un .npz; se escribe aparte y se renombra para no dejarlo a medias"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Un temporal por proceso: varios workers pueden construirlo a la vez al arrancar
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, movie_ids=np.array(self.movie_ids, dtype=str), vectors=self.vectors,
+                 centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows,
+                 nprobe=self.nprobe)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_file(cls, path):
+        with np.load(path) as data:
+            return cls(data["movie_ids"].tolist(), data["vectors"], data["centroids"],
+                       data["list_offsets"], data["list_rows"], int(data["nprobe"]))
+
+    def candidates(self, vector, nprobe=None):
+        """Filas de las `nprobe` listas cuyo centroide está más cerca de `vector`"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        closest = np.argpartition(-(self.centroids @ vector), nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]]
+                               for c in closest])
+
+    def similar(self, movie_id, limit=10, nprobe=None):
+        """[(movie_id, coseno)] de las películas más parecidas (sin la propia); None si no existe"""
+        row = self.movie_index.get(movie_id)
+        if row is None:
+            return None
+        if len(self.centroids) == 1:
+            return self.exact(movie_id, limit)
+        vector = self.vectors[row]
+        rows = self.candidates(vector, nprobe)
+        rows = rows[rows != row]
+        if not len(rows):
+            return []
+        scores = self.vectors[rows] @ vector
+        return self._top(rows, scores, limit)
+
+    def exact(self, movie_id, limit=10):
+        """Lo mismo que similar() recorriendo todas las películas (referencia para el benchmark)"""
+        row = self.movie_index.get(movie_id)
+        if row is None:
+            return None
+        scores = self.vectors @ self.vectors[row]
+        scores[row] = 0.0
+        return self._top(np.arange(len(scores)), scores, limit)
+
+    def _top(self, rows, scores, limit):
+        keep = scores > 0
+        rows, scores = rows[keep], scores[keep]
+        if not len(rows):
+            return []
+        k = min(limit, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((rows[top], -scores[top]))]
+        return [(self.movie_ids[rows[i]], float(scores[i])) for i in top]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_options():
+    return {
+        "dim": int(os.getenv("SIMILAR_INDEX_DIM", "128")),
+        "nlist": int(os.getenv("SIMILAR_INDEX_LISTS", "0")) or None,
+        "nprobe": int(os.getenv("SIMILAR_INDEX_PROBES", "16")),
+    }
+
+
+def index_path():
+    return os.getenv("SIMILAR_INDEX_PATH", os.path.join("data", "similar_index.npz"))
+
+
+def build_on_start():
+    return os.getenv("SIMILAR_INDEX_BUILD_ON_START", "true").lower() in ("1", "true", "yes")
+
+
+def build_similar_index(path=None):
+    """Construye el índice desde Neo4j y lo guarda en `path` (si se indica)"""
+    with Neo4jConnection() as conn:
+        index = SimilarIndex.load(conn, **build_options())
+    if path:
+        index.save(path)
+    return index
+
+
+def get_similar_index():
+    """Devuelve el índice de películas parecidas o None si todavía no se cargó"""
+    return _index
+
+
+def is_loaded():
+    return _index is not None
+
+
+def load_similar_index():
+    """Lee el índice de SIMILAR_INDEX_PATH; si no existe lo construye desde Neo4j (solo al arrancar)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = index_path()
+                if path and os.path.exists(path):
+                    _index = SimilarIndex.load_file(path)
+                elif build_on_start():
+                    _index = build_similar_index(path)
+    return _index
+
+
+def reload_similar_index(rebuild=True):
+    """Reconstruye el índice (por ejemplo tras cargar películas nuevas) y lo reemplaza.
+    Sin rebuild lee el archivo que dejó otro worker, si existe"""
+    global _index
+    path = index_path()
+    if not rebuild and path and os.path.exists(path):
+        index = SimilarIndex.load_file(path)
+    else:
+        index = build_similar_index(path)
+    with _index_lock:
+        _index = index
+    return index
@@ -0,0 +1,204 @@
+"""Snapshots en disco de estructuras de solo lectura, pensados para mmap.
+
+Formato de un archivo:
+
+    MAGIC (8 bytes) | versión (uint32) | reservado (uint32) | largo del encabezado (uint64)
+    encabezado JSON {"meta": {...}, "arrays": {nombre: {dtype, shape, offset}}}
+    buffers NumPy crudos, cada uno alineado a 64 bytes
+
+Los workers abren el archivo con mmap de solo lectura: los arrays son
+vistas sobre el mapeo, así que las páginas viven una sola vez en la caché
+de páginas del sistema y las comparten todos los procesos. Las listas de
+textos (ids, títulos, nombres) se guardan como StringTable, que también
+resuelve texto -> posición sin construir un dict en cada proceso.
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+import numpy as np
+
+SNAPSHOT_MAGIC = b"MRSNAP\x00\x01"
+SNAPSHOT_VERSION = 1
+_PREFIX = struct.Struct("<8sIIQ")
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_snapshot(path, arrays, meta=None):
+    """Escribe {nombre: ndarray} en `path` de forma atómica (archivo temporal + rename)"""
+    layout, offset = {}, 0
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"meta": meta or {}, "arrays": layout}).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    # Un worker que ya tiene abierto el archivo anterior sigue leyendo su mapeo intacto
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Snapshot abierto con mmap: .arrays son vistas de solo lectura, .meta el encabezado"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        self.path = path
+        self.identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+        magic, version, _, header_len = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} no es un snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Versión de snapshot {version} no soportada (se esperaba {SNAPSHOT_VERSION})")
+        header = json.loads(bytes(self._mmap[_PREFIX.size:_PREFIX.size + header_len]))
+        self.version = version
+        self.meta = header["meta"]
+        data_start = _aligned(_PREFIX.size + header_len)
+        self.arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count,
+                                              offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+    def strings(self, prefix):
+        return StringTable.from_arrays(self.arrays, prefix)
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StringTable:
+    """Lista inmutable de textos (o None) sobre buffers planos, con búsqueda texto -> posición.
+
+    blob tiene los textos UTF-8 concatenados y offsets[i]:offsets[i+1] es el
+    i-ésimo. Para buscar se guarda el hash de 64 bits de cada texto ordenado
+    (hashes) junto con su posición (order): un searchsorted más una
+    comparación del texto. Las llaves se comparan como str().
+    """
+
+    def __init__(self, offsets, blob, nulls, hashes, order):
+        self.offsets = offsets
+        self.blob = blob
+        self.nulls = nulls
+        self.hashes = hashes
+        self.order = order
+
+    @classmethod
+    def from_strings(cls, values):
+        encoded = [None if value is None else str(value).encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) if value is not None else 0 for value in encoded])
+        blob = np.frombuffer(b"".join(value for value in encoded if value is not None), dtype=np.uint8)
+        nulls = np.array([value is None for value in encoded], dtype=bool)
+        hashes = np.array([_hash(value.decode("utf-8")) if value is not None else 0 for value in encoded],
+                          dtype=np.uint64)
+        present = np.flatnonzero(~nulls)
+        order = present[np.argsort(hashes[present], kind="stable")]
+        return cls(offsets, blob, nulls, hashes[order], order.astype(np.int64))
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(*(arrays[f"{prefix}.{part}"] for part in ("offsets", "blob", "nulls", "hashes", "order")))
+
+    def to_arrays(self, prefix):
+        return {f"{prefix}.offsets": self.offsets, f"{prefix}.blob": self.blob,
+                f"{prefix}.nulls": self.nulls, f"{prefix}.hashes": self.hashes,
+                f"{prefix}.order": self.order}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if self.nulls[i]:
+            return None
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def position(self, value):
+        """Posición de `value` o None"""
+        if value is None:
+            return None
+        text = str(value)
+        target = np.uint64(_hash(text))
+        lo = int(np.searchsorted(self.hashes, target, side="left"))
+        while lo < len(self.hashes) and self.hashes[lo] == target:
+            i = int(self.order[lo])
+            if self[i] == text:
+                return i
+            lo += 1
+        return None
+
+    def index(self):
+        return StringIndex(self)
+
+
+class StringIndex:
+    """Vista tipo dict {texto: posición} sobre una StringTable (get, in, [])"""
+
+    def __init__(self, table):
+        self._table = table
+
+    def get(self, key, default=None):
+        position = self._table.position(key)
+        return default if position is None else position
+
+    def __contains__(self, key):
+        return self._table.position(key) is not None
+
+    def __getitem__(self, key):
+        position = self._table.position(key)
+        if position is None:
+            raise KeyError(key)
+        return position
+
+    def __len__(self):
+        return len(self._table)
+
+
+class IntColumn:
+    """Enteros con nulos sobre un array (p. ej. años), devueltos como int o None"""
+
+    def __init__(self, values, nulls):
+        self.values = values
+        self.nulls = nulls
+
+    @classmethod
+    def from_values(cls, values):
+        nulls = np.array([value is None for value in values], dtype=bool)
+        return cls(np.array([value or 0 for value in values], dtype=np.int64), nulls)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return None if self.nulls[i] else int(self.values[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,192 @@
+import os
+import time
+import bisect
+import threading
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import ContentGraph, get_content_graph, on_swap
+from engines.popularity_index import POPULARITY_QUERY, get_popularity_index
+from engines.text_index import normalize, word_starts
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Tipo de sugerencia -> categoría del grafo de contenido
+SUGGEST_TYPES = {
+    "movie": None,
+    "actor": "actor",
+    "director": "director",
+    "genre": "genre",
+}
+
+# Carácter mayor que cualquier otro: [q, q + _MAX_CHAR) es el rango de términos que empiezan con q
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class PrefixIndex:
+    """Autocompletado por prefijo sobre un arreglo ordenado de términos.
+
+    Cada entidad aporta un término por palabra de su nombre ("la noche",
+    "noche"), así que se sugiere tanto por el inicio del nombre como por el de
+    cualquier palabra. Las entidades se numeran por popularidad (rank 0 es la
+    más popular), de modo que el top-k de un rango es np.unique de sus ranks.
+    Los prefijos cortos con rangos de más de `heavy` términos guardan su top-k
+    precalculado, como los nodos de un trie.
+    """
+
+    def __init__(self, ids, names, weights, cache_limit=20, heavy=256):
+        order = sorted(range(len(ids)), key=lambda i: (-weights[i], normalize(names[i]), i))
+        self.ids = [ids[i] for i in order]
+        self.names = [names[i] for i in order]
+        self.weights = [weights[i] for i in order]
+        self.cache_limit = cache_limit
+        self.heavy = heavy
+
+        entries = sorted(
+            (normalized[start:], rank)
+            for rank, normalized in enumerate(normalize(name) for name in self.names)
+            for start in word_starts(normalized)
+        )
+        self._terms = [term for term, _ in entries]
+        self._ranks = np.fromiter((rank for _, rank in entries), dtype=np.int32, count=len(entries))
+        self._cache = {}
+        self._cache_heavy(0, len(self._terms), 0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cache_heavy(self, lo, hi, depth):
+        """Precalcula el top-k de cada prefijo cuyo rango supera `heavy` términos"""
+        terms = self._terms
+        i = lo
+        while i < hi:
+            if len(terms[i]) <= depth:
+                i += 1
+                continue
+            prefix = terms[i][:depth + 1]
+            end = bisect.bisect_left(terms, prefix + _MAX_CHAR, i, hi)
+            if end - i > self.heavy:
+                self._cache[prefix] = np.unique(self._ranks[i:end])[:self.cache_limit]
+                self._cache_heavy(i, end, depth + 1)
+            i = end
+
+    def suggest(self, query, limit=10):
+        """[{'id', 'name'}] cuyo nombre (o alguna palabra) empieza con query, por popularidad"""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        ranks = self._cache.get(query) if limit <= self.cache_limit else None
+        if ranks is None:
+            lo = bisect.bisect_left(self._terms, query)
+            hi = bisect.bisect_left(self._terms, query + _MAX_CHAR, lo)
+            ranks = np.unique(self._ranks[lo:hi])
+        return [{"id": self.ids[rank], "name": self.names[rank]} for rank in ranks[:limit].tolist()]
+
+
+class SuggestIndex:
+    """Un PrefixIndex por tipo (película, actor, director, género).
+
+    Peso de una película: sus likes. Peso de un actor/director/género: la
+    suma de (1 + likes) de sus películas.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    @classmethod
+    def from_content_graph(cls, content_graph, likes=None):
+        likes = likes or {}
+        movie_weights = np.array([likes.get(movie_id, 0) for movie_id in content_graph.movie_ids],
+                                 dtype=np.float64)
+        indexes = {"movie": PrefixIndex(list(content_graph.movie_ids),
+                                        [title or "" for title in content_graph.titles],
+                                        movie_weights.tolist())}
+        for suggest_type, category in SUGGEST_TYPES.items():
+            if category is None:
+                continue
+            matrix = content_graph.categories[category]
+            rows = np.repeat(np.arange(len(content_graph.movie_ids)), np.diff(matrix.indptr))
+            weights = np.bincount(matrix.indices, weights=1 + movie_weights[rows],
+                                  minlength=len(matrix.keys))
+            indexes[suggest_type] = PrefixIndex(list(matrix.keys),
+                                                [name or "" for name in matrix.names],
+                                                weights.tolist())
+        return cls(indexes)
+
+    @classmethod
+    def load(cls, conn, content_graph=None):
+        if content_graph is None:
+            content_graph = ContentGraph.load(conn)
+        popularity = get_popularity_index()
+        if popularity is not None:
+            likes = {movie_id: popularity.counts(movie_id)[0] for movie_id in content_graph.movie_ids}
+        else:
+            # Sin índice de popularidad se cuentan todos los likes hasta ahora
+            cutoff = int(time.time() * 1000)
+            likes = {row['movie_id']: row['positive'] for row in conn.query(POPULARITY_QUERY, {"cutoff": cutoff})}
+        return cls.from_content_graph(content_graph, likes)
+
+    def suggest(self, query, types=None, limit=10):
+        """{tipo: [{'id', 'name'}]} para cada tipo pedido"""
+        return {suggest_type: self.indexes[suggest_type].suggest(query, limit)
+                for suggest_type in (types or SUGGEST_TYPES)}
+
+    def stats(self):
+        return {suggest_type: {"entities": len(index), "terms": len(index._terms),
+                               "cached_prefixes": len(index._cache)}
+                for suggest_type, index in self.indexes.items()}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("SUGGEST_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_suggest_index():
+    """Devuelve el índice de autocompletado (cargándolo la primera vez) o None si está deshabilitado"""
+    global _index
+    if _index is None and is_enabled():
+        with _index_lock:
+            if _index is None:
+                with Neo4jConnection() as conn:
+                    _index = SuggestIndex.load(conn, get_content_graph())
+                interval = float(os.getenv("SUGGEST_REFRESH_INTERVAL", "3600"))
+                if interval > 0:
+                    threading.Thread(target=_refresh_loop, args=(interval,),
+                                     name="suggest-refresh", daemon=True).start()
+    return _index
+
+
+def reload_suggest_index():
+    global _index
+    with Neo4jConnection() as conn:
+        index = SuggestIndex.load(conn, get_content_graph())
+    with _index_lock:
+        _index = index
+    return index
+
+
+def _refresh_loop(interval):
+    # Los pesos de popularidad cambian despacio; se recalculan con el índice completo
+    while True:
+        time.sleep(interval)
+        try:
+            reload_suggest_index()
+        except Exception as e:
+            log.error("Recargando índice de autocompletado: %s", e)
+
+
+def is_loaded():
+    return _index is not None
+
+
+# Los prefijos salen de los títulos y entidades del grafo: con uno nuevo se rehacen
+def _graph_swapped(content_graph):
+    if is_loaded():
+        reload_suggest_index()
+
+
+on_swap(_graph_swapped)
@@ -0,0 +1,322 @@
+import os
+import re
+import bisect
+import heapq
+import threading
+import unicodedata
+import numpy as np
+from neo4j_connection import Neo4jConnection
+from engines.content_graph import ContentGraph, get_content_graph, on_swap
+
+ACTORS_QUERY = """
+MATCH (a:Actor)
+RETURN a.id AS id, a.name AS name
+"""
+
+# Marcas diacríticas que deja la descomposición NFKD (tildes, diéresis, virgulilla de la ñ)
+_DIACRITICS = re.compile("[\u0300-\u036f]")
+# Inicio de cada palabra (letras o dígitos)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Minúsculas y sin acentos/diacríticos: 'Pequeña Él' -> 'pequena el'"""
+    return _DIACRITICS.sub("", unicodedata.normalize("NFKD", (text or "").casefold()))
+
+
+def word_starts(text):
+    """Posiciones donde empieza cada palabra del texto"""
+    return [m.start() for m in _WORD.finditer(text)]
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Índice de texto sobre textos cortos (títulos, nombres).
+
+    - heads: textos normalizados ordenados, para coincidencias al inicio
+    - words: sufijos que empiezan en cada palabra, para coincidencias de palabra
+    - postings: trigrama -> documentos, para coincidencias en cualquier parte
+
+    search() recorre esas tres fuentes en orden de calidad (exacta, prefijo,
+    inicio de palabra, subcadena) y se detiene al llenar `limit`, así que una
+    búsqueda corta y frecuente no recorre todo el catálogo.
+    """
+
+    def __init__(self):
+        self._ids = []
+        self._texts = []
+        self._normalized = []
+        self._positions = {}
+        self._postings = {}
+        self._heads = []
+        self._words = []
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _entries(self, position):
+        normalized = self._normalized[position]
+        heads = [(normalized, position)]
+        words = [(normalized[start:], position) for start in word_starts(normalized) if start]
+        return heads, words
+
+    def _append(self, doc_id, text):
+        """Agrega el documento sin ordenar; devuelve None si ya existía con el mismo texto"""
+        if doc_id in self._positions:
+            if self._texts[self._positions[doc_id]] == text:
+                return None
+            self.remove(doc_id)
+        position = len(self._ids)
+        normalized = normalize(text)
+        self._ids.append(doc_id)
+        self._texts.append(text)
+        self._normalized.append(normalized)
+        self._positions[doc_id] = position
+        for gram in trigrams(normalized):
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = {position}
+            else:
+                postings.add(position)
+        return position
+
+    def add(self, doc_id, text):
+        """Agrega o reemplaza un documento"""
+        position = self._append(doc_id, text)
+        if position is not None:
+            heads, words = self._entries(position)
+            for entry in heads:
+                bisect.insort(self._heads, entry)
+            for entry in words:
+                bisect.insort(self._words, entry)
+
+    def extend(self, docs):
+        """Carga masiva de (doc_id, texto): ordena una sola vez al final"""
+        for doc_id, text in docs:
+            position = self._append(doc_id, text)
+            if position is not None:
+                heads, words = self._entries(position)
+                self._heads.extend(heads)
+                self._words.extend(words)
+        self._heads.sort()
+        self._words.sort()
+
+    def remove(self, doc_id):
+        position = self._positions.pop(doc_id, None)
+        if position is None:
+            return
+        for gram in trigrams(self._normalized[position]):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(position)
+                if not postings:
+                    del self._postings[gram]
+        heads, words = self._entries(position)
+        for sorted_entries, entries in ((self._heads, heads), (self._words, words)):
+            for entry in entries:
+                i = bisect.bisect_left(sorted_entries, entry)
+                if i < len(sorted_entries) and sorted_entries[i] == entry:
+                    del sorted_entries[i]
+        # La posición queda vacía; no se reutiliza para no mover las demás
+        self._normalized[position] = None
+
+    def _substring_positions(self, query):
+        grams = trigrams(query)
+        if not grams:
+            candidates = range(len(self._normalized))
+        else:
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                candidates &= other
+                if not candidates:
+                    return []
+        normalized = self._normalized
+        return [i for i in candidates if normalized[i] is not None and query in normalized[i]]
+
+    def matching_ids(self, query):
+        """Todos los documentos cuyo texto contiene query"""
+        query = normalize(query)
+        if not query:
+            return set()
+        return {self._ids[i] for i in self._substring_positions(query)}
+
+    def search(self, query, limit=20):
+        """[(doc_id, texto)] ordenados por calidad de coincidencia"""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        found = []
+        seen = set()
+        for sorted_entries in (self._heads, self._words):
+            i = bisect.bisect_left(sorted_entries, (query,))
+            while i < len(sorted_entries) and len(found) < limit:
+                text, position = sorted_entries[i]
+                if not text.startswith(query):
+                    break
+                if position not in seen:
+                    seen.add(position)
+                    found.append(position)
+                i += 1
+        if len(found) < limit:
+            normalized = self._normalized
+            rest = sorted((i for i in self._substring_positions(query) if i not in seen),
+                          key=lambda i: (len(normalized[i]), normalized[i]))
+            found.extend(rest[:limit - len(found)])
+        return [(self._ids[i], self._texts[i]) for i in found]
+
+
+class SearchIndex:
+    """Índices de búsqueda de títulos, actores y de las entidades de cada película.
+
+    Además guarda, para cada entidad, las películas relacionadas, de modo que
+    la búsqueda avanzada se resuelve con intersecciones de conjuntos.
+    """
+
+    CATEGORIES = ("genre", "actor", "director", "season")
+
+    def __init__(self):
+        self.movies = TrigramIndex()
+        self.actors = TrigramIndex()
+        self.actor_records = {}
+        # El índice de actores sirve tanto a search_actors como al filtro de la búsqueda avanzada
+        self.entities = {category: TrigramIndex() for category in self.CATEGORIES}
+        self.entities["actor"] = self.actors
+        self.movies_by_entity = {category: {} for category in self.CATEGORIES}
+        self.titles = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, conn, content_graph=None):
+        if content_graph is None:
+            content_graph = ContentGraph.load(conn)
+        index = cls.from_content_graph(content_graph)
+        index.add_actors(conn.stream(ACTORS_QUERY, rows="tuple"))
+        return index
+
+    @classmethod
+    def from_content_graph(cls, content_graph):
+        index = cls()
+        index.titles = dict(zip(content_graph.movie_ids, content_graph.titles))
+        index.movies.extend((movie_id, title or "") for movie_id, title in index.titles.items())
+        for category in cls.CATEGORIES:
+            matrix = content_graph.categories[category]
+            by_entity = index.movies_by_entity[category]
+            rows = np.repeat(np.arange(len(content_graph.movie_ids)), np.diff(matrix.indptr))
+            for row, col in zip(rows.tolist(), matrix.indices.tolist()):
+                by_entity.setdefault(matrix.keys[col], set()).add(content_graph.movie_ids[row])
+            if category == "actor":
+                index.add_actors(zip(matrix.keys, matrix.names))
+            else:
+                index.entities[category].extend(
+                    (key, name or "") for key, name in zip(matrix.keys, matrix.names))
+        return index
+
+    def add_movie(self, movie_id, title, related=None):
+        """Agrega una película nueva; related: {categoría: [(llave, nombre)]}"""
+        with self._lock:
+            self.titles[movie_id] = title
+            self.movies.add(movie_id, title or "")
+            for category, entities in (related or {}).items():
+                for key, name in entities:
+                    if category == "actor":
+                        self.actor_records.setdefault(key, {"id": key, "name": name})
+                    self.entities[category].add(key, name or "")
+                    self.movies_by_entity[category].setdefault(key, set()).add(movie_id)
+
+    def add_actors(self, actors):
+        """Carga masiva de (id, nombre); sin id se usa el nombre como llave (como coalesce)"""
+        docs = []
+        with self._lock:
+            for actor_id, name in actors:
+                key = actor_id if actor_id is not None else name
+                self.actor_records[key] = {"id": actor_id, "name": name}
+                docs.append((key, name or ""))
+            self.actors.extend(docs)
+
+    def add_actor(self, actor_id, name):
+        key = actor_id if actor_id is not None else name
+        with self._lock:
+            self.actor_records[key] = {"id": actor_id, "name": name}
+            self.actors.add(key, name or "")
+
+    def search_movies(self, keyword, limit=20):
+        with self._lock:
+            return [movie_id for movie_id, _ in self.movies.search(keyword, limit)]
+
+    def search_actors(self, keyword, limit=20):
+        """[{'id', 'name'}] ordenados por calidad de coincidencia"""
+        with self._lock:
+            return [dict(self.actor_records[key]) for key, _ in self.actors.search(keyword, limit)]
+
+    def advanced_search(self, params, limit=50, after=None):
+        """Ids de películas que cumplen todos los filtros, ordenadas por (título, id).
+
+        after: (título, id) de la última película de la página anterior
+        """
+        with self._lock:
+            candidates = None
+            for category in self.CATEGORIES:
+                keyword = params.get(category)
+                if not keyword:
+                    continue
+                movies = set()
+                for key in self.entities[category].matching_ids(keyword):
+                    movies |= self.movies_by_entity[category].get(key, set())
+                candidates = movies if candidates is None else candidates & movies
+            if params.get('title'):
+                titles = self.movies.matching_ids(params['title'])
+                candidates = titles if candidates is None else candidates & titles
+            if candidates is None:
+                candidates = self.titles
+            keys = ((self.titles.get(m) or "", m) for m in candidates)
+            if after is not None:
+                after = tuple(after)
+                keys = (key for key in keys if key > after)
+            return [movie_id for _, movie_id in heapq.nsmallest(limit, keys)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_enabled():
+    return os.getenv("SEARCH_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_search_index():
+    """Devuelve el índice de búsqueda (cargándolo la primera vez) o None si está deshabilitado"""
+    global _index
+    if _index is None and is_enabled():
+        with _index_lock:
+            if _index is None:
+                with Neo4jConnection() as conn:
+                    _index = SearchIndex.load(conn, get_content_graph())
+    return _index
+
+
+def reload_search_index():
+    global _index
+    with Neo4jConnection() as conn:
+        index = SearchIndex.load(conn, get_content_graph())
+    with _index_lock:
+        _index = index
+    return index
+
+
+def is_loaded():
+    return _index is not None
+
+
+# Títulos y entidades se copian del grafo: con uno nuevo se vuelve a armar el índice
+def _graph_swapped(content_graph):
+    if is_loaded():
+        reload_search_index()
+
+
+on_swap(_graph_swapped)
@@ -0,0 +1,62 @@
+"""Carga de los motores en memoria antes de recibir tráfico.
+
+Cada get_* lee de Neo4j la primera vez; si eso pasa dentro de una petición
+la bloquea (y en ASGI también el event loop). Los deshabilitados devuelven
+None sin consultar nada; el índice de películas parecidas se lee de
+SIMILAR_INDEX_PATH y solo se construye si el archivo no existe.
+
+ENGINES_WARMUP=false lo apaga; los comandos de la CLI de Flask (salvo run) no
+precalientan. init_app también arranca el hilo que aplica en este worker las
+recargas del catálogo pedidas a otro (ingest.watch_refresh).
+"""
+import os
+import click
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+
+def loaders():
+    from engines.content_graph import get_content_graph
+    from engines.popularity_index import get_popularity_index
+    from engines.preference_store import get_preference_store
+    from engines.item_cf import get_item_cf
+    from engines.similar_index import load_similar_index
+
+    return [
+        ("content_graph", get_content_graph),
+        ("popularity_index", get_popularity_index),
+        ("preference_store", get_preference_store),
+        ("item_cf", get_item_cf),
+        ("similar_index", load_similar_index),
+    ]
+
+
+def _cli_command():
+    # FlaskGroup crea la app al resolver el subcomando; `flask run` la crea dentro del suyo
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.info_name != "run"
+
+
+def is_enabled():
+    return os.getenv("ENGINES_WARMUP", "true").lower() in ("1", "true", "yes")
+
+
+# Función para cargar los motores habilitados; un fallo no impide arrancar
+def warm_engines():
+    for name, load in loaders():
+        try:
+            load()
+        except Exception as e:
+            log.error("Precarga de %s: %s", name, e)
+
+
+def init_app(app):
+    # flask <comando> también pasa por create_app: ahí no hace falta cargar nada
+    if _cli_command():
+        return
+    # Recargas del catálogo publicadas por otros workers (ingest.publish_refresh)
+    from ingest import watch_refresh
+    watch_refresh()
+    if is_enabled():
+        warm_engines()
@@ -0,0 +1,471 @@
+"""Carga masiva de películas desde CSV o JSONL.
+
+El archivo se recorre como una cadena de generadores (leer -> normalizar ->
+trozos), sin cargarlo entero. Cada trozo de batch_size * writers filas:
+
+1. Registra en el grafo, desde el hilo principal, los géneros, personas y
+   temporadas que todavía no se vieron (se deduplican en memoria, así que
+   cada entidad se escribe una sola vez por corrida).
+2. Reparte las películas por hash del id entre los hilos escritores: cada
+   hilo escribe siempre las mismas películas (particiones disjuntas) en
+   lotes `UNWIND $rows` de batch_size dentro de una transacción explícita
+   (execute_write, que reintenta los errores transitorios como deadlocks
+   al crear relaciones hacia el mismo género).
+
+Todas las escrituras son MERGE, así que repetir filas no duplica nada. El
+checkpoint guarda cuántas filas del archivo quedaron escritas (el mayor
+prefijo con todos sus trozos confirmados); al reanudar se saltan esas
+filas y se repite como mucho el último trozo.
+
+Formato JSONL, una película por línea:
+    {"id": "m1", "title": "...", "year": 1999, "description": "...",
+     "genres": [{"name": "Drama", "peso": 0.8}, "Comedia"],
+     "actors": [{"id": "a1", "name": "..."}, "Solo Nombre"],
+     "directors": [{"id": "d1", "name": "...", "peso": 0.9}],
+     "seasons": ["Navidad"]}
+
+Formato CSV, columnas id,title,year,description,genres,actors,directors,seasons
+con las listas separadas por "|": géneros y directores como nombre:peso
+(peso opcional, 1.0), personas como id=nombre (id opcional). Una persona
+sin id se identifica por el nombre, igual que coalesce(a.id, a.name) en
+las consultas de la aplicación.
+"""
+import os
+import csv
+import json
+import time
+import zlib
+import queue
+import itertools
+import threading
+from neo4j_connection import get_driver
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+FORMATS = ("csv", "jsonl")
+LIST_SEPARATOR = "|"
+
+# categoría -> (etiqueta, relación desde Movie, la relación lleva peso)
+CATEGORIES = {
+    "genre": ("Genre", "HAS_GENRE", True),
+    "actor": ("Actor", "HAS_ACTOR", False),
+    "director": ("Director", "DIRECTED_BY", True),
+    "season": ("Season", "APPROPIATE_FOR_SEASON", False),
+}
+# Columna del archivo de cada categoría
+COLUMNS = {"genre": "genres", "actor": "actors", "director": "directors", "season": "seasons"}
+
+MOVIES_QUERY = """
+UNWIND $rows AS row
+MERGE (m:Movie {id: row.id})
+SET m += row.props
+"""
+
+ENTITY_QUERY = """
+UNWIND $rows AS row
+MERGE (e:{label} {{{prop}: row.key}})
+SET e.name = coalesce(row.name, e.name)
+"""
+
+EDGE_QUERY = """
+UNWIND $rows AS row
+MATCH (m:Movie {{id: row.movie_id}})
+MATCH (e:{label} {{{prop}: row.key}})
+MERGE (m)-[r:{relationship}]->(e)
+{set_weight}
+"""
+
+
+# -- Lectura y normalización ------------------------------------------------
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                log.warning("%s:%s no es JSON válido: %s", path, line_number, e)
+                # None cuenta como fila (inválida) para que el checkpoint no se corra
+                yield None
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def read_rows(path, fmt=None):
+    """Filas crudas del archivo; el formato sale de la extensión si no se indica"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (opciones: {', '.join(FORMATS)})")
+    return read_csv(path) if fmt == "csv" else read_jsonl(path)
+
+
+def _split(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+    return list(value)
+
+
+def _weight(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_entity(category, item):
+    """(propiedad llave, llave, nombre, peso) de un elemento de lista, o None si no tiene nombre"""
+    if isinstance(item, dict):
+        name, entity_id, weight = item.get("name"), item.get("id"), _weight(item.get("peso"))
+    else:
+        name, entity_id, weight = str(item), None, None
+        # "nombre:0.8" (el peso va al final; un nombre con ':' sin número queda entero)
+        head, sep, tail = name.rpartition(":")
+        if sep and _weight(tail) is not None:
+            name, weight = head, _weight(tail)
+        if category in ("actor", "director") and "=" in name:
+            entity_id, _, name = name.partition("=")
+    name = (name or "").strip() or None
+    entity_id = str(entity_id).strip() if entity_id not in (None, "") else None
+    if name is None and entity_id is None:
+        return None
+    if weight is None:
+        weight = 1.0
+    if category in ("genre", "season") or entity_id is None:
+        return ("name", name, name, weight)
+    return ("id", entity_id, name, weight)
+
+
+def parse_movie(raw):
+    """Película normalizada o None si la fila no tiene id o título"""
+    if not isinstance(raw, dict):
+        return None
+    movie_id = str(raw.get("id") or "").strip()
+    title = str(raw.get("title") or "").strip()
+    if not movie_id or not title:
+        return None
+    year = raw.get("year")
+    if isinstance(year, str):
+        year = int(year) if year.strip().lstrip("-").isdigit() else None
+    # Las propiedades vacías no se escriben: reimportar sin descripción no borra la que había
+    props = {key: value for key, value in (("title", title), ("year", year),
+                                           ("description", raw.get("description") or None)) if value is not None}
+    movie = {"id": movie_id, "props": props}
+    for category, column in COLUMNS.items():
+        entities = (parse_entity(category, item) for item in _split(raw.get(column)))
+        movie[category] = [entity for entity in entities if entity is not None]
+    return movie
+
+
+# -- Escritura --------------------------------------------------------------
+
+def entity_query(category, prop):
+    return ENTITY_QUERY.format(label=CATEGORIES[category][0], prop=prop)
+
+
+def edge_query(category, prop):
+    label, relationship, weighted = CATEGORIES[category]
+    return EDGE_QUERY.format(label=label, prop=prop, relationship=relationship,
+                             set_weight="SET r.peso = row.peso" if weighted else "")
+
+
+def _write_entities(tx, entities):
+    for (category, prop), rows in entities.items():
+        tx.run(entity_query(category, prop), {"rows": rows}).consume()
+
+
+def _write_movies(tx, movies):
+    tx.run(MOVIES_QUERY, {"rows": [{"id": movie["id"], "props": movie["props"]} for movie in movies]}).consume()
+    edges = {}
+    for movie in movies:
+        for category in CATEGORIES:
+            for prop, key, _, weight in movie[category]:
+                edges.setdefault((category, prop), []).append({"movie_id": movie["id"], "key": key, "peso": weight})
+    for (category, prop), rows in edges.items():
+        tx.run(edge_query(category, prop), {"rows": rows}).consume()
+    return sum(len(rows) for rows in edges.values())
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, data):
+    # Escritura atómica: un corte a mitad de camino deja el checkpoint anterior
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class MovieIngester:
+    """Escribe películas en lotes UNWIND con varios hilos sobre particiones disjuntas"""
+
+    def __init__(self, batch_size=1000, writers=4, checkpoint_path=None, progress=None, progress_interval=2.0):
+        self.batch_size = batch_size
+        self.writers = max(1, writers)
+        self.checkpoint_path = checkpoint_path
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.known = set()
+        self.stats = {"rows": 0, "movies": 0, "invalid": 0, "entities": 0, "relationships": 0,
+                      "batches": 0, "committed_rows": 0, "elapsed": 0.0}
+        self.error = None
+        self._lock = threading.Lock()
+        self._chunks = {}
+        self._next_chunk = 0
+
+    def partition(self, movie_id):
+        return zlib.crc32(movie_id.encode("utf-8")) % self.writers
+
+    def new_entities(self, movies):
+        """{(categoría, propiedad): [filas]} de las entidades que no se vieron en esta corrida"""
+        found = {}
+        for movie in movies:
+            for category in CATEGORIES:
+                for prop, key, name, _ in movie[category]:
+                    if (category, prop, key) not in self.known:
+                        self.known.add((category, prop, key))
+                        found.setdefault((category, prop), []).append({"key": key, "name": name})
+        return found
+
+    def run(self, rows, skip=0):
+        """Carga las filas (iterable de dicts crudos) saltando las primeras `skip`; devuelve stats"""
+        start = time.perf_counter()
+        self.stats["committed_rows"] = skip
+        queues = [queue.Queue(maxsize=2) for _ in range(self.writers)]
+        threads = [threading.Thread(target=self._writer, args=(q,), name=f"ingest-writer-{i}", daemon=True)
+                   for i, q in enumerate(queues)]
+        for thread in threads:
+            thread.start()
+        driver = get_driver()
+        last_progress = time.monotonic()
+        chunk_rows = self.batch_size * self.writers
+        source = itertools.islice(rows, skip, None)
+        position = skip
+        try:
+            for chunk_id in itertools.count():
+                raw = list(itertools.islice(source, chunk_rows))
+                if not raw or self.error:
+                    break
+                position += len(raw)
+                movies = [movie for movie in map(parse_movie, raw) if movie is not None]
+                with self._lock:
+                    self.stats["rows"] += len(raw)
+                    self.stats["invalid"] += len(raw) - len(movies)
+                entities = self.new_entities(movies)
+                if entities:
+                    with driver.session() as session:
+                        session.execute_write(_write_entities, entities)
+                    with self._lock:
+                        self.stats["entities"] += sum(len(entity_rows) for entity_rows in entities.values())
+                batches = self._batches(movies)
+                with self._lock:
+                    self._chunks[chunk_id] = [len(batches), position]
+                self._finish_batch(chunk_id, 0, 0)
+                for partition, batch in batches:
+                    queues[partition].put((chunk_id, batch))
+                if self.progress and time.monotonic() - last_progress >= self.progress_interval:
+                    last_progress = time.monotonic()
+                    self.stats["elapsed"] = time.perf_counter() - start
+                    self.progress(dict(self.stats))
+        finally:
+            # Los escritores siguen vaciando sus colas aunque haya un error, así que put no se traba
+            for q in queues:
+                q.put(None)
+            for thread in threads:
+                thread.join()
+            self.stats["elapsed"] = time.perf_counter() - start
+        if self.error:
+            raise self.error
+        return dict(self.stats)
+
+    def _batches(self, movies):
+        by_partition = {}
+        for movie in movies:
+            by_partition.setdefault(self.partition(movie["id"]), []).append(movie)
+        return [(partition, part[i:i + self.batch_size])
+                for partition, part in sorted(by_partition.items())
+                for i in range(0, len(part), self.batch_size)]
+
+    def _writer(self, q):
+        driver = get_driver()
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            if self.error:
+                continue
+            chunk_id, movies = item
+            try:
+                with driver.session() as session:
+                    relationships = session.execute_write(_write_movies, movies)
+            except Exception as e:
+                log.error("Escribiendo lote de %s películas (desde %s): %s", len(movies), movies[0]["id"], e)
+                self.error = e
+                continue
+            self._finish_batch(chunk_id, len(movies), relationships, done=1)
+
+    def _finish_batch(self, chunk_id, movies, relationships, done=0):
+        """Descuenta un lote del trozo y avanza el checkpoint por los trozos completos consecutivos"""
+        with self._lock:
+            self._chunks[chunk_id][0] -= done
+            if done:
+                self.stats["movies"] += movies
+                self.stats["relationships"] += relationships
+                self.stats["batches"] += 1
+            advanced = False
+            while self._next_chunk in self._chunks and self._chunks[self._next_chunk][0] == 0:
+                self.stats["committed_rows"] = self._chunks.pop(self._next_chunk)[1]
+                self._next_chunk += 1
+                advanced = True
+            if advanced and self.checkpoint_path:
+                save_checkpoint(self.checkpoint_path, {"rows": self.stats["committed_rows"],
+                                                       "updated": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+
+def ingest_file(path, fmt=None, batch_size=1000, writers=4, checkpoint_path=None, restart=False, progress=None):
+    """Carga un archivo reanudando desde su checkpoint (salvo restart); devuelve stats"""
+    checkpoint = {} if restart else load_checkpoint(checkpoint_path)
+    ingester = MovieIngester(batch_size, writers, checkpoint_path, progress)
+    stats = ingester.run(read_rows(path, fmt), skip=checkpoint.get("rows", 0))
+    stats["skipped"] = checkpoint.get("rows", 0)
+    return stats
+
+
+# -- Cachés e índices en memoria ---------------------------------------------
+
+def refresh_caches(movie_ids=None, rebuild=True):
+    """Después de cargar películas: retira las tarjetas en caché y recarga los motores
+    habilitados en este proceso que dependen del catálogo. Devuelve los nombres recargados.
+
+    Con rebuild se reescriben desde Neo4j los archivos compartidos por los workers
+    (snapshot del grafo de contenido, índice de películas parecidas); sin rebuild se
+    leen los que dejó el worker que publicó la recarga (ver publish_refresh)."""
+    from engines import content_graph, movie_sampler, ppr, preference_store, similar_index, suggest_index, text_index
+    from engines.card_cache import card_cache
+    from engines.recommendation_cache import recommendation_cache
+
+    if movie_ids is None:
+        card_cache.clear()
+    else:
+        card_cache.invalidate(movie_ids)
+    # Las recomendaciones guardadas no incluyen las películas nuevas
+    recommendation_cache.clear()
+    reloaded = []
+    # El grafo de contenido primero: al reemplazarlo, los motores ya cargados que se arman
+    # desde él (búsqueda, sugerencias, muestreo, PageRank, preferencias) se rehacen (on_swap)
+    swapped = content_graph.is_enabled()
+    if swapped:
+        graph = content_graph.refresh_content_graph(rebuild)
+        reloaded.append("content_graph")
+        # El almacén de preferencias calcula los vectores con las entidades del grafo actual
+        if preference_store.is_loaded():
+            preference_store.get_preference_store().rebind(graph)
+            reloaded.append("preference_store")
+    for name, enabled, loaded, reload in (
+            ("search_index", text_index.is_enabled, text_index.is_loaded, text_index.reload_search_index),
+            ("suggest_index", suggest_index.is_enabled, suggest_index.is_loaded, suggest_index.reload_suggest_index),
+            ("movie_sampler", movie_sampler.is_enabled, movie_sampler.is_loaded, movie_sampler.reload_movie_sampler)):
+        if enabled():
+            if not (swapped and loaded()):
+                reload()
+            reloaded.append(name)
+    # El grafo de PageRank no tiene variable que lo habilite: se recarga solo si ya se usó
+    if ppr.is_loaded():
+        if not swapped:
+            ppr.reload_ppr_graph()
+        reloaded.append("ppr_graph")
+    # Sin esto /movies/<id>/similar responde 404 para las películas nuevas
+    if similar_index.is_loaded():
+        similar_index.reload_similar_index(rebuild)
+        reloaded.append("similar_index")
+    return reloaded
+
+
+# -- Recarga en todos los workers ----------------------------------------------
+#
+# POST /movies/cache/refresh llega a un solo worker. Ese worker recarga, reescribe
+# los archivos compartidos y deja una versión nueva en CATALOG_REFRESH_PATH; los
+# demás la leen cada CATALOG_REFRESH_CHECK_INTERVAL segundos y recargan sin rebuild.
+
+_seen_refresh = None
+_watch_lock = threading.Lock()
+_watching = False
+
+
+def refresh_path():
+    return os.getenv("CATALOG_REFRESH_PATH", os.path.join("data", "catalog_refresh.json"))
+
+
+def read_refresh(path=None):
+    """{'version', 'movie_ids'} de la última recarga publicada o None"""
+    path = path or refresh_path()
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.error("Leyendo %s: %s", path, e)
+        return None
+
+
+def publish_refresh(movie_ids=None):
+    """Escribe una versión nueva para que los demás workers recarguen; devuelve la versión"""
+    global _seen_refresh
+    path = refresh_path()
+    if not path:
+        return None
+    version = f"{time.time_ns()}-{os.getpid()}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Este worker ya recargó: no debe repetirlo al ver su propia versión
+    _seen_refresh = version
+    save_checkpoint(path, {"version": version, "movie_ids": movie_ids})
+    return version
+
+
+def check_refresh():
+    """Recarga este proceso si otro publicó una versión que todavía no vio; devuelve si recargó"""
+    global _seen_refresh
+    notice = read_refresh()
+    if notice is None or notice.get("version") == _seen_refresh:
+        return False
+    _seen_refresh = notice.get("version")
+    refresh_caches(notice.get("movie_ids"), rebuild=False)
+    return True
+
+
+def watch_refresh():
+    """Arranca (una vez por proceso) el hilo que revisa CATALOG_REFRESH_PATH"""
+    global _seen_refresh, _watching
+    interval = float(os.getenv("CATALOG_REFRESH_CHECK_INTERVAL", "5"))
+    if interval <= 0 or not refresh_path():
+        return
+    with _watch_lock:
+        if _watching:
+            return
+        _watching = True
+        # Lo publicado antes de arrancar ya está en lo que cargó este proceso
+        notice = read_refresh()
+        _seen_refresh = notice.get("version") if notice else None
+    threading.Thread(target=_watch_loop, args=(interval,), name="catalog-refresh-watch", daemon=True).start()
+
+
+def _watch_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            check_refresh()
+        except Exception as e:
+            log.error("Recargando el catálogo publicado por otro worker: %s", e)
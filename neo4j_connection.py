@@ -1,10 +1,102 @@
 import os
+import time
+import atexit
+import threading
+from functools import lru_cache
+from collections import namedtuple
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from telemetry import caller_name, span
+from query_profiler import get_query_profiler
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Driver compartido por todo el proceso (se crea la primera vez que se usa)
+_driver = None
+_driver_lock = threading.Lock()
+
+# Driver asíncrono del modo ASGI; queda ligado al event loop donde se crea
+_async_driver = None
+
+
+# Función para leer la configuración del pool de conexiones desde el entorno
+def _pool_config():
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60")),
+        "max_connection_lifetime": float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")),
+    }
+
+
+# Función para obtener el driver compartido, creándolo de forma perezosa
+def get_driver():
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(
+                    os.getenv("NEO4J_URI"),
+                    auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+                    **_pool_config()
+                )
+    return _driver
+
+
+# Función para reemplazar el driver compartido (testing/memory_driver.py instala uno en memoria)
+def set_driver(driver):
+    global _driver
+    with _driver_lock:
+        _driver = driver
+
+
+# Función para cerrar el driver compartido (al apagar la aplicación)
+def close_driver():
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+atexit.register(close_driver)
+
+
+# Función para obtener el driver asíncrono compartido (llamar desde el event loop del servidor)
+def get_async_driver():
+    global _async_driver
+    if _async_driver is None:
+        _async_driver = AsyncGraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+            **_pool_config()
+        )
+    return _async_driver
+
+
+# Función para cerrar el driver asíncrono (al apagar el servidor ASGI)
+async def close_async_driver():
+    global _async_driver
+    if _async_driver is not None:
+        driver, _async_driver = _async_driver, None
+        await driver.close()
+
+# Formatos de fila de Neo4jConnection.stream: dict (como query), tuple (valores
+# en el orden del RETURN) o row (namedtuple con los nombres de las columnas)
+ROW_FORMATS = ("dict", "tuple", "row")
+
+
+# Función para leer cuántos registros pide el driver al servidor en cada lote
+def _stream_fetch_size():
+    return int(os.getenv("NEO4J_STREAM_FETCH_SIZE", "1000"))
+
+
+# Función para obtener la clase de fila (sin __dict__ por instancia) de unas columnas
+@lru_cache(maxsize=256)
+def row_class(keys):
+    return namedtuple("Row", keys, rename=True)
+
+
 class Neo4jConnection:
     # Función para inicializar la clase obteniendo las credenciales
     def __init__(self):
@@ -12,17 +104,17 @@ class Neo4jConnection:
         self.user = os.getenv("NEO4J_USERNAME")
         self.password = os.getenv("NEO4J_PASSWORD")
         self.driver = None
-    
-    # Función para establecer la conexión con Neo4j
+
+    # Función para establecer la conexión con Neo4j (usa el driver compartido)
     def connect(self):
         if not self.driver:
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            self.driver = get_driver()
         return self
 
-    # Función para cerrar la conexión con Neo4j
+    # Función para liberar la conexión; el driver compartido sigue abierto
+    # y sus conexiones vuelven al pool
     def close(self):
-        if self.driver:
-            self.driver.close()
+        self.driver = None
 
     # Función especial para usar la conexión como un contexto
     def __enter__(self):
@@ -32,9 +124,109 @@ class Neo4jConnection:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    # Función para ejecutar una consulta Cypher; name identifica la consulta en la
+    # telemetría y en las capturas de planes (por defecto, la función que la lanza)
+    def query(self, cypher_query, parameters=None, name=None):
+        name = name or caller_name()
+        start = time.perf_counter()
+        with span("cypher", name) as timing:
+            with self.driver.session() as session:
+                result = session.run(cypher_query, parameters or {})
+                records = [record.data() for record in result]
+            timing.rows = len(records)
+        profiler = get_query_profiler()
+        if profiler is not None:
+            profiler.observe(cypher_query, parameters or {}, name, (time.perf_counter() - start) * 1000)
+        return records
+
+    # Función para recorrer el resultado de una consulta sin cargarlo completo en memoria;
+    # la sesión queda abierta mientras se consume el generador. fetch_size es el
+    # tamaño de cada lote que el driver pide al servidor y rows el formato de fila
+    def stream(self, cypher_query, parameters=None, fetch_size=None, rows="dict", name=None):
+        if rows not in ROW_FORMATS:
+            raise ValueError(f"Formato de fila no soportado: {rows}")
+        return self._stream(cypher_query, parameters or {}, fetch_size or _stream_fetch_size(), rows,
+                            name or caller_name())
+
+    # El span cubre todo el recorrido, incluido el tiempo de quien consume las filas
+    def _stream(self, cypher_query, parameters, fetch_size, rows, name):
+        with span("cypher", name) as timing, self.driver.session(fetch_size=fetch_size) as session:
+            result = session.run(cypher_query, parameters)
+            timing.rows = 0
+            if rows == "dict":
+                for record in result:
+                    timing.rows += 1
+                    yield record.data()
+            elif rows == "tuple":
+                for record in result:
+                    timing.rows += 1
+                    yield tuple(record)
+            else:
+                make_row = row_class(tuple(result.keys()))._make
+                for record in result:
+                    timing.rows += 1
+                    yield make_row(record)
+
+
+class AsyncNeo4jConnection:
+    """Versión asíncrona de Neo4jConnection para el modo ASGI.
+
+    Cada consulta usa su propia sesión del pool, así que varias consultas
+    independientes se pueden lanzar a la vez con asyncio.gather.
+    """
+
+    def __init__(self):
+        self.driver = None
+
+    # Función para establecer la conexión (usa el driver asíncrono compartido)
+    def connect(self):
+        self.driver = get_async_driver()
+        return self
+
+    def close(self):
+        self.driver = None
+
+    async def __aenter__(self):
+        return self.connect()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     # Función para ejecutar una consulta Cypher
-    def query(self, cypher_query, parameters=None):
-        with self.driver.session() as session:
-            result = session.run(cypher_query, parameters or {})
-            return [record.data() for record in result]    
-        
\ No newline at end of file
+    # (no es async para tomar el nombre de quien llama antes de que asyncio.gather la mande a otra tarea)
+    def query(self, cypher_query, parameters=None, name=None):
+        return self._query(cypher_query, parameters, name or caller_name())
+
+    async def _query(self, cypher_query, parameters, name):
+        start = time.perf_counter()
+        with span("cypher", name) as timing:
+            async with self.driver.session() as session:
+                result = await session.run(cypher_query, parameters or {})
+                records = [record.data() async for record in result]
+            timing.rows = len(records)
+        profiler = get_query_profiler()
+        if profiler is not None:
+            profiler.observe(cypher_query, parameters or {}, name, (time.perf_counter() - start) * 1000)
+        return records
+
+    # Función para recorrer el resultado sin cargarlo completo (mismos formatos que stream)
+    def stream(self, cypher_query, parameters=None, fetch_size=None, rows="dict", name=None):
+        if rows not in ROW_FORMATS:
+            raise ValueError(f"Formato de fila no soportado: {rows}")
+        return self._stream(cypher_query, parameters or {}, fetch_size or _stream_fetch_size(), rows,
+                            name or caller_name())
+
+    async def _stream(self, cypher_query, parameters, fetch_size, rows, name):
+        with span("cypher", name) as timing:
+            async with self.driver.session(fetch_size=fetch_size) as session:
+                result = await session.run(cypher_query, parameters)
+                make_row = row_class(tuple(result.keys()))._make if rows == "row" else None
+                timing.rows = 0
+                async for record in result:
+                    timing.rows += 1
+                    if rows == "dict":
+                        yield record.data()
+                    elif rows == "tuple":
+                        yield tuple(record)
+                    else:
+                        yield make_row(record)
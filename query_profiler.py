@@ -0,0 +1,246 @@
+"""Captura por muestreo de planes PROFILE/EXPLAIN de las consultas Cypher.
+
+Con QUERY_PROFILE_SAMPLE_RATE > 0 o QUERY_PROFILE_SLOW_MS definido,
+Neo4jConnection.query entrega cada consulta terminada a observe(): si cae
+en la muestra o tardó más que el umbral, se encola y un hilo aparte la
+vuelve a correr con PROFILE (con EXPLAIN si escribe, para no repetir la
+escritura). La petición no espera ese segundo viaje; si la cola está
+llena, la captura se descarta.
+
+Cada captura se agrega como una línea JSON a QUERY_PROFILE_PATH con la
+huella de la consulta (texto sin comentarios, literales ni espacios
+repetidos), los db hits, las filas y el árbol de operadores. `flask --app
+main profiles report` agrupa el archivo por huella, ordena por db hits
+totales y señala los escaneos por etiqueta que filtran por una propiedad
+(p. ej. NodeByLabelScan de User seguido de un filtro por u.id), que
+indican un índice o constraint faltante.
+"""
+import os
+import re
+import json
+import time
+import queue
+import random
+import hashlib
+import threading
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Cláusulas que modifican el grafo: esas consultas se capturan con EXPLAIN (sin ejecutarlas)
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|FOREACH|DETACH)\b", re.IGNORECASE)
+# Operadores que recorren todos los nodos de una etiqueta (o todos los nodos)
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+# Igualdad, IN o prefijo sobre una propiedad: lo que un índice resolvería
+_PROPERTY_FILTER = re.compile(r"\b(\w+)\.(\w+)\s*(?:=|IN\b|STARTS WITH\b)", re.IGNORECASE)
+_LABELED_VARIABLE = re.compile(r"\b(\w+):(\w+)")
+_COMMENT = re.compile(r"//[^\n]*")
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+
+
+def normalize(cypher_query):
+    """Texto de la consulta sin comentarios, con literales como ? y espacios colapsados"""
+    text = _COMMENT.sub(" ", cypher_query)
+    text = _STRING.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    return " ".join(text.split())
+
+
+def fingerprint(cypher_query):
+    """Huella estable de la consulta: dos consultas que solo cambian en literales comparten huella"""
+    return hashlib.blake2b(normalize(cypher_query).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _operator_name(plan):
+    # Neo4j 5 agrega el runtime al nombre: "NodeByLabelScan@neo4j"
+    return plan.get("operatorType", "?").split("@")[0]
+
+
+def operator_tree(plan):
+    """Árbol de operadores del resumen del driver con db hits, filas y detalles"""
+    args = plan.get("args", {})
+    return {
+        "operator": _operator_name(plan),
+        "details": args.get("Details"),
+        "identifiers": plan.get("identifiers", []),
+        "db_hits": plan.get("dbHits"),
+        "rows": plan.get("rows"),
+        "estimated_rows": args.get("EstimatedRows"),
+        "children": [operator_tree(child) for child in plan.get("children", [])],
+    }
+
+
+def total_db_hits(tree):
+    return (tree.get("db_hits") or 0) + sum(total_db_hits(child) for child in tree["children"])
+
+
+def missing_indexes(tree, ancestors=()):
+    """[(operador, etiqueta, propiedad)] de los escaneos por etiqueta que un filtro superior acota por propiedad"""
+    found = []
+    if tree["operator"] in SCAN_OPERATORS:
+        labels = dict(_LABELED_VARIABLE.findall(tree.get("details") or ""))
+        for variable in tree.get("identifiers") or labels:
+            label = labels.get(variable)
+            properties = {prop for ancestor in ancestors
+                          for var, prop in _PROPERTY_FILTER.findall(ancestor.get("details") or "") if var == variable}
+            for prop in sorted(properties) or [None]:
+                found.append((tree["operator"], label, prop))
+    for child in tree["children"]:
+        found.extend(missing_indexes(child, ancestors + (tree,)))
+    return found
+
+
+class QueryProfiler:
+    """Decide qué consultas capturar y las vuelve a correr con PROFILE/EXPLAIN en un hilo aparte"""
+
+    def __init__(self, path, sample_rate=0.0, slow_ms=None, cooldown=60.0, queue_size=100, max_bytes=50 * 2**20):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.cooldown = cooldown
+        self.max_bytes = max_bytes
+        self.captured = 0
+        self.dropped = 0
+        self._last_capture = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._worker, name="query-profiler", daemon=True).start()
+
+    def observe(self, cypher_query, parameters, name, elapsed_ms):
+        """Llamado tras cada consulta; encola la captura si corresponde (no bloquea)"""
+        slow = self.slow_ms is not None and elapsed_ms >= self.slow_ms
+        if not slow and not (self.sample_rate and random.random() < self.sample_rate):
+            return False
+        key = fingerprint(cypher_query)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_capture.get(key, -self.cooldown) < self.cooldown:
+                return False
+            self._last_capture[key] = now
+        try:
+            self._queue.put_nowait((cypher_query, parameters, name, elapsed_ms, key, "slow" if slow else "sample"))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Espera a que se procesen las capturas encoladas"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                entry = self.capture(*job)
+                if entry is not None:
+                    self._append(entry)
+            except Exception as e:
+                log.error("Capturando el plan de %s: %s", job[2], e)
+            finally:
+                self._queue.task_done()
+
+    def capture(self, cypher_query, parameters, name, elapsed_ms, key, trigger):
+        """Corre la consulta con PROFILE (EXPLAIN si escribe) y arma la entrada; None si no hay plan"""
+        from neo4j_connection import get_driver
+
+        mode = "EXPLAIN" if WRITE_CLAUSES.search(_COMMENT.sub(" ", cypher_query)) else "PROFILE"
+        with get_driver().session() as session:
+            result = session.run(f"{mode} {cypher_query}", parameters)
+            rows = sum(1 for _ in result)
+            summary = result.consume()
+        plan = summary.profile if mode == "PROFILE" else summary.plan
+        if not plan:
+            return None
+        tree = operator_tree(plan)
+        return {
+            "fingerprint": key,
+            "name": name,
+            "mode": mode,
+            "trigger": trigger,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "db_hits": total_db_hits(tree) if mode == "PROFILE" else None,
+            "rows": rows if mode == "PROFILE" else None,
+            "missing_indexes": [list(item) for item in missing_indexes(tree)],
+            "query": normalize(cypher_query)[:4000],
+            "plan": tree,
+        }
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.captured += 1
+
+
+def read_profiles(path):
+    """Entradas del archivo de capturas y de su rotación .1 (ignora líneas cortadas)"""
+    entries = []
+    for candidate in (f"{path}.1", path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+
+def summarize(entries):
+    """Agregado por huella, ordenado por db hits totales (y después por tiempo máximo)"""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"], "names": set(), "captures": 0, "profiled": 0,
+            "db_hits": 0, "rows": 0, "max_ms": 0.0, "missing_indexes": set(), "query": entry["query"],
+        })
+        group["names"].add(entry.get("name") or "?")
+        group["captures"] += 1
+        group["max_ms"] = max(group["max_ms"], entry.get("elapsed_ms") or 0.0)
+        group["missing_indexes"].update(tuple(item) for item in entry.get("missing_indexes", []))
+        if entry.get("db_hits") is not None:
+            group["profiled"] += 1
+            group["db_hits"] += entry["db_hits"]
+            group["rows"] += entry.get("rows") or 0
+    return sorted(groups.values(), key=lambda group: (-group["db_hits"], -group["max_ms"]))
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def is_enabled():
+    return float(os.getenv("QUERY_PROFILE_SAMPLE_RATE", "0")) > 0 or bool(os.getenv("QUERY_PROFILE_SLOW_MS"))
+
+
+def profiles_path():
+    return os.getenv("QUERY_PROFILE_PATH", "query_profiles.jsonl")
+
+
+def get_query_profiler():
+    """Devuelve el perfilador (creándolo la primera vez) o None si está deshabilitado"""
+    global _profiler
+    if _profiler is None and is_enabled():
+        with _profiler_lock:
+            if _profiler is None:
+                slow_ms = os.getenv("QUERY_PROFILE_SLOW_MS")
+                _profiler = QueryProfiler(
+                    profiles_path(),
+                    sample_rate=float(os.getenv("QUERY_PROFILE_SAMPLE_RATE", "0")),
+                    slow_ms=float(slow_ms) if slow_ms else None,
+                    cooldown=float(os.getenv("QUERY_PROFILE_COOLDOWN", "60")),
+                    max_bytes=int(float(os.getenv("QUERY_PROFILE_MAX_MB", "50")) * 2**20),
+                )
+    return _profiler
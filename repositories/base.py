@@ -0,0 +1,213 @@
+"""Acceso a datos de los controladores.
+
+Los controladores no arman consultas: piden lo que necesitan a un
+Repository. Neo4jRepository (neo4j_repository.py) lo resuelve con Cypher;
+MemoryRepository (memory_repository.py) con un MemoryGraph en memoria, para
+correr la API sin base. Las filas tienen la misma forma en las dos
+implementaciones, que es la que devuelven las rutas.
+
+Los motores en memoria (engines/) leen sus datos del grafo con sus propias
+consultas y no pasan por aquí.
+
+Los métodos *_async son las versiones del modo ASGI.
+"""
+import threading
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+class Repository:
+    """Interfaz común de Neo4jRepository y MemoryRepository.
+
+    after es la pareja (llave de orden, id) del último elemento visto en los
+    listados paginados (ver controllers/pagination.py).
+    """
+
+    # -- Catálogo ----------------------------------------------------------
+
+    def movies_by_ids(self, movie_ids):
+        """Películas completas (todos los actores) de los ids que existen, sin orden"""
+        raise NotImplementedError
+
+    async def movies_by_ids_async(self, movie_ids):
+        raise NotImplementedError
+
+    def random_movie_ids(self, limit):
+        raise NotImplementedError
+
+    def movie_ids_page(self, limit, after=None):
+        """Ids de una página del catálogo ordenado por (título, id)"""
+        raise NotImplementedError
+
+    def stream_movies(self, after=None):
+        """Películas (primeros 3 actores) desde el cursor, una a una"""
+        raise NotImplementedError
+
+    def latest_movie_ids(self, limit):
+        raise NotImplementedError
+
+    def movies_by_season(self, season_name, limit=20):
+        """[(movie_id, temporada)] de las temporadas que contienen season_name, más nuevas primero"""
+        raise NotImplementedError
+
+    def search_movie_ids(self, keyword, limit=20):
+        raise NotImplementedError
+
+    def advanced_search_ids(self, filters, limit, after=None):
+        """Ids de las películas que cumplen todos los filtros (title, genre, actor, director, season)"""
+        raise NotImplementedError
+
+    def top_movies(self, limit, seconds=None):
+        """[(movie_id, interacciones positivas)], solo las de los últimos `seconds` si se indica"""
+        raise NotImplementedError
+
+    # -- Actores, directores y géneros -------------------------------------
+
+    def get_actor(self, actor_id):
+        """{'actor': {id, name}} o None"""
+        raise NotImplementedError
+
+    def actors_page(self, limit, after=None):
+        raise NotImplementedError
+
+    def stream_actors(self, after=None):
+        raise NotImplementedError
+
+    def search_actors(self, keyword, limit=20):
+        raise NotImplementedError
+
+    def movies_by_actor(self, actor_name, limit=20):
+        raise NotImplementedError
+
+    def get_director(self, director_id):
+        """{'director': {id, name}} o None"""
+        raise NotImplementedError
+
+    def directors_page(self, limit, after=None):
+        raise NotImplementedError
+
+    def stream_directors(self, after=None):
+        raise NotImplementedError
+
+    def movies_by_director(self, director_name, min_weight, limit=20):
+        raise NotImplementedError
+
+    def get_genre(self, genre_name):
+        """{'genre': {name}} o None"""
+        raise NotImplementedError
+
+    def genres_page(self, limit, after=None):
+        raise NotImplementedError
+
+    def stream_genres(self, after=None):
+        raise NotImplementedError
+
+    def movies_by_genre(self, genre_name, min_weight, limit=20):
+        raise NotImplementedError
+
+    def suggest(self, suggest_type, prefix, limit):
+        """[{'id', 'name'}] de un tipo (movie, actor, director, genre) cuyo nombre o una palabra empieza con prefix"""
+        raise NotImplementedError
+
+    # -- Usuarios e interacciones ------------------------------------------
+
+    def create_user(self, user):
+        """user: {id, email, name, password_hash}; devuelve {id, email, name, created_at}"""
+        raise NotImplementedError
+
+    def user_by_id(self, user_id):
+        """{id, email, name, hashed_password} o None"""
+        raise NotImplementedError
+
+    def user_by_email(self, email):
+        raise NotImplementedError
+
+    def user_summary(self, user_id):
+        """{user_id, user_name, user_email} o None"""
+        raise NotImplementedError
+
+    async def user_summary_async(self, user_id):
+        raise NotImplementedError
+
+    def movie_summary(self, movie_id):
+        """{movie_id, movie_title} o None"""
+        raise NotImplementedError
+
+    async def movie_summary_async(self, movie_id):
+        raise NotImplementedError
+
+    def write_interactions(self, events):
+        """Aplica eventos de interaction_event; una fila {'result': ...} por evento escrito"""
+        raise NotImplementedError
+
+    async def write_interactions_async(self, events):
+        raise NotImplementedError
+
+    def user_interactions(self, user_id, limit):
+        raise NotImplementedError
+
+    def user_preferences(self, user_id):
+        """{'user_preferences': {user, preferences}} o None"""
+        raise NotImplementedError
+
+    # -- Recomendador ------------------------------------------------------
+
+    def user_profiles(self, user_ids):
+        """{user_id: UserProfile} de los usuarios que existen"""
+        raise NotImplementedError
+
+    async def user_profiles_async(self, user_ids):
+        raise NotImplementedError
+
+    def user_likes(self, user_id):
+        """(películas con like, películas vistas) o None si el usuario no existe"""
+        raise NotImplementedError
+
+    def content_recommendations(self, user_id, limit):
+        """[(movie_id, puntaje)] por preferencias de contenido, sin las vistas"""
+        raise NotImplementedError
+
+    async def content_recommendations_async(self, user_id, limit):
+        raise NotImplementedError
+
+    def popular_for_user(self, user_id, limit):
+        """[(movie_id, puntaje)] populares que el usuario no vio"""
+        raise NotImplementedError
+
+    async def popular_for_user_async(self, user_id, limit):
+        raise NotImplementedError
+
+    def collaborative_candidates(self, user_id, limit):
+        """[(movie_id, usuarios con likes en común a los que les gustó)]"""
+        raise NotImplementedError
+
+    def iter_user_ids(self, page_size=1000):
+        """Todos los ids de usuario, por páginas ordenadas por id"""
+        raise NotImplementedError
+
+    def explanation(self, user_id, movie_id, popularity_count=None):
+        """{'explanation': {movie, reasons}} o None; popularity_count evita contar los likes"""
+        raise NotImplementedError
+
+    def content_graph(self):
+        """ContentGraph del catálogo completo (para el cálculo por lotes sin grafo en memoria)"""
+        raise NotImplementedError
+
+
+def get_repository():
+    """Repositorio del proceso; por defecto el de Neo4j"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                from repositories.neo4j_repository import Neo4jRepository
+                _repository = Neo4jRepository()
+    return _repository
+
+
+def set_repository(repository):
+    """Reemplaza el repositorio del proceso (p. ej. uno en memoria en pruebas y benchmarks)"""
+    global _repository
+    with _repository_lock:
+        _repository = repository
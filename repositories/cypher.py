@@ -0,0 +1,60 @@
+"""Piezas de Cypher compartidas por las consultas de Neo4jRepository.
+
+Proyección de películas: cada relación (géneros, actores, directores,
+temporadas) se lee con su propia pattern comprehension, así que una
+película con 30 actores y 5 géneros produce una sola fila en lugar del
+producto cartesiano de varios OPTIONAL MATCH que luego colapsa
+COLLECT(DISTINCT ...). Las variables internas llevan el prefijo proj_ para
+no chocar con las de la consulta.
+
+Paginación por cursor: cada listado se ordena por (llave de orden, id) y la
+página siguiente empieza después de la última pareja vista.
+"""
+
+
+def keyset_where(sort_expr, id_expr):
+    """Condición Cypher para continuar después de ($after_key, $after_id)"""
+    return (f"($after_key IS NULL OR {sort_expr} > $after_key "
+            f"OR ({sort_expr} = $after_key AND {id_expr} > $after_id))")
+
+
+def keyset_params(after):
+    after_key, after_id = after if after else (None, None)
+    return {"after_key": after_key, "after_id": after_id}
+
+
+def distinct_names(pattern, expr):
+    """Lista sin nulos ni repetidos de `expr` para cada coincidencia de `pattern` (como COLLECT(DISTINCT))"""
+    return (f"reduce(proj_acc = [], proj_name IN [{pattern} WHERE {expr} IS NOT NULL | {expr}] | "
+            f"CASE WHEN proj_name IN proj_acc THEN proj_acc ELSE proj_acc + proj_name END)")
+
+
+def _slice(expr, limit):
+    return f"{expr}[0..{limit}]" if limit is not None else expr
+
+
+def relation_lists(var="m", actor_limit=3, genre_limit=None):
+    """Campos genres, actors, directors y seasons de la película `var`"""
+    return {
+        "genres": _slice(distinct_names(f"({var})-[:HAS_GENRE]->(proj_g:Genre)", "proj_g.name"), genre_limit),
+        "actors": _slice(distinct_names(f"({var})-[:HAS_ACTOR]->(proj_a:Actor)", "proj_a.name"), actor_limit),
+        "directors": distinct_names(f"({var})-[:DIRECTED_BY]->(proj_d:Director)", "proj_d.name"),
+        "seasons": distinct_names(f"({var})-[:APPROPIATE_FOR_SEASON]->(proj_s)",
+                                  "coalesce(proj_s.name, proj_s.nombre)"),
+    }
+
+
+def movie_projection(var="m", actor_limit=3, **overrides):
+    """`var {.id, .title, .year, .description, genres, actors, directors, seasons} AS movie`
+
+    actor_limit: máximo de actores (None = todos). overrides reemplaza o
+    agrega campos, p. ej. seasons="[coalesce(s.name, s.nombre)]" o
+    popularity="positive_interactions".
+    """
+    fields = relation_lists(var, actor_limit)
+    fields.update(overrides)
+    body = ",\n            ".join([".id", ".title", ".year", ".description"] +
+                                  [f"{name}: {expr}" for name, expr in fields.items()])
+    return f"""{var} {{
+            {body}
+        }} AS movie"""
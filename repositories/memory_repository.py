@@ -0,0 +1,572 @@
+"""Repository en memoria: la API completa sin una base Neo4j.
+
+MemoryGraph guarda nodos y relaciones en dicts; MemoryRepository responde
+sobre él lo mismo que Neo4jRepository, con las mismas filas. Sirve para
+pruebas y para medir la parte de Python (armado de JSON, recomendador) sin
+una base en marcha; los motores que leen el grafo con Cypher propio
+necesitan además el driver de testing/memory_driver.py.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from engines.content_graph import ContentGraph
+from engines.preference_store import profiles_from_rows
+from repositories.base import Repository
+
+# Paso de preferencia por categoría (los mismos de preference_store.PREFERENCE_DELTAS)
+PREFERENCE_STEPS = {"genre": 0.15, "director": 0.12, "actor": 0.08, "season": 0.05}
+PREFERENCE_RELS = {"genre": "USER_GENRE_PREFERENCE", "actor": "USER_ACTOR_PREFERENCE",
+                   "director": "USER_DIRECTOR_PREFERENCE", "season": "USER_SEASON_PREFERENCE"}
+# Peso de cada categoría en la consulta de recomendaciones de contenido
+CONTENT_WEIGHTS = {"genre": 0.5, "actor": 0.2, "director": 0.3, "season": 0.1}
+
+
+def iso(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _contains(text, needle):
+    return text is not None and needle.lower() in text.lower()
+
+
+def _after_keyset(items, after):
+    """Filtra [(sort_key, sort_id, fila)] ya ordenados para continuar después de after"""
+    if not after or after[0] is None:
+        return items
+    after_key, after_id = after
+    return [item for item in items
+            if item[0] > after_key or (item[0] == after_key and item[1] > after_id)]
+
+
+class MemoryGraph:
+    """Nodos y relaciones de la base guardados en dicts.
+
+    Las películas guardan sus entidades por categoría como {llave: peso};
+    la llave es la misma que usa el resto de la aplicación (nombre del
+    género o de la temporada, id o nombre de actores y directores).
+    """
+
+    def __init__(self):
+        self.movies = {}
+        self.genres = {}
+        self.actors = {}
+        self.directors = {}
+        self.seasons = {}
+        self.movie_entities = {}
+        self.users = {}
+        self.interactions = {}
+        self.preferences = {}
+        # Esquema (schema_migrations.py): nombres de constraints/índices y versiones aplicadas
+        self.schema_objects = set()
+        self.schema_versions = {}
+        self.lock = threading.RLock()
+
+    # -- Carga ---------------------------------------------------------------
+
+    def add_movie(self, movie_id, title, year=None, description=None,
+                  genres=(), actors=(), directors=(), seasons=()):
+        """genres: [(nombre, peso)], actors: [(id, nombre)], directors: [(id, nombre, peso)], seasons: [nombre]"""
+        with self.lock:
+            self.movies[movie_id] = {"id": movie_id, "title": title, "year": year, "description": description}
+            entities = {"genre": {}, "actor": {}, "director": {}, "season": {}}
+            for name, weight in genres:
+                self.genres.setdefault(name, {"name": name})
+                entities["genre"][name] = weight
+            for actor_id, name in actors:
+                self.actors.setdefault(actor_id, {"id": actor_id, "name": name})
+                entities["actor"][actor_id] = 1.0
+            for director_id, name, weight in directors:
+                self.directors.setdefault(director_id, {"id": director_id, "name": name})
+                entities["director"][director_id] = weight
+            for name in seasons:
+                self.seasons.setdefault(name, {"name": name})
+                entities["season"][name] = 1.0
+            self.movie_entities[movie_id] = entities
+
+    def add_user(self, user_id, email, name=None, hashed_password=None):
+        with self.lock:
+            self.users[user_id] = {"id": user_id, "email": email, "name": name,
+                                   "hashed_password": hashed_password, "created_at": iso(time.time() * 1000)}
+            self.interactions.setdefault(user_id, {})
+            self.preferences.setdefault(user_id, {category: {} for category in PREFERENCE_STEPS})
+
+    def interact(self, user_id, movie_id, interaction_type, weight, timestamp_ms=None):
+        """Registra la interacción y ajusta las preferencias; devuelve el peso anterior"""
+        with self.lock:
+            previous = self.interactions[user_id].get(movie_id, {}).get("weight", 0) or 0
+            self.interactions[user_id][movie_id] = {
+                "type": interaction_type, "weight": weight,
+                "timestamp": timestamp_ms if timestamp_ms is not None else int(time.time() * 1000)}
+            self._apply_delta(user_id, movie_id, weight - previous)
+            return previous
+
+    def _apply_delta(self, user_id, movie_id, delta):
+        if not delta:
+            return
+        prefs = self.preferences[user_id]
+        for category, step in PREFERENCE_STEPS.items():
+            for key in self.movie_entities[movie_id][category]:
+                prefs[category][key] = (prefs[category].get(key) or 0) + delta * step
+
+    def write_interactions(self, events):
+        """Aplica eventos de interaction_event como INTERACTION_WRITE_QUERY: una fila {'result'} por evento"""
+        rows = []
+        with self.lock:
+            for e in events:
+                user, movie = self.users.get(e["user_id"]), self.movies.get(e["movie_id"])
+                if user is None or movie is None:
+                    continue
+                stored = self.interactions[e["user_id"]].get(e["movie_id"])
+                # Un evento más viejo que el guardado no cambia nada
+                current = stored is None or stored["timestamp"] <= e["timestamp"]
+                if current:
+                    previous = self.interact(e["user_id"], e["movie_id"], e["type"], e["weight"], e["timestamp"])
+                else:
+                    previous = stored["weight"]
+                rows.append({"result": {
+                    "user": {"id": user["id"], "name": user["name"], "email": user["email"]},
+                    "movie": {"id": movie["id"], "title": movie["title"]},
+                    "interaction": {"type": e["type"], "weight": e["weight"], "previous_weight": previous},
+                    "status": "success" if current else "stale",
+                }})
+        return rows
+
+    def rebuild_preferences(self, user_ids):
+        """Recalcula las preferencias desde las interacciones; devuelve los usuarios reconstruidos"""
+        rebuilt = 0
+        with self.lock:
+            for user_id in user_ids:
+                if user_id not in self.users:
+                    continue
+                self.preferences[user_id] = {category: {} for category in PREFERENCE_STEPS}
+                for movie_id, r in self.interactions[user_id].items():
+                    self._apply_delta(user_id, movie_id, r["weight"] or 0)
+                rebuilt += 1
+        return rebuilt
+
+    # -- Ayudas ----------------------------------------------------------------
+
+    def entity_name(self, category, key):
+        table = {"genre": self.genres, "actor": self.actors, "director": self.directors,
+                 "season": self.seasons}[category]
+        return table.get(key, {}).get("name")
+
+    def projection(self, movie_id, actor_limit=3):
+        movie = self.movies[movie_id]
+        entities = self.movie_entities[movie_id]
+        actors = [self.actors[key]["name"] for key in entities["actor"]]
+        return dict(movie,
+                    genres=list(entities["genre"]),
+                    actors=actors[:actor_limit] if actor_limit is not None else actors,
+                    directors=[self.directors[key]["name"] for key in entities["director"]],
+                    seasons=list(entities["season"]))
+
+    def positive_counts(self, since_ms=None):
+        counts = {}
+        for interactions in self.interactions.values():
+            for movie_id, interaction in interactions.items():
+                if interaction["weight"] > 0 and (since_ms is None or interaction["timestamp"] >= since_ms):
+                    counts[movie_id] = counts.get(movie_id, 0) + 1
+        return counts
+
+    def profile_rows(self, user_ids):
+        """Filas de USER_PROFILE_QUERY (ver preference_store.profiles_from_rows)"""
+        rows = []
+        for user_id in user_ids:
+            if user_id not in self.users:
+                continue
+            rows.append({
+                "user_id": user_id,
+                "interactions": [{"movie_id": movie_id, "weight": r["weight"]}
+                                 for movie_id, r in self.interactions[user_id].items()],
+                "prefs": [{"rel": PREFERENCE_RELS[category], "key": key, "weight": weight}
+                          for category, prefs in self.preferences[user_id].items() for key, weight in prefs.items()],
+            })
+        return rows
+
+    def edges(self, category, value):
+        """[{movie_id, key, name|weight}] de una categoría, como las consultas de ContentGraph.load"""
+        return [{"movie_id": movie_id, "key": key,
+                 value: weight if value == "weight" else self.entity_name(category, key)}
+                for movie_id, entities in self.movie_entities.items()
+                for key, weight in entities[category].items()]
+
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.graph.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MemoryRepository(Repository):
+    """Repository sobre un MemoryGraph; los métodos *_async solo llaman a los síncronos"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    # -- Catálogo ----------------------------------------------------------
+
+    @_locked
+    def movies_by_ids(self, movie_ids):
+        g = self.graph
+        return [g.projection(movie_id, actor_limit=None) for movie_id in movie_ids if movie_id in g.movies]
+
+    async def movies_by_ids_async(self, movie_ids):
+        return self.movies_by_ids(movie_ids)
+
+    @_locked
+    def random_movie_ids(self, limit):
+        ids = list(self.graph.movies)
+        return random.sample(ids, min(limit, len(ids)))
+
+    def _movies_sorted(self, after):
+        items = sorted(((movie["title"] or "", movie["id"] or "", movie["id"]) for movie in self.graph.movies.values()),
+                       key=lambda item: item[:2])
+        return [movie_id for _, _, movie_id in _after_keyset(items, after)]
+
+    @_locked
+    def movie_ids_page(self, limit, after=None):
+        return self._movies_sorted(after)[:limit]
+
+    def stream_movies(self, after=None):
+        with self.graph.lock:
+            movies = [self.graph.projection(movie_id) for movie_id in self._movies_sorted(after)]
+        yield from movies
+
+    @_locked
+    def latest_movie_ids(self, limit):
+        movies = sorted(self.graph.movies.values(), key=lambda movie: movie["year"] or 0, reverse=True)
+        return [movie["id"] for movie in movies[:limit]]
+
+    @_locked
+    def movies_by_season(self, season_name, limit=20):
+        g = self.graph
+        rows = [(g.movies[movie_id]["year"] or 0, movie_id, season)
+                for movie_id, entities in g.movie_entities.items()
+                for season in entities["season"] if _contains(season, season_name)]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [(movie_id, season) for _, movie_id, season in rows[:limit]]
+
+    @_locked
+    def search_movie_ids(self, keyword, limit=20):
+        return [movie_id for movie_id, movie in self.graph.movies.items()
+                if _contains(movie["title"], keyword)][:limit]
+
+    @_locked
+    def advanced_search_ids(self, filters, limit, after=None):
+        g = self.graph
+        filters = {name: value for name, value in filters.items() if value}
+        matches = []
+        for movie_id, movie in g.movies.items():
+            entities = g.movie_entities[movie_id]
+            if "title" in filters and not _contains(movie["title"], filters["title"]):
+                continue
+            if "genre" in filters and not any(_contains(name, filters["genre"]) for name in entities["genre"]):
+                continue
+            if "actor" in filters and not any(_contains(g.actors[key]["name"], filters["actor"])
+                                              for key in entities["actor"]):
+                continue
+            if "director" in filters and not any(_contains(g.directors[key]["name"], filters["director"])
+                                                 for key in entities["director"]):
+                continue
+            if "season" in filters and not any(_contains(name, filters["season"]) for name in entities["season"]):
+                continue
+            matches.append((movie["title"] or "", movie_id or "", movie_id))
+        return [movie_id for _, _, movie_id in _after_keyset(sorted(matches), after)[:limit]]
+
+    @_locked
+    def top_movies(self, limit, seconds=None):
+        g = self.graph
+        counts = g.positive_counts(int((time.time() - seconds) * 1000) if seconds else None)
+        ranked = sorted(g.movies.values(), key=lambda movie: (-counts.get(movie["id"], 0), -(movie["year"] or 0)))
+        return [(movie["id"], counts.get(movie["id"], 0)) for movie in ranked[:limit]]
+
+    # -- Actores, directores y géneros -------------------------------------
+
+    def _people(self, table, alias, after):
+        items = sorted((person["name"] or "", person["id"], person) for person in table.values()
+                       if person["id"] is not None)
+        return [{alias: {"id": person["id"], "name": person["name"]}} for _, _, person in _after_keyset(items, after)]
+
+    @_locked
+    def get_actor(self, actor_id):
+        actor = self.graph.actors.get(actor_id)
+        return {"actor": {"id": actor["id"], "name": actor["name"]}} if actor else None
+
+    @_locked
+    def actors_page(self, limit, after=None):
+        return self._people(self.graph.actors, "actor", after)[:limit]
+
+    def stream_actors(self, after=None):
+        with self.graph.lock:
+            actors = self._people(self.graph.actors, "actor", after)
+        yield from actors
+
+    @_locked
+    def search_actors(self, keyword, limit=20):
+        return [{"actor": {"id": actor["id"], "name": actor["name"]}} for actor in self.graph.actors.values()
+                if _contains(actor["name"], keyword)][:limit]
+
+    @_locked
+    def movies_by_actor(self, actor_name, limit=20):
+        g = self.graph
+        movies = [g.movies[movie_id] for movie_id, entities in g.movie_entities.items()
+                  if any(g.actors[key]["name"] == actor_name for key in entities["actor"])]
+        movies.sort(key=lambda movie: movie["year"] or 0, reverse=True)
+        return [{"movie": {"id": m["id"], "title": m["title"], "year": m["year"]}} for m in movies[:limit]]
+
+    @_locked
+    def get_director(self, director_id):
+        director = self.graph.directors.get(director_id)
+        return {"director": {"id": director["id"], "name": director["name"]}} if director else None
+
+    @_locked
+    def directors_page(self, limit, after=None):
+        return self._people(self.graph.directors, "director", after)[:limit]
+
+    def stream_directors(self, after=None):
+        with self.graph.lock:
+            directors = self._people(self.graph.directors, "director", after)
+        yield from directors
+
+    @_locked
+    def movies_by_director(self, director_name, min_weight, limit=20):
+        g = self.graph
+        rows = [(weight, g.movies[movie_id]) for movie_id, entities in g.movie_entities.items()
+                for key, weight in entities["director"].items()
+                if g.directors[key]["name"] == director_name and weight >= min_weight]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [{"movie": {"id": m["id"], "title": m["title"], "year": m["year"], "director_weight": weight}}
+                for weight, m in rows[:limit]]
+
+    @_locked
+    def get_genre(self, genre_name):
+        return {"genre": {"name": genre_name}} if genre_name in self.graph.genres else None
+
+    def _genres(self, after):
+        items = sorted((name, name, name) for name in self.graph.genres)
+        return [{"genre": {"name": name}} for _, _, name in _after_keyset(items, after)]
+
+    @_locked
+    def genres_page(self, limit, after=None):
+        return self._genres(after)[:limit]
+
+    def stream_genres(self, after=None):
+        with self.graph.lock:
+            genres = self._genres(after)
+        yield from genres
+
+    @_locked
+    def movies_by_genre(self, genre_name, min_weight, limit=20):
+        g = self.graph
+        rows = [(entities["genre"][genre_name], g.movies[movie_id])
+                for movie_id, entities in g.movie_entities.items()
+                if genre_name in entities["genre"] and entities["genre"][genre_name] >= min_weight]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [{"movie": {"id": m["id"], "title": m["title"], "year": m["year"], "genre_weight": weight}}
+                for weight, m in rows[:limit]]
+
+    @_locked
+    def suggest(self, suggest_type, prefix, limit):
+        g = self.graph
+        prefix = prefix.lower()
+        if suggest_type == "movie":
+            pairs = [(movie["id"], movie["title"]) for movie in g.movies.values()]
+        elif suggest_type == "actor":
+            pairs = [(actor["id"] or actor["name"], actor["name"]) for actor in g.actors.values()]
+        elif suggest_type == "director":
+            pairs = [(director["id"] or director["name"], director["name"]) for director in g.directors.values()]
+        else:
+            pairs = [(name, name) for name in g.genres]
+        found = sorted((name, entity_id) for entity_id, name in pairs if name is not None and
+                       (name.lower().startswith(prefix) or f" {prefix}" in name.lower()))
+        return [{"id": entity_id, "name": name} for name, entity_id in found[:limit]]
+
+    # -- Usuarios e interacciones ------------------------------------------
+
+    @_locked
+    def create_user(self, user):
+        g = self.graph
+        g.add_user(user["id"], user["email"], user.get("name"), user.get("password_hash"))
+        created = g.users[user["id"]]
+        return {key: created[key] for key in ("id", "email", "name", "created_at")}
+
+    @staticmethod
+    def _user(user):
+        return {key: user[key] for key in ("id", "email", "name", "hashed_password")} if user else None
+
+    @_locked
+    def user_by_id(self, user_id):
+        return self._user(self.graph.users.get(user_id))
+
+    @_locked
+    def user_by_email(self, email):
+        return self._user(next((u for u in self.graph.users.values() if u["email"] == email), None))
+
+    @_locked
+    def user_summary(self, user_id):
+        user = self.graph.users.get(user_id)
+        return {"user_id": user["id"], "user_name": user["name"], "user_email": user["email"]} if user else None
+
+    async def user_summary_async(self, user_id):
+        return self.user_summary(user_id)
+
+    @_locked
+    def movie_summary(self, movie_id):
+        movie = self.graph.movies.get(movie_id)
+        return {"movie_id": movie["id"], "movie_title": movie["title"]} if movie else None
+
+    async def movie_summary_async(self, movie_id):
+        return self.movie_summary(movie_id)
+
+    def write_interactions(self, events):
+        # Como preference_store.write_interactions: de varios eventos de la misma pareja cuenta el último
+        latest = {}
+        for event in events:
+            latest[(event["user_id"], event["movie_id"])] = event
+        return self.graph.write_interactions(list(latest.values()))
+
+    async def write_interactions_async(self, events):
+        return self.write_interactions(events)
+
+    @_locked
+    def user_interactions(self, user_id, limit):
+        g = self.graph
+        items = sorted(g.interactions.get(user_id, {}).items(), key=lambda item: -item[1]["timestamp"])
+        return [{"interaction": {
+            "movie": {"id": movie_id, "title": g.movies[movie_id]["title"]},
+            "interaction": {"type": r["type"], "weight": r["weight"], "timestamp": iso(r["timestamp"])},
+        }} for movie_id, r in items[:limit]]
+
+    @_locked
+    def user_preferences(self, user_id):
+        g = self.graph
+        user = g.users.get(user_id)
+        if user is None:
+            return None
+        prefs = g.preferences[user["id"]]
+
+        def named(category):
+            return [{"name": g.entity_name(category, key), "peso": weight}
+                    for key, weight in prefs[category].items() if weight > 0.05]
+        return {"user_preferences": {
+            "user": {"id": user["id"], "name": user["name"], "email": user["email"]},
+            "preferences": {"genres": named("genre"), "directors": named("director"), "actors": named("actor")},
+        }}
+
+    # -- Recomendador ------------------------------------------------------
+
+    @_locked
+    def user_profiles(self, user_ids):
+        return profiles_from_rows(self.graph.profile_rows(user_ids))
+
+    async def user_profiles_async(self, user_ids):
+        return self.user_profiles(user_ids)
+
+    @_locked
+    def user_likes(self, user_id):
+        if user_id not in self.graph.users:
+            return None
+        interactions = self.graph.interactions[user_id]
+        return [movie_id for movie_id, r in interactions.items() if r["weight"] > 0], set(interactions)
+
+    @_locked
+    def content_recommendations(self, user_id, limit):
+        g = self.graph
+        if user_id not in g.users:
+            return []
+        prefs = g.preferences[user_id]
+        seen = g.interactions[user_id]
+        scored = []
+        for movie_id, entities in g.movie_entities.items():
+            if movie_id in seen:
+                continue
+            score = 0.0
+            for category, weight in CONTENT_WEIGHTS.items():
+                keys = entities[category]
+                if keys:
+                    score += max(weight * (prefs[category].get(key) or 0) for key in keys)
+            scored.append((score, movie_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(movie_id, round(score * 100) / 100) for score, movie_id in scored[:limit]]
+
+    async def content_recommendations_async(self, user_id, limit):
+        return self.content_recommendations(user_id, limit)
+
+    @_locked
+    def popular_for_user(self, user_id, limit):
+        g = self.graph
+        if user_id not in g.users:
+            return []
+        seen = g.interactions[user_id]
+        counts = g.positive_counts()
+
+        def score(movie_id):
+            count = counts.get(movie_id, 0)
+            return 0.9 if count > 50 else 0.7 if count > 30 else 0.5 if count > 10 else 0.3
+        ranked = sorted(((score(movie_id), movie["title"] or "", movie_id)
+                         for movie_id, movie in g.movies.items() if movie_id not in seen),
+                        key=lambda item: (-item[0], item[1]))
+        return [(movie_id, s) for s, _, movie_id in ranked[:limit]]
+
+    async def popular_for_user_async(self, user_id, limit):
+        return self.popular_for_user(user_id, limit)
+
+    @_locked
+    def collaborative_candidates(self, user_id, limit):
+        g = self.graph
+        mine = g.interactions.get(user_id)
+        if mine is None:
+            return []
+        liked = {movie_id for movie_id, r in mine.items() if r["weight"] > 0}
+        support = {}
+        for other_id, theirs in g.interactions.items():
+            if other_id == user_id or not any(m in liked and r["weight"] > 0 for m, r in theirs.items()):
+                continue
+            for movie_id, r in theirs.items():
+                if r["weight"] > 0 and movie_id not in mine:
+                    support[movie_id] = support.get(movie_id, 0) + 1
+        ranked = sorted(support.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def iter_user_ids(self, page_size=1000):
+        with self.graph.lock:
+            user_ids = sorted(self.graph.users)
+        yield from user_ids
+
+    @_locked
+    def explanation(self, user_id, movie_id, popularity_count=None):
+        g = self.graph
+        user, movie = g.users.get(user_id), g.movies.get(movie_id)
+        if user is None or movie is None:
+            return None
+        prefs = g.preferences[user["id"]]
+        entities = g.movie_entities[movie["id"]]
+
+        def matches(category, field):
+            return [{field: g.entity_name(category, key), "user_preference": prefs[category][key]}
+                    for key in entities[category]
+                    if key in prefs[category] and prefs[category][key] > 0.1]
+        if popularity_count is None:
+            popularity_count = g.positive_counts().get(movie["id"], 0)
+        return {"explanation": {
+            "movie": {"id": movie["id"], "title": movie["title"]},
+            "reasons": {
+                "matched_genres": matches("genre", "genre"),
+                "matched_actors": matches("actor", "actor"),
+                "matched_directors": matches("director", "director"),
+                "is_popular": popularity_count > 5,
+            },
+        }}
+
+    @_locked
+    def content_graph(self):
+        g = self.graph
+        movies = [{"id": m["id"], "title": m["title"], "year": m["year"]} for m in g.movies.values()]
+        edges = {category: [(row["movie_id"], row["key"], row["name"]) for row in g.edges(category, "name")]
+                 for category in PREFERENCE_STEPS}
+        return ContentGraph.from_rows(movies, edges)
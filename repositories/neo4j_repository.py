@@ -0,0 +1,669 @@
+"""Repository sobre Neo4j: las consultas Cypher de los controladores"""
+import random
+from neo4j_connection import AsyncNeo4jConnection, Neo4jConnection
+from engines.content_graph import ContentGraph
+from engines.preference_store import (iter_user_id_pages, load_profiles, load_profiles_async,
+                                      write_interactions)
+from repositories.base import Repository
+from repositories.cypher import keyset_params, keyset_where, movie_projection
+
+# -- Catálogo -----------------------------------------------------------------
+
+# Película completa (todos los actores) para una lista de ids
+MOVIES_BY_IDS_QUERY = """
+UNWIND $ids AS movie_id
+MATCH (m:Movie {id: movie_id})
+RETURN """ + movie_projection(actor_limit=None)
+
+# Películas ordenadas por (título, id) a partir de un cursor
+MOVIES_PAGE_QUERY = """
+MATCH (m:Movie)
+WITH m, coalesce(m.title, '') AS sort_key, coalesce(m.id, '') AS sort_id
+WHERE """ + keyset_where("sort_key", "sort_id") + """
+RETURN {return_clause}
+ORDER BY sort_key, sort_id
+"""
+
+# Portada al azar sin ORDER BY rand(): el total sale del conteo por etiqueta (sin recorrer
+# nada) y se lee una ventana de RANDOM_WINDOW_FACTOR * limit películas desde un salto al
+# azar; de ella se sortean las `limit` (ver Neo4jRepository.random_movie_ids)
+MOVIE_COUNT_QUERY = """
+MATCH (m:Movie)
+RETURN count(m) AS total
+"""
+
+RANDOM_MOVIES_QUERY = """
+MATCH (m:Movie)
+RETURN m.id AS id
+SKIP $skip
+LIMIT $window
+"""
+
+RANDOM_WINDOW_FACTOR = 10
+
+LATEST_MOVIES_QUERY = """
+MATCH (m:Movie)
+WITH m
+ORDER BY m.year DESC
+LIMIT $limit
+RETURN m.id AS id
+"""
+
+MOVIES_BY_SEASON_QUERY = """
+MATCH (m:Movie)-[:APPROPIATE_FOR_SEASON]->(s)
+WHERE toLower(coalesce(s.name, s.nombre)) CONTAINS toLower($season_name)
+WITH m, s
+ORDER BY m.year DESC
+LIMIT $limit
+RETURN m.id AS id, coalesce(s.name, s.nombre) AS season
+"""
+
+SEARCH_MOVIES_QUERY = """
+MATCH (m:Movie)
+WHERE toLower(m.title) CONTAINS toLower($keyword)
+WITH m
+LIMIT $limit
+RETURN m.id AS id
+"""
+
+# Un MATCH por filtro de relación; el de título va pegado al MATCH inicial
+# (detrás de otro MATCH ... WHERE sería un segundo WHERE)
+ADVANCED_SEARCH_FILTERS = {
+    "genre": """
+    MATCH (m)-[:HAS_GENRE]->(search_g:Genre)
+    WHERE toLower(search_g.name) CONTAINS toLower($genre)
+    """,
+    "actor": """
+    MATCH (m)-[:HAS_ACTOR]->(search_a:Actor)
+    WHERE toLower(search_a.name) CONTAINS toLower($actor)
+    """,
+    "director": """
+    MATCH (m)-[:DIRECTED_BY]->(search_d:Director)
+    WHERE toLower(search_d.name) CONTAINS toLower($director)
+    """,
+    "season": """
+    MATCH (m)-[:APPROPIATE_FOR_SEASON]->(search_s)
+    WHERE toLower(coalesce(search_s.name, search_s.nombre)) CONTAINS toLower($season)
+    """,
+}
+
+TOP_MOVIES_QUERY = """
+MATCH (m:Movie)
+OPTIONAL MATCH (m)<-[r:INTERACTED]-()
+WHERE r.weight > 0
+  AND ($seconds IS NULL OR r.timestamp >= datetime() - duration({seconds: $seconds}))
+WITH m, COUNT(r) AS positive_interactions
+ORDER BY positive_interactions DESC, m.year DESC
+LIMIT $limit
+RETURN m.id AS id, positive_interactions
+"""
+
+# -- Actores, directores y géneros ------------------------------------------------
+
+ACTOR_QUERY = """
+MATCH (a:Actor {id: $actor_id})
+RETURN a {.id, .name} AS actor
+"""
+
+# Actores ordenados por (nombre, id) a partir de un cursor
+ACTORS_PAGE_QUERY = """
+MATCH (a:Actor)
+WITH a, coalesce(a.name, '') AS sort_key, coalesce(a.id, '') AS sort_id
+WHERE """ + keyset_where("sort_key", "sort_id") + """
+RETURN a {.id, .name} AS actor
+ORDER BY sort_key, sort_id
+"""
+
+SEARCH_ACTORS_QUERY = """
+MATCH (a:Actor)
+WHERE toLower(a.name) CONTAINS toLower($keyword)
+RETURN a {.id, .name} AS actor
+LIMIT $limit
+"""
+
+MOVIES_BY_ACTOR_QUERY = """
+MATCH (m:Movie)-[:HAS_ACTOR]->(a:Actor {name: $actor_name})
+RETURN m {.id, .title, .year} AS movie
+ORDER BY m.year DESC
+LIMIT $limit
+"""
+
+DIRECTOR_QUERY = """
+MATCH (d:Director {id: $director_id})
+RETURN d {.id, .name} AS director
+"""
+
+# Directores ordenados por (nombre, id) a partir de un cursor
+DIRECTORS_PAGE_QUERY = """
+MATCH (d:Director)
+WITH d, coalesce(d.name, '') AS sort_key, coalesce(d.id, '') AS sort_id
+WHERE """ + keyset_where("sort_key", "sort_id") + """
+RETURN d {.id, .name} AS director
+ORDER BY sort_key, sort_id
+"""
+
+MOVIES_BY_DIRECTOR_QUERY = """
+MATCH (d:Director {name: $director_name})<-[r:DIRECTED_BY]-(m:Movie)
+WHERE r.peso >= $min_weight
+RETURN m {.id, .title, .year, director_weight: r.peso} AS movie
+ORDER BY r.peso DESC
+LIMIT $limit
+"""
+
+GENRE_QUERY = """
+MATCH (g:Genre {name: $genre_name})
+RETURN g {.name} AS genre
+"""
+
+# Géneros ordenados por nombre a partir de un cursor (el nombre es su llave)
+GENRES_PAGE_QUERY = """
+MATCH (g:Genre)
+WITH g, coalesce(g.name, '') AS sort_key
+WHERE """ + keyset_where("sort_key", "sort_key") + """
+RETURN g {.name} AS genre
+ORDER BY sort_key
+"""
+
+MOVIES_BY_GENRE_QUERY = """
+MATCH (g:Genre {name: $genre_name})<-[r:HAS_GENRE]-(m:Movie)
+WHERE r.peso >= $min_weight
+RETURN m {.id, .title, .year, genre_weight: r.peso} AS movie
+ORDER BY r.peso DESC
+LIMIT $limit
+"""
+
+# Sugerencias por tipo (solo id y nombre, sin expandir el grafo)
+SUGGEST_QUERIES = {
+    "movie": ("MATCH (x:Movie)", "x.id", "x.title"),
+    "actor": ("MATCH (x:Actor)", "coalesce(x.id, x.name)", "x.name"),
+    "director": ("MATCH (x:Director)", "coalesce(x.id, x.name)", "x.name"),
+    "genre": ("MATCH (x:Genre)", "x.name", "x.name"),
+}
+
+# -- Usuarios e interacciones ---------------------------------------------------
+
+CREATE_USER_QUERY = """
+CREATE (u:User {
+    id: $id,
+    email: $email,
+    name: $name,
+    hashed_password: $password_hash,
+    created_at: datetime()
+})
+RETURN u {.id, .email, .name, created_at: toString(datetime())} AS user
+"""
+
+USER_BY_ID_QUERY = "MATCH (u:User {id: $user_id}) RETURN u {.id, .email, .name, .hashed_password} AS user"
+
+USER_BY_EMAIL_QUERY = """
+MATCH (u:User {email: $email})
+RETURN u {.id, .email, .name, .hashed_password} AS user
+"""
+
+# Comprobaciones previas a registrar una interacción (independientes entre sí)
+USER_CHECK_QUERY = """
+MATCH (u:User {id: $user_id})
+RETURN u.id AS user_id, u.name AS user_name, u.email AS user_email
+"""
+
+MOVIE_CHECK_QUERY = """
+MATCH (m:Movie {id: $movie_id})
+RETURN m.id AS movie_id, m.title AS movie_title
+"""
+
+USER_INTERACTIONS_QUERY = """
+MATCH (u:User {id: $user_id})-[r:INTERACTED]->(m:Movie)
+RETURN {
+    movie: {id: m.id, title: m.title},
+    interaction: {type: r.type, weight: r.weight, timestamp: toString(r.timestamp)}
+} AS interaction
+ORDER BY r.timestamp DESC
+LIMIT $limit
+"""
+
+USER_PREFERENCES_QUERY = """
+MATCH (u:User {id: $user_id})
+
+// Preferencias de géneros
+OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)
+WITH u, COLLECT({name: g.name, peso: pg.peso}) AS genre_prefs
+
+// Preferencias de directores
+OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)
+WITH u, genre_prefs, COLLECT({name: d.name, peso: pd.peso}) AS director_prefs
+
+// Preferencias de actores
+OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)
+WITH u, genre_prefs, director_prefs, COLLECT({name: a.name, peso: pa.peso}) AS actor_prefs
+
+RETURN {
+    user: {id: u.id, name: u.name, email: u.email},
+    preferences: {
+        genres: [x IN genre_prefs WHERE x.peso > 0.05 | x],
+        directors: [x IN director_prefs WHERE x.peso > 0.05 | x],
+        actors: [x IN actor_prefs WHERE x.peso > 0.05 | x]
+    }
+} AS user_preferences
+"""
+
+# -- Recomendador ---------------------------------------------------------------
+
+# Películas con like (semillas del PageRank y del filtrado por ítems) y todas las vistas
+USER_LIKES_QUERY = """
+MATCH (u:User {id: $user_id})
+OPTIONAL MATCH (u)-[r:INTERACTED]->(m:Movie)
+RETURN COLLECT(m.id) AS seen,
+       COLLECT(CASE WHEN r.weight > 0 THEN m.id END) AS liked
+"""
+
+# Recomendaciones de contenido calculadas en Neo4j (sin grafo en memoria)
+CONTENT_RECOMMENDATIONS_QUERY = """
+MATCH (u:User {id: $user_id})
+
+// 1. PREFERENCIAS DE GÉNERO (50% peso)
+OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)
+WITH u, COLLECT({genre: g, weight: pg.peso}) AS genre_prefs
+
+// 2. PREFERENCIAS DE ACTORES (20% peso)
+OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)
+WITH u, genre_prefs, COLLECT({actor: a, weight: pa.peso}) AS actor_prefs
+
+// 3. PREFERENCIAS DE DIRECTORES (30% peso)
+OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)
+WITH u, genre_prefs, actor_prefs, COLLECT({director: d, weight: pd.peso}) AS director_prefs
+
+// 4. PREFERENCIAS DE TEMPORADA (opcional)
+OPTIONAL MATCH (u)-[ps:USER_SEASON_PREFERENCE]->(s)
+WITH u, genre_prefs, actor_prefs, director_prefs, COLLECT({season: s, weight: ps.peso}) AS season_prefs
+
+CALL {
+    WITH u, genre_prefs, actor_prefs, director_prefs, season_prefs
+
+    MATCH (m:Movie)
+    WHERE NOT EXISTS((u)-[:INTERACTED]->(m))
+
+    // 1. Puntaje por géneros
+    OPTIONAL MATCH (m)-[:HAS_GENRE]->(mg:Genre)
+    WITH m, genre_prefs, actor_prefs, director_prefs, season_prefs,
+         REDUCE(s = 0, gp IN genre_prefs |
+           CASE WHEN mg = gp.genre THEN s + gp.weight * 0.5 ELSE s END) AS genre_score
+
+    // 2. Puntaje por actores
+    OPTIONAL MATCH (m)-[:HAS_ACTOR]->(ma:Actor)
+    WITH m, genre_score, actor_prefs, director_prefs, season_prefs,
+         genre_score + REDUCE(s = 0, ap IN actor_prefs |
+           CASE WHEN ma = ap.actor THEN s + ap.weight * 0.2 ELSE s END) AS actor_score
+
+    // 3. Puntaje por directores
+    OPTIONAL MATCH (m)-[:DIRECTED_BY]->(md:Director)
+    WITH m, genre_score, actor_score, director_prefs, season_prefs,
+         actor_score + REDUCE(s = 0, dp IN director_prefs |
+           CASE WHEN md = dp.director THEN s + dp.weight * 0.3 ELSE s END) AS director_score
+
+    // 4. Puntaje por temporada (opcional)
+    OPTIONAL MATCH (m)-[:APPROPIATE_FOR_SEASON]->(ms)
+    WITH m, genre_score, actor_score, director_score, season_prefs,
+         director_score + REDUCE(s = 0, sp IN season_prefs |
+           CASE WHEN ms = sp.season THEN s + sp.weight * 0.1 ELSE s END) AS final_score
+
+    RETURN m, max(final_score) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+}
+
+// Solo ids y puntajes; las tarjetas salen de la caché
+RETURN m.id AS id, round(score * 100) / 100 AS score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+# Fallback: películas populares que el usuario no ha visto
+POPULAR_MOVIES_QUERY = """
+MATCH (u:User {id: $user_id})
+MATCH (m:Movie)
+WHERE NOT EXISTS((u)-[:INTERACTED]->(m))
+
+OPTIONAL MATCH (m)<-[int:INTERACTED]-() WHERE int.weight > 0
+WITH m, COUNT(int) AS popularity
+
+WITH m,
+     CASE
+        WHEN popularity > 50 THEN 0.9
+        WHEN popularity > 30 THEN 0.7
+        WHEN popularity > 10 THEN 0.5
+        ELSE 0.3
+     END AS score
+ORDER BY score DESC, m.title
+LIMIT $limit
+RETURN m.id AS id, score
+"""
+
+# Candidatos colaborativos: lo que les gustó a usuarios con likes en común
+COLLABORATIVE_CANDIDATES_QUERY = """
+MATCH (u:User {id: $user_id})-[r1:INTERACTED]->(:Movie)<-[r2:INTERACTED]-(other:User)-[r3:INTERACTED]->(m:Movie)
+WHERE r1.weight > 0 AND r2.weight > 0 AND r3.weight > 0 AND other <> u
+  AND NOT EXISTS((u)-[:INTERACTED]->(m))
+WITH m, count(DISTINCT other) AS support
+ORDER BY support DESC, m.id
+LIMIT $limit
+RETURN m.id AS id, support AS score
+"""
+
+EXPLANATION_QUERY = """
+MATCH (u:User {id: $user_id}), (m:Movie {id: $movie_id})
+
+OPTIONAL MATCH (u)-[pg:USER_GENRE_PREFERENCE]->(g:Genre)<-[:HAS_GENRE]-(m)
+WITH u, m, COLLECT({genre: g.name, weight: pg.peso}) AS genre_matches
+
+OPTIONAL MATCH (u)-[pa:USER_ACTOR_PREFERENCE]->(a:Actor)<-[:HAS_ACTOR]-(m)
+WITH u, m, genre_matches, COLLECT({actor: a.name, weight: pa.peso}) AS actor_matches
+
+OPTIONAL MATCH (u)-[pd:USER_DIRECTOR_PREFERENCE]->(d:Director)<-[:DIRECTED_BY]-(m)
+WITH u, m, genre_matches, actor_matches, COLLECT({director: d.name, weight: pd.peso}) AS director_matches
+{popularity_clause}
+RETURN {
+    movie: {id: m.id, title: m.title},
+    reasons: {
+        matched_genres: [x IN genre_matches WHERE x.weight > 0.1 | {
+            genre: x.genre,
+            user_preference: x.weight
+        }],
+        matched_actors: [x IN actor_matches WHERE x.weight > 0.1 | {
+            actor: x.actor,
+            user_preference: x.weight
+        }],
+        matched_directors: [x IN director_matches WHERE x.weight > 0.1 | {
+            director: x.director,
+            user_preference: x.weight
+        }],
+        is_popular: popularity_count > 5
+    }
+} AS explanation
+"""
+
+# La popularidad sale del índice en memoria (si está) en lugar de contar INTERACTED
+GIVEN_POPULARITY_CLAUSE = """
+WITH u, m, genre_matches, actor_matches, director_matches,
+     $popularity_count AS popularity_count
+"""
+
+COUNTED_POPULARITY_CLAUSE = """
+OPTIONAL MATCH (m)<-[int:INTERACTED]-() WHERE int.weight > 0
+WITH u, m, genre_matches, actor_matches, director_matches,
+     COUNT(int) AS popularity_count
+"""
+
+
+def _first(rows, column=None):
+    if not rows:
+        return None
+    return rows[0][column] if column else rows[0]
+
+
+def _scored(rows):
+    return [(row['id'], row['score']) for row in rows]
+
+
+class Neo4jRepository(Repository):
+    """Repository sobre Neo4j; cada método usa una conexión del driver compartido"""
+
+    # -- Catálogo ----------------------------------------------------------
+
+    def movies_by_ids(self, movie_ids):
+        with Neo4jConnection() as conn:
+            results = conn.query(MOVIES_BY_IDS_QUERY, {"ids": list(movie_ids)}, name="Neo4jRepository.movies_by_ids")
+        return [result['movie'] for result in results]
+
+    async def movies_by_ids_async(self, movie_ids):
+        async with AsyncNeo4jConnection() as conn:
+            results = await conn.query(MOVIES_BY_IDS_QUERY, {"ids": list(movie_ids)},
+                                       name="Neo4jRepository.movies_by_ids_async")
+        return [result['movie'] for result in results]
+
+    # Los ayudantes reciben el nombre de la consulta: si no, caller_name() los daría a
+    # ellos y las métricas, /debug/slow y los planes capturados mezclarían consultas
+    def _ids(self, query, params, name):
+        with Neo4jConnection() as conn:
+            return [result['id'] for result in conn.query(query, params, name=name)]
+
+    def random_movie_ids(self, limit):
+        # Sin ordenar el catálogo: memoria O(limit) y un recorrido que se corta en skip + window
+        with Neo4jConnection() as conn:
+            total = conn.query(MOVIE_COUNT_QUERY, name="Neo4jRepository.movie_count")[0]['total']
+            window = min(total, limit * RANDOM_WINDOW_FACTOR)
+            skip = random.randrange(total - window + 1) if total > window else 0
+            ids = [result['id'] for result in conn.query(RANDOM_MOVIES_QUERY, {"skip": skip, "window": window},
+                                                         name="Neo4jRepository.random_movie_ids")]
+        return random.sample(ids, min(limit, len(ids)))
+
+    def movie_ids_page(self, limit, after=None):
+        query = MOVIES_PAGE_QUERY.replace("{return_clause}", "m.id AS id") + "LIMIT $limit"
+        return self._ids(query, {**keyset_params(after), "limit": limit}, name="Neo4jRepository.movie_ids_page")
+
+    def stream_movies(self, after=None):
+        query = MOVIES_PAGE_QUERY.replace("{return_clause}", movie_projection())
+        with Neo4jConnection() as conn:
+            for result in conn.stream(query, keyset_params(after), name="Neo4jRepository.stream_movies"):
+                yield result['movie']
+
+    def latest_movie_ids(self, limit):
+        return self._ids(LATEST_MOVIES_QUERY, {"limit": limit}, name="Neo4jRepository.latest_movie_ids")
+
+    def movies_by_season(self, season_name, limit=20):
+        with Neo4jConnection() as conn:
+            results = conn.query(MOVIES_BY_SEASON_QUERY, {"season_name": season_name, "limit": limit},
+                                 name="Neo4jRepository.movies_by_season")
+        return [(result['id'], result['season']) for result in results]
+
+    def search_movie_ids(self, keyword, limit=20):
+        return self._ids(SEARCH_MOVIES_QUERY, {"keyword": keyword, "limit": limit},
+                         name="Neo4jRepository.search_movie_ids")
+
+    def advanced_search_ids(self, filters, limit, after=None):
+        query = """
+        MATCH (m:Movie)
+        """
+        params = {}
+        if filters.get('title'):
+            query += """
+            WHERE toLower(m.title) CONTAINS toLower($title)
+            """
+            params['title'] = filters['title']
+        for name, clause in ADVANCED_SEARCH_FILTERS.items():
+            if filters.get(name):
+                query += clause
+                params[name] = filters[name]
+        query += """
+        WITH DISTINCT m
+        WITH m, coalesce(m.title, '') AS sort_key, coalesce(m.id, '') AS sort_id
+        WHERE """ + keyset_where("sort_key", "sort_id") + """
+        RETURN m.id AS id
+        ORDER BY sort_key, sort_id
+        LIMIT $limit
+        """
+        params.update(keyset_params(after), limit=limit)
+        return self._ids(query, params, name="Neo4jRepository.advanced_search_ids")
+
+    def top_movies(self, limit, seconds=None):
+        with Neo4jConnection() as conn:
+            results = conn.query(TOP_MOVIES_QUERY, {"limit": limit, "seconds": seconds},
+                                 name="Neo4jRepository.top_movies")
+        return [(result['id'], result['positive_interactions']) for result in results]
+
+    # -- Actores, directores y géneros -------------------------------------
+
+    def _one(self, query, params, name):
+        with Neo4jConnection() as conn:
+            return _first(conn.query(query, params, name=name))
+
+    def _rows(self, query, params, name):
+        with Neo4jConnection() as conn:
+            return conn.query(query, params, name=name)
+
+    def _page(self, query, limit, after, name):
+        return self._rows(query + "LIMIT $limit", {**keyset_params(after), "limit": limit}, name=name)
+
+    def _stream(self, query, after, name):
+        with Neo4jConnection() as conn:
+            yield from conn.stream(query, keyset_params(after), name=name)
+
+    def get_actor(self, actor_id):
+        return self._one(ACTOR_QUERY, {"actor_id": actor_id}, name="Neo4jRepository.get_actor")
+
+    def actors_page(self, limit, after=None):
+        return self._page(ACTORS_PAGE_QUERY, limit, after, name="Neo4jRepository.actors_page")
+
+    def stream_actors(self, after=None):
+        return self._stream(ACTORS_PAGE_QUERY, after, name="Neo4jRepository.stream_actors")
+
+    def search_actors(self, keyword, limit=20):
+        return self._rows(SEARCH_ACTORS_QUERY, {"keyword": keyword, "limit": limit},
+                          name="Neo4jRepository.search_actors")
+
+    def movies_by_actor(self, actor_name, limit=20):
+        return self._rows(MOVIES_BY_ACTOR_QUERY, {"actor_name": actor_name, "limit": limit},
+                          name="Neo4jRepository.movies_by_actor")
+
+    def get_director(self, director_id):
+        return self._one(DIRECTOR_QUERY, {"director_id": director_id}, name="Neo4jRepository.get_director")
+
+    def directors_page(self, limit, after=None):
+        return self._page(DIRECTORS_PAGE_QUERY, limit, after, name="Neo4jRepository.directors_page")
+
+    def stream_directors(self, after=None):
+        return self._stream(DIRECTORS_PAGE_QUERY, after, name="Neo4jRepository.stream_directors")
+
+    def movies_by_director(self, director_name, min_weight, limit=20):
+        return self._rows(MOVIES_BY_DIRECTOR_QUERY,
+                          {"director_name": director_name, "min_weight": min_weight, "limit": limit},
+                          name="Neo4jRepository.movies_by_director")
+
+    def get_genre(self, genre_name):
+        return self._one(GENRE_QUERY, {"genre_name": genre_name}, name="Neo4jRepository.get_genre")
+
+    def genres_page(self, limit, after=None):
+        return self._page(GENRES_PAGE_QUERY, limit, after, name="Neo4jRepository.genres_page")
+
+    def stream_genres(self, after=None):
+        return self._stream(GENRES_PAGE_QUERY, after, name="Neo4jRepository.stream_genres")
+
+    def movies_by_genre(self, genre_name, min_weight, limit=20):
+        return self._rows(MOVIES_BY_GENRE_QUERY,
+                          {"genre_name": genre_name, "min_weight": min_weight, "limit": limit},
+                          name="Neo4jRepository.movies_by_genre")
+
+    def suggest(self, suggest_type, prefix, limit):
+        match, id_expr, name_expr = SUGGEST_QUERIES[suggest_type]
+        query = f"""
+        {match}
+        WHERE toLower({name_expr}) STARTS WITH toLower($q)
+           OR toLower({name_expr}) CONTAINS ' ' + toLower($q)
+        RETURN {id_expr} AS id, {name_expr} AS name
+        ORDER BY name
+        LIMIT $limit
+        """
+        return self._rows(query, {"q": prefix, "limit": limit}, name=f"Neo4jRepository.suggest.{suggest_type}")
+
+    # -- Usuarios e interacciones ------------------------------------------
+
+    def create_user(self, user):
+        with Neo4jConnection() as conn:
+            return conn.query(CREATE_USER_QUERY, user, name="Neo4jRepository.create_user")[0]['user']
+
+    def user_by_id(self, user_id):
+        with Neo4jConnection() as conn:
+            return _first(conn.query(USER_BY_ID_QUERY, {"user_id": user_id},
+                                     name="Neo4jRepository.user_by_id"), 'user')
+
+    def user_by_email(self, email):
+        with Neo4jConnection() as conn:
+            return _first(conn.query(USER_BY_EMAIL_QUERY, {"email": email},
+                                     name="Neo4jRepository.user_by_email"), 'user')
+
+    def user_summary(self, user_id):
+        return self._one(USER_CHECK_QUERY, {"user_id": user_id}, name="Neo4jRepository.user_summary")
+
+    async def user_summary_async(self, user_id):
+        async with AsyncNeo4jConnection() as conn:
+            return _first(await conn.query(USER_CHECK_QUERY, {"user_id": user_id},
+                                           name="Neo4jRepository.user_summary_async"))
+
+    def movie_summary(self, movie_id):
+        return self._one(MOVIE_CHECK_QUERY, {"movie_id": movie_id}, name="Neo4jRepository.movie_summary")
+
+    async def movie_summary_async(self, movie_id):
+        async with AsyncNeo4jConnection() as conn:
+            return _first(await conn.query(MOVIE_CHECK_QUERY, {"movie_id": movie_id},
+                                           name="Neo4jRepository.movie_summary_async"))
+
+    def write_interactions(self, events):
+        with Neo4jConnection() as conn:
+            return write_interactions(conn, events)
+
+    async def write_interactions_async(self, events):
+        async with AsyncNeo4jConnection() as conn:
+            return await write_interactions(conn, events)
+
+    def user_interactions(self, user_id, limit):
+        return self._rows(USER_INTERACTIONS_QUERY, {"user_id": user_id, "limit": limit},
+                          name="Neo4jRepository.user_interactions")
+
+    def user_preferences(self, user_id):
+        return self._one(USER_PREFERENCES_QUERY, {"user_id": user_id}, name="Neo4jRepository.user_preferences")
+
+    # -- Recomendador ------------------------------------------------------
+
+    def user_profiles(self, user_ids):
+        with Neo4jConnection() as conn:
+            return load_profiles(conn, user_ids)
+
+    async def user_profiles_async(self, user_ids):
+        async with AsyncNeo4jConnection() as conn:
+            return await load_profiles_async(conn, user_ids)
+
+    def user_likes(self, user_id):
+        result = self._one(USER_LIKES_QUERY, {"user_id": user_id}, name="Neo4jRepository.user_likes")
+        if result is None:
+            return None
+        return result['liked'], set(result['seen'])
+
+    def content_recommendations(self, user_id, limit):
+        return _scored(self._rows(CONTENT_RECOMMENDATIONS_QUERY, {"user_id": user_id, "limit": limit},
+                                  name="Neo4jRepository.content_recommendations"))
+
+    async def content_recommendations_async(self, user_id, limit):
+        async with AsyncNeo4jConnection() as conn:
+            return _scored(await conn.query(CONTENT_RECOMMENDATIONS_QUERY, {"user_id": user_id, "limit": limit},
+                                            name="Neo4jRepository.content_recommendations_async"))
+
+    def popular_for_user(self, user_id, limit):
+        return _scored(self._rows(POPULAR_MOVIES_QUERY, {"user_id": user_id, "limit": limit},
+                                  name="Neo4jRepository.popular_for_user"))
+
+    async def popular_for_user_async(self, user_id, limit):
+        async with AsyncNeo4jConnection() as conn:
+            return _scored(await conn.query(POPULAR_MOVIES_QUERY, {"user_id": user_id, "limit": limit},
+                                            name="Neo4jRepository.popular_for_user_async"))
+
+    def collaborative_candidates(self, user_id, limit):
+        return _scored(self._rows(COLLABORATIVE_CANDIDATES_QUERY, {"user_id": user_id, "limit": limit},
+                                  name="Neo4jRepository.collaborative_candidates"))
+
+    def iter_user_ids(self, page_size=1000):
+        with Neo4jConnection() as conn:
+            for page in iter_user_id_pages(conn, page_size):
+                yield from page
+
+    def explanation(self, user_id, movie_id, popularity_count=None):
+        params = {"user_id": user_id, "movie_id": movie_id}
+        if popularity_count is not None:
+            clause = GIVEN_POPULARITY_CLAUSE
+            params["popularity_count"] = popularity_count
+        else:
+            clause = COUNTED_POPULARITY_CLAUSE
+        return self._one(EXPLANATION_QUERY.replace("{popularity_clause}", clause), params,
+                         name="Neo4jRepository.explanation")
+
+    def content_graph(self):
+        with Neo4jConnection() as conn:
+            return ContentGraph.load(conn)
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from controllers.actor_controller import ActorController
+from routes.listing import page_args, paginated, stream_format, streamed
 
 actors_bp = Blueprint('actors', __name__)
 
@@ -12,8 +13,16 @@ def get_actor(actor_id):
 
 @actors_bp.route('/actors')
 def get_all_actors():
-    actors = ActorController.get_all_actors()
-    return jsonify(actors)
+    """Actores por nombre: ?limit=&cursor= (siguiente en X-Next-Cursor) o ?stream=ndjson|json"""
+    try:
+        limit, after = page_args()
+        fmt = stream_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt:
+        return streamed(ActorController.stream_actors(after), fmt)
+    actors = ActorController.get_all_actors(limit, after)
+    return paginated(actors, limit, lambda item: (item['actor']['name'] or '', item['actor']['id'] or ''))
 
 @actors_bp.route('/actors/search')
 def search_actors():
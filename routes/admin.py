@@ -0,0 +1,23 @@
+"""Rutas de operación protegidas con el token de ADMIN_TOKEN."""
+import hmac
+import os
+from functools import wraps
+from flask import jsonify, request
+
+
+def admin_token():
+    return os.getenv("ADMIN_TOKEN", "")
+
+
+def admin_required(view):
+    """Exige Authorization: Bearer <ADMIN_TOKEN>; sin ADMIN_TOKEN definido la ruta queda deshabilitada"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = admin_token()
+        if not token:
+            return jsonify({"error": "Ruta de administración deshabilitada: definir ADMIN_TOKEN"}), 403
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(given.encode(), token.encode()):
+            return jsonify({"error": "Token de administración inválido"}), 401
+        return view(*args, **kwargs)
+    return wrapper
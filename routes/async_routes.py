@@ -0,0 +1,50 @@
+from quart import Blueprint, request, jsonify
+from controllers.movieRecommender_controller import ALGORITHMS, AsyncMovieRecommenderController
+from controllers.interaction_controller import AsyncInteractionController
+
+# Rutas con versión asíncrona (modo ASGI, ver asgi.py); mismas respuestas que
+# recommendations_routes e interaction_routes
+async_bp = Blueprint('async_routes', __name__)
+
+@async_bp.route('/recommendations/<user_id>')
+async def get_recommendations(user_id):
+    """Obtiene recomendaciones personalizadas para un usuario"""
+    limit = request.args.get('limit', default=10, type=int)
+    algo = request.args.get('algo', default='content', type=str)
+    if algo not in ALGORITHMS:
+        return jsonify({"error": f"El parámetro 'algo' debe ser uno de: {', '.join(ALGORITHMS)}"}), 400
+
+    try:
+        recommendations = await AsyncMovieRecommenderController.get_recommendations_for_user(user_id, limit, algo)
+
+        if not recommendations:
+            return jsonify({
+                "message": "No se encontraron recomendaciones",
+                "recommendations": []
+            }), 200
+
+        return jsonify({
+            "user_id": user_id,
+            "total_recommendations": len(recommendations),
+            "recommendations": recommendations
+        })
+
+    except Exception as e:
+        return jsonify({"error": f"Error al generar recomendaciones: {str(e)}"}), 500
+
+@async_bp.route('/interact', methods=['POST'])
+async def add_interaction():
+    data = await request.get_json()
+    try:
+        result = await AsyncInteractionController.add_interaction(
+            user_id=data['user_id'],
+            movie_id=data['movie_id'],
+            interaction_type=data['type']
+        )
+        return jsonify(result), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve), "status": "validation_error"}), 400
+    except KeyError as ke:
+        return jsonify({"error": f"Campo faltante: {str(ke)}", "status": "missing_field"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "server_error"}), 500
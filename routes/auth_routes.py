@@ -1,12 +1,15 @@
 from flask import Blueprint, request, jsonify
 from controllers.auth_controller import AuthController
+from telemetry import get_logger
+
+log = get_logger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
-    print("Datos recibidos:", request.json)
     data = request.get_json()
+    log.debug("Registro solicitado para: %s", data.get('email'))
     try:
         if not data.get('email') or not data.get('password'):
             return jsonify({"error": "Email and password are required"}), 400
@@ -27,7 +30,7 @@ def register():
         }), 201
         
     except Exception as e:
-        print("Error en registro:", str(e))
+        log.error("Error en registro: %s", e)
         return jsonify({"error": str(e)}), 400
 
 @auth_bp.route('/login', methods=['POST'])
@@ -51,5 +54,5 @@ def login():
         })
         
     except Exception as e:
-        print("Error en login:", str(e))
+        log.error("Error en login: %s", e)
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
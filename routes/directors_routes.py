@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from controllers.director_controller import DirectorController
+from routes.listing import page_args, paginated, stream_format, streamed
 
 directors_bp = Blueprint('directors', __name__)
 
@@ -12,8 +13,16 @@ def get_director(director_id):
 
 @directors_bp.route('/directors')
 def get_all_directors():
-    directors = DirectorController.get_all_directors()
-    return jsonify(directors)
+    """Directores por nombre: ?limit=&cursor= (siguiente en X-Next-Cursor) o ?stream=ndjson|json"""
+    try:
+        limit, after = page_args()
+        fmt = stream_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt:
+        return streamed(DirectorController.stream_directors(after), fmt)
+    directors = DirectorController.get_all_directors(limit, after)
+    return paginated(directors, limit, lambda item: (item['director']['name'] or '', item['director']['id'] or ''))
 
 @directors_bp.route('/directors/<director_name>/movies')
 def get_movies_by_director(director_name):
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from controllers.genre_controller import GenreController
+from routes.listing import page_args, paginated, stream_format, streamed
 
 genres_bp = Blueprint('genres', __name__)
 
@@ -12,8 +13,16 @@ def get_genre(genre_name):
 
 @genres_bp.route('/genres')
 def get_all_genres():
-    genres = GenreController.get_all_genres()
-    return jsonify(genres)
+    """Géneros por nombre: ?limit=&cursor= (siguiente en X-Next-Cursor) o ?stream=ndjson|json"""
+    try:
+        limit, after = page_args()
+        fmt = stream_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt:
+        return streamed(GenreController.stream_genres(after), fmt)
+    genres = GenreController.get_all_genres(limit, after)
+    return paginated(genres, limit, lambda item: (item['genre']['name'] or '', item['genre']['name'] or ''))
 
 @genres_bp.route('/genres/<genre_name>/movies')
 def get_movies_by_genre(genre_name):
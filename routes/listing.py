@@ -0,0 +1,50 @@
+"""Respuestas de listados: páginas con cursor (X-Next-Cursor) o streaming."""
+import json
+from flask import Response, jsonify, request, stream_with_context
+from controllers.pagination import decode_cursor, encode_cursor
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_FORMATS = ("ndjson", "json")
+
+
+def page_args(default_limit=DEFAULT_PAGE_SIZE):
+    """(limit, after) desde ?limit= y ?cursor=; ValueError si el cursor no es válido"""
+    limit = request.args.get('limit', default=default_limit, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    return limit, decode_cursor(request.args.get('cursor'))
+
+
+def stream_format():
+    """Formato pedido con ?stream= (ndjson o json) o None para paginar; ValueError si no existe"""
+    fmt = request.args.get('stream')
+    if fmt and fmt not in STREAM_FORMATS:
+        raise ValueError(f"Formato de stream no soportado, usa: {', '.join(STREAM_FORMATS)}")
+    return fmt
+
+
+def paginated(items, limit, key):
+    """Lista JSON con X-Next-Cursor si la página se llenó (puede haber más)"""
+    response = jsonify(items)
+    if items and len(items) >= limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(key(items[-1]))
+    return response
+
+
+def streamed(rows, fmt):
+    """Respuesta que escribe cada fila en cuanto sale del driver (memoria constante)"""
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+    def generate_json():
+        yield "["
+        first = True
+        for row in rows:
+            yield ("" if first else ",") + json.dumps(row, ensure_ascii=False, default=str)
+            first = False
+        yield "]"
+
+    if fmt == "ndjson":
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json()), mimetype='application/json')
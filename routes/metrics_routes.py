@@ -0,0 +1,17 @@
+from flask import Blueprint, Response, jsonify, request
+from routes.admin import admin_required
+from telemetry import registry, slow_requests
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Histogramas de peticiones, controladores y consultas en formato de texto de Prometheus"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@metrics_bp.route('/debug/slow')
+@admin_required
+def slow():
+    """Últimas peticiones más lentas que TELEMETRY_SLOW_MS, con sus spans"""
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify(slow_requests.recent(max(limit, 1)))
@@ -1,5 +1,14 @@
 from flask import Blueprint, jsonify, request
 from controllers.movie_controller import MovieController
+from engines.popularity_index import WINDOWS
+from engines.card_cache import card_cache
+from engines.similar_index import get_similar_index
+from routes.admin import admin_required
+from routes.listing import page_args, paginated, stream_format, streamed
+
+
+def _title_key(movie):
+    return (movie['title'] or '', movie['id'])
 
 movies_bp = Blueprint('movies', __name__)
 
@@ -8,16 +17,42 @@ def get_movie(movie_id):
     movie = MovieController.get_movie(movie_id)
     return jsonify(movie) if movie else ("Película no encontrada", 404)
 
+@movies_bp.route('/movies/<movie_id>/similar')
+def get_similar_movies(movie_id):
+    # El índice se carga al arrancar o con `flask similar build`; nunca dentro de una petición
+    if get_similar_index() is None:
+        return jsonify({"error": "El índice de películas parecidas no está cargado"}), 503
+    limit = min(max(request.args.get('limit', default=10, type=int), 1), 100)
+    movies = MovieController.get_similar_movies(movie_id, limit)
+    return jsonify(movies) if movies is not None else ("Película no encontrada", 404)
+
 @movies_bp.route('/movies')
 def get_all_movies():
+    """Portada aleatoria por defecto; con ?sort=title, ?cursor= o ?stream= recorre el catálogo por título"""
+    if request.args.get('sort') == 'title' or request.args.get('cursor') or request.args.get('stream'):
+        try:
+            limit, after = page_args()
+            fmt = stream_format()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if fmt:
+            return streamed(MovieController.stream_movies(after), fmt)
+        return paginated(MovieController.get_movies_page(limit, after), limit, _title_key)
+
     limit = request.args.get('limit', default=50, type=int)
-    movies = MovieController.get_all_movies(limit)
+    # seed (opcional) fija el orden para paginar dentro de una sesión
+    seed = request.args.get('seed')
+    page = max(request.args.get('page', default=0, type=int), 0)
+    movies = MovieController.get_all_movies(limit, seed, page)
     return jsonify(movies)
 
 @movies_bp.route('/movies/top')
 def get_top_movies():
     limit = request.args.get('limit', default=10, type=int)
-    movies = MovieController.get_top_movies(limit)
+    window = request.args.get('window')
+    if window and window not in WINDOWS:
+        return jsonify({"error": f"Ventana no soportada, usa una de: {', '.join(WINDOWS)}"}), 400
+    movies = MovieController.get_top_movies(limit, window)
     return jsonify(movies)
 
 @movies_bp.route('/movies/latest')
@@ -53,5 +88,42 @@ def advanced_search():
     if not search_params:
         return jsonify({"error": "Al menos un parámetro de búsqueda es requerido"}), 400
     
-    movies = MovieController.advanced_search(search_params)
-    return jsonify(movies)
\ No newline at end of file
+    try:
+        limit, after = page_args(default_limit=50)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    movies = MovieController.advanced_search(search_params, limit, after)
+    return paginated(movies, limit, _title_key)
+
+@movies_bp.route('/movies/cache/stats')
+def movie_cache_stats():
+    """Aciertos, fallos y memoria de la caché de tarjetas de películas"""
+    return jsonify(card_cache.stats())
+
+@movies_bp.route('/movies/cache/invalidate', methods=['POST'])
+@admin_required
+def invalidate_movie_cache():
+    """Retira películas editadas de la caché. Body: {"movie_ids": [...]} o {"all": true}"""
+    data = request.get_json(silent=True) or {}
+    if data.get('all'):
+        card_cache.clear()
+    elif isinstance(data.get('movie_ids'), list):
+        card_cache.invalidate(data['movie_ids'])
+    else:
+        return jsonify({"error": "Se requiere 'movie_ids' (lista) o 'all': true"}), 400
+    return jsonify(card_cache.stats())
+
+@movies_bp.route('/movies/cache/refresh', methods=['POST'])
+@admin_required
+def refresh_movie_caches():
+    """Tras una carga masiva: caché de tarjetas y motores del catálogo de este proceso;
+    los demás workers recargan al ver la versión publicada.
+    Body opcional: {"movie_ids": [...]} (sin él se vacía toda la caché de tarjetas)"""
+    from ingest import publish_refresh, refresh_caches
+
+    data = request.get_json(silent=True) or {}
+    movie_ids = data.get('movie_ids')
+    if movie_ids is not None and not isinstance(movie_ids, list):
+        return jsonify({"error": "'movie_ids' debe ser una lista"}), 400
+    reloaded = refresh_caches(movie_ids)
+    return jsonify({"reloaded": reloaded, "version": publish_refresh(movie_ids)})
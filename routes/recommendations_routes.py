@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
-from controllers.movieRecommender_controller import MovieRecommenderController
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from controllers.movieRecommender_controller import ALGORITHMS, MovieRecommenderController
+from engines.recommendation_cache import recommendation_cache
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
@@ -7,9 +9,12 @@ recommendations_bp = Blueprint('recommendations', __name__)
 def get_recommendations(user_id):
     """Obtiene recomendaciones personalizadas para un usuario"""
     limit = request.args.get('limit', default=10, type=int)
+    algo = request.args.get('algo', default='content', type=str)
+    if algo not in ALGORITHMS:
+        return jsonify({"error": f"El parámetro 'algo' debe ser uno de: {', '.join(ALGORITHMS)}"}), 400
     
     try:
-        recommendations = MovieRecommenderController.get_recommendations_for_user(user_id, limit)
+        recommendations = MovieRecommenderController.get_recommendations_for_user(user_id, limit, algo)
         
         if not recommendations:
             return jsonify({
@@ -26,6 +31,43 @@ def get_recommendations(user_id):
     except Exception as e:
         return jsonify({"error": f"Error al generar recomendaciones: {str(e)}"}), 500
 
+@recommendations_bp.route('/recommendations/batch', methods=['POST'])
+def batch_recommendations():
+    """Recomendaciones para muchos usuarios en NDJSON (una línea por usuario).
+
+    Body: {"user_ids": [...], "limit": 10} o {"all_users": true, "limit": 10}
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "El body debe ser un objeto JSON"}), 400
+    user_ids = data.get('user_ids')
+    if user_ids is None and not data.get('all_users'):
+        return jsonify({"error": "Se requiere 'user_ids' o 'all_users': true"}), 400
+    if user_ids is not None and not isinstance(user_ids, list):
+        return jsonify({"error": "'user_ids' debe ser una lista"}), 400
+
+    try:
+        limit = int(data.get('limit', 10))
+        chunk_size = int(data['chunk_size']) if data.get('chunk_size') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'limit' y 'chunk_size' deben ser enteros"}), 400
+    if limit < 1 or (chunk_size is not None and chunk_size < 1):
+        return jsonify({"error": "'limit' y 'chunk_size' deben ser mayores que 0"}), 400
+
+    def generate():
+        for result in MovieRecommenderController.get_recommendations_for_users(
+                user_ids, limit, chunk_size):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@recommendations_bp.route('/recommendations/cache/stats')
+def recommendation_cache_stats():
+    """Contadores de la caché de recomendaciones (aciertos, fallos, desalojos)"""
+    return jsonify(recommendation_cache.stats())
+
 @recommendations_bp.route('/recommendations/<user_id>/explain/<movie_id>')
 def explain_recommendation(user_id, movie_id):
     """Explica por qué se recomendó una película específica"""
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify, request
+from controllers.suggest_controller import SuggestController
+from engines.suggest_index import SUGGEST_TYPES
+
+suggest_bp = Blueprint('suggest', __name__)
+
+@suggest_bp.route('/suggest')
+def suggest():
+    """Autocompletado: /suggest?q=cor&types=movie,actor&limit=8"""
+    query = request.args.get('q', default="", type=str)
+    limit = min(request.args.get('limit', default=8, type=int), 20)
+    types = [t for t in request.args.get('types', default="", type=str).split(',') if t]
+    invalid = [t for t in types if t not in SUGGEST_TYPES]
+    if invalid:
+        return jsonify({"error": f"Tipos no soportados: {', '.join(invalid)}. Usa: {', '.join(SUGGEST_TYPES)}"}), 400
+    if not query.strip():
+        return jsonify({t: [] for t in types or SUGGEST_TYPES})
+    return jsonify(SuggestController.suggest(query, types, limit))
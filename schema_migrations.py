@@ -0,0 +1,124 @@
+"""Migraciones del esquema de Neo4j: constraints de unicidad e índices.
+
+Cada consulta caliente busca un nodo por una propiedad: User por id o
+email, Movie por id, Genre por nombre, Actor y Director por id o nombre.
+Sin índice cada búsqueda es un NodeByLabelScan que crece con la etiqueta.
+MIGRATIONS lista, en orden, las sentencias que crean esos caminos de
+acceso; todas usan IF NOT EXISTS, así que repetir una migración no hace
+nada. Cada migración aplicada deja un nodo (:SchemaMigration {version})
+en el grafo y la versión actual es la mayor.
+
+create_app() llama a init_app según SCHEMA_MIGRATIONS: apply (por
+defecto) aplica las pendientes y verifica, verify solo verifica que los
+índices de las versiones aplicadas existan y estén ONLINE, off no hace
+nada. Un fallo se registra en el log y la aplicación arranca igual (p. ej.
+si hay emails repetidos, el constraint de User.email no se puede crear).
+Desde la línea de comandos: flask --app main schema migrate|status.
+"""
+import os
+import re
+from neo4j_connection import Neo4jConnection
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# (versión, descripción, sentencias); no se editan las ya publicadas, se agrega una nueva
+MIGRATIONS = [
+    (1, "Unicidad de los ids de usuarios, películas, actores y directores y del nombre de los géneros", [
+        "CREATE CONSTRAINT schema_migration_version IF NOT EXISTS FOR (s:SchemaMigration) REQUIRE s.version IS UNIQUE",
+        "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+        "CREATE CONSTRAINT movie_id_unique IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
+        "CREATE CONSTRAINT genre_name_unique IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+        "CREATE CONSTRAINT actor_id_unique IF NOT EXISTS FOR (a:Actor) REQUIRE a.id IS UNIQUE",
+        "CREATE CONSTRAINT director_id_unique IF NOT EXISTS FOR (d:Director) REQUIRE d.id IS UNIQUE",
+    ]),
+    # Los nombres de personas se repiten (no son únicos); Movie.year ordena portada y filmografías
+    (2, "Índices de rango de los nombres de actores y directores y del año de las películas", [
+        "CREATE INDEX actor_name IF NOT EXISTS FOR (a:Actor) ON (a.name)",
+        "CREATE INDEX director_name IF NOT EXISTS FOR (d:Director) ON (d.name)",
+        "CREATE INDEX movie_year IF NOT EXISTS FOR (m:Movie) ON (m.year)",
+    ]),
+    # Aparte porque falla si la base ya tiene emails repetidos (create_user no lo revisaba)
+    (3, "Unicidad del email de los usuarios (login)", [
+        "CREATE CONSTRAINT user_email_unique IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
+    ]),
+]
+
+MODES = ("apply", "verify", "off")
+
+_SCHEMA_OBJECT = re.compile(r"CREATE (?:CONSTRAINT|INDEX) (\w+) IF NOT EXISTS")
+
+
+# Función para obtener los nombres de constraints e índices que crea una migración
+def object_names(statements):
+    return [_SCHEMA_OBJECT.match(statement).group(1) for statement in statements]
+
+
+# Función para leer la versión aplicada del esquema (0 si nunca se migró)
+def current_version(conn):
+    result = conn.query("MATCH (s:SchemaMigration) RETURN max(s.version) AS version", name="schema.version")
+    return (result[0]["version"] if result else None) or 0
+
+
+# Función para aplicar las migraciones pendientes hasta target (todas por defecto);
+# devuelve las versiones aplicadas y corta en la primera que falla
+def migrate(target=None):
+    applied = []
+    with Neo4jConnection() as conn:
+        version = current_version(conn)
+        for number, description, statements in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            # Las sentencias de esquema no se pueden mezclar con escrituras en una transacción
+            for statement in statements:
+                conn.query(statement, name="schema.migrate")
+            conn.query("""
+            MERGE (s:SchemaMigration {version: $version})
+            SET s.description = $description, s.applied_at = datetime()
+            """, {"version": number, "description": description}, name="schema.record")
+            log.info("Migración de esquema %s aplicada: %s", number, description)
+            applied.append(number)
+    return applied
+
+
+# Función para verificar el esquema: (versión aplicada, [(versión, nombre, estado o None)]
+# de los índices de las versiones aplicadas que faltan o no están ONLINE)
+def verify():
+    with Neo4jConnection() as conn:
+        version = current_version(conn)
+        # Los constraints de unicidad aparecen en SHOW INDEXES con su índice de respaldo (mismo nombre)
+        states = {row["name"]: row["state"]
+                  for row in conn.query("SHOW INDEXES YIELD name, state RETURN name, state", name="schema.indexes")}
+    missing = [(number, name, states.get(name))
+               for number, _, statements in MIGRATIONS if number <= version
+               for name in object_names(statements) if states.get(name) != "ONLINE"]
+    return version, missing
+
+
+# Función para esperar a que los índices recién creados terminen de poblarse
+def wait_for_indexes(timeout=300):
+    with Neo4jConnection() as conn:
+        conn.query("CALL db.awaitIndexes($timeout)", {"timeout": timeout}, name="schema.await")
+
+
+# Función para aplicar y verificar el esquema al crear la aplicación (SCHEMA_MIGRATIONS)
+def init_app(app):
+    mode = os.getenv("SCHEMA_MIGRATIONS", "apply").lower()
+    if mode not in MODES:
+        raise ValueError(f"SCHEMA_MIGRATIONS no soportado: {mode} (opciones: {', '.join(MODES)})")
+    if mode == "off":
+        return
+    try:
+        if mode == "apply":
+            migrate()
+        version, missing = verify()
+        for number, name, state in missing:
+            if state == "POPULATING":
+                continue
+            log.warning("Esquema: falta %s de la migración %s (estado %s)", name, number, state or "inexistente")
+        latest = MIGRATIONS[-1][0]
+        if version < latest:
+            log.warning("Esquema en la versión %s de %s; aplicar con: flask --app main schema migrate",
+                        version, latest)
+    except Exception as e:
+        log.error("Migraciones de esquema: %s", e)
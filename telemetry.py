@@ -0,0 +1,390 @@
+"""Telemetría en proceso: spans por petición, histogramas estilo Prometheus y logging con muestreo.
+
+Cada petición abre un RequestTrace. Los métodos de los controladores
+(decorados con @instrumented) y cada consulta de Neo4jConnection abren un
+span dentro de él. Las consultas se nombran por la función que las lanza
+(p. ej. MovieController.search_movies) y registran sus filas. El tiempo de
+base de datos de un span es la suma de sus consultas; el resto es tiempo
+de Python. Todos los spans alimentan el registro de histogramas que se
+publica en /metrics; las peticiones más lentas que TELEMETRY_SLOW_MS se
+guardan completas, con sus spans, en un buffer circular para /debug/slow.
+
+El logging usa la librería estándar bajo el logger "movierec": con el
+nivel por debajo de LOG_LEVEL una llamada log.debug(...) solo compara el
+nivel, y LOG_SAMPLE_RATE deja pasar una fracción de los DEBUG/INFO (los
+WARNING y ERROR salen siempre).
+"""
+import os
+import sys
+import time
+import random
+import bisect
+import inspect
+import logging
+import threading
+import functools
+from collections import deque
+from contextvars import ContextVar
+
+# Límites superiores (segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Rutas que no se miden (las de la propia telemetría)
+EXCLUDED_PATHS = ("/metrics", "/debug/slow")
+
+METRIC_HELP = {
+    "movierec_request_seconds": ("histogram", "Duración de las peticiones HTTP por ruta"),
+    "movierec_request_db_seconds": ("histogram", "Tiempo en consultas a la base por petición"),
+    "movierec_request_python_seconds": ("histogram", "Tiempo fuera de la base por petición"),
+    "movierec_controller_seconds": ("histogram", "Duración de los métodos de los controladores"),
+    "movierec_controller_python_seconds": ("histogram", "Tiempo de Python (sin consultas) de los controladores"),
+    "movierec_cypher_seconds": ("histogram", "Duración de las consultas Cypher (incluye leer las filas)"),
+    "movierec_cypher_rows_total": ("counter", "Filas devueltas por las consultas Cypher"),
+    "movierec_cypher_errors_total": ("counter", "Consultas Cypher que lanzaron una excepción"),
+}
+
+
+def _enabled():
+    return os.getenv("TELEMETRY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Histogramas y contadores por (métrica, etiquetas), con salida en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.counts[bisect.bisect_left(BUCKETS, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+        lines = []
+        by_name = {}
+        for (name, labels), counts, total, count in histograms:
+            by_name.setdefault(name, []).append((labels, counts, total, count))
+        for (name, labels), value in counters:
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for entry in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(entry[0])} {entry[1]}")
+                    continue
+                labels, counts, total, count = entry
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class SlowRequestLog:
+    """Buffer circular con las últimas peticiones lentas (sus spans incluidos)"""
+
+    def __init__(self, max_entries=100):
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def recent(self, limit=None):
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RequestTrace:
+    """Spans y tiempo de base acumulado de una petición (o de un hilo fuera de una petición)"""
+
+    __slots__ = ("method", "path", "started", "t0", "spans", "db_seconds", "depth", "dropped", "closed", "max_spans")
+
+    def __init__(self, method=None, path=None, max_spans=0):
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.db_seconds = 0.0
+        self.depth = 0
+        self.dropped = 0
+        self.closed = False
+        self.max_spans = max_spans
+
+    def open_span(self, kind, name, depth):
+        """Entrada del span en orden de inicio (se completa al cerrarlo); None si no se guardan"""
+        if self.closed or not self.max_spans:
+            return None
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        entry = {"kind": kind, "name": name, "depth": depth}
+        self.spans.append(entry)
+        return entry
+
+
+registry = MetricsRegistry()
+slow_requests = SlowRequestLog(int(os.getenv("TELEMETRY_SLOW_BUFFER", "100")))
+ENABLED = _enabled()
+_trace = ContextVar("movierec_trace", default=None)
+
+
+def current_trace():
+    """Trace activo; fuera de una petición, uno por hilo/contexto que no guarda spans"""
+    trace = _trace.get()
+    if trace is None:
+        trace = RequestTrace()
+        _trace.set(trace)
+    return trace
+
+
+class Span:
+    """Mide un método de controlador (kind='controller') o una consulta (kind='cypher')"""
+
+    __slots__ = ("kind", "name", "rows", "_start", "_trace", "_db_start", "_depth", "_entry")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.rows = None
+
+    def __enter__(self):
+        trace = self._trace = current_trace()
+        self._db_start = trace.db_seconds
+        self._depth = trace.depth
+        self._entry = trace.open_span(self.kind, self.name, trace.depth)
+        trace.depth += 1
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        trace = self._trace
+        trace.depth = self._depth
+        labels = (("query" if self.kind == "cypher" else "method", self.name),)
+        if self.kind == "cypher":
+            trace.db_seconds += elapsed
+            db_seconds = elapsed
+            registry.observe("movierec_cypher_seconds", labels, elapsed)
+            if self.rows is not None:
+                registry.inc("movierec_cypher_rows_total", labels, self.rows)
+            if exc_type is not None:
+                registry.inc("movierec_cypher_errors_total", labels)
+        else:
+            db_seconds = trace.db_seconds - self._db_start
+            registry.observe("movierec_controller_seconds", labels, elapsed)
+            registry.observe("movierec_controller_python_seconds", labels, max(elapsed - db_seconds, 0.0))
+        if self._entry is not None:
+            self._entry.update(ms=round(elapsed * 1000, 3), db_ms=round(db_seconds * 1000, 3), rows=self.rows,
+                               error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+class _NoSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(kind, name):
+    return Span(kind, name) if ENABLED else _NO_SPAN
+
+
+def caller_name(depth=2):
+    """Nombre calificado de la función que llamó a quien llama a caller_name (p. ej. Clase.método)"""
+    code = sys._getframe(depth).f_code
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def instrumented(cls):
+    """Decorador de clase: cada método estático abre un span 'Clase.método' (los generadores no)"""
+    if not ENABLED:
+        return cls
+    for attr, value in list(vars(cls).items()):
+        if not isinstance(value, staticmethod):
+            continue
+        func = value.__func__
+        if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+            continue
+        setattr(cls, attr, staticmethod(_traced(func, f"{cls.__name__}.{attr}")))
+    return cls
+
+
+def _traced(func, name):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with Span("controller", name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Span("controller", name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# -- Ciclo de vida de las peticiones ----------------------------------------
+
+
+def _settings():
+    return float(os.getenv("TELEMETRY_SLOW_MS", "500")), int(os.getenv("TELEMETRY_MAX_SPANS", "200"))
+
+
+def begin_request(method, path):
+    """Abre el trace de la petición; devuelve el token para end_request (None si no se mide)"""
+    if not ENABLED or path.startswith(EXCLUDED_PATHS):
+        return None
+    trace = RequestTrace(method, path, _settings()[1])
+    return trace, _trace.set(trace)
+
+
+def end_request(state, route, status):
+    """Cierra el trace: histogramas de la petición y, si fue lenta, la guarda en slow_requests"""
+    if state is None:
+        return
+    trace, token = state
+    if trace.closed:
+        return
+    trace.closed = True
+    try:
+        _trace.reset(token)
+    except ValueError:
+        # El token es de otro contexto (p. ej. after_request en otro hilo); se deja el trace cerrado
+        pass
+    elapsed = time.perf_counter() - trace.t0
+    labels = (("route", route), ("method", trace.method), ("status", str(status)))
+    registry.observe("movierec_request_seconds", labels, elapsed)
+    registry.observe("movierec_request_db_seconds", (("route", route),), trace.db_seconds)
+    registry.observe("movierec_request_python_seconds", (("route", route),), max(elapsed - trace.db_seconds, 0.0))
+    slow_ms = _settings()[0]
+    if elapsed * 1000 >= slow_ms:
+        slow_requests.add({
+            "method": trace.method, "path": trace.path, "route": route, "status": status,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(trace.started)),
+            "total_ms": round(elapsed * 1000, 3), "db_ms": round(trace.db_seconds * 1000, 3),
+            "python_ms": round(max(elapsed - trace.db_seconds, 0.0) * 1000, 3),
+            "spans": trace.spans, "dropped_spans": trace.dropped,
+        })
+
+
+def init_app(app, asynchronous=False):
+    """Registra los hooks de petición en una app Flask (o Quart con asynchronous=True)"""
+    from flask import g, request
+
+    if asynchronous:
+        from quart import g, request  # noqa: F811
+
+    def before():
+        g.telemetry = begin_request(request.method, request.path)
+
+    def after(response):
+        rule = request.url_rule.rule if request.url_rule is not None else "<sin ruta>"
+        end_request(getattr(g, "telemetry", None), rule, response.status_code)
+        return response
+
+    if asynchronous:
+        async def async_before():
+            before()
+
+        async def async_after(response):
+            return after(response)
+        app.before_request(async_before)
+        app.after_request(async_after)
+    else:
+        app.before_request(before)
+        app.after_request(after)
+
+
+# -- Logging -----------------------------------------------------------------
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción `rate` de los registros por debajo de WARNING"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+_logging_lock = threading.Lock()
+_logging_configured = False
+
+
+def get_logger(name):
+    """Logger hijo de "movierec" (configurado por configure_logging)"""
+    return logging.getLogger(f"movierec.{name}")
+
+
+def configure_logging():
+    """Nivel (LOG_LEVEL, INFO por defecto) y muestreo (LOG_SAMPLE_RATE, 1.0) del logger "movierec" """
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        logger = logging.getLogger("movierec")
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s >> %(message)s"))
+        handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "1.0"))))
+        logger.addHandler(handler)
+        logger.propagate = False
+        _logging_configured = True
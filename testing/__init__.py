@@ -0,0 +1 @@
+"""Datos sintéticos y dobles de Neo4j compartidos por tests/ y benchmarks/; la aplicación no los importa."""
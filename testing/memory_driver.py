@@ -0,0 +1,319 @@
+"""Grafo en memoria para benchmarks y pruebas (sin Neo4j).
+
+install() deja todo el proceso sobre un MemoryGraph:
+
+- los controladores usan un MemoryRepository (repositories/memory_repository.py);
+- los motores en memoria, la carga masiva (ingest.py) y las migraciones de
+  esquema, que leen y escriben el grafo con Cypher propio, reciben un
+  MemoryDriver en lugar del driver de Neo4j.
+
+MemoryDriver no es un intérprete de Cypher ni se usa fuera de benchmarks/
+y tests/: reconoce cada consulta de esos módulos por fragmentos de texto
+(QUERY_HANDLERS) y la responde desde el grafo con las mismas columnas que
+Neo4j. Una consulta sin handler lanza NotImplementedError y queda en
+backend.unsupported (bench_api falla si hay alguna).
+
+    MEMORY_BACKEND_SYNTHETIC=5000,1000,50000 python -m testing.memory_driver
+"""
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from neo4j import Record
+from repositories.base import set_repository
+from repositories.memory_repository import MemoryGraph, MemoryRepository
+
+# Relación de ingest.py -> categoría de las entidades de la película
+INGEST_CATEGORIES = {"HAS_GENRE": "genre", "HAS_ACTOR": "actor", "DIRECTED_BY": "director",
+                     "APPROPIATE_FOR_SEASON": "season"}
+
+
+class MemoryBackend:
+    """Responde las consultas de los motores, la carga masiva y el esquema contra un MemoryGraph"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        # Consultas que llegaron sin handler; quien las lanza suele atrapar la excepción
+        self.unsupported = []
+
+    def run(self, query, params):
+        # PROFILE/EXPLAIN (query_profiler.py): no hay plan que devolver; EXPLAIN no ejecuta
+        mode, _, rest = query.lstrip().partition(" ")
+        if mode.upper() == "EXPLAIN":
+            return []
+        if mode.upper() == "PROFILE":
+            query = rest
+        try:
+            handler = _handler_for(query)
+        except NotImplementedError as e:
+            self.unsupported.append(str(e))
+            raise
+        with self.graph.lock:
+            return getattr(self, handler)(query, params)
+
+    # -- Usuarios (preference_store.rebuild_preferences) ---------------------
+
+    def user_ids_page(self, q, p):
+        ids = sorted(user_id for user_id in self.graph.users if p["after"] is None or user_id > p["after"])
+        return [{"user_id": user_id} for user_id in ids[:p["page_size"]]]
+
+    def rebuild_preferences(self, q, p):
+        return [{"users": self.graph.rebuild_preferences(p["user_ids"])}]
+
+    # -- Cargas de los motores en memoria ------------------------------------
+
+    def movie_rows(self, q, p):
+        return [{"id": m["id"], "title": m["title"], "year": m["year"]} for m in self.graph.movies.values()]
+
+    def movie_ids(self, q, p):
+        return [{"id": movie_id} for movie_id in self.graph.movies]
+
+    def genre_edges(self, q, p):
+        return self.graph.edges("genre", "name")
+
+    def actor_edges(self, q, p):
+        return self.graph.edges("actor", "name")
+
+    def director_edges(self, q, p):
+        return self.graph.edges("director", "name")
+
+    def season_edges(self, q, p):
+        return self.graph.edges("season", "name")
+
+    def genre_features(self, q, p):
+        return self.graph.edges("genre", "weight")
+
+    def actor_features(self, q, p):
+        return self.graph.edges("actor", "weight")
+
+    def director_features(self, q, p):
+        return self.graph.edges("director", "weight")
+
+    def season_features(self, q, p):
+        return self.graph.edges("season", "weight")
+
+    def popularity(self, q, p):
+        g = self.graph
+        positive, negative = {}, {}
+        for interactions in g.interactions.values():
+            for movie_id, r in interactions.items():
+                if r["timestamp"] > p["cutoff"]:
+                    continue
+                if r["weight"] > 0:
+                    positive[movie_id] = positive.get(movie_id, 0) + 1
+                elif r["weight"] < 0:
+                    negative[movie_id] = negative.get(movie_id, 0) + 1
+        return [{"movie_id": m["id"], "title": m["title"], "year": m["year"],
+                 "positive": positive.get(m["id"], 0), "negative": negative.get(m["id"], 0)}
+                for m in g.movies.values()]
+
+    def changed_since(self, q, p):
+        return [{"user_id": user_id, "movie_id": movie_id, "weight": r["weight"], "timestamp": r["timestamp"]}
+                for user_id, interactions in self.graph.interactions.items()
+                for movie_id, r in interactions.items() if r["timestamp"] > p["cutoff"]]
+
+    def recent_likes(self, q, p):
+        since = int((time.time() - p["seconds"]) * 1000)
+        return [{"user_id": user_id, "movie_id": movie_id, "timestamp": r["timestamp"]}
+                for user_id, interactions in self.graph.interactions.items()
+                for movie_id, r in interactions.items() if r["weight"] > 0 and r["timestamp"] >= since]
+
+    def likes(self, q, p):
+        return [{"user_id": user_id, "movie_id": movie_id}
+                for user_id, interactions in self.graph.interactions.items()
+                for movie_id, r in interactions.items() if r["weight"] > 0]
+
+    def all_actors(self, q, p):
+        return [{"id": actor["id"], "name": actor["name"]} for actor in self.graph.actors.values()]
+
+    # -- Esquema ----------------------------------------------------------------
+    # Los dicts ya son índices; solo se guardan los nombres para que migrate/verify funcionen
+
+    def schema_create(self, q, p):
+        self.graph.schema_objects.add(" ".join(q.split()).split(" ")[2])
+        return []
+
+    def schema_indexes(self, q, p):
+        return [{"name": name, "state": "ONLINE"} for name in sorted(self.graph.schema_objects)]
+
+    def schema_version(self, q, p):
+        return [{"version": max(self.graph.schema_versions, default=None)}]
+
+    def schema_record(self, q, p):
+        self.graph.schema_versions[p["version"]] = p["description"]
+        return []
+
+    def await_indexes(self, q, p):
+        return []
+
+    # -- Carga masiva (ingest.py) -------------------------------------------
+
+    def ingest_movies(self, q, p):
+        g = self.graph
+        for row in p["rows"]:
+            movie = g.movies.setdefault(row["id"], {"id": row["id"], "title": None, "year": None, "description": None})
+            movie.update(row["props"])
+            g.movie_entities.setdefault(row["id"], {"genre": {}, "actor": {}, "director": {}, "season": {}})
+        return []
+
+    def _ingest_table(self, label):
+        g = self.graph
+        return {"Genre": g.genres, "Actor": g.actors, "Director": g.directors, "Season": g.seasons}[label]
+
+    def ingest_entities(self, q, p):
+        label, prop = _INGEST_ENTITY.search(" ".join(q.split())).groups()
+        table = self._ingest_table(label)
+        for row in p["rows"]:
+            if label in ("Genre", "Season"):
+                empty = {"name": None}
+            else:
+                empty = {"id": row["key"] if prop == "id" else None, "name": None}
+            entity = table.setdefault(row["key"], empty)
+            entity["name"] = row["name"] or entity["name"] or (row["key"] if prop == "name" else None)
+        return []
+
+    def ingest_edges(self, q, p):
+        label, prop, relationship = _INGEST_EDGE.search(" ".join(q.split())).groups()
+        category = INGEST_CATEGORIES[relationship]
+        table, g = self._ingest_table(label), self.graph
+        for row in p["rows"]:
+            if row["movie_id"] in g.movies and row["key"] in table:
+                g.movie_entities[row["movie_id"]][category][row["key"]] = row["peso"] if "r.peso" in q else 1.0
+        return []
+
+
+# Fragmentos que identifican cada consulta (con los espacios normalizados) -> método de MemoryBackend.
+# Van de la más específica a la más general: gana la primera cuyos fragmentos aparecen todos.
+QUERY_HANDLERS = [
+    (("WHERE $after IS NULL OR u.id > $after",), "user_ids_page"),
+    (("WHERE u.id IN $user_ids",), "rebuild_preferences"),
+    (("RETURN m.id AS id, m.title AS title, m.year AS year",), "movie_rows"),
+    (("g.name AS key, g.name AS name",), "genre_edges"),
+    (("coalesce(a.id, a.name) AS key, a.name AS name",), "actor_edges"),
+    (("coalesce(d.id, d.name) AS key, d.name AS name",), "director_edges"),
+    (("coalesce(s.name, s.nombre) AS key, coalesce(s.name, s.nombre) AS name",), "season_edges"),
+    (("g.name AS key, coalesce(r.peso, 1.0) AS weight",), "genre_features"),
+    (("coalesce(a.id, a.name) AS key, 1.0 AS weight",), "actor_features"),
+    (("coalesce(d.id, d.name) AS key, coalesce(r.peso, 1.0) AS weight",), "director_features"),
+    (("coalesce(s.name, s.nombre) AS key, 1.0 AS weight",), "season_features"),
+    (("AS positive,",), "popularity"),
+    (("WHERE r.timestamp > datetime({epochMillis: $cutoff})",), "changed_since"),
+    (("r.timestamp.epochMillis",), "recent_likes"),
+    (("WHERE r.weight > 0 RETURN u.id AS user_id, m.id AS movie_id",), "likes"),
+    (("MATCH (a:Actor) RETURN a.id AS id, a.name AS name",), "all_actors"),
+    (("CREATE CONSTRAINT",), "schema_create"),
+    (("CREATE INDEX",), "schema_create"),
+    (("SHOW INDEXES",), "schema_indexes"),
+    (("MATCH (s:SchemaMigration) RETURN max(s.version)",), "schema_version"),
+    (("MERGE (s:SchemaMigration",), "schema_record"),
+    (("CALL db.awaitIndexes",), "await_indexes"),
+    (("MERGE (m:Movie {id: row.id})",), "ingest_movies"),
+    (("UNWIND $rows AS row MERGE (e:",), "ingest_entities"),
+    (("MERGE (m)-[r:",), "ingest_edges"),
+]
+
+_INGEST_ENTITY = re.compile(r"MERGE \(e:(\w+) \{(\w+): row\.key\}\)")
+_INGEST_EDGE = re.compile(r"MATCH \(e:(\w+) \{(\w+): row\.key\}\) MERGE \(m\)-\[r:(\w+)\]")
+
+
+@lru_cache(maxsize=1024)
+def _handler_for(query):
+    normalized = " ".join(query.split())
+    if normalized == "MATCH (m:Movie) RETURN m.id AS id":
+        return "movie_ids"
+    for fragments, handler in QUERY_HANDLERS:
+        if all(fragment in normalized for fragment in fragments):
+            return handler
+    raise NotImplementedError(f"Consulta no soportada por el driver en memoria: {normalized[:120]}")
+
+
+class MemorySummary:
+    profile = None
+    plan = None
+
+
+class MemoryResult:
+    """Resultado con la interfaz que usa Neo4jConnection: iterar Records y keys()"""
+
+    def __init__(self, rows):
+        self._records = [Record(row) for row in rows]
+
+    # Resumen sin plan: el driver en memoria no tiene operadores que perfilar
+    def consume(self):
+        return MemorySummary()
+
+    def keys(self):
+        return list(self._records[0].keys()) if self._records else []
+
+    def __iter__(self):
+        return iter(self._records)
+
+
+class MemorySession:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None):
+        return MemoryResult(self._backend.run(query, parameters or {}))
+
+    # Transacción explícita: la sesión misma hace de tx (sin rollback)
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+
+class MemoryDriver:
+    """Reemplazo de neo4j.Driver sobre un MemoryGraph"""
+
+    def __init__(self, graph):
+        self.backend = MemoryBackend(graph)
+
+    def session(self, **config):
+        return MemorySession(self.backend)
+
+    def close(self):
+        pass
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_memory_graph():
+    """Grafo instalado; si no hay uno, se genera con MEMORY_BACKEND_SYNTHETIC=películas,usuarios,interacciones"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                from testing.synthetic import generate_graph
+
+                sizes = [int(x) for x in os.getenv("MEMORY_BACKEND_SYNTHETIC", "1000,200,5000").split(",")]
+                _graph = generate_graph(*sizes)
+    return _graph
+
+
+def install(graph=None):
+    """Deja el repositorio y el driver del proceso sobre `graph` (o el de get_memory_graph()); lo devuelve"""
+    global _graph
+    from neo4j_connection import set_driver
+
+    if graph is not None:
+        with _graph_lock:
+            _graph = graph
+    graph = get_memory_graph()
+    set_repository(MemoryRepository(graph))
+    set_driver(MemoryDriver(graph))
+    return graph
+
+
+if __name__ == "__main__":
+    install()
+    from app import create_app
+
+    create_app().run(host="0.0.0.0", port=5001)
@@ -0,0 +1,25 @@
+"""Referencia en Python de la consulta Cypher de recomendaciones por contenido"""
+import itertools
+
+from engines.content_graph import CATEGORY_WEIGHTS
+
+
+def cypher_reference_scores(movies, per_movie, preferences, seen):
+    """Emula la semántica de la consulta: puntaje máximo de las filas (m, score)"""
+    pref_lists = {c: list(p.items()) for c, p in preferences.items()}
+    best = {}
+    for movie in movies:
+        movie_id = movie["id"]
+        if movie_id in seen:
+            continue
+        partials = []
+        for category, weight in CATEGORY_WEIGHTS.items():
+            keys = per_movie[category].get(movie_id) or [None]
+            # REDUCE(s = 0, p IN prefs | CASE WHEN x = p.entity THEN s + p.weight * w ELSE s END)
+            partials.append([
+                sum(w * weight for k, w in pref_lists[category] if k == key)
+                for key in keys
+            ])
+        rows = {sum(combo) for combo in itertools.product(*partials)}
+        best[movie_id] = max(rows)
+    return best
@@ -0,0 +1,147 @@
+"""Generador determinista de catálogos sintéticos para benchmarks y pruebas"""
+import random
+import time
+
+SEASONS = ["Navidad", "Verano", "Halloween", "San Valentín", "Semana Santa", "Invierno"]
+
+# Deltas que aplica InteractionController.add_interaction por cada like/dislike
+PREFERENCE_DELTAS = {"genre": 0.15, "director": 0.12, "actor": 0.08, "season": 0.05}
+
+
+def _zipf_choice(rng, n, skew=2.5):
+    """Índice en [0, n) sesgado hacia los primeros (pocos muy populares)"""
+    return min(int(n * rng.random() ** skew), n - 1)
+
+
+def generate_catalogue(n_movies, seed=42, n_genres=20, actors_per_movie=(3, 12)):
+    """Devuelve (movies, edges) con el mismo formato que ContentGraph.from_rows"""
+    rng = random.Random(seed)
+    n_actors = max(10, n_movies // 2)
+    n_directors = max(5, n_movies // 10)
+
+    movies = []
+    edges = {"genre": [], "actor": [], "director": [], "season": []}
+    for i in range(n_movies):
+        movie_id = f"m{i}"
+        movies.append({
+            "id": movie_id,
+            "title": f"Película {i}",
+            "year": rng.randint(1950, 2025),
+            "description": f"Descripción de la película {i}",
+        })
+        for g in rng.sample(range(n_genres), rng.randint(1, 3)):
+            edges["genre"].append((movie_id, f"Género {g}", f"Género {g}"))
+        cast = {_zipf_choice(rng, n_actors) for _ in range(rng.randint(*actors_per_movie))}
+        for a in cast:
+            edges["actor"].append((movie_id, f"a{a}", f"Actor {a}"))
+        d = _zipf_choice(rng, n_directors)
+        edges["director"].append((movie_id, f"d{d}", f"Director {d}"))
+        if rng.random() < 0.3:
+            season = rng.choice(SEASONS)
+            edges["season"].append((movie_id, season, season))
+    return movies, edges
+
+
+def edges_by_movie(edges):
+    """{categoría: {movie_id: [llaves]}}"""
+    result = {}
+    for category, rows in edges.items():
+        per_movie = result.setdefault(category, {})
+        for movie_id, key, _ in rows:
+            keys = per_movie.setdefault(movie_id, [])
+            if key not in keys:
+                keys.append(key)
+    return result
+
+
+def generate_user(movies, edges, n_interactions=30, like_ratio=0.8, seed=7):
+    """Simula likes/dislikes y devuelve (vistas, preferencias) como las dejaría el grafo"""
+    rng = random.Random(seed)
+    per_movie = edges_by_movie(edges)
+    seen = {}
+    for _ in range(n_interactions):
+        movie = movies[_zipf_choice(rng, len(movies), 2.0)]
+        seen[movie["id"]] = 1.0 if rng.random() < like_ratio else -1.0
+
+    preferences = {category: {} for category in PREFERENCE_DELTAS}
+    for movie_id, weight in seen.items():
+        for category, delta in PREFERENCE_DELTAS.items():
+            for key in per_movie[category].get(movie_id, []):
+                prefs = preferences[category]
+                prefs[key] = prefs.get(key, 0) + weight * delta
+    return set(seen), preferences
+
+
+def generate_interactions(movies, n_users, n_interactions, like_ratio=0.8, seed=11):
+    """Lista de (user_id, movie_id, weight) con usuarios y películas en ley de potencias"""
+    rng = random.Random(seed)
+    interactions = {}
+    for _ in range(n_interactions):
+        user_id = f"u{_zipf_choice(rng, n_users, 1.5)}"
+        movie_id = movies[_zipf_choice(rng, len(movies), 2.0)]["id"]
+        interactions[(user_id, movie_id)] = 1.0 if rng.random() < like_ratio else -1.0
+    return [(user_id, movie_id, weight) for (user_id, movie_id), weight in interactions.items()]
+
+
+TITLE_WORDS = ["El", "La", "Los", "Las", "Noche", "Último", "Corazón", "Ciudad", "Sueño", "Camino",
+               "Pequeña", "Guerra", "Amor", "Silencio", "Río", "Canción", "Invierno", "Jardín",
+               "Espíritu", "Montaña", "Mar", "Sombra", "Fuego", "Viaje", "Estación", "Tierra"]
+FIRST_NAMES = ["José", "María", "Ángel", "Lucía", "Andrés", "Sofía", "Raúl", "Inés", "Iñaki",
+               "Begoña", "Tomás", "Mónica", "Martín", "Julián", "Verónica", "Óscar", "Ramón"]
+LAST_NAMES = ["García", "Pérez", "Núñez", "Gutiérrez", "Martínez", "López", "Sánchez", "Peña",
+              "Ibáñez", "Fernández", "Muñoz", "Álvarez", "Domínguez", "Ortiz", "Vázquez", "Ruiz"]
+
+
+def with_realistic_names(movies, edges, seed=3):
+    """Reemplaza títulos y nombres por textos en español (con acentos) para pruebas de búsqueda"""
+    rng = random.Random(seed)
+    for i, movie in enumerate(movies):
+        words = rng.sample(TITLE_WORDS, rng.randint(1, 4))
+        movie["title"] = f"{' '.join(words)} {i}"
+    names = {}
+    for category in ("actor", "director"):
+        renamed = []
+        for movie_id, key, _ in edges[category]:
+            if key not in names:
+                names[key] = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {key}"
+            renamed.append((movie_id, key, names[key]))
+        edges[category] = renamed
+    return movies, edges
+
+
+def generate_graph(n_movies, n_users, n_interactions, seed=42, like_ratio=0.8, days=30):
+    """MemoryGraph (ver repositories/memory_repository.py) con catálogo, usuarios e interacciones en ley de potencias.
+
+    Los pesos de HAS_GENRE y DIRECTED_BY van de 0.3 a 1.0 y las
+    interacciones se reparten en los últimos `days` días, en orden de
+    tiempo, así que las preferencias quedan como las dejaría la aplicación.
+    """
+    from repositories.memory_repository import MemoryGraph
+
+    rng = random.Random(seed)
+    movies, edges = with_realistic_names(*generate_catalogue(n_movies, seed))
+    per_movie = {category: {} for category in edges}
+    for category, rows in edges.items():
+        for movie_id, key, name in rows:
+            per_movie[category].setdefault(movie_id, []).append((key, name))
+
+    graph = MemoryGraph()
+    for movie in movies:
+        movie_id = movie["id"]
+        graph.add_movie(
+            movie_id, movie["title"], movie["year"], movie["description"],
+            genres=[(key, round(rng.uniform(0.3, 1.0), 2)) for key, _ in per_movie["genre"].get(movie_id, [])],
+            actors=per_movie["actor"].get(movie_id, []),
+            directors=[(key, name, round(rng.uniform(0.3, 1.0), 2))
+                       for key, name in per_movie["director"].get(movie_id, [])],
+            seasons=[key for key, _ in per_movie["season"].get(movie_id, [])],
+        )
+    for i in range(n_users):
+        graph.add_user(f"u{i}", f"usuario{i}@example.com", f"Usuario {i}")
+
+    interactions = generate_interactions(movies, n_users, n_interactions, like_ratio, seed)
+    now_ms = int(time.time() * 1000)
+    timestamps = sorted(now_ms - rng.randrange(days * 86_400_000) for _ in interactions)
+    for (user_id, movie_id, weight), timestamp in zip(interactions, timestamps):
+        graph.interact(user_id, movie_id, "like" if weight > 0 else "dislike", weight, timestamp)
+    return graph
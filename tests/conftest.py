@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+# Las pruebas corren sobre el grafo en memoria (repositorio y driver) con un grafo sintético pequeño
+os.environ.setdefault("MEMORY_BACKEND_SYNTHETIC", "200,30,600")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin")
+# El índice de películas parecidas se construye al crear la app, sin guardarlo en disco
+os.environ.setdefault("SIMILAR_INDEX_PATH", "")
+# Un solo proceso: las recargas del catálogo no se publican a otros workers
+os.environ.setdefault("CATALOG_REFRESH_PATH", "")
+
+
+from testing import memory_driver
+
+memory_driver.install()
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers():
+    return {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"}
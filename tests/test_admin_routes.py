@@ -0,0 +1,30 @@
+"""Rutas de administración protegidas con ADMIN_TOKEN"""
+import pytest
+
+ADMIN_ROUTES = ["/movies/cache/invalidate", "/movies/cache/refresh"]
+
+
+@pytest.mark.parametrize("path", ADMIN_ROUTES)
+def test_admin_routes_require_token(client, path):
+    assert client.post(path, json={"all": True}).status_code == 401
+    bad = {"Authorization": "Bearer otro"}
+    assert client.post(path, json={"all": True}, headers=bad).status_code == 401
+
+
+@pytest.mark.parametrize("path", ADMIN_ROUTES)
+def test_admin_routes_disabled_without_token(client, admin_headers, monkeypatch, path):
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert client.post(path, json={"all": True}, headers=admin_headers).status_code == 403
+
+
+def test_slow_requests_require_token(client, admin_headers):
+    assert client.get("/debug/slow").status_code == 401
+    response = client.get("/debug/slow?limit=5", headers=admin_headers)
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), list)
+
+
+def test_invalidate_with_token(client, admin_headers):
+    response = client.post("/movies/cache/invalidate", json={"all": True}, headers=admin_headers)
+    assert response.status_code == 200
+    assert "entries" in response.get_json()
@@ -0,0 +1,85 @@
+"""POST /movies/cache/refresh tras una carga: snapshot, preferencias, parecidas y los demás workers"""
+import json
+
+import pytest
+
+import ingest
+from testing import memory_driver
+from testing.synthetic import generate_graph
+from engines import content_graph, preference_store, similar_index
+from engines.content_graph import ContentGraph
+from engines.preference_store import PreferenceStore
+from engines.snapshot import Snapshot
+from neo4j_connection import Neo4jConnection
+
+NEW_MOVIE = {"id": "recien-cargada", "title": "Recién cargada", "year": 2026,
+             "genres": ["Drama"], "actors": [{"id": "a-nuevo", "name": "Actor Nuevo"}]}
+
+
+@pytest.fixture
+def graph():
+    previous = memory_driver.get_memory_graph()
+    yield memory_driver.install(generate_graph(80, 10, 200, seed=11))
+    memory_driver.install(previous)
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch, graph):
+    path = str(tmp_path / "content_graph.snap")
+    with Neo4jConnection() as conn:
+        ContentGraph.load(conn).save_snapshot(path)
+    monkeypatch.setenv("CONTENT_GRAPH_ENABLED", "true")
+    monkeypatch.setenv("CONTENT_GRAPH_SNAPSHOT", path)
+    monkeypatch.setenv("CONTENT_GRAPH_SNAPSHOT_CHECK_INTERVAL", "3600")
+    monkeypatch.setattr(content_graph, "_graph", None)
+    yield path
+    content_graph._graph = None
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, snapshot):
+    store = PreferenceStore(content_graph.get_content_graph(), str(tmp_path / "journal"), flush_interval=60)
+    monkeypatch.setattr(preference_store, "_store", store)
+    yield store
+    store.close()
+
+
+def _load_new_movie(tmp_path):
+    path = tmp_path / "nuevas.jsonl"
+    path.write_text(json.dumps(NEW_MOVIE) + "\n", encoding="utf-8")
+    ingest.ingest_file(str(path), writers=1)
+
+
+def test_refresh_rebuilds_snapshot_rebinds_store_and_similar(app, client, admin_headers, tmp_path,
+                                                              monkeypatch, store):
+    monkeypatch.setattr(similar_index, "_index", similar_index.build_similar_index())
+    _load_new_movie(tmp_path)
+    assert client.get(f"/movies/{NEW_MOVIE['id']}/similar").status_code == 404
+
+    response = client.post("/movies/cache/refresh", json={}, headers=admin_headers)
+    assert response.status_code == 200
+    assert {"content_graph", "preference_store", "similar_index"} <= set(response.get_json()["reloaded"])
+
+    # El snapshot en disco se reescribió: los demás workers mapean el catálogo nuevo
+    assert NEW_MOVIE["id"] in ContentGraph.from_snapshot(Snapshot(content_graph.snapshot_path())).movie_index
+    assert store.content_graph is content_graph.get_content_graph()
+    assert NEW_MOVIE["id"] in store.content_graph.movie_index
+    assert client.get(f"/movies/{NEW_MOVIE['id']}/similar").status_code == 200
+
+
+def test_other_workers_reload_the_published_version(client, admin_headers, tmp_path, monkeypatch):
+    monkeypatch.setenv("CATALOG_REFRESH_PATH", str(tmp_path / "catalog_refresh.json"))
+    monkeypatch.setattr(ingest, "_seen_refresh", None)
+    response = client.post("/movies/cache/refresh", json={"movie_ids": ["m1"]}, headers=admin_headers)
+    version = response.get_json()["version"]
+    assert ingest.read_refresh()["version"] == version
+
+    calls = []
+    monkeypatch.setattr(ingest, "refresh_caches", lambda movie_ids=None, rebuild=True: calls.append((movie_ids, rebuild)))
+    # El worker que atendió la petición ya recargó
+    assert not ingest.check_refresh()
+    # Otro worker, que vio la versión anterior, recarga sin reconstruir los archivos compartidos
+    monkeypatch.setattr(ingest, "_seen_refresh", "anterior")
+    assert ingest.check_refresh()
+    assert not ingest.check_refresh()
+    assert calls == [(["m1"], False)]
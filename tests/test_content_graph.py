@@ -0,0 +1,61 @@
+"""Paridad de puntajes entre el grafo de contenido y la semántica de la consulta Cypher"""
+import pytest
+
+from testing.reference import cypher_reference_scores
+from testing.synthetic import edges_by_movie, generate_catalogue, generate_user
+from engines.content_graph import CATEGORY_WEIGHTS, ContentGraph
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    movies, edges = generate_catalogue(500, seed=1)
+    return movies, edges, ContentGraph.from_rows(movies, edges), edges_by_movie(edges)
+
+
+@pytest.mark.parametrize("user_seed", range(8))
+def test_scores_match_cypher(catalogue, user_seed):
+    movies, edges, graph, per_movie = catalogue
+    seen, preferences = generate_user(movies, edges, n_interactions=40, seed=user_seed)
+    reference = cypher_reference_scores(movies, per_movie, preferences, seen)
+
+    scores = graph.score(preferences)
+    for movie_id, expected in reference.items():
+        assert scores[graph.movie_index[movie_id]] == pytest.approx(expected, abs=1e-9), movie_id
+
+
+@pytest.mark.parametrize("user_seed", range(8))
+def test_top_k_matches_cypher_and_skips_seen(catalogue, user_seed):
+    movies, edges, graph, per_movie = catalogue
+    seen, preferences = generate_user(movies, edges, n_interactions=40, seed=user_seed)
+    reference = cypher_reference_scores(movies, per_movie, preferences, seen)
+
+    top = graph.top_k(graph.score(preferences), seen, 10)
+    expected = sorted(reference.values(), reverse=True)[:10]
+    assert [score for _, score in top] == pytest.approx(expected, abs=1e-9)
+    assert not {graph.movie_ids[row] for row, _ in top} & seen
+
+
+def test_multiple_entities_per_category_take_best_row():
+    # Cypher devuelve una fila por combinación de entidades y se queda con la mejor,
+    # así que dos géneros con preferencia no se suman
+    movies = [{"id": "m1", "title": "Uno", "year": 2000}, {"id": "m2", "title": "Dos", "year": 2001}]
+    edges = {
+        "genre": [("m1", "Drama", "Drama"), ("m1", "Comedia", "Comedia"), ("m2", "Drama", "Drama")],
+        "actor": [("m1", "a1", "Actor 1"), ("m1", "a2", "Actor 2")],
+        "director": [("m2", "d1", "Director 1")],
+        "season": [],
+    }
+    preferences = {
+        "genre": {"Drama": 0.4, "Comedia": -0.6},
+        "actor": {"a2": 1.0},
+        "director": {"d1": 0.5},
+        "season": {},
+    }
+    graph = ContentGraph.from_rows(movies, edges)
+    scores = graph.score(preferences)
+
+    w = CATEGORY_WEIGHTS
+    assert scores[graph.movie_index["m1"]] == pytest.approx(0.4 * w["genre"] + 1.0 * w["actor"])
+    assert scores[graph.movie_index["m2"]] == pytest.approx(0.4 * w["genre"] + 0.5 * w["director"])
+    reference = cypher_reference_scores(movies, edges_by_movie(edges), preferences, set())
+    assert [scores[graph.movie_index[m]] for m in ("m1", "m2")] == pytest.approx([reference["m1"], reference["m2"]])
@@ -0,0 +1,74 @@
+"""Al reemplazar el grafo de contenido, los motores que lo usan pasan al nuevo"""
+import threading
+
+import pytest
+
+from testing.synthetic import generate_catalogue
+from engines import content_graph, movie_sampler, ppr, preference_store, suggest_index, text_index
+from engines.content_graph import ContentGraph
+from engines.preference_store import PreferenceStore
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    movies, edges = generate_catalogue(60, seed=5)
+    path = str(tmp_path / "content_graph.snap")
+    ContentGraph.from_rows(movies, edges).save_snapshot(path)
+    monkeypatch.setenv("CONTENT_GRAPH_ENABLED", "true")
+    monkeypatch.setenv("CONTENT_GRAPH_SNAPSHOT", path)
+    monkeypatch.setenv("CONTENT_GRAPH_SNAPSHOT_CHECK_INTERVAL", "0")
+    monkeypatch.setattr(content_graph, "_graph", None)
+    yield path, movies, edges
+    content_graph._graph = None
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, snapshot):
+    store = PreferenceStore(content_graph.get_content_graph(), str(tmp_path / "journal"), flush_interval=60)
+    monkeypatch.setattr(preference_store, "_store", store)
+    yield store
+    store.close()
+
+
+def _wait_for_swap_threads():
+    for thread in threading.enumerate():
+        if thread.name == "content-graph-swap":
+            thread.join(5)
+
+
+def test_new_snapshot_rebinds_preference_store(snapshot, store):
+    path, movies, edges = snapshot
+    old = content_graph.get_content_graph()
+    assert store.content_graph is old
+
+    # Una película nueva en el snapshot: los eventos sobre ella deben usar el grafo nuevo
+    extra = {"id": "nueva", "title": "Nueva", "year": 2024}
+    ContentGraph.from_rows(movies + [extra], {**edges, "genre": edges["genre"] + [("nueva", "Drama", "Drama")]}
+                           ).save_snapshot(path)
+    new = content_graph.get_content_graph()
+    _wait_for_swap_threads()
+
+    assert new is not old and "nueva" in new.movie_index
+    assert store.content_graph is new
+
+
+def test_reload_rebuilds_loaded_engines(snapshot, monkeypatch):
+    content_graph.get_content_graph()
+    rebuilt = []
+    for module, reload_name, loaded_name in ((ppr, "reload_ppr_graph", "_ppr_graph"),
+                                             (text_index, "reload_search_index", "_index"),
+                                             (suggest_index, "reload_suggest_index", "_index"),
+                                             (movie_sampler, "reload_movie_sampler", "_sampler")):
+        monkeypatch.setattr(module, loaded_name, object())
+        monkeypatch.setattr(module, reload_name, lambda name=reload_name: rebuilt.append(name))
+
+    content_graph.reload_content_graph()
+    assert sorted(rebuilt) == ["reload_movie_sampler", "reload_ppr_graph",
+                               "reload_search_index", "reload_suggest_index"]
+
+
+def test_engines_not_loaded_are_left_alone(snapshot, monkeypatch):
+    content_graph.get_content_graph()
+    monkeypatch.setattr(ppr, "_ppr_graph", None)
+    monkeypatch.setattr(ppr, "reload_ppr_graph", lambda: pytest.fail("PageRank se cargó sin haberse usado"))
+    content_graph.reload_content_graph()
@@ -0,0 +1,61 @@
+"""Plazos, cancelación y tope por fuente del ranking híbrido"""
+import threading
+
+from engines.hybrid import CYPHER_DEADLINES_MS, DEFAULT_DEADLINES_MS, HybridRanker
+
+
+def test_late_queued_calls_are_cancelled():
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return [("a", 1.0)]
+
+    ranker = HybridRanker(blend={"collaborative": 1.0}, budget_ms=50, max_workers=1, max_pending=2)
+    try:
+        # La primera llamada ocupa el único hilo; la segunda queda en cola y vence sin empezar
+        assert ranker.gather({"collaborative": slow}) == ({}, ["collaborative"])
+        assert ranker.gather({"collaborative": slow}) == ({}, ["collaborative"])
+    finally:
+        release.set()
+    ranker._executors["collaborative"].shutdown(wait=True)
+    assert len(calls) == 1
+
+
+def test_saturated_source_is_skipped_without_blocking_others():
+    release = threading.Event()
+    ranker = HybridRanker(blend={"content": 0.5, "collaborative": 0.5}, budget_ms=50,
+                          max_workers=1, max_pending=1)
+    sources = {"content": lambda: [("a", 1.0)],
+               "collaborative": lambda: release.wait(5) and [("b", 1.0)]}
+    try:
+        ranker.gather(sources)
+        results, missed = ranker.gather(sources)
+        assert results == {"content": [("a", 1.0)]}
+        assert missed == ["collaborative"]
+    finally:
+        release.set()
+
+
+def test_default_deadlines_follow_enabled_engines(monkeypatch):
+    for var in ("HYBRID_DEADLINES_MS", "HYBRID_BUDGET_MS", "CONTENT_GRAPH_ENABLED",
+                "POPULARITY_INDEX_ENABLED", "ITEM_CF_ENABLED"):
+        monkeypatch.delenv(var, raising=False)
+    ranker = HybridRanker.from_env()
+    # Sin motores en memoria las tres fuentes son consultas Cypher y el presupuesto cubre la más lenta
+    assert ranker.deadlines_ms == CYPHER_DEADLINES_MS
+    assert ranker.budget_ms == max(CYPHER_DEADLINES_MS.values())
+
+    monkeypatch.setenv("CONTENT_GRAPH_ENABLED", "true")
+    monkeypatch.setenv("POPULARITY_INDEX_ENABLED", "true")
+    ranker = HybridRanker.from_env()
+    assert ranker.deadlines_ms == {"content": DEFAULT_DEADLINES_MS["content"],
+                                   "popular": DEFAULT_DEADLINES_MS["popular"],
+                                   "collaborative": CYPHER_DEADLINES_MS["collaborative"]}
+
+    monkeypatch.setenv("HYBRID_DEADLINES_MS", "content:50")
+    monkeypatch.setenv("HYBRID_BUDGET_MS", "80")
+    ranker = HybridRanker.from_env()
+    assert (ranker.deadlines_ms, ranker.budget_ms) == ({"content": 50}, 80)
@@ -0,0 +1,46 @@
+"""Vecinos por ítem cargados de archivo: se ponen al día con los likes escritos después"""
+import time
+
+import numpy as np
+
+from engines import item_cf
+from engines.item_cf import ItemNeighbours
+from engines.preference_store import interaction_event
+from neo4j_connection import Neo4jConnection
+from repositories.base import get_repository
+
+
+def _unliked_pair(model):
+    for user_id in model.user_index:
+        for movie_id in model.movie_ids:
+            if not model.liked(user_id, movie_id):
+                return user_id, movie_id
+
+
+def test_model_from_file_catches_up_with_later_likes(tmp_path, monkeypatch):
+    path = str(tmp_path / "item_cf.npz")
+    with Neo4jConnection() as conn:
+        ItemNeighbours.load(conn, **item_cf.build_options()).save(path)
+    monkeypatch.setenv("ITEM_CF_PATH", path)
+
+    user_id, movie_id = _unliked_pair(ItemNeighbours.load_file(path))
+    time.sleep(0.002)
+    get_repository().write_interactions([interaction_event(user_id, movie_id, "like", 1.0, time.time())])
+
+    assert item_cf._load_model().liked(user_id, movie_id)
+
+
+def test_file_without_build_time_is_rebuilt(tmp_path, monkeypatch):
+    path = str(tmp_path / "item_cf.npz")
+    with Neo4jConnection() as conn:
+        model = ItemNeighbours.load(conn, **item_cf.build_options())
+    # Formato anterior: sin built_at
+    np.savez(path, movie_ids=np.array([], dtype=str), likes=np.zeros(0, dtype=np.int64),
+             neighbours=np.zeros((0, model.k), dtype=np.int32), counts=np.zeros((0, model.k), dtype=np.int32),
+             user_ids=np.array([], dtype=str), user_indptr=np.zeros(1, dtype=np.int64),
+             user_items=np.zeros(0, dtype=np.int32), kind=model.kind, max_user_likes=model.max_user_likes)
+    monkeypatch.setenv("ITEM_CF_PATH", path)
+
+    loaded = item_cf._load_model()
+    assert loaded.built_at is not None
+    assert len(loaded) == len(model)
@@ -0,0 +1,57 @@
+"""Muestreo de la portada: páginas con semilla y corte en max_offset"""
+from collections import Counter
+
+import pytest
+
+from engines.movie_sampler import MovieSampler
+
+N = 1000
+LIMIT = 50
+
+
+@pytest.fixture
+def sampler():
+    return MovieSampler(f"m{i}" for i in range(N))
+
+
+def test_unseeded_samples_are_distinct(sampler):
+    for _ in range(100):
+        sample = sampler.sample(LIMIT)
+        assert len(sample) == len(set(sample)) == LIMIT
+
+
+def test_seeded_pages_are_stable_and_cover_the_catalogue(sampler):
+    pages = [sampler.sample(LIMIT, seed="sesion", page=p) for p in range(N // LIMIT)]
+    assert pages[3] == sampler.sample(LIMIT, seed="sesion", page=3)
+    assert sorted(id_ for page in pages for id_ in page) == sorted(f"m{i}" for i in range(N))
+    assert sampler.sample(LIMIT, seed="sesion", page=N // LIMIT) == []
+
+
+def test_seeded_pages_stop_at_max_offset(sampler):
+    # Cada página repite los sorteos anteriores, así que el corte no cambia su contenido
+    pages = [sampler.sample(LIMIT, seed="sesion", page=p) for p in range(3)]
+    capped = MovieSampler((f"m{i}" for i in range(N)), max_offset=LIMIT * 2 + LIMIT // 2)
+    assert capped.sample(LIMIT, seed="sesion", page=1) == pages[1]
+    assert capped.sample(LIMIT, seed="sesion", page=2) == pages[2][:LIMIT // 2]
+    assert capped.sample(LIMIT, seed="sesion", page=3) == []
+
+
+def test_unseeded_samples_are_uniform(sampler):
+    counts = Counter(id_ for _ in range(4000) for id_ in sampler.sample(LIMIT))
+    expected = 4000 * LIMIT / N
+    assert all(abs(counts[f"m{i}"] - expected) < expected * 0.5 for i in range(N))
+
+
+def test_add_and_remove(sampler):
+    sampler.remove("m0")
+    sampler.remove("m999")
+    sampler.add("nueva")
+    everything = sampler.sample(N)
+    assert "m0" not in everything and "m999" not in everything and "nueva" in everything
+    assert len(everything) == N - 1
+
+
+def test_unseeded_samples_ignore_max_offset():
+    sampler = MovieSampler((f"m{i}" for i in range(100)), max_offset=10)
+    assert len(sampler.sample(50)) == 50
+    assert sampler.sample(10, seed="sesion", page=1) == []
@@ -0,0 +1,64 @@
+"""Reconciliación del índice de popularidad sin contar dos veces los eventos del buffer"""
+import time
+
+from engines.popularity_index import PopularityIndex
+from testing.memory_driver import get_memory_graph
+from engines.preference_store import interaction_event
+from neo4j_connection import Neo4jConnection
+from repositories.base import get_repository
+
+
+def _write(user_id, movie_id, weight, timestamp):
+    result = get_repository().write_interactions([interaction_event(
+        user_id, movie_id, "like" if weight > 0 else "dislike", weight, timestamp)])
+    return result[0]['result']['interaction']['previous_weight']
+
+
+def _expected_counts(movie_id):
+    weights = [r[movie_id]["weight"] for r in get_memory_graph().interactions.values() if movie_id in r]
+    return sum(1 for w in weights if w > 0), sum(1 for w in weights if w < 0)
+
+
+def test_events_written_during_reload_count_once(monkeypatch):
+    graph = get_memory_graph()
+    movie_id = "m5"
+    fans = [user_id for user_id in sorted(graph.users) if movie_id not in graph.interactions[user_id]][:2]
+    with Neo4jConnection() as conn:
+        index = PopularityIndex.load(conn)
+    real_read = PopularityIndex._read.__func__
+
+    def read_with_concurrent_likes(cls, conn, cutoff=None):
+        # Mientras se recarga llegan interacciones: la primera antes de que la consulta lea el grafo
+        timestamp = time.time() + 1
+        previous = _write(fans[0], movie_id, 1.0, timestamp)
+        index.apply(fans[0], movie_id, previous, 1.0, timestamp)
+        fresh = real_read(cls, conn, cutoff)
+        timestamp += 1
+        previous = _write(fans[1], movie_id, -1.0, timestamp)
+        index.apply(fans[1], movie_id, previous, -1.0, timestamp)
+        return fresh
+
+    monkeypatch.setattr(PopularityIndex, "_read", classmethod(read_with_concurrent_likes))
+    index.reconcile()
+    assert index.counts(movie_id) == _expected_counts(movie_id)
+
+
+def test_event_stamped_before_cutoff_and_committed_after_read_is_kept(monkeypatch):
+    graph = get_memory_graph()
+    movie_id = "m6"
+    fan = next(user_id for user_id in sorted(graph.users) if movie_id not in graph.interactions[user_id])
+    with Neo4jConnection() as conn:
+        index = PopularityIndex.load(conn)
+    real_read = PopularityIndex._read.__func__
+
+    def read_then_late_commit(cls, conn, cutoff=None):
+        # El timestamp se tomó antes del corte, pero la escritura se confirma después de leer
+        timestamp = time.time() - 1
+        fresh = real_read(cls, conn, cutoff)
+        previous = _write(fan, movie_id, 1.0, timestamp)
+        index.apply(fan, movie_id, previous, 1.0, timestamp)
+        return fresh
+
+    monkeypatch.setattr(PopularityIndex, "_read", classmethod(read_then_late_commit))
+    index.reconcile()
+    assert index.counts(movie_id) == _expected_counts(movie_id)
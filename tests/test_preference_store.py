@@ -0,0 +1,147 @@
+"""Perfiles acotados, journal compactado y eventos viejos en el almacén de preferencias"""
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from testing.memory_driver import get_memory_graph
+from testing.synthetic import generate_catalogue
+from engines.content_graph import ContentGraph
+from engines import preference_store
+from engines.preference_store import PreferenceStore, interaction_event, recover_journals, replay_journal
+from repositories.base import get_repository
+
+
+@pytest.fixture
+def store(tmp_path):
+    movies, edges = generate_catalogue(50, seed=3)
+    store = PreferenceStore(ContentGraph.from_rows(movies, edges), str(tmp_path),
+                            flush_interval=60, max_profiles=3, profile_ttl=60)
+    yield store
+    store.close()
+
+
+def _journal_events(store):
+    with open(store.journal_path, encoding="utf-8") as journal:
+        return [json.loads(line) for line in journal if line.strip()]
+
+
+def test_profiles_are_bounded_and_pending_ones_are_kept(store):
+    # Con el candado de vaciado tomado, el hilo de fondo no puede escribir lo pendiente
+    with store._flush_lock:
+        store.record("u1", "m1", "like", 1.0)
+        for user_id in ("u2", "u3", "u4", "u5"):
+            store.get_profile(user_id)
+        assert store.stats()["profiles"] == 3
+        # u1 es el menos usado pero tiene una escritura pendiente
+        assert store.peek("u1") is not None
+
+    store.flush()
+    for user_id in ("u6", "u7", "u8"):
+        store.get_profile(user_id)
+    assert store.peek("u1") is None
+    assert store.stats()["profiles"] == 3
+
+
+def test_expired_profiles_are_reloaded(store):
+    store.get_profile("u1")
+    store.profile_ttl = 0
+    time.sleep(0.01)
+    assert store.peek("u1") is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_journal_keeps_only_unwritten_events(store, monkeypatch):
+    journals = []
+    repository = get_repository()
+    write_interactions = repository.write_interactions
+
+    def write_and_look(batch):
+        journals.append([e["movie_id"] for e in _journal_events(store)])
+        return write_interactions(batch)
+
+    monkeypatch.setattr(repository, "write_interactions", write_and_look)
+    store.batch_size = 1
+    with store._flush_lock:
+        store.record("u1", "m1", "like", 1.0)
+        store.record("u1", "m2", "dislike", -1.0)
+    store.flush()
+
+    # Antes del segundo lote el journal ya no tiene el primero
+    assert journals == [["m1", "m2"], ["m2"]]
+    assert _journal_events(store) == []
+
+
+def test_old_events_do_not_change_the_graph(tmp_path):
+    graph = get_memory_graph()
+    now = time.time()
+    get_repository().write_interactions([interaction_event("u7", "m3", "like", 1.0, now)])
+    preferences = {c: dict(p) for c, p in graph.preferences["u7"].items()}
+
+    path = tmp_path / "preferences-1.jsonl"
+    path.write_text(json.dumps(interaction_event("u7", "m3", "dislike", -1.0, now - 60)) + "\n")
+    assert replay_journal(str(path)) == 0
+    assert graph.interactions["u7"]["m3"]["weight"] == 1.0
+    assert graph.preferences["u7"] == preferences
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_workers_starting_together_replay_a_journal_once(tmp_path, monkeypatch):
+    path = tmp_path / f"preferences-{_dead_pid()}.jsonl"
+    path.write_text(json.dumps(interaction_event("u5", "m8", "like", 1.0, time.time())) + "\n")
+
+    # Los dos "workers" listan el journal antes de que cualquiera lo reclame
+    barrier = threading.Barrier(2)
+    listed = preference_store.glob.glob
+
+    def glob_then_wait(pattern):
+        paths = listed(pattern)
+        if pattern.endswith("preferences-*.jsonl"):
+            barrier.wait(5)
+        return paths
+
+    monkeypatch.setattr(preference_store.glob, "glob", glob_then_wait)
+    writes, results, errors = [], [], []
+    repository = get_repository()
+    write = repository.write_interactions
+    monkeypatch.setattr(repository, "write_interactions", lambda batch: writes.append(batch) or write(batch))
+
+    def worker():
+        try:
+            results.append(recover_journals(str(tmp_path)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert errors == []
+    assert len(writes) == 1
+    assert sorted(len(result) for result in results) == [0, 1]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "preferences-1.jsonl"
+    event = json.dumps(interaction_event("u6", "m9", "like", 1.0, time.time()))
+    path.write_text(event + "\n" + event[:20])
+    assert replay_journal(str(path)) == 1
+    assert not path.exists()
+
+
+def test_claim_left_by_a_dead_worker_is_replayed(tmp_path):
+    journal = tmp_path / f"preferences-{_dead_pid()}.jsonl"
+    claimed = tmp_path / f"{journal.name}.recovering.{_dead_pid()}"
+    claimed.write_text(json.dumps(interaction_event("u4", "m7", "like", 1.0, time.time())) + "\n")
+    assert recover_journals(str(tmp_path)) == [(str(journal), 1)]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,62 @@
+"""Generaciones de la caché de recomendaciones y resultados que no se guardan"""
+import time
+
+from controllers.movieRecommender_controller import MovieRecommenderController
+from engines.recommendation_cache import RecommendationCache, recommendation_cache
+
+
+def test_put_with_older_generation_is_dropped():
+    cache = RecommendationCache(max_entries=10)
+    generation = cache.generation("u1")
+    cache.invalidate_user("u1")
+    cache.put("u1", "content", [{"id": "m1"}], generation)
+    assert cache.get("u1", "content", 10) is None
+    assert cache.stats()["stale_puts"] == 1
+
+    cache.put("u1", "content", [{"id": "m2"}], cache.generation("u1"))
+    assert cache.get("u1", "content", 10) == [{"id": "m2"}]
+
+
+def test_invalidating_one_user_keeps_other_generations():
+    cache = RecommendationCache(max_entries=10)
+    generation = cache.generation("u2")
+    cache.invalidate_user("u1")
+    cache.put("u2", "content", [{"id": "m1"}], generation)
+    assert cache.get("u2", "content", 10) == [{"id": "m1"}]
+
+
+def test_clear_drops_puts_computed_before():
+    cache = RecommendationCache(max_entries=10)
+    generation = cache.generation("u1")
+    cache.clear()
+    cache.put("u1", "content", [{"id": "m1"}], generation)
+    assert cache.get("u1", "content", 10) is None
+
+
+def test_invalidations_are_forgotten_after_the_ttl():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=0.05)
+    for i in range(100):
+        cache.invalidate_user(f"u{i}")
+    assert cache.stats()["tracked_invalidations"] == 100
+    generation = cache.generation("u1")
+    time.sleep(0.06)
+    cache.invalidate_user("otro")
+    assert cache.stats()["tracked_invalidations"] == 1
+    # Un cálculo más largo que el TTL no se guarda: ya no se sabría si se invalidó
+    cache.put("u1", "content", [{"id": "m1"}], generation)
+    assert cache.get("u1", "content", 10) is None
+
+
+def test_error_fallback_is_not_cached(monkeypatch):
+    def broken(user_id, limit, algo):
+        raise RuntimeError("Neo4j no responde")
+
+    recommendation_cache.clear()
+    monkeypatch.setattr(MovieRecommenderController, "_rank", staticmethod(broken))
+    movies = MovieRecommenderController.get_recommendations_for_user("u1", 5)
+    assert all(movie["recommendation_type"] == "popular" for movie in movies)
+    assert recommendation_cache.get("u1", "content", 5) is None
+
+    monkeypatch.undo()
+    MovieRecommenderController.get_recommendations_for_user("u1", 5)
+    assert recommendation_cache.get("u1", "content", 5) is not None
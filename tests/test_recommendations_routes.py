@@ -0,0 +1,28 @@
+"""Validación del body de POST /recommendations/batch"""
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("body", [
+    {"user_ids": ["u1"], "limit": "diez"},
+    {"user_ids": ["u1"], "limit": None},
+    {"user_ids": ["u1"], "limit": 0},
+    {"user_ids": ["u1"], "chunk_size": "x"},
+    {"user_ids": "u1"},
+    {},
+    ["u1", "u2"],
+    "u1",
+])
+def test_batch_rejects_invalid_body(client, body):
+    response = client.post("/recommendations/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_batch_streams_one_line_per_user(client):
+    response = client.post("/recommendations/batch", json={"user_ids": ["u1", "u2"], "limit": "5"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["user_id"] for line in lines] == ["u1", "u2"]
+    assert all(len(line["recommendations"]) <= 5 for line in lines)
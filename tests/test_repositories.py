@@ -0,0 +1,121 @@
+"""Interfaz de acceso a datos: las dos implementaciones completas y los controladores sin driver"""
+import inspect
+
+import pytest
+
+import neo4j_connection
+import telemetry
+from testing.memory_driver import get_memory_graph
+from engines.preference_store import interaction_event
+from repositories.base import Repository, get_repository
+from repositories.memory_repository import MemoryRepository
+from repositories.neo4j_repository import Neo4jRepository
+
+
+def _interface():
+    return [name for name, _ in inspect.getmembers(Repository, inspect.isfunction) if not name.startswith("_")]
+
+
+@pytest.mark.parametrize("implementation", [Neo4jRepository, MemoryRepository])
+def test_implementations_cover_the_interface(implementation):
+    missing = [name for name in _interface() if getattr(implementation, name) is getattr(Repository, name)]
+    assert missing == []
+
+
+def test_pages_continue_after_the_cursor():
+    repository = MemoryRepository(get_memory_graph())
+    first = repository.actors_page(5)
+    last = first[-1]["actor"]
+    after = repository.actors_page(5, (last["name"], last["id"]))
+    everything = [row["actor"]["id"] for row in repository.actors_page(10)]
+    assert [row["actor"]["id"] for row in first + after] == everything
+
+
+def test_repeated_events_count_once():
+    graph = get_memory_graph()
+    user_id = "u3"
+    movie_id = next(m for m in graph.movies if m not in graph.interactions[user_id])
+    result = MemoryRepository(graph).write_interactions([
+        interaction_event(user_id, movie_id, "like", 1.0, 100.0),
+        interaction_event(user_id, movie_id, "dislike", -1.0, 101.0),
+    ])
+    assert len(result) == 1
+    assert graph.interactions[user_id][movie_id]["weight"] == -1.0
+
+
+class UnreachableDriver:
+    def session(self, **config):
+        raise AssertionError("Un controlador usó el driver en lugar del repositorio")
+
+    def close(self):
+        pass
+
+
+def test_routes_only_use_the_repository(client, monkeypatch):
+    graph = get_memory_graph()
+    monkeypatch.setattr(neo4j_connection, "_driver", UnreachableDriver())
+    user_id, movie_id = sorted(graph.users)[0], sorted(graph.movies)[0]
+    actor = next(iter(graph.actors.values()))
+    for path in ("/movies?limit=5", "/movies/latest", "/movies/top", f"/movies/{movie_id}",
+                 "/movies/search?q=a", "/movies/search/advanced?title=a", "/actors", f"/actors/{actor['id']}",
+                 "/genres", "/directors", "/suggest?q=a", f"/users/{user_id}/preferences",
+                 f"/recommendations/{user_id}", f"/recommendations/{user_id}/explain/{movie_id}"):
+        assert client.get(path).status_code == 200, path
+    assert isinstance(get_repository(), MemoryRepository)
+
+
+class EmptyResultDriver:
+    def session(self, **config):
+        return self
+
+    def run(self, query, parameters=None):
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+
+def test_each_neo4j_query_gets_its_own_metric_label(monkeypatch):
+    monkeypatch.setattr(neo4j_connection, "_driver", EmptyResultDriver())
+    monkeypatch.setattr(telemetry, "ENABLED", True)
+    telemetry.registry.reset()
+    repository = Neo4jRepository()
+    repository.get_actor("a1")
+    repository.get_genre("Drama")
+    metrics = telemetry.registry.render()
+    assert 'query="Neo4jRepository.get_actor"' in metrics
+    assert 'query="Neo4jRepository.get_genre"' in metrics
+    assert "Neo4jRepository._one" not in metrics
+
+
+class Row(dict):
+    def data(self):
+        return dict(self)
+
+
+class CatalogueDriver(EmptyResultDriver):
+    """1000 películas; guarda las consultas recibidas"""
+
+    def __init__(self):
+        self.queries = []
+
+    def run(self, query, parameters=None):
+        self.queries.append(query)
+        if "count(m)" in query:
+            return [Row(total=1000)]
+        skip, window = parameters["skip"], parameters["window"]
+        return [Row(id=f"m{i}") for i in range(skip, min(skip + window, 1000))]
+
+
+def test_random_movies_do_not_sort_the_catalogue(monkeypatch):
+    driver = CatalogueDriver()
+    monkeypatch.setattr(neo4j_connection, "_driver", driver)
+    movie_ids = Neo4jRepository().random_movie_ids(20)
+    assert len(set(movie_ids)) == 20
+    assert not any("rand()" in query for query in driver.queries)
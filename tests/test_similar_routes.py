@@ -0,0 +1,27 @@
+"""GET /movies/<id>/similar solo consulta el índice cargado al arrancar"""
+from engines import similar_index
+
+
+def test_similar_uses_index_loaded_at_startup(app, client):
+    assert similar_index.is_loaded()
+    movie_id = similar_index.get_similar_index().movie_ids[0]
+
+    response = client.get(f"/movies/{movie_id}/similar?limit=5")
+    assert response.status_code == 200
+    assert all("similarity" in movie for movie in response.get_json())
+
+
+def test_similar_without_index_is_503_and_does_not_build(app, client, monkeypatch):
+    def build(path=None):
+        raise AssertionError("el índice se construyó dentro de la petición")
+
+    monkeypatch.setattr(similar_index, "_index", None)
+    monkeypatch.setattr(similar_index, "build_similar_index", build)
+
+    response = client.get("/movies/m1/similar")
+    assert response.status_code == 503
+    assert not similar_index.is_loaded()
+
+
+def test_unknown_movie_is_404(app, client):
+    assert client.get("/movies/no-existe/similar").status_code == 404
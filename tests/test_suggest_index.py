@@ -0,0 +1,12 @@
+"""Índice de sugerencias sin índice de popularidad: cuenta los likes del grafo"""
+from engines import popularity_index
+from engines.suggest_index import SuggestIndex
+from neo4j_connection import Neo4jConnection
+
+
+def test_load_counts_likes_without_popularity_index(monkeypatch):
+    monkeypatch.setattr(popularity_index, "_index", None)
+    monkeypatch.setenv("POPULARITY_INDEX_ENABLED", "false")
+    with Neo4jConnection() as conn:
+        index = SuggestIndex.load(conn)
+    assert index.suggest("a", types=["movie"], limit=5)["movie"]
@@ -0,0 +1,54 @@
+"""Los vecinos por ítem se cargan al arrancar, nunca dentro de una interacción"""
+import pytest
+
+from controllers.interaction_controller import InteractionController
+from engines import item_cf, warmup
+
+USER = {"user_name": "Ana", "user_email": "ana@example.com"}
+MOVIE = {"movie_title": "Uno"}
+
+
+class FakeModel:
+    def __init__(self):
+        self.applied = []
+
+    def apply(self, user_id, movie_id, previous, weight):
+        self.applied.append((user_id, movie_id, previous, weight))
+
+
+@pytest.fixture
+def item_cf_enabled(monkeypatch):
+    monkeypatch.setenv("ITEM_CF_ENABLED", "true")
+    monkeypatch.setattr(item_cf, "_model", None)
+    yield
+    item_cf._model = None
+
+
+def test_interaction_does_not_build_item_cf(item_cf_enabled, monkeypatch):
+    def build():
+        raise AssertionError("los vecinos se construyeron dentro de la petición")
+
+    monkeypatch.setattr(item_cf, "_load_model", build)
+    InteractionController._applied("u1", "m1", "like", 1.0, 0, 0.0, [], USER, MOVIE)
+    assert not item_cf.is_loaded()
+
+
+def test_warmup_loads_item_cf_and_interactions_update_it(item_cf_enabled, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(item_cf, "_load_model", lambda: model)
+
+    warmup.warm_engines()
+    assert item_cf.is_loaded()
+
+    InteractionController._applied("u1", "m1", "like", 1.0, 0, 0.0, [], USER, MOVIE)
+    assert model.applied == [("u1", "m1", 0, 1.0)]
+
+
+def test_warmup_logs_failures_and_keeps_going(item_cf_enabled, monkeypatch):
+    def broken():
+        raise RuntimeError("sin conexión")
+
+    loaded = []
+    monkeypatch.setattr(warmup, "loaders", lambda: [("roto", broken), ("ok", lambda: loaded.append(True))])
+    warmup.warm_engines()
+    assert loaded == [True]